@@ -53,6 +53,7 @@ class SceneSegment:
     dominant_colors: List[str] = field(default_factory=list)
     brightness: float = 0.5  # 0-1
     motion_score: float = 0.0  # 0-1
+    thumbnail_path: Optional[str] = None  # first frame of the scene
     
     # Audio analysis
     has_speech: bool = False
@@ -4,9 +4,14 @@ Analyzes video content, detects scenes, extracts transcript
 """
 
 import os
+import re
 import json
+import math
+import asyncio
+import bisect
 import tempfile
-import subprocess
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
@@ -25,6 +30,48 @@ from core.state import (
 
 logger = structlog.get_logger(__name__)
 
+SCENE_THRESHOLD = 0.3  # FFmpeg scene score for a cut
+MIN_SCENE_GAP = 0.5  # seconds between two cuts
+AUDIO_WINDOW = 0.5  # seconds per loudness window
+SPEECH_LEVEL_DB = -30.0  # mean level above which a scene is assumed to contain speech
+SILENCE_DB = -91.0  # level reported for digital silence (same floor as volumedetect)
+
+# "[Parsed_showinfo_1 @ 0x...] n:   3 pts: ... pts_time:12.4 ..."
+_FILTER_LOG = re.compile(r"^\[Parsed_(showinfo|ametadata)_\d+ @ [^\]]+\] (.*)$")
+
+
+@dataclass
+class AnalysisPass:
+    """Everything collected by the single FFmpeg analysis pass"""
+    # pts_time of selected frames: the first frame, then every scene cut
+    selected_frames: List[float] = field(default_factory=list)
+    # (window start, RMS level in dB), one per AUDIO_WINDOW
+    audio_windows: List[Tuple[float, float]] = field(default_factory=list)
+    # One JPEG per selected frame, same order (empty without a work dir)
+    thumbnails: List[str] = field(default_factory=list)
+
+    def feed(self, line: str):
+        """Parse one FFmpeg stderr line (showinfo / ametadata output)"""
+        match = _FILTER_LOG.match(line)
+        if not match:
+            return
+        source, body = match.groups()
+
+        try:
+            if source == "showinfo":
+                if body.startswith("n:") and "pts_time:" in body:
+                    self.selected_frames.append(float(body.split("pts_time:")[1].split()[0]))
+            elif "pts_time:" in body:
+                # ametadata frame header, followed by its metadata keys
+                self.audio_windows.append((float(body.split("pts_time:")[1].split()[0]), SILENCE_DB))
+            elif body.startswith("lavfi.astats.Overall.RMS_level=") and self.audio_windows:
+                level = float(body.split("=", 1)[1])  # "-inf" for silence
+                if not math.isnan(level):
+                    start, _ = self.audio_windows[-1]
+                    self.audio_windows[-1] = (start, max(level, SILENCE_DB))
+        except (IndexError, ValueError):
+            pass
+
 
 class VideoAnalyzer:
     """
@@ -53,10 +100,10 @@ class VideoAnalyzer:
             metadata = await self._get_video_metadata(video_path)
             state.set_status("analyzing", progress=20)
             
-            # 2. Detect scenes
-            state.add_log("🎬 Detecting scenes...")
-            scenes = await self._detect_scenes(video_path, metadata)
-            state.set_status("analyzing", progress=40)
+            # 2. Scenes, audio levels and thumbnails in one decode
+            state.add_log("🎬 Detecting scenes, audio levels and thumbnails...")
+            scenes = await self._analyze_media(video_path, metadata, state.work_dir)
+            state.set_status("analyzing", progress=50)
             
             # 3. Extract transcript if has audio
             transcript = ""
@@ -64,20 +111,9 @@ class VideoAnalyzer:
             if metadata.get("has_audio", False) and self.whisper_client:
                 state.add_log("🎤 Transcribing audio with Whisper...")
                 transcript, transcript_segments = await self._transcribe(video_path)
-                state.set_status("analyzing", progress=60)
-            
-            # 4. Analyze audio levels per scene
-            if metadata.get("has_audio", False):
-                state.add_log("🔊 Analyzing audio levels...")
-                scenes = await self._analyze_audio_per_scene(video_path, scenes)
-                state.set_status("analyzing", progress=70)
+                state.set_status("analyzing", progress=80)
             
-            # 5. Generate thumbnails for scenes
-            state.add_log("🖼️ Extracting scene thumbnails...")
-            # thumbnails = await self._extract_thumbnails(video_path, scenes, state.work_dir)
-            state.set_status("analyzing", progress=80)
-            
-            # 6. Build analysis object
+            # 4. Build analysis object
             analysis = VideoAnalysis(
                 file_path=video_path,
                 duration=metadata["duration"],
@@ -151,90 +187,171 @@ class VideoAnalyzer:
             logger.error("FFprobe error", error=str(e))
             raise ValueError(f"Failed to probe video: {str(e)}")
     
-    async def _detect_scenes(
+    async def _analyze_media(
         self,
         video_path: str,
-        metadata: Dict[str, Any]
+        metadata: Dict[str, Any],
+        work_dir: Optional[str] = None
     ) -> List[SceneSegment]:
         """
-        Detect scene changes using FFmpeg scene detection filter.
-        Falls back to fixed intervals if scene detection fails.
+        Detect scenes, measure audio per scene and extract scene thumbnails
+        from a single FFmpeg decode.
+        Falls back to fixed intervals if the analysis pass fails.
         """
-        scenes = []
         duration = metadata["duration"]
+        thumb_dir = os.path.join(work_dir, "thumbnails") if work_dir else None
+        result = None
         
         try:
-            # Use FFmpeg scene detection
-            scene_threshold = 0.3  # Default threshold
-            cmd = [
-                "ffmpeg",
-                "-i", video_path,
-                "-vf", f"select='gt(scene,{scene_threshold})',showinfo",
-                "-f", "null",
-                "-"
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=120
-            )
-            
-            # Parse scene change timestamps from stderr
-            scene_times = [0.0]  # Always start at 0
-            
-            for line in result.stderr.split("\n"):
-                if "pts_time:" in line:
-                    try:
-                        pts_time = float(line.split("pts_time:")[1].split()[0])
-                        if pts_time > scene_times[-1] + 0.5:  # Min 0.5s between scenes
-                            scene_times.append(pts_time)
-                    except (IndexError, ValueError):
-                        continue
-            
-            # Add end time if not present
-            if scene_times[-1] < duration - 0.5:
-                scene_times.append(duration)
-            
-            # Create scene segments
-            for i in range(len(scene_times) - 1):
-                start = scene_times[i]
-                end = scene_times[i + 1]
-                
-                scene = SceneSegment(
-                    start_time=start,
-                    end_time=end,
-                    duration=end - start,
-                    scene_type=SceneType.unknown,
-                    confidence=0.7,
-                )
-                scenes.append(scene)
-            
+            result = await self._run_analysis_pass(video_path, metadata, thumb_dir)
+            scenes = self._scenes_from_pass(result, duration)
             logger.info(f"Detected {len(scenes)} scenes via FFmpeg")
             
-        except (subprocess.TimeoutExpired, Exception) as e:
+        except Exception as e:
             logger.warning(f"Scene detection failed, using fixed intervals: {e}")
-            
-            # Fallback: fixed 3-second intervals
-            interval = 3.0
-            current = 0.0
-            
-            while current < duration:
-                end = min(current + interval, duration)
-                scenes.append(SceneSegment(
-                    start_time=current,
-                    end_time=end,
-                    duration=end - current,
-                    scene_type=SceneType.unknown,
-                    confidence=0.5,
-                ))
-                current = end
+            scenes = self._fixed_interval_scenes(duration)
         
         # If too few scenes, subdivide
         if len(scenes) < 3 and duration > 10:
             scenes = self._subdivide_scenes(scenes, target_count=max(3, int(duration / 5)))
         
+        if result and result.audio_windows:
+            self._apply_audio_levels(scenes, result.audio_windows)
+        
+        return scenes
+    
+    def _analysis_command(
+        self,
+        video_path: str,
+        metadata: Dict[str, Any],
+        thumb_dir: Optional[str]
+    ) -> List[str]:
+        """
+        One FFmpeg invocation for the whole analysis:
+        - video: select first frame + scene cuts -> showinfo (timestamps) -> JPEG per cut
+        - audio: fixed windows -> astats RMS level -> ametadata (printed to stderr)
+        """
+        video_graph = (
+            f"[0:v:0]select='eq(n\\,0)+gt(scene\\,{SCENE_THRESHOLD})',showinfo[scenes]"
+        )
+        cmd = [
+            settings.ffmpeg_path,
+            "-hide_banner",
+            "-nostats",
+            "-i", video_path,
+        ]
+        outputs = ["-map", "[scenes]"]
+        if thumb_dir:
+            outputs += ["-fps_mode", "vfr", "-q:v", "2", "-y", os.path.join(thumb_dir, "scene_%04d.jpg")]
+        else:
+            outputs += ["-f", "null", "-"]
+        
+        graph = [video_graph]
+        if metadata.get("has_audio", False):
+            window = max(1, int((metadata.get("audio_sample_rate") or 44100) * AUDIO_WINDOW))
+            graph.append(
+                f"[0:a:0]asetnsamples=n={window}:p=0,"
+                "astats=metadata=1:reset=1:measure_perchannel=none:measure_overall=RMS_level,"
+                "ametadata=mode=print:key=lavfi.astats.Overall.RMS_level[levels]"
+            )
+            outputs += ["-map", "[levels]", "-f", "null", "-"]
+        
+        return cmd + ["-filter_complex", ";".join(graph)] + outputs
+    
+    async def _run_analysis_pass(
+        self,
+        video_path: str,
+        metadata: Dict[str, Any],
+        thumb_dir: Optional[str]
+    ) -> AnalysisPass:
+        """Run the analysis pass, parsing stderr as it streams"""
+        if thumb_dir:
+            os.makedirs(thumb_dir, exist_ok=True)
+        
+        process = await asyncio.create_subprocess_exec(
+            *self._analysis_command(video_path, metadata, thumb_dir),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            limit=1024 * 1024,  # showinfo side-data lines can be long
+        )
+        result = AnalysisPass()
+        tail = deque(maxlen=5)
+        
+        async def consume() -> int:
+            async for raw in process.stderr:
+                line = raw.decode("utf-8", errors="replace").rstrip()
+                result.feed(line)
+                tail.append(line)
+            return await process.wait()
+        
+        # Same 2-minute budget as before, extended for long videos
+        timeout = max(120.0, metadata["duration"])
+        try:
+            returncode = await asyncio.wait_for(consume(), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise RuntimeError(f"FFmpeg analysis timed out after {timeout:.0f}s")
+        
+        if returncode != 0:
+            raise RuntimeError(f"FFmpeg exited with {returncode}: {' | '.join(tail)}")
+        if not result.selected_frames:
+            raise RuntimeError("FFmpeg analysis produced no frames")
+        
+        if thumb_dir:
+            result.thumbnails = [
+                os.path.join(thumb_dir, f"scene_{i + 1:04d}.jpg")
+                for i in range(len(result.selected_frames))
+            ]
+        return result
+    
+    def _scenes_from_pass(self, result: AnalysisPass, duration: float) -> List[SceneSegment]:
+        """Build scene segments from the cut timestamps"""
+        scene_times = [0.0]  # Always start at 0
+        thumbnails = [result.thumbnails[0] if result.thumbnails else None]
+        
+        for i, pts_time in enumerate(result.selected_frames[1:], start=1):
+            thumbnail = result.thumbnails[i] if result.thumbnails else None
+            if pts_time > scene_times[-1] + MIN_SCENE_GAP:
+                scene_times.append(pts_time)
+                thumbnails.append(thumbnail)
+            elif thumbnail and os.path.exists(thumbnail):
+                # Cut too close to the previous one: not a scene
+                os.remove(thumbnail)
+        
+        # Add end time if not present
+        if scene_times[-1] < duration - MIN_SCENE_GAP:
+            scene_times.append(duration)
+        
+        return [
+            SceneSegment(
+                start_time=scene_times[i],
+                end_time=scene_times[i + 1],
+                duration=scene_times[i + 1] - scene_times[i],
+                scene_type=SceneType.unknown,
+                confidence=0.7,
+                thumbnail_path=thumbnails[i],
+            )
+            for i in range(len(scene_times) - 1)
+        ]
+    
+    def _fixed_interval_scenes(self, duration: float, interval: float = 3.0) -> List[SceneSegment]:
+        """Fallback: fixed 3-second intervals"""
+        scenes = []
+        current = 0.0
+        
+        while current < duration:
+            end = min(current + interval, duration)
+            scenes.append(SceneSegment(
+                start_time=current,
+                end_time=end,
+                duration=end - current,
+                scene_type=SceneType.unknown,
+                confidence=0.5,
+            ))
+            current = end
+        
         return scenes
     
     def _subdivide_scenes(
@@ -255,6 +372,7 @@ class VideoAnalyzer:
                     duration=mid - scene.start_time,
                     scene_type=scene.scene_type,
                     confidence=scene.confidence * 0.8,
+                    thumbnail_path=scene.thumbnail_path,
                 ))
                 new_scenes.append(SceneSegment(
                     start_time=mid,
@@ -288,75 +406,26 @@ class VideoAnalyzer:
             logger.error(f"Transcription failed: {e}")
             return "", []
     
-    async def _analyze_audio_per_scene(
+    def _apply_audio_levels(
         self,
-        video_path: str,
-        scenes: List[SceneSegment]
-    ) -> List[SceneSegment]:
-        """Analyze audio characteristics for each scene"""
-        for scene in scenes:
-            try:
-                # Use FFmpeg to get audio stats for this segment
-                cmd = [
-                    "ffmpeg",
-                    "-ss", str(scene.start_time),
-                    "-t", str(scene.duration),
-                    "-i", video_path,
-                    "-af", "volumedetect",
-                    "-f", "null",
-                    "-"
-                ]
-                
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=30
-                )
-                
-                # Parse mean volume
-                for line in result.stderr.split("\n"):
-                    if "mean_volume:" in line:
-                        try:
-                            volume = float(line.split("mean_volume:")[1].split("dB")[0].strip())
-                            scene.audio_level = volume
-                            # Assume speech if volume above threshold
-                            scene.has_speech = volume > -30
-                        except (IndexError, ValueError):
-                            pass
-                        break
-                
-            except Exception as e:
-                logger.warning(f"Audio analysis failed for scene: {e}")
-        
-        return scenes
-    
-    async def _extract_thumbnails(
-        self,
-        video_path: str,
         scenes: List[SceneSegment],
-        work_dir: str
-    ) -> Dict[int, str]:
-        """Extract thumbnail at midpoint of each scene"""
-        thumbnails = {}
+        audio_windows: List[Tuple[float, float]]
+    ) -> List[SceneSegment]:
+        """Set each scene's mean audio level from the loudness windows it overlaps"""
+        starts = [start for start, _ in audio_windows]
         
-        for i, scene in enumerate(scenes):
-            mid_time = scene.start_time + scene.duration / 2
-            thumb_path = os.path.join(work_dir, f"thumb_scene_{i}.jpg")
+        for scene in scenes:
+            first = max(0, bisect.bisect_right(starts, scene.start_time) - 1)
+            last = max(first + 1, bisect.bisect_left(starts, scene.end_time))
+            levels = [level for _, level in audio_windows[first:last]]
             
-            try:
-                (
-                    ffmpeg
-                    .input(video_path, ss=mid_time)
-                    .output(thumb_path, vframes=1, **{'q:v': 2})
-                    .overwrite_output()
-                    .run(capture_stdout=True, capture_stderr=True)
-                )
-                thumbnails[i] = thumb_path
-            except Exception as e:
-                logger.warning(f"Thumbnail extraction failed for scene {i}: {e}")
+            # Mean power, as volumedetect's mean_volume
+            power = sum(10 ** (level / 10) for level in levels) / len(levels)
+            scene.audio_level = max(10 * math.log10(power), SILENCE_DB) if power > 0 else SILENCE_DB
+            # Assume speech if volume above threshold
+            scene.has_speech = scene.audio_level > SPEECH_LEVEL_DB
         
-        return thumbnails
+        return scenes
 
 
 # =============================================================================
@@ -0,0 +1,118 @@
+"""
+IA Factory Operator - Video analysis benchmark
+N+2 FFmpeg passes (scene detect, volumedetect per scene, thumbnail per scene)
+vs the single analysis pass of VideoAnalyzer
+
+Generates a synthetic 720p source with a hard cut every 7s (600s by default)
+and analyzes it both ways. Run from the operator root (or in the container):
+
+    python scripts/benchmark_analyzer.py --duration 600
+    python scripts/benchmark_analyzer.py --video /path/to/source.mp4
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import settings
+from pipeline.analyzer import VideoAnalyzer
+
+CUT_EVERY = 7  # seconds between synthetic hard cuts
+
+
+def make_source(path: Path, duration: int):
+    """720p test pattern, inverted every CUT_EVERY seconds, with speech-like bursts"""
+    subprocess.run([
+        settings.ffmpeg_path, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i",
+        f"testsrc2=s=1280x720:r=25:d={duration},negate=enable='mod(floor(t/{CUT_EVERY})\\,2)'",
+        "-f", "lavfi", "-i",
+        f"sine=frequency=220:d={duration},volume='if(lt(mod(t\\,13)\\,6)\\,1\\,0.01)':eval=frame",
+        "-c:v", "libx264", "-preset", "veryfast", "-c:a", "aac", "-shortest", str(path),
+    ], check=True)
+
+
+def legacy_analysis(video_path: str, duration: float, work_dir: str):
+    """Previous analyzer: one scene pass, then one volumedetect and one seek per scene"""
+    result = subprocess.run(
+        [settings.ffmpeg_path, "-i", video_path,
+         "-vf", "select='gt(scene,0.3)',showinfo", "-f", "null", "-"],
+        capture_output=True, text=True,
+    )
+    scene_times = [0.0]
+    for line in result.stderr.split("\n"):
+        if "pts_time:" in line:
+            try:
+                pts_time = float(line.split("pts_time:")[1].split()[0])
+            except (IndexError, ValueError):
+                continue
+            if pts_time > scene_times[-1] + 0.5:
+                scene_times.append(pts_time)
+    if scene_times[-1] < duration - 0.5:
+        scene_times.append(duration)
+    scenes = list(zip(scene_times, scene_times[1:]))
+
+    processes = 1
+    for i, (start, end) in enumerate(scenes):
+        subprocess.run(
+            [settings.ffmpeg_path, "-ss", str(start), "-t", str(end - start), "-i", video_path,
+             "-af", "volumedetect", "-f", "null", "-"],
+            capture_output=True, text=True,
+        )
+        subprocess.run(
+            [settings.ffmpeg_path, "-ss", str(start + (end - start) / 2), "-i", video_path,
+             "-vframes", "1", "-q:v", "2", "-y", os.path.join(work_dir, f"thumb_scene_{i}.jpg")],
+            capture_output=True,
+        )
+        processes += 2
+    return len(scenes), processes
+
+
+async def benchmark(video: Path, workdir: Path):
+    analyzer = VideoAnalyzer()
+    metadata = await analyzer._get_video_metadata(str(video))
+    print(f"Source: {video.name}, {metadata['duration']:.0f}s "
+          f"{metadata['width']}x{metadata['height']}, {os.cpu_count()} CPUs")
+
+    legacy_dir = workdir / "legacy"
+    legacy_dir.mkdir()
+    started = time.perf_counter()
+    scene_count, processes = await asyncio.to_thread(
+        legacy_analysis, str(video), metadata["duration"], str(legacy_dir)
+    )
+    legacy = time.perf_counter() - started
+    print(f"  N+2 passes   {legacy:7.1f}s  {scene_count:4d} scenes  {processes} FFmpeg processes")
+
+    started = time.perf_counter()
+    scenes = await analyzer._analyze_media(str(video), metadata, str(workdir / "single"))
+    single = time.perf_counter() - started
+    thumbnails = sum(1 for scene in scenes if scene.thumbnail_path)
+    print(f"  single pass  {single:7.1f}s  {len(scenes):4d} scenes  1 FFmpeg process, {thumbnails} thumbnails")
+
+    print(f"  speedup      {legacy / single:7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=int, default=600, help="synthetic source length (s)")
+    parser.add_argument("--video", type=Path, help="analyze this file instead of a synthetic one")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="analyzer_bench_") as tmp:
+        workdir = Path(tmp)
+        video = args.video
+        if video is None:
+            video = workdir / f"source_{args.duration}s.mp4"
+            make_source(video, args.duration)
+        asyncio.run(benchmark(video, workdir))
+
+
+if __name__ == "__main__":
+    main()
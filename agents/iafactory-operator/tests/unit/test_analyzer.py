@@ -0,0 +1,170 @@
+"""
+Unit tests for the single-pass FFmpeg analysis parser and scene building
+"""
+import asyncio
+
+import pytest
+
+from core.state import SceneSegment
+from pipeline.analyzer import MIN_SCENE_GAP, SILENCE_DB, AnalysisPass, VideoAnalyzer
+
+# stderr of the analysis command (FFmpeg 7.0) on a 4.2 s clip: red then blue
+# at 2 s, a 440 Hz tone for 2 s then silence
+CAPTURED_LOG = """\
+Stream mapping:
+  Stream #0:0 (mpeg4) -> select:default
+  Stream #0:1 (aac) -> asetnsamples:default
+  showinfo:default -> Stream #0:0 (wrapped_avframe)
+  ametadata:default -> Stream #1:0 (pcm_s16le)
+Press [q] to stop, [?] for help
+[Parsed_showinfo_1 @ 0x7f2ad0004a80] config in time_base: 1/12800, frame_rate: 25/1
+[Parsed_showinfo_1 @ 0x7f2ad0004a80] config out time_base: 0/0, frame_rate: 0/0
+[Parsed_showinfo_1 @ 0x7f2ad0004a80] n:   0 pts:      0 pts_time:0       duration:    512 duration_time:0.04    fmt:yuv420p cl:left sar:1/1 s:160x120 i:P iskey:1 type:I checksum:3992E941 plane_checksum:[859CBC59 3B1D97DA F2F394FF] mean:[81 90 240] stdev:[0.0 0.0 0.0]
+[Parsed_showinfo_1 @ 0x7f2ad0004a80] color_range:unknown color_space:unknown color_primaries:unknown color_trc:unknown
+Output #0, null, to 'pipe:':
+[Parsed_ametadata_4 @ 0x7f2ad0005740] frame:0    pts:0       pts_time:0
+[Parsed_ametadata_4 @ 0x7f2ad0005740] lavfi.astats.Overall.RMS_level=-21.138360
+[Parsed_ametadata_4 @ 0x7f2ad0005740] frame:1    pts:22050   pts_time:0.5
+[Parsed_ametadata_4 @ 0x7f2ad0005740] lavfi.astats.Overall.RMS_level=-21.053953
+[Parsed_ametadata_4 @ 0x7f2ad0005740] frame:2    pts:44100   pts_time:1
+[Parsed_ametadata_4 @ 0x7f2ad0005740] lavfi.astats.Overall.RMS_level=-21.085028
+[Parsed_showinfo_1 @ 0x7f2ad0004a80] n:   1 pts:  25600 pts_time:2       duration:    512 duration_time:0.04    fmt:yuv420p cl:left sar:1/1 s:160x120 i:P iskey:1 type:I checksum:76CCA7AB plane_checksum:[E7F003B4 F2F394FF 64B00EF8] mean:[41 240 110] stdev:[0.0 0.0 0.0]
+[Parsed_showinfo_1 @ 0x7f2ad0004a80] color_range:unknown color_space:unknown color_primaries:unknown color_trc:unknown
+[Parsed_ametadata_4 @ 0x7f2ad0005740] frame:3    pts:66150   pts_time:1.5
+[Parsed_ametadata_4 @ 0x7f2ad0005740] lavfi.astats.Overall.RMS_level=-21.073402
+[Parsed_ametadata_4 @ 0x7f2ad0005740] frame:4    pts:88200   pts_time:2
+[Parsed_ametadata_4 @ 0x7f2ad0005740] lavfi.astats.Overall.RMS_level=-80.364634
+[Parsed_ametadata_4 @ 0x7f2ad0005740] frame:5    pts:110250  pts_time:2.5
+[Parsed_ametadata_4 @ 0x7f2ad0005740] lavfi.astats.Overall.RMS_level=-inf
+[Parsed_ametadata_4 @ 0x7f2ad0005740] frame:6    pts:132300  pts_time:3
+[Parsed_ametadata_4 @ 0x7f2ad0005740] lavfi.astats.Overall.RMS_level=-inf
+[Parsed_ametadata_4 @ 0x7f2ad0005740] frame:7    pts:154350  pts_time:3.5
+[Parsed_ametadata_4 @ 0x7f2ad0005740] lavfi.astats.Overall.RMS_level=-inf
+[Parsed_ametadata_4 @ 0x7f2ad0005740] frame:8    pts:176400  pts_time:4
+[Parsed_ametadata_4 @ 0x7f2ad0005740] lavfi.astats.Overall.RMS_level=-inf
+[Parsed_astats_3 @ 0x7f2ad0005300] Overall
+[Parsed_astats_3 @ 0x7f2ad0005300] RMS level dB: -inf
+[out#0/null @ 0x1d1b1b00] video:1KiB audio:0KiB subtitle:0KiB other streams:0KiB global headers:0KiB muxing overhead: unknown
+frame=    2 fps=0.0 q=-0.0 Lsize=N/A time=00:00:02.04 bitrate=N/A speed= 162x
+"""
+
+METADATA = {"duration": 4.2, "has_audio": True, "audio_sample_rate": 44100}
+
+
+def _captured_pass() -> AnalysisPass:
+    result = AnalysisPass()
+    for line in CAPTURED_LOG.splitlines():
+        result.feed(line)
+    return result
+
+
+def _scene(start: float, end: float) -> SceneSegment:
+    return SceneSegment(start_time=start, end_time=end, duration=end - start)
+
+
+class TestAnalysisPassFeed:
+    """Test suite for parsing showinfo / ametadata stderr lines"""
+
+    def test_captured_log(self):
+        """Scene cuts and one level per window are read from real FFmpeg output"""
+        result = _captured_pass()
+
+        assert result.selected_frames == [0.0, 2.0]
+        assert [start for start, _ in result.audio_windows] == [0, 0.5, 1, 1.5, 2, 2.5, 3, 3.5, 4]
+        assert [level for _, level in result.audio_windows[:5]] == pytest.approx(
+            [-21.138360, -21.053953, -21.085028, -21.073402, -80.364634]
+        )
+        # "-inf" (digital silence) is floored like volumedetect
+        assert [level for _, level in result.audio_windows[5:]] == [SILENCE_DB] * 4
+
+    def test_unusable_lines_are_ignored(self):
+        """Orphan, malformed or NaN values neither raise nor shift windows"""
+        result = AnalysisPass()
+        for line in [
+            "[Parsed_ametadata_4 @ 0x1] lavfi.astats.Overall.RMS_level=-20.0",
+            "[Parsed_showinfo_1 @ 0x1] n:   0 pts:      0 pts_time:abc",
+            "[Parsed_ametadata_4 @ 0x1] frame:0    pts:0       pts_time:0",
+            "[Parsed_ametadata_4 @ 0x1] lavfi.astats.Overall.RMS_level=nan",
+            "[Parsed_ametadata_4 @ 0x1] frame:1    pts:22050   pts_time:",
+            "[Parsed_scale_2 @ 0x1] n:   0 pts:      0 pts_time:1",
+            "n:   0 pts:      0 pts_time:1",
+        ]:
+            result.feed(line)
+
+        assert result.selected_frames == []
+        assert result.audio_windows == [(0.0, SILENCE_DB)]
+
+
+class TestScenesFromPass:
+    """Test suite for turning cut timestamps into scenes"""
+
+    def test_close_cuts_are_merged_and_their_thumbnails_removed(self, tmp_path):
+        """Cuts within MIN_SCENE_GAP of the previous scene are dropped with their JPEG"""
+        frames = [0.0, MIN_SCENE_GAP, 2.0, 2.0 + MIN_SCENE_GAP / 2, 4.0]
+        thumbnails = []
+        for i in range(len(frames)):
+            path = tmp_path / f"scene_{i + 1:04d}.jpg"
+            path.write_bytes(b"jpeg")
+            thumbnails.append(str(path))
+        result = AnalysisPass(selected_frames=frames, thumbnails=thumbnails)
+
+        scenes = VideoAnalyzer()._scenes_from_pass(result, duration=6.0)
+
+        assert [(s.start_time, s.end_time) for s in scenes] == [(0.0, 2.0), (2.0, 4.0), (4.0, 6.0)]
+        assert [s.thumbnail_path for s in scenes] == [thumbnails[0], thumbnails[2], thumbnails[4]]
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["scene_0001.jpg", "scene_0003.jpg", "scene_0005.jpg"]
+
+    def test_without_thumbnails(self):
+        """Without a work dir scenes have no thumbnail and nothing is removed"""
+        scenes = VideoAnalyzer()._scenes_from_pass(AnalysisPass(selected_frames=[0.0, 0.1, 3.0]), duration=5.0)
+
+        assert [(s.start_time, s.end_time) for s in scenes] == [(0.0, 3.0), (3.0, 5.0)]
+        assert all(s.thumbnail_path is None for s in scenes)
+
+    def test_cut_near_the_end_adds_no_scene(self):
+        """The end of the video closes the last scene unless a cut is within MIN_SCENE_GAP of it"""
+        scenes = VideoAnalyzer()._scenes_from_pass(AnalysisPass(selected_frames=[0.0, 2.0]), duration=2.0 + MIN_SCENE_GAP)
+
+        assert [(s.start_time, s.end_time) for s in scenes] == [(0.0, 2.0)]
+
+
+class TestAudioLevels:
+    """Test suite for averaging loudness windows per scene"""
+
+    WINDOWS = [(0.0, -20.0), (0.5, -40.0), (1.0, -60.0)]
+
+    def test_mean_power_of_overlapping_windows(self):
+        """A scene takes the mean power of the windows it overlaps, including a partial first one"""
+        scenes = VideoAnalyzer()._apply_audio_levels([_scene(0.0, 0.5), _scene(0.7, 1.2)], self.WINDOWS)
+
+        assert scenes[0].audio_level == pytest.approx(-20.0)
+        assert scenes[0].has_speech
+        assert scenes[1].audio_level == pytest.approx(-42.967, abs=1e-3)
+        assert not scenes[1].has_speech
+
+    def test_scene_shorter_than_a_window(self):
+        """A scene inside one window gets that window's level"""
+        scene, = VideoAnalyzer()._apply_audio_levels([_scene(0.6, 0.7)], self.WINDOWS)
+
+        assert scene.audio_level == pytest.approx(-40.0)
+
+    def test_silence(self):
+        """Silent windows give the silence floor, never -inf"""
+        scene, = VideoAnalyzer()._apply_audio_levels([_scene(0.0, 1.0)], [(0.0, SILENCE_DB), (0.5, SILENCE_DB)])
+
+        assert scene.audio_level == pytest.approx(SILENCE_DB)
+        assert not scene.has_speech
+
+    def test_analyze_media_with_captured_pass(self, monkeypatch):
+        """Scenes and their levels come from one pass over the captured output"""
+        analyzer = VideoAnalyzer()
+
+        async def run_pass(video_path, metadata, thumb_dir):
+            return _captured_pass()
+
+        monkeypatch.setattr(analyzer, "_run_analysis_pass", run_pass)
+        scenes = asyncio.run(analyzer._analyze_media("clip.mp4", METADATA))
+
+        assert [(s.start_time, s.end_time) for s in scenes] == [(0.0, 2.0), (2.0, 4.2)]
+        assert scenes[0].audio_level == pytest.approx(-21.088, abs=1e-3) and scenes[0].has_speech
+        assert scenes[1].audio_level == pytest.approx(-86.065, abs=1e-3) and not scenes[1].has_speech
@@ -11,6 +11,7 @@ import logging
 from generators.base import GeneratorCategory, GenerationRequest, GenerationStatus
 from generators.registry import get_global_registry
 from generators.router import SmartRouter, RoutingCriteria
+from generators.tracking import get_global_tracker
 
 logger = logging.getLogger(__name__)
 
@@ -345,6 +346,36 @@ async def cancel_generation(generator_name: str, task_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/webhooks/{generator_name}")
+async def generation_webhook(generator_name: str, payload: Dict):
+    """
+    Provider completion callback
+
+    Only identifies the task: the tracker confirms its status with the
+    provider right away, so the payload content is never trusted.
+
+    Args:
+        generator_name: Generator identifier
+        payload: Provider callback body
+
+    Returns:
+        Whether the task was being tracked
+    """
+    registry = get_global_registry()
+
+    try:
+        generator = registry.get(generator_name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Generator '{generator_name}' not found")
+
+    task_id = generator.webhook_task_id(payload)
+    if not task_id:
+        raise HTTPException(status_code=400, detail="Unrecognised webhook payload")
+
+    tracked = get_global_tracker().notify(task_id)
+    return {"success": True, "task_id": task_id, "tracked": tracked}
+
+
 @router.post("/compare", response_model=Dict)
 async def compare_generators(request: MultiGenerateRequest):
     """
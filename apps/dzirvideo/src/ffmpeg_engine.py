@@ -0,0 +1,669 @@
+"""
+FFmpeg Job Engine
+Shared by dzirvideo, video-studio and ia-factory
+
+Canonical copy: packages/shared/services_shared/ffmpeg_engine.py. Each app
+is built from its own Docker context, so the module is vendored into every
+app with `make sync-ffmpeg-engine` - edit this copy, then sync.
+
+- FFmpegEngine runs ffmpeg via asyncio.create_subprocess_exec (never blocks
+  the event loop), limits concurrent encodes to a worker pool and parses
+  `-progress` output.
+- build_assembly_args() describes clip concat + subtitle burn-in + audio mix
+  as a single filter_complex graph: one decode, one encode, no intermediate
+  files.
+- build_multi_output_args() decodes a source once and fans it out to several
+  renditions (split + scale per output) in a single FFmpeg invocation.
+- StageCache stores pipeline stage outputs (TTS audio, subtitle tracks,
+  backgrounds...) under a hash of their inputs so unchanged stages are not
+  regenerated on re-render.
+
+Stdlib only.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class FFmpegError(Exception):
+    """FFmpeg exited with an error"""
+
+    def __init__(self, message: str, returncode: Optional[int] = None, stderr: str = ""):
+        super().__init__(message)
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+@dataclass
+class FFmpegProgress:
+    """Progress report parsed from `-progress pipe:1`"""
+    out_time: float
+    fraction: Optional[float] = None  # 0..1 when the expected duration is known
+    speed: Optional[float] = None     # Encoding speed (x realtime)
+    done: bool = False
+
+
+@dataclass
+class FFmpegResult:
+    """Successful FFmpeg run"""
+    output_path: Optional[str]
+    elapsed_seconds: float
+    queued_seconds: float
+
+
+ProgressCallback = Callable[[FFmpegProgress], None]
+
+
+# =====================================================================
+# Engine
+# =====================================================================
+
+class FFmpegEngine:
+    """
+    Non-blocking FFmpeg runner with a worker pool limit
+
+    Example:
+        >>> engine = get_ffmpeg_engine()
+        >>> args = build_assembly_args(clips, "final.mp4", EncodeSettings(1080, 1920), ...)
+        >>> await engine.run(args, output_path="final.mp4", duration=58.0, on_progress=print)
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        ffmpeg_bin: str = "ffmpeg",
+        ffprobe_bin: str = "ffprobe",
+        stderr_tail_lines: int = 40
+    ):
+        """
+        Initialize engine
+
+        Args:
+            max_workers: Concurrent FFmpeg processes (default: FFMPEG_MAX_WORKERS or half the CPUs)
+            ffmpeg_bin: ffmpeg executable
+            ffprobe_bin: ffprobe executable
+            stderr_tail_lines: stderr lines kept for error messages
+        """
+        self.max_workers = max_workers or int(os.getenv("FFMPEG_MAX_WORKERS", "0")) \
+            or max(1, (os.cpu_count() or 2) // 2)
+        self.ffmpeg_bin = ffmpeg_bin
+        self.ffprobe_bin = ffprobe_bin
+        self.stderr_tail_lines = stderr_tail_lines
+
+        self.active_jobs = 0
+        self.completed_jobs = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+
+    def encoder_threads(self, encoders: int = 1) -> int:
+        """
+        Threads per video encoder so that a full worker pool fits the CPUs
+
+        libx264 defaults to ~1.5 threads per core for every encoder; a
+        multi-output job running N encoders in each of max_workers slots
+        would oversubscribe the machine N * max_workers times.
+
+        Args:
+            encoders: Video encoders in one job (outputs of a multi-output run)
+
+        Returns:
+            Value for `-threads` on each encoder (at least 1)
+        """
+        cpus = os.cpu_count() or 2
+        return max(1, cpus // (self.max_workers * max(encoders, 1)))
+
+    def _slot(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def run(
+        self,
+        args: Sequence[str],
+        output_path: Union[str, Sequence[str], None] = None,
+        duration: Optional[float] = None,
+        on_progress: Optional[ProgressCallback] = None
+    ) -> FFmpegResult:
+        """
+        Run one FFmpeg job
+
+        Args:
+            args: FFmpeg arguments (inputs, filters, output), without the binary
+            output_path: Output file(s), removed if the job fails
+            duration: Expected output duration, used for progress fractions
+            on_progress: Called for each progress block
+
+        Returns:
+            FFmpegResult
+
+        Raises:
+            FFmpegError: If FFmpeg exits with a non-zero code
+        """
+        cmd = [
+            self.ffmpeg_bin, "-hide_banner", "-nostdin", "-nostats", "-y",
+            "-progress", "pipe:1",
+            *args
+        ]
+
+        queued_at = time.monotonic()
+        async with self._slot():
+            started_at = time.monotonic()
+            self.active_jobs += 1
+            try:
+                returncode, stderr = await self._execute(cmd, duration, on_progress)
+            finally:
+                self.active_jobs -= 1
+
+        elapsed = time.monotonic() - started_at
+        if returncode != 0:
+            outputs = [output_path] if isinstance(output_path, (str, os.PathLike)) else output_path or []
+            for path in outputs:
+                Path(path).unlink(missing_ok=True)
+            raise FFmpegError(
+                f"FFmpeg exited with code {returncode}: {stderr[-500:]}",
+                returncode=returncode,
+                stderr=stderr
+            )
+
+        self.completed_jobs += 1
+        logger.info(f"FFmpeg job done in {elapsed:.1f}s: {output_path or cmd[-1]}")
+        return FFmpegResult(
+            output_path=output_path,
+            elapsed_seconds=elapsed,
+            queued_seconds=started_at - queued_at
+        )
+
+    async def _execute(
+        self,
+        cmd: List[str],
+        duration: Optional[float],
+        on_progress: Optional[ProgressCallback]
+    ) -> Tuple[int, str]:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        stderr_tail: Deque[str] = deque(maxlen=self.stderr_tail_lines)
+
+        try:
+            await asyncio.gather(
+                self._read_progress(process.stdout, duration, on_progress),
+                self._drain(process.stderr, stderr_tail)
+            )
+            returncode = await process.wait()
+        except asyncio.CancelledError:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            raise
+
+        return returncode, "\n".join(stderr_tail)
+
+    @staticmethod
+    async def _drain(stream: asyncio.StreamReader, tail: Deque[str]):
+        # Draining stderr continuously keeps FFmpeg from blocking on a full pipe
+        async for line in stream:
+            tail.append(line.decode("utf-8", errors="replace").rstrip())
+
+    @staticmethod
+    async def _read_progress(
+        stream: asyncio.StreamReader,
+        duration: Optional[float],
+        on_progress: Optional[ProgressCallback]
+    ):
+        block: Dict[str, str] = {}
+        async for raw in stream:
+            key, _, value = raw.decode("utf-8", errors="replace").strip().partition("=")
+            block[key] = value
+            if key != "progress":
+                continue
+
+            progress = parse_progress_block(block, duration)
+            block = {}
+            if on_progress:
+                try:
+                    on_progress(progress)
+                except Exception as e:
+                    logger.warning(f"FFmpeg progress callback failed: {e}")
+
+    async def _probe(self, args: Sequence[str]) -> str:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.ffprobe_bin, "-v", "error", *args,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except OSError as e:
+            logger.warning(f"ffprobe unavailable: {e}")
+            return ""
+        stdout, _ = await process.communicate()
+        return stdout.decode("utf-8", errors="replace").strip()
+
+    async def probe_duration(self, path: str) -> float:
+        """Media duration in seconds (0.0 if unknown)"""
+        output = await self._probe([
+            "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1",
+            path
+        ])
+        try:
+            return float(output)
+        except ValueError:
+            return 0.0
+
+    async def has_audio(self, path: str) -> bool:
+        """True if the file contains at least one audio stream"""
+        output = await self._probe([
+            "-select_streams", "a",
+            "-show_entries", "stream=index",
+            "-of", "csv=p=0",
+            path
+        ])
+        return bool(output)
+
+
+def parse_progress_block(block: Dict[str, str], duration: Optional[float] = None) -> FFmpegProgress:
+    """
+    Convert one `-progress` key=value block into FFmpegProgress
+
+    Args:
+        block: Keys of the block (out_time_us, speed, progress...)
+        duration: Expected output duration in seconds
+
+    Returns:
+        FFmpegProgress
+    """
+    # out_time_ms is in microseconds too, despite its name (long-standing FFmpeg quirk)
+    raw_time = block.get("out_time_us") or block.get("out_time_ms") or "0"
+    try:
+        out_time = max(int(raw_time), 0) / 1_000_000
+    except ValueError:
+        out_time = 0.0
+
+    try:
+        speed = float(block.get("speed", "").rstrip("x"))
+    except ValueError:
+        speed = None
+
+    done = block.get("progress") == "end"
+    fraction = None
+    if done:
+        fraction = 1.0
+    elif duration:
+        fraction = min(out_time / duration, 1.0)
+
+    return FFmpegProgress(out_time=out_time, fraction=fraction, speed=speed, done=done)
+
+
+_default_engine: Optional[FFmpegEngine] = None
+
+
+def get_ffmpeg_engine() -> FFmpegEngine:
+    """
+    Get or create the process-wide engine (one worker pool per process)
+
+    Returns:
+        FFmpegEngine singleton
+    """
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = FFmpegEngine()
+    return _default_engine
+
+
+# =====================================================================
+# Filter graphs
+# =====================================================================
+
+@dataclass
+class EncodeSettings:
+    """Output encoding settings"""
+    width: int
+    height: int
+    fps: int = 30
+    video_codec: str = "libx264"
+    preset: str = "medium"
+    crf: int = 23
+    pix_fmt: str = "yuv420p"
+    audio_codec: str = "aac"
+    audio_bitrate: str = "192k"
+    audio_sample_rate: Optional[int] = None
+    extra_video_args: List[str] = field(default_factory=list)
+    faststart: bool = True
+
+    def video_args(self) -> List[str]:
+        return [
+            "-c:v", self.video_codec,
+            "-preset", self.preset,
+            "-crf", str(self.crf),
+            *self.extra_video_args,
+            "-pix_fmt", self.pix_fmt,
+            "-r", str(self.fps),
+        ]
+
+    def audio_args(self) -> List[str]:
+        args = ["-c:a", self.audio_codec, "-b:a", self.audio_bitrate]
+        if self.audio_sample_rate:
+            args += ["-ar", str(self.audio_sample_rate)]
+        return args
+
+    def container_args(self) -> List[str]:
+        return ["-movflags", "+faststart"] if self.faststart else []
+
+
+@dataclass
+class AudioInput:
+    """Audio source mixed into the output"""
+    path: str
+    volume: float = 1.0
+    start_time: float = 0.0
+    fade_in: float = 0.0
+
+
+def escape_filter_value(value: str) -> str:
+    """
+    Escape a filter option value (file path, style) for use in filter_complex
+
+    Two levels: the option value (`\\`, `'`, `:`), then the filtergraph
+    description (`\\`, `'`, `[`, `]`, `,`, `;`).
+    """
+    for char in ("\\", "'", ":"):
+        value = value.replace(char, "\\" + char)
+    escaped = []
+    for char in value:
+        if char in "\\'[],;":
+            escaped.append("\\")
+        escaped.append(char)
+    return "".join(escaped)
+
+
+def fit_frame_filter(settings: EncodeSettings, pad_color: str = "black") -> str:
+    """Scale + pad to the output frame, normalized for the concat filter"""
+    w, h = settings.width, settings.height
+    return (
+        f"scale={w}:{h}:force_original_aspect_ratio=decrease,"
+        f"pad={w}:{h}:(ow-iw)/2:(oh-ih)/2:color={pad_color},"
+        f"setsar=1,fps={settings.fps},format={settings.pix_fmt}"
+    )
+
+
+def build_assembly_args(
+    clips: Sequence[str],
+    output_path: str,
+    settings: EncodeSettings,
+    audio: Sequence[AudioInput] = (),
+    subtitles_path: Optional[str] = None,
+    subtitle_style: Optional[str] = None,
+    keep_clip_audio: bool = False,
+    max_duration: Optional[float] = None
+) -> List[str]:
+    """
+    Single-pass assembly: concat clips, burn subtitles, mix audio, one encode
+
+    Args:
+        clips: Video clips, in timeline order
+        output_path: Output file
+        settings: Encoding settings (clips are scaled/padded to this frame)
+        audio: Narration / music tracks to mix
+        subtitles_path: SRT/ASS file burned into the video
+        subtitle_style: ASS force_style override
+        keep_clip_audio: Mix the clips' own audio (every clip must have an audio stream)
+        max_duration: Cut the output at this duration
+
+    Returns:
+        FFmpeg arguments for FFmpegEngine.run
+    """
+    if not clips:
+        raise ValueError("At least one clip is required")
+
+    inputs: List[str] = []
+    for clip in clips:
+        inputs += ["-i", str(clip)]
+    for track in audio:
+        inputs += ["-i", str(track.path)]
+
+    graph: List[str] = []
+    frame = fit_frame_filter(settings)
+    for i in range(len(clips)):
+        graph.append(f"[{i}:v]{frame}[v{i}]")
+
+    video_label = "v0"
+    if len(clips) > 1 or keep_clip_audio:
+        segments = "".join(
+            f"[v{i}][{i}:a]" if keep_clip_audio else f"[v{i}]"
+            for i in range(len(clips))
+        )
+        outputs = "[vcat][acat]" if keep_clip_audio else "[vcat]"
+        graph.append(f"{segments}concat=n={len(clips)}:v=1:a={int(keep_clip_audio)}{outputs}")
+        video_label = "vcat"
+
+    if subtitles_path:
+        subtitle_filter = f"subtitles=filename={escape_filter_value(str(subtitles_path))}"
+        if subtitle_style:
+            subtitle_filter += f":force_style={escape_filter_value(subtitle_style)}"
+        graph.append(f"[{video_label}]{subtitle_filter}[vsub]")
+        video_label = "vsub"
+
+    audio_labels = ["acat"] if keep_clip_audio else []
+    for i, track in enumerate(audio):
+        chain = []
+        if track.volume != 1.0:
+            chain.append(f"volume={track.volume}")
+        if track.fade_in:
+            chain.append(f"afade=t=in:st=0:d={track.fade_in}")
+        if track.start_time:
+            delay = int(track.start_time * 1000)
+            chain.append(f"adelay={delay}|{delay}")
+        graph.append(f"[{len(clips) + i}:a]{','.join(chain) or 'anull'}[a{i}]")
+        audio_labels.append(f"a{i}")
+
+    audio_label = None
+    if len(audio_labels) == 1:
+        audio_label = audio_labels[0]
+    elif audio_labels:
+        mix_inputs = "".join(f"[{label}]" for label in audio_labels)
+        graph.append(f"{mix_inputs}amix=inputs={len(audio_labels)}:duration=longest[aout]")
+        audio_label = "aout"
+
+    args = [*inputs, "-filter_complex", ";".join(graph), "-map", f"[{video_label}]"]
+    if audio_label:
+        args += ["-map", f"[{audio_label}]", *settings.audio_args()]
+    else:
+        args += ["-an"]
+    args += settings.video_args()
+    if max_duration:
+        args += ["-t", str(max_duration)]
+    args += [*settings.container_args(), str(output_path)]
+    return args
+
+
+@dataclass
+class RenditionOutput:
+    """One output of a multi-output run"""
+    path: str
+    settings: EncodeSettings
+    max_duration: Optional[float] = None
+    pad_color: str = "black"
+
+
+def build_multi_output_args(
+    source: str,
+    outputs: Sequence[RenditionOutput],
+    include_audio: bool = True,
+    encoder_threads: Optional[int] = None
+) -> List[str]:
+    """
+    Decode once, encode many: split the source video into one branch per output
+
+    Args:
+        source: Input video
+        outputs: Renditions to produce (frame size, fps, codec, duration cap)
+        include_audio: Map the source audio, if any, into every output
+        encoder_threads: `-threads` for each video encoder (None = FFmpeg default)
+
+    Returns:
+        FFmpeg arguments for FFmpegEngine.run
+    """
+    if not outputs:
+        raise ValueError("At least one output is required")
+
+    graph: List[str] = []
+    if len(outputs) == 1:
+        branches = ["0:v"]
+    else:
+        branches = [f"s{i}" for i in range(len(outputs))]
+        graph.append(f"[0:v]split={len(outputs)}" + "".join(f"[{b}]" for b in branches))
+
+    for i, (branch, output) in enumerate(zip(branches, outputs)):
+        graph.append(f"[{branch}]{fit_frame_filter(output.settings, output.pad_color)}[o{i}]")
+
+    args = ["-i", str(source), "-filter_complex", ";".join(graph)]
+    for i, output in enumerate(outputs):
+        args += ["-map", f"[o{i}]"]
+        if include_audio:
+            # "?" keeps sources without an audio stream valid
+            args += ["-map", "0:a:0?", *output.settings.audio_args()]
+        else:
+            args += ["-an"]
+        args += output.settings.video_args()
+        if encoder_threads:
+            args += ["-threads", str(encoder_threads)]
+        if output.max_duration:
+            args += ["-t", str(output.max_duration)]
+        args += [*output.settings.container_args(), str(output.path)]
+    return args
+
+
+def build_color_source_args(
+    duration: float,
+    output_path: str,
+    settings: EncodeSettings,
+    color: str = "black",
+    silent_audio: bool = False
+) -> List[str]:
+    """
+    Solid color video (static background / placeholder)
+
+    Args:
+        duration: Duration in seconds
+        output_path: Output file
+        settings: Encoding settings
+        color: FFmpeg color name
+        silent_audio: Add a silent stereo track
+
+    Returns:
+        FFmpeg arguments for FFmpegEngine.run
+    """
+    args = [
+        "-f", "lavfi",
+        "-i", f"color=c={color}:s={settings.width}x{settings.height}:d={duration}:r={settings.fps}",
+    ]
+    if silent_audio:
+        args += ["-f", "lavfi", "-i", "anullsrc=r=44100:cl=stereo", "-t", str(duration)]
+        args += settings.audio_args()
+    args += settings.video_args()
+    args += [*settings.container_args(), str(output_path)]
+    return args
+
+
+# =====================================================================
+# Stage cache
+# =====================================================================
+
+class StageCache:
+    """
+    Content-addressed cache of pipeline stage outputs
+
+    A stage output is keyed by the stage name, its parameters and the content
+    of its input files. Re-rendering with unchanged inputs reuses the file.
+
+    Example:
+        >>> cache = StageCache("output/cache")
+        >>> audio = await cache.get_or_create(
+        ...     "tts", {"text": text, "voice": voice}, suffix=".wav",
+        ...     build=lambda path: tts.generate(text, str(path), voice=voice))
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+
+    def _file_digest(self, path: str) -> str:
+        stat = os.stat(path)
+        memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(memo_key)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(chunk)
+            digest = self._digests[memo_key] = hasher.hexdigest()
+        return digest
+
+    def key(self, stage: str, params: Dict[str, Any], inputs: Sequence[str] = ()) -> str:
+        """Cache key of a stage invocation"""
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps({"stage": stage, "params": params}, sort_keys=True, default=str).encode())
+        for path in inputs:
+            hasher.update(self._file_digest(str(path)).encode())
+        return hasher.hexdigest()[:32]
+
+    def path_for(self, stage: str, key: str, suffix: str = "") -> Path:
+        return self.cache_dir / f"{stage}-{key}{suffix}"
+
+    async def get_or_create(
+        self,
+        stage: str,
+        params: Dict[str, Any],
+        build: Callable[[Path], Awaitable[Any]],
+        inputs: Sequence[str] = (),
+        suffix: str = ""
+    ) -> Path:
+        """
+        Return the cached stage output, building it on miss
+
+        Args:
+            stage: Stage name (tts, subtitles, background...)
+            params: JSON-serializable parameters affecting the output
+            build: Coroutine writing the output to the given path
+            inputs: Input files whose content affects the output
+            suffix: Output file extension (kept last so FFmpeg detects the format)
+
+        Returns:
+            Path of the stage output
+        """
+        key = self.key(stage, params, inputs)
+        path = self.path_for(stage, key, suffix)
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if path.exists():
+                self.hits += 1
+                logger.info(f"Stage '{stage}' reused from cache: {path.name}")
+                return path
+
+            self.misses += 1
+            partial = path.with_name(f"{stage}-{key}.partial{suffix}")
+            try:
+                await build(partial)
+                os.replace(partial, path)
+            finally:
+                partial.unlink(missing_ok=True)
+        return path
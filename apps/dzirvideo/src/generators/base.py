@@ -3,6 +3,7 @@ Base Generator Interface for Dzir IA Video
 Common interface for all AI image and video generators
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import Dict, Optional, List, Any
@@ -64,6 +65,7 @@ class GeneratorCapabilities:
     # Speed
     avg_generation_time_seconds: float = 30.0
     supports_async: bool = True  # If API is async (polling-based)
+    supports_webhooks: bool = False  # Provider can call back on completion
 
     # Features
     supports_negative_prompts: bool = False
@@ -97,6 +99,9 @@ class GenerationRequest:
     task_id: Optional[str] = None
     user_id: Optional[str] = None
 
+    # Completion callback (only used by generators supporting webhooks)
+    webhook_url: Optional[str] = None
+
 
 @dataclass
 class GenerationResult:
@@ -203,6 +208,58 @@ class BaseGenerator(ABC):
         """
         pass
 
+    async def check_status_batch(self, task_ids: List[str]) -> Dict[str, Any]:
+        """
+        Check status of several generation tasks at once
+
+        Default implementation runs `check_status` concurrently; override
+        when the provider exposes a bulk status endpoint.
+
+        Args:
+            task_ids: Task identifiers
+
+        Returns:
+            Dict task_id -> GenerationResult, or the exception raised for that task
+        """
+        results = await asyncio.gather(
+            *(self.check_status(task_id) for task_id in task_ids),
+            return_exceptions=True
+        )
+        return dict(zip(task_ids, results))
+
+    def webhook_params(self, request: GenerationRequest) -> Dict[str, Any]:
+        """
+        Provider parameters registering the request's completion callback
+
+        Args:
+            request: Generation request
+
+        Returns:
+            Extra API parameters (empty if webhooks unsupported or not requested)
+        """
+        if not (self.capabilities.supports_webhooks and request.webhook_url):
+            return {}
+        return {"webhook": request.webhook_url, "webhook_events_filter": ["completed"]}
+
+    def webhook_task_id(self, payload: Dict[str, Any]) -> Optional[str]:
+        """
+        Extract the task identifier from a provider callback payload
+
+        The payload is only used to identify the task: its status is then
+        confirmed with `check_status`, so unsigned callbacks cannot inject
+        output URLs.
+
+        Args:
+            payload: Callback JSON body
+
+        Returns:
+            Task identifier, or None if the payload is not recognised
+        """
+        if not self.capabilities.supports_webhooks:
+            return None
+        task_id = payload.get("id")
+        return str(task_id) if task_id else None
+
     def estimate_cost(self, request: GenerationRequest) -> float:
         """
         Estimate cost for a generation request
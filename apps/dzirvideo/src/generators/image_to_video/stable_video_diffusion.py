@@ -117,6 +117,7 @@ class StableVideoDiffusionGenerator(BaseGenerator):
             # Performance
             avg_generation_time_seconds=30.0,  # ~30 seconds
             supports_async=True,
+            supports_webhooks=True,
 
             # Features
             supports_negative_prompts=False,  # Image input only
@@ -154,7 +155,8 @@ class StableVideoDiffusionGenerator(BaseGenerator):
             # Call Replicate async API
             prediction = replicate.predictions.create(
                 version=self.model_version,
-                input=params
+                input=params,
+                **self.webhook_params(request)
             )
 
             task_id = prediction.id
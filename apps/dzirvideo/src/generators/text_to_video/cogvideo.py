@@ -23,13 +23,13 @@ class CogVideoGenerator(BaseGenerator):
         return GeneratorCapabilities(
             supports_text_to_video=True, max_duration_seconds=8.0,
             max_resolution="720p", api_cost_per_second=0.0, free_tier=True,
-            quality_score=78, avg_generation_time_seconds=90.0
+            quality_score=78, avg_generation_time_seconds=90.0, supports_webhooks=True
         )
 
     async def generate(self, request: GenerationRequest) -> GenerationResult:
         self.validate_request(request)
         import replicate
-        pred = replicate.predictions.create(version=self.model_version, input={"prompt": request.prompt})
+        pred = replicate.predictions.create(version=self.model_version, input={"prompt": request.prompt}, **self.webhook_params(request))
         return GenerationResult(status=GenerationStatus.PROCESSING, task_id=pred.id, estimated_completion_time=90.0)
 
     async def check_status(self, task_id: str) -> GenerationResult:
@@ -28,7 +28,7 @@ class HunyuanVideoGenerator(BaseGenerator):
             api_cost_per_second=0.0,  # Open source
             free_tier=True,
             quality_score=82,
-            avg_generation_time_seconds=120.0,
+            avg_generation_time_seconds=120.0, supports_webhooks=True,
             supports_negative_prompts=True
         )
 
@@ -48,7 +48,8 @@ class HunyuanVideoGenerator(BaseGenerator):
 
             prediction = replicate.predictions.create(
                 version=self.model_version,
-                input=input_params
+                input=input_params,
+                **self.webhook_params(request)
             )
 
             return GenerationResult(
@@ -107,6 +107,7 @@ class KlingAIGenerator(BaseGenerator):
             # Performance
             avg_generation_time_seconds=60.0,  # ~1 minute
             supports_async=True,
+            supports_webhooks=True,
 
             # Features
             supports_negative_prompts=True,
@@ -140,7 +141,8 @@ class KlingAIGenerator(BaseGenerator):
             # Call Replicate async API
             prediction = replicate.predictions.create(
                 version=self.model_version,
-                input=params
+                input=params,
+                **self.webhook_params(request)
             )
 
             task_id = prediction.id
@@ -115,6 +115,7 @@ class LumaDreamGenerator(BaseGenerator):
             # Performance
             avg_generation_time_seconds=40.0,  # ~40 seconds
             supports_async=True,
+            supports_webhooks=True,
 
             # Features
             supports_negative_prompts=False,  # Simplified API
@@ -148,7 +149,8 @@ class LumaDreamGenerator(BaseGenerator):
             # Call Replicate async API
             prediction = replicate.predictions.create(
                 version=self.model_version,
-                input=params
+                input=params,
+                **self.webhook_params(request)
             )
 
             task_id = prediction.id
@@ -28,7 +28,7 @@ class Mochi1Generator(BaseGenerator):
             api_cost_per_second=0.0,  # Open source
             free_tier=True,
             quality_score=81,
-            avg_generation_time_seconds=180.0,
+            avg_generation_time_seconds=180.0, supports_webhooks=True,
             supports_aspect_ratios=True
         )
 
@@ -48,7 +48,8 @@ class Mochi1Generator(BaseGenerator):
 
             prediction = replicate.predictions.create(
                 version=self.model_version,
-                input=input_params
+                input=input_params,
+                **self.webhook_params(request)
             )
 
             return GenerationResult(
@@ -23,13 +23,13 @@ class OpenSoraGenerator(BaseGenerator):
         return GeneratorCapabilities(
             supports_text_to_video=True, max_duration_seconds=16.0,
             max_resolution="720p", api_cost_per_second=0.0, free_tier=True,
-            quality_score=75, avg_generation_time_seconds=120.0
+            quality_score=75, avg_generation_time_seconds=120.0, supports_webhooks=True
         )
 
     async def generate(self, request: GenerationRequest) -> GenerationResult:
         self.validate_request(request)
         import replicate
-        pred = replicate.predictions.create(version=self.model_version, input={"prompt": request.prompt, "num_frames": 16})
+        pred = replicate.predictions.create(version=self.model_version, input={"prompt": request.prompt, "num_frames": 16}, **self.webhook_params(request))
         return GenerationResult(status=GenerationStatus.PROCESSING, task_id=pred.id, estimated_completion_time=120.0)
 
     async def check_status(self, task_id: str) -> GenerationResult:
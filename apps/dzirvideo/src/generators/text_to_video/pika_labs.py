@@ -109,6 +109,7 @@ class PikaLabsGenerator(BaseGenerator):
             # Performance
             avg_generation_time_seconds=45.0,  # ~45s
             supports_async=True,
+            supports_webhooks=True,
 
             # Features
             supports_negative_prompts=True,
@@ -142,7 +143,8 @@ class PikaLabsGenerator(BaseGenerator):
             # Call Replicate async API
             prediction = replicate.predictions.create(
                 version=self.model_version,
-                input=params
+                input=params,
+                **self.webhook_params(request)
             )
 
             task_id = prediction.id
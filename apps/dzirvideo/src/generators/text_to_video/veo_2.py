@@ -31,14 +31,15 @@ class Veo2Generator(BaseGenerator):
             api_cost_per_second=0.50,  # Expensive!
             free_tier=False,
             quality_score=93, realism_score=94, coherence_score=92,
-            avg_generation_time_seconds=120.0, supports_async=True
+            avg_generation_time_seconds=120.0, supports_async=True, supports_webhooks=True
         )
 
     async def generate(self, request: GenerationRequest) -> GenerationResult:
         self.validate_request(request)
         prediction = replicate.predictions.create(
             version=self.model_version,
-            input={"prompt": request.prompt, "duration": int(request.duration_seconds or 5)}
+            input={"prompt": request.prompt, "duration": int(request.duration_seconds or 5)},
+            **self.webhook_params(request)
         )
         return GenerationResult(status=GenerationStatus.PROCESSING, task_id=prediction.id, estimated_completion_time=120.0)
 
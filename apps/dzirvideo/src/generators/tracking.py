@@ -0,0 +1,281 @@
+"""
+Generation Tracking for Dzir IA Video
+Waits for asynchronous generation tasks across all generators
+
+A single polling loop serves every in-flight task: due status checks are
+grouped per generator and sent through `check_status_batch`. Poll intervals
+adapt to the generator's `avg_generation_time_seconds` (few checks before the
+expected completion, exponential backoff after it). Provider webhooks wake
+the loop so the task is confirmed immediately instead of at its next poll.
+"""
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .base import BaseGenerator, GenerationResult, GenerationStatus
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (GenerationStatus.COMPLETED, GenerationStatus.FAILED)
+
+
+@dataclass
+class TrackedTask:
+    """In-flight generation task"""
+    task_id: str
+    generator: BaseGenerator
+    future: asyncio.Future
+    started_at: float
+    expected_seconds: float
+    webhook: bool = False
+    next_check: float = 0.0
+    late_polls: int = 0
+    polls: int = 0
+
+
+@dataclass
+class TrackerStats:
+    """Counters exposed for monitoring"""
+    status_checks: int = 0
+    batches: int = 0
+    webhooks: int = 0
+    completed: int = 0
+    failed: int = 0
+    timeouts: int = 0
+
+
+class GenerationTracker:
+    """
+    Shared waiter for asynchronous generation tasks
+
+    Example:
+        >>> tracker = get_global_tracker()
+        >>> result = await generator.generate(request)
+        >>> result = await tracker.wait(generator, result.task_id)
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 2.0,
+        max_interval: float = 30.0,
+        backoff: float = 1.5,
+        webhook_base_url: Optional[str] = None
+    ):
+        """
+        Initialize tracker
+
+        Args:
+            min_interval: Shortest delay between two checks of a task (seconds)
+            max_interval: Longest delay between two checks of a task (seconds)
+            backoff: Interval growth factor once the expected time is exceeded
+            webhook_base_url: Public URL of the webhook endpoint (None = polling only)
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.webhook_base_url = webhook_base_url.rstrip("/") if webhook_base_url else None
+        self.stats = TrackerStats()
+
+        self._tasks: Dict[str, TrackedTask] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    # =================================================================
+    # Public API
+    # =================================================================
+
+    def webhook_url(self, generator_name: str, generator: BaseGenerator) -> Optional[str]:
+        """
+        Callback URL to set on a request, if the generator supports webhooks
+
+        Args:
+            generator_name: Registry name of the generator
+            generator: Generator instance
+
+        Returns:
+            Webhook URL or None
+        """
+        if not self.webhook_base_url or not generator.capabilities.supports_webhooks:
+            return None
+        return f"{self.webhook_base_url}/{generator_name}"
+
+    async def wait(
+        self,
+        generator: BaseGenerator,
+        task_id: str,
+        timeout: float = 300.0,
+        webhook: bool = False
+    ) -> GenerationResult:
+        """
+        Wait until a task reaches COMPLETED or FAILED
+
+        Args:
+            generator: Generator that started the task
+            task_id: Task identifier returned by `generate`
+            timeout: Maximum wait in seconds
+            webhook: True if a completion callback was registered
+
+        Returns:
+            Final GenerationResult (COMPLETED or FAILED)
+
+        Raises:
+            TimeoutError: If the task does not finish within `timeout`
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        tracked = TrackedTask(
+            task_id=task_id,
+            generator=generator,
+            future=loop.create_future(),
+            started_at=now,
+            expected_seconds=generator.capabilities.avg_generation_time_seconds,
+            webhook=webhook,
+        )
+        tracked.next_check = now + self._next_interval(tracked, now)
+        self._tasks[task_id] = tracked
+        self._ensure_loop()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(tracked.future), timeout)
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            raise TimeoutError(f"Generation {task_id} timed out after {timeout:.0f}s")
+        finally:
+            self._tasks.pop(task_id, None)
+
+    def notify(self, task_id: str) -> bool:
+        """
+        Schedule an immediate status check (called on provider webhook)
+
+        Args:
+            task_id: Task identifier from the callback
+
+        Returns:
+            True if the task is being tracked
+        """
+        tracked = self._tasks.get(task_id)
+        if tracked is None:
+            return False
+
+        self.stats.webhooks += 1
+        tracked.next_check = 0.0
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return True
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+    # =================================================================
+    # Polling loop
+    # =================================================================
+
+    def _next_interval(self, tracked: TrackedTask, now: float) -> float:
+        """Delay before the next check of a task"""
+        if tracked.webhook:
+            # The callback wakes the loop: polling is only a safety net
+            return self.max_interval
+
+        remaining = tracked.expected_seconds - (now - tracked.started_at)
+        if remaining > 0:
+            # Converge on the expected completion time
+            interval = remaining / 2
+        else:
+            interval = self.min_interval * self.backoff ** tracked.late_polls
+            tracked.late_polls += 1
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _ensure_loop(self):
+        stale = self._loop_task is None or self._loop_task.done() \
+            or self._loop_task.get_loop() is not asyncio.get_running_loop()
+        if stale:
+            self._wakeup = asyncio.Event()
+            self._loop_task = asyncio.ensure_future(self._run())
+        else:
+            self._wakeup.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while self._tasks:
+            now = loop.time()
+            # Tasks due shortly after now join the current batch
+            horizon = now + self.min_interval / 2
+            due = [t for t in self._tasks.values() if t.next_check <= horizon]
+
+            if not due:
+                delay = min(t.next_check for t in self._tasks.values()) - now
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(delay, 0.0))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._check(due)
+
+    async def _check(self, due: List[TrackedTask]):
+        """Check all due tasks, one batch per generator"""
+        by_generator: Dict[int, List[TrackedTask]] = {}
+        for tracked in due:
+            by_generator.setdefault(id(tracked.generator), []).append(tracked)
+
+        batches = list(by_generator.values())
+        responses = await asyncio.gather(
+            *(group[0].generator.check_status_batch([t.task_id for t in group]) for group in batches),
+            return_exceptions=True
+        )
+
+        now = asyncio.get_running_loop().time()
+        for group, response in zip(batches, responses):
+            self.stats.batches += 1
+            self.stats.status_checks += len(group)
+
+            for tracked in group:
+                result = response if isinstance(response, Exception) else response.get(tracked.task_id)
+                tracked.polls += 1
+
+                if isinstance(result, GenerationResult) and result.status in TERMINAL_STATUSES:
+                    self._finish(tracked, result)
+                    continue
+
+                if isinstance(result, Exception):
+                    logger.warning(f"Status check failed for {tracked.task_id}: {result}")
+                tracked.next_check = now + self._next_interval(tracked, now)
+
+    def _finish(self, tracked: TrackedTask, result: GenerationResult):
+        if tracked.future.done():
+            return
+        if result.status == GenerationStatus.COMPLETED:
+            self.stats.completed += 1
+        else:
+            self.stats.failed += 1
+        tracked.future.set_result(result)
+        self._tasks.pop(tracked.task_id, None)
+
+
+# =====================================================================
+# Global Tracker Instance
+# =====================================================================
+
+_global_tracker: Optional[GenerationTracker] = None
+
+
+def get_global_tracker() -> GenerationTracker:
+    """
+    Get or create global tracker instance
+
+    The webhook base URL is read from DZIRVIDEO_WEBHOOK_BASE_URL
+    (e.g. https://video.example.com/api/v1/generators/webhooks).
+
+    Returns:
+        GenerationTracker singleton
+    """
+    global _global_tracker
+    if _global_tracker is None:
+        _global_tracker = GenerationTracker(webhook_base_url=os.getenv("DZIRVIDEO_WEBHOOK_BASE_URL"))
+    return _global_tracker
@@ -12,7 +12,16 @@ from pathlib import Path
 
 from generators.registry import get_global_registry
 from generators.router import SmartRouter, RoutingCriteria
-from generators.base import GenerationRequest, GeneratorCategory
+from generators.base import GenerationRequest, GeneratorCategory, GenerationStatus
+from generators.tracking import get_global_tracker
+from ffmpeg_engine import (
+    AudioInput,
+    EncodeSettings,
+    StageCache,
+    build_assembly_args,
+    build_color_source_args,
+    get_ffmpeg_engine,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -67,11 +76,40 @@ class PipelineV2:
     7. YouTube upload
     """
 
+    # Short side in pixels for each resolution preset
+    RESOLUTION_SHORT_SIDE = {"480p": 480, "720p": 720, "1080p": 1080, "1440p": 1440, "4K": 2160}
+
+    # Clip generation / download limits
+    CLIP_TIMEOUT_SECONDS = 300.0
+    DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+    MAX_DOWNLOAD_CONNECTIONS = 8
+
     def __init__(self):
         self.registry = get_global_registry()
         self.router = SmartRouter(self.registry)
+        self.tracker = get_global_tracker()
+        self.ffmpeg = get_ffmpeg_engine()
         self.output_dir = Path("output")
         self.output_dir.mkdir(exist_ok=True)
+        self.stage_cache = StageCache(str(self.output_dir / "cache"))
+        self._http_session = None
+
+    async def _get_http_session(self):
+        """Shared aiohttp session (connection pool reused across clip downloads)"""
+        import aiohttp
+
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.MAX_DOWNLOAD_CONNECTIONS),
+                timeout=aiohttp.ClientTimeout(total=None, sock_read=60)
+            )
+        return self._http_session
+
+    async def close(self):
+        """Release the pooled HTTP session"""
+        if self._http_session is not None and not self._http_session.closed:
+            await self._http_session.close()
+        self._http_session = None
 
     async def run_full_pipeline(self, config: PipelineConfig) -> Dict:
         """
@@ -165,6 +203,9 @@ class PipelineV2:
                 "error": str(e)
             }
 
+        finally:
+            await self.close()
+
     async def _generate_audio(
         self,
         text: str,
@@ -174,16 +215,25 @@ class PipelineV2:
         """
         Generate audio from text using TTS
 
+        Reused from the stage cache when text, voice and engine are unchanged.
+
         Returns:
             Tuple of (audio_path, duration)
         """
         # Import TTS generator (existing)
         from tts.generator import TTSGenerator
 
-        tts = TTSGenerator(engine=engine)
-        audio_path = self.output_dir / "audio.wav"
+        async def synthesize(path: Path):
+            tts = TTSGenerator(engine=engine)
+            await tts.generate(text, str(path), voice=voice)
 
-        duration = await tts.generate(text, str(audio_path), voice=voice)
+        audio_path = await self.stage_cache.get_or_create(
+            "tts",
+            {"text": text, "voice": voice, "engine": engine},
+            build=synthesize,
+            suffix=".wav"
+        )
+        duration = await self.ffmpeg.probe_duration(str(audio_path))
 
         return audio_path, duration
 
@@ -192,15 +242,28 @@ class PipelineV2:
         text: str,
         duration: float
     ) -> Path:
-        """Generate subtitle file (SRT format)"""
+        """Generate subtitle file (SRT format), reused while text and duration are unchanged"""
         from subtitles.generator import SubtitleGenerator
 
-        sub_gen = SubtitleGenerator()
-        subtitle_path = self.output_dir / "subtitles.srt"
+        async def write_subtitles(path: Path):
+            await SubtitleGenerator().generate(text, duration, str(path))
 
-        await sub_gen.generate(text, duration, str(subtitle_path))
+        return await self.stage_cache.get_or_create(
+            "subtitles",
+            {"text": text, "duration": round(duration, 3)},
+            build=write_subtitles,
+            suffix=".srt"
+        )
 
-        return subtitle_path
+    def _encode_settings(self, config: PipelineConfig) -> EncodeSettings:
+        """Output frame size from resolution preset and aspect ratio"""
+        short_side = self.RESOLUTION_SHORT_SIDE.get(config.resolution, 1080)
+        ratio_w, ratio_h = (int(x) for x in config.aspect_ratio.split(":"))
+        long_side = short_side * max(ratio_w, ratio_h) // min(ratio_w, ratio_h)
+        long_side += long_side % 2  # libx264 needs even dimensions
+
+        width, height = (short_side, long_side) if ratio_w <= ratio_h else (long_side, short_side)
+        return EncodeSettings(width=width, height=height, fps=config.fps)
 
     async def _split_into_scenes(
         self,
@@ -281,7 +344,8 @@ class PipelineV2:
                 category=GeneratorCategory.TEXT_TO_VIDEO,
                 duration_seconds=scene.duration_seconds,
                 aspect_ratio=config.aspect_ratio,
-                style=scene.visual_style
+                style_preset=scene.visual_style,
+                webhook_url=self.tracker.webhook_url(generator_name, generator)
             )
             tasks.append(self._generate_single_clip(generator, request, i))
 
@@ -301,57 +365,63 @@ class PipelineV2:
         # Generate
         result = await generator.generate(request)
 
-        # Poll for completion
-        max_attempts = 60  # 5 minutes
-        for attempt in range(max_attempts):
-            status = await generator.check_status(result.task_id)
-
-            if status.status.value == "completed":
-                # Download clip
-                clip_path = self.output_dir / f"clip_{clip_index:03d}.mp4"
-                await self._download_clip(status.output_url, clip_path)
-                return clip_path
-
-            elif status.status.value == "failed":
-                raise Exception(f"Clip {clip_index} generation failed: {status.error_message}")
+        # Wait for completion (shared polling loop + webhook)
+        if result.status not in (GenerationStatus.COMPLETED, GenerationStatus.FAILED):
+            try:
+                result = await self.tracker.wait(
+                    generator,
+                    result.task_id,
+                    timeout=self.CLIP_TIMEOUT_SECONDS,
+                    webhook=request.webhook_url is not None
+                )
+            except TimeoutError:
+                await generator.cancel(result.task_id)
+                raise Exception(f"Clip {clip_index} generation timeout")
 
-            await asyncio.sleep(5)  # Wait 5s between polls
+        if result.status == GenerationStatus.FAILED:
+            raise Exception(f"Clip {clip_index} generation failed: {result.error_message}")
 
-        raise Exception(f"Clip {clip_index} generation timeout")
+        # Download clip
+        clip_path = self.output_dir / f"clip_{clip_index:03d}.mp4"
+        await self._download_clip(result.output_url, clip_path)
+        return clip_path
 
     async def _download_clip(self, url: str, output_path: Path):
-        """Download generated clip from URL"""
-        import aiohttp
+        """Stream generated clip from URL to disk in chunks"""
+        session = await self._get_http_session()
+        partial_path = output_path.with_suffix(output_path.suffix + ".part")
 
-        async with aiohttp.ClientSession() as session:
+        try:
             async with session.get(url) as response:
-                content = await response.read()
-                output_path.write_bytes(content)
+                response.raise_for_status()
+                with open(partial_path, "wb") as f:
+                    async for chunk in response.content.iter_chunked(self.DOWNLOAD_CHUNK_BYTES):
+                        f.write(chunk)
+            partial_path.replace(output_path)
+        finally:
+            partial_path.unlink(missing_ok=True)
 
     async def _create_static_background(
         self,
         duration: float,
         config: PipelineConfig
     ) -> Path:
-        """Create static background video (fallback)"""
-        import subprocess
-
-        bg_path = self.output_dir / "background.mp4"
-
-        # Create solid color background with FFmpeg
-        cmd = [
-            "ffmpeg",
-            "-f", "lavfi",
-            "-i", f"color=c=black:s=1080x1920:d={duration}",
-            "-r", str(config.fps),
-            "-pix_fmt", "yuv420p",
-            "-y",
-            str(bg_path)
-        ]
-
-        subprocess.run(cmd, check=True)
+        """Create static background video (fallback), cached per duration and format"""
+        settings = self._encode_settings(config)
+
+        async def render(path: Path):
+            await self.ffmpeg.run(
+                build_color_source_args(duration, str(path), settings),
+                output_path=str(path),
+                duration=duration
+            )
 
-        return bg_path
+        return await self.stage_cache.get_or_create(
+            "background",
+            {"duration": round(duration, 3), "size": [settings.width, settings.height], "fps": settings.fps},
+            build=render,
+            suffix=".mp4"
+        )
 
     async def _assemble_final_video(
         self,
@@ -363,70 +433,36 @@ class PipelineV2:
         """
         Assemble clips, audio, and subtitles into final video
 
-        Uses FFmpeg for clip concatenation and overlay
+        Single FFmpeg pass: clips are concatenated, subtitles burned and the
+        narration muxed in one filter graph, with one libx264 encode.
         """
-        import subprocess
-
         final_path = self.output_dir / "final_video.mp4"
 
-        if len(video_clips) == 1:
-            # Single clip - just overlay subtitles and audio
-            cmd = [
-                "ffmpeg",
-                "-i", str(video_clips[0]),
-                "-i", str(audio_path),
-                "-vf", f"subtitles={subtitle_path}",
-                "-map", "0:v:0",
-                "-map", "1:a:0",
-                "-c:v", "libx264",
-                "-preset", "medium",
-                "-crf", "23",
-                "-c:a", "aac",
-                "-b:a", "192k",
-                "-y",
-                str(final_path)
-            ]
-        else:
-            # Multiple clips - concatenate first
-            concat_list = self.output_dir / "concat_list.txt"
-            concat_list.write_text("\n".join([f"file '{clip}'" for clip in video_clips]))
-
-            concat_path = self.output_dir / "concatenated.mp4"
-
-            # Step 1: Concatenate clips
-            subprocess.run([
-                "ffmpeg",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", str(concat_list),
-                "-c", "copy",
-                "-y",
-                str(concat_path)
-            ], check=True)
-
-            # Step 2: Add audio and subtitles
-            cmd = [
-                "ffmpeg",
-                "-i", str(concat_path),
-                "-i", str(audio_path),
-                "-vf", f"subtitles={subtitle_path}",
-                "-map", "0:v:0",
-                "-map", "1:a:0",
-                "-c:v", "libx264",
-                "-preset", "medium",
-                "-crf", "23",
-                "-c:a", "aac",
-                "-b:a", "192k",
-                "-y",
-                str(final_path)
-            ]
-
-        subprocess.run(cmd, check=True)
+        args = build_assembly_args(
+            clips=[str(clip) for clip in video_clips],
+            output_path=str(final_path),
+            settings=self._encode_settings(config),
+            audio=[AudioInput(path=str(audio_path))],
+            subtitles_path=str(subtitle_path)
+        )
+        expected_duration = await self.ffmpeg.probe_duration(str(audio_path))
+
+        await self.ffmpeg.run(
+            args,
+            output_path=str(final_path),
+            duration=expected_duration,
+            on_progress=self._log_assembly_progress
+        )
 
         logger.info(f"Final video assembled: {final_path}")
 
         return final_path
 
+    @staticmethod
+    def _log_assembly_progress(progress):
+        if progress.fraction is not None:
+            logger.debug(f"Assembly {progress.fraction:.0%} (speed {progress.speed or 0:.1f}x)")
+
     async def _post_process(self, video_path: Path, config: PipelineConfig) -> Path:
         """Optional post-processing (effects, filters, etc.)"""
         # For now, just return as-is
@@ -0,0 +1,258 @@
+"""
+Unit Tests for the shared FFmpeg job engine
+Filter graph construction, progress parsing, worker pool and stage cache
+"""
+
+import pytest
+import asyncio
+import stat
+import textwrap
+
+import sys
+sys.path.insert(0, 'src')
+
+from ffmpeg_engine import (
+    AudioInput,
+    EncodeSettings,
+    FFmpegEngine,
+    FFmpegError,
+    RenditionOutput,
+    StageCache,
+    build_assembly_args,
+    build_multi_output_args,
+    escape_filter_value,
+    parse_progress_block,
+)
+
+
+FAKE_FFMPEG = textwrap.dedent("""\
+    #!{python}
+    import sys, time
+    output = sys.argv[-1]
+    if output.endswith("fail.mp4"):
+        sys.stderr.write("Invalid data found when processing input\\n")
+        sys.exit(1)
+    for step in range(1, 4):
+        time.sleep(0.05)
+        print(f"out_time_us={{step * 1000000}}")
+        print("speed=2.5x")
+        print("progress=" + ("end" if step == 3 else "continue"), flush=True)
+    open(output, "wb").write(b"video")
+""")
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    path = tmp_path / "ffmpeg"
+    path.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+class TestAssemblyGraph:
+    """Test single-pass filter graph construction"""
+
+    def test_concat_subtitles_and_narration_in_one_graph(self):
+        """Clips, subtitles and narration produce one filter_complex and one encode"""
+        args = build_assembly_args(
+            clips=["clip_000.mp4", "clip_001.mp4", "clip_002.mp4"],
+            output_path="final.mp4",
+            settings=EncodeSettings(width=1080, height=1920),
+            audio=[AudioInput(path="audio.wav")],
+            subtitles_path="output/cache/subtitles-abc.srt"
+        )
+
+        graph = args[args.index("-filter_complex") + 1]
+
+        assert args.count("-filter_complex") == 1
+        assert args.count("-c:v") == 1
+        assert "[v0][v1][v2]concat=n=3:v=1:a=0[vcat]" in graph
+        assert "[vcat]subtitles=filename=output/cache/subtitles-abc.srt[vsub]" in graph
+        assert args[args.index("-map") + 1] == "[vsub]"
+        assert "[3:a]anull[a0]" in graph
+        assert args[-1] == "final.mp4"
+
+    def test_music_is_mixed_with_clip_audio(self):
+        """Clip audio is concatenated and mixed with delayed, attenuated music"""
+        args = build_assembly_args(
+            clips=["a.mp4", "b.mp4"],
+            output_path="out.mp4",
+            settings=EncodeSettings(width=1280, height=720),
+            audio=[AudioInput(path="music.mp3", volume=0.3, start_time=1.5)],
+            keep_clip_audio=True
+        )
+
+        graph = args[args.index("-filter_complex") + 1]
+
+        assert "[v0][0:a][v1][1:a]concat=n=2:v=1:a=1[vcat][acat]" in graph
+        assert "[2:a]volume=0.3,adelay=1500|1500[a0]" in graph
+        assert "[acat][a0]amix=inputs=2:duration=longest[aout]" in graph
+
+    def test_filter_values_are_escaped(self):
+        """Paths with filtergraph separators stay a single option value"""
+        assert escape_filter_value("C:/subs/it's [v1].srt") == "C\\\\:/subs/it\\\\\\'s \\[v1\\].srt"
+
+
+class TestMultiOutputGraph:
+    """Test decode-once, encode-many argument construction"""
+
+    @staticmethod
+    def _outputs_of(args):
+        """Arguments of each output, split after its output path"""
+        outputs, current = [], []
+        for arg in args[args.index("-filter_complex") + 2:]:
+            current.append(arg)
+            if arg.endswith(".mp4"):
+                outputs.append(current)
+                current = []
+        return outputs
+
+    def test_three_renditions_split_one_decode(self):
+        """One input, one split and one scale/pad branch per rendition"""
+        args = build_multi_output_args(
+            "source.mp4",
+            [
+                RenditionOutput(path="vertical.mp4", settings=EncodeSettings(width=1080, height=1920), max_duration=90),
+                RenditionOutput(path="portrait.mp4", settings=EncodeSettings(width=1080, height=1350), max_duration=600),
+                RenditionOutput(path="shorts.mp4", settings=EncodeSettings(width=1080, height=1920, fps=60), max_duration=60),
+            ],
+            encoder_threads=2
+        )
+
+        graph = args[args.index("-filter_complex") + 1].split(";")
+
+        assert args[:2] == ["-i", "source.mp4"] and args.count("-i") == 1
+        assert graph[0] == "[0:v]split=3[s0][s1][s2]"
+        assert graph[1].startswith("[s0]scale=1080:1920:") and graph[1].endswith(",fps=30,format=yuv420p[o0]")
+        assert graph[2].startswith("[s1]scale=1080:1350:") and "pad=1080:1350:" in graph[2]
+        assert graph[3].startswith("[s2]scale=1080:1920:") and graph[3].endswith(",fps=60,format=yuv420p[o2]")
+
+        outputs = self._outputs_of(args)
+        assert [output[-1] for output in outputs] == ["vertical.mp4", "portrait.mp4", "shorts.mp4"]
+        for i, (output, duration) in enumerate(zip(outputs, ("90", "600", "60"))):
+            assert output[:2] == ["-map", f"[o{i}]"]
+            assert output[output.index("-map", 1) + 1] == "0:a:0?"
+            assert output[output.index("-threads") + 1] == "2"
+            assert output[output.index("-t") + 1] == duration
+            assert output.count("-c:v") == 1
+
+    def test_two_renditions_without_audio(self):
+        """Without audio every output gets -an and no audio encoder"""
+        args = build_multi_output_args(
+            "source.mp4",
+            [
+                RenditionOutput(path="a.mp4", settings=EncodeSettings(width=1280, height=720)),
+                RenditionOutput(path="b.mp4", settings=EncodeSettings(width=640, height=360)),
+            ],
+            include_audio=False
+        )
+
+        assert args[args.index("-filter_complex") + 1].startswith("[0:v]split=2[s0][s1];")
+        for output in self._outputs_of(args):
+            assert "-an" in output and "-c:a" not in output
+            assert "-t" not in output and "-threads" not in output
+
+    def test_single_rendition_is_not_split(self):
+        """One output scales the input stream directly"""
+        args = build_multi_output_args(
+            "source.mp4", [RenditionOutput(path="out.mp4", settings=EncodeSettings(width=1280, height=720))]
+        )
+
+        graph = args[args.index("-filter_complex") + 1]
+
+        assert "split" not in graph and graph.startswith("[0:v]scale=1280:720:")
+
+    def test_no_outputs_is_rejected(self):
+        """An empty rendition list is an error, not an FFmpeg run without outputs"""
+        with pytest.raises(ValueError):
+            build_multi_output_args("source.mp4", [])
+
+
+class TestFFmpegEngine:
+    """Test FFmpegEngine execution"""
+
+    def test_progress_block_parsing(self):
+        """out_time is read in microseconds and turned into a fraction"""
+        progress = parse_progress_block({"out_time_us": "15000000", "speed": "1.25x", "progress": "continue"}, 60.0)
+
+        assert progress.out_time == 15.0
+        assert progress.fraction == 0.25
+        assert progress.speed == 1.25
+        assert not progress.done
+
+    @pytest.mark.asyncio
+    async def test_run_reports_progress(self, fake_ffmpeg, tmp_path):
+        """Progress callbacks follow the encode up to completion"""
+        engine = FFmpegEngine(max_workers=2, ffmpeg_bin=fake_ffmpeg)
+        reports = []
+
+        output = str(tmp_path / "out.mp4")
+        await engine.run(["-i", "in.mp4", output], output_path=output, duration=4.0, on_progress=reports.append)
+
+        assert [p.fraction for p in reports] == [0.25, 0.5, 1.0]
+        assert reports[-1].done
+
+    @pytest.mark.asyncio
+    async def test_worker_pool_limits_concurrency(self, fake_ffmpeg, tmp_path):
+        """No more than max_workers FFmpeg processes run at once"""
+        engine = FFmpegEngine(max_workers=2, ffmpeg_bin=fake_ffmpeg)
+        peak = []
+
+        await asyncio.gather(*(
+            engine.run([str(tmp_path / f"out_{i}.mp4")], on_progress=lambda _: peak.append(engine.active_jobs))
+            for i in range(5)
+        ))
+
+        assert max(peak) == 2
+        assert engine.completed_jobs == 5
+
+    @pytest.mark.asyncio
+    async def test_failure_raises_with_stderr(self, fake_ffmpeg, tmp_path):
+        """A non-zero exit raises FFmpegError carrying the stderr tail"""
+        engine = FFmpegEngine(ffmpeg_bin=fake_ffmpeg)
+
+        with pytest.raises(FFmpegError) as exc_info:
+            await engine.run([str(tmp_path / "fail.mp4")])
+
+        assert exc_info.value.returncode == 1
+        assert "Invalid data" in exc_info.value.stderr
+
+
+class TestStageCache:
+    """Test StageCache reuse across re-renders"""
+
+    @pytest.mark.asyncio
+    async def test_unchanged_stage_is_not_rebuilt(self, tmp_path):
+        """Same parameters reuse the output; changed parameters rebuild it"""
+        cache = StageCache(str(tmp_path / "cache"))
+        builds = []
+
+        async def build(path):
+            builds.append(path)
+            path.write_text("1\n00:00:00,000 --> 00:00:02,000\nSalam\n")
+
+        first = await cache.get_or_create("subtitles", {"text": "Salam", "duration": 2.0}, build, suffix=".srt")
+        again = await cache.get_or_create("subtitles", {"text": "Salam", "duration": 2.0}, build, suffix=".srt")
+        other = await cache.get_or_create("subtitles", {"text": "Marhba", "duration": 2.0}, build, suffix=".srt")
+
+        assert first == again != other
+        assert (cache.hits, cache.misses) == (1, 2)
+        assert builds[0].name.endswith(".partial.srt")
+        assert not list((tmp_path / "cache").glob("*.partial*"))
+
+    @pytest.mark.asyncio
+    async def test_input_content_is_part_of_the_key(self, tmp_path):
+        """Editing an input file invalidates the stages derived from it"""
+        cache = StageCache(str(tmp_path / "cache"))
+        source = tmp_path / "script.txt"
+        source.write_text("v1")
+
+        async def build(path):
+            path.write_text(source.read_text())
+
+        first = await cache.get_or_create("copy", {}, build, inputs=[str(source)])
+        source.write_text("v2")
+        second = await cache.get_or_create("copy", {}, build, inputs=[str(source)])
+
+        assert first != second
+        assert second.read_text() == "v2"
@@ -0,0 +1,129 @@
+"""
+Unit Tests for the shared generation tracker
+Adaptive polling, batched status checks and webhook wake-up
+"""
+
+import pytest
+import asyncio
+import time
+
+import sys
+sys.path.insert(0, 'src')
+
+from generators.base import (
+    BaseGenerator,
+    GeneratorCapabilities,
+    GenerationRequest,
+    GenerationResult,
+    GenerationStatus,
+)
+from generators.tracking import GenerationTracker
+
+
+class FakeGenerator(BaseGenerator):
+    """Generator whose tasks complete after a fixed delay"""
+
+    def __init__(self, duration: float = 0.2, webhooks: bool = False):
+        self.duration = duration
+        self.webhooks = webhooks
+        super().__init__()
+        self.started = {}
+        self.batches = []
+
+    def _define_capabilities(self) -> GeneratorCapabilities:
+        return GeneratorCapabilities(
+            supports_text_to_video=True,
+            avg_generation_time_seconds=self.duration,
+            supports_webhooks=self.webhooks
+        )
+
+    async def generate(self, request: GenerationRequest) -> GenerationResult:
+        task_id = f"task-{len(self.started)}"
+        self.started[task_id] = time.monotonic()
+        return GenerationResult(status=GenerationStatus.PROCESSING, task_id=task_id)
+
+    async def check_status(self, task_id: str) -> GenerationResult:
+        done = time.monotonic() - self.started[task_id] >= self.duration
+        if not done:
+            return GenerationResult(status=GenerationStatus.PROCESSING, task_id=task_id)
+        return GenerationResult(
+            status=GenerationStatus.COMPLETED,
+            task_id=task_id,
+            output_url=f"https://cdn.example.com/{task_id}.mp4"
+        )
+
+    async def check_status_batch(self, task_ids):
+        self.batches.append(list(task_ids))
+        return await super().check_status_batch(task_ids)
+
+    async def cancel(self, task_id: str) -> bool:
+        return False
+
+
+def make_request():
+    return GenerationRequest(prompt="Sahara sunset", category="text_to_video")
+
+
+class TestGenerationTracker:
+    """Test GenerationTracker polling and webhook handling"""
+
+    @pytest.mark.asyncio
+    async def test_clips_share_batched_polls(self):
+        """Concurrent clips of one generator are checked in shared batches"""
+        tracker = GenerationTracker(min_interval=0.01, max_interval=0.1)
+        gen = FakeGenerator(duration=0.2)
+
+        started = [await gen.generate(make_request()) for _ in range(8)]
+        results = await asyncio.gather(*(tracker.wait(gen, r.task_id, timeout=2) for r in started))
+
+        assert all(r.status == GenerationStatus.COMPLETED for r in results)
+        assert max(len(batch) for batch in gen.batches) == 8
+        assert tracker.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_adaptive_polling_beats_fixed_interval(self):
+        """Few checks before the expected time, small completion latency after it"""
+        tracker = GenerationTracker(min_interval=0.02, max_interval=1.0)
+        gen = FakeGenerator(duration=0.5)
+
+        result = await gen.generate(make_request())
+        await tracker.wait(gen, result.task_id, timeout=3)
+        latency = time.monotonic() - gen.started[result.task_id] - gen.duration
+
+        # Equivalent fixed polling needs duration / min_interval = 25 checks
+        assert tracker.stats.status_checks <= 10
+        assert latency < 0.1
+
+    @pytest.mark.asyncio
+    async def test_webhook_triggers_immediate_check(self):
+        """A callback wakes the loop instead of waiting for the safety-net poll"""
+        tracker = GenerationTracker(min_interval=0.01, max_interval=5.0, webhook_base_url="https://api.example.com/hooks/")
+        gen = FakeGenerator(duration=0.1, webhooks=True)
+        request = make_request()
+        request.webhook_url = tracker.webhook_url("fake", gen)
+
+        result = await gen.generate(request)
+        assert gen.webhook_params(request)["webhook"] == "https://api.example.com/hooks/fake"
+
+        async def provider_callback():
+            await asyncio.sleep(0.15)
+            assert tracker.notify(gen.webhook_task_id({"id": result.task_id, "status": "succeeded"}))
+
+        asyncio.ensure_future(provider_callback())
+        final = await tracker.wait(gen, result.task_id, timeout=1, webhook=True)
+
+        assert final.status == GenerationStatus.COMPLETED
+        assert tracker.stats.webhooks == 1
+        assert tracker.stats.status_checks == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_stops_tracking(self):
+        """A task exceeding its timeout raises and leaves the loop"""
+        tracker = GenerationTracker(min_interval=0.01, max_interval=0.05)
+        gen = FakeGenerator(duration=10.0)
+
+        result = await gen.generate(make_request())
+        with pytest.raises(TimeoutError):
+            await tracker.wait(gen, result.task_id, timeout=0.1)
+
+        assert tracker.in_flight == 0
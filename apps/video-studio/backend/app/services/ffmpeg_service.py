@@ -1,11 +1,15 @@
 """
 FFmpeg Video Assembly Service
 Assemble video segments, audio, music and subtitles into final video
+
+FFmpeg runs through the shared job engine (non-blocking, worker pool limit);
+full assembly is a single filter graph and a single encode.
 """
 
 import asyncio
 import os
 import shutil
+import time
 from typing import List, Optional, Dict, Any
 from dataclasses import dataclass
 from pathlib import Path
@@ -13,6 +17,16 @@ import structlog
 import aiohttp
 import aiofiles
 
+from app.services.ffmpeg_engine import (
+    AudioInput,
+    EncodeSettings,
+    FFmpegError,
+    StageCache,
+    build_assembly_args,
+    build_color_source_args,
+    get_ffmpeg_engine,
+)
+
 logger = structlog.get_logger()
 
 
@@ -58,56 +72,153 @@ class AssemblyConfig:
     audio_codec: str = "aac"
     audio_bitrate: str = "192k"
 
+    def encode_settings(self) -> EncodeSettings:
+        width, height = (int(x) for x in self.resolution.split("x"))
+        return EncodeSettings(
+            width=width,
+            height=height,
+            fps=self.fps,
+            video_codec=self.codec,
+            preset=self.preset,
+            crf=self.crf,
+            audio_codec=self.audio_codec,
+            audio_bitrate=self.audio_bitrate
+        )
+
+
+# Remote downloads kept in the stage cache (seconds / bytes)
+DOWNLOAD_CACHE_TTL = int(os.getenv("VIDEO_STUDIO_DOWNLOAD_CACHE_TTL", str(7 * 24 * 3600)))
+DOWNLOAD_CACHE_MAX_BYTES = int(os.getenv("VIDEO_STUDIO_DOWNLOAD_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+
+SUBTITLE_STYLE = "FontSize=24,PrimaryColour=&H00FFFFFF,OutlineColour=&H00000000,Outline=2"
+
 
 class FFmpegService:
     """Service for assembling videos with FFmpeg"""
     
-    def __init__(self, work_dir: Optional[str] = None):
+    def __init__(self, work_dir: Optional[str] = None, cache_dir: Optional[str] = None):
         self.work_dir = work_dir or "/tmp/video-studio"
         Path(self.work_dir).mkdir(parents=True, exist_ok=True)
+        self.engine = get_ffmpeg_engine()
+        # Shared across productions: re-renders reuse unchanged downloaded assets
+        self.cache = StageCache(cache_dir or os.getenv("VIDEO_STUDIO_CACHE_DIR", "/tmp/video-studio/cache"))
         
     async def download_file(self, url: str, filename: str) -> str:
-        """Download a file from URL"""
-        filepath = os.path.join(self.work_dir, filename)
+        """
+        Download a file from URL (streamed to disk)
+
+        Cached only when the server sends a validator (ETag or Last-Modified):
+        the key includes it, so changed content is downloaded again. Without
+        one the file goes to the work dir, as it cannot be revalidated.
+        """
+        suffix = Path(filename).suffix
         
         if url.startswith("https://example.com"):
             logger.warning("Mock URL detected, creating placeholder", url=url)
-            await self._create_placeholder_video(filepath, 5)
-            return filepath
+            path = await self.cache.get_or_create(
+                "placeholder", {"duration": 5}, build=self._create_placeholder_video, suffix=".mp4"
+            )
+            return str(path)
             
-        try:
-            async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession() as session:
+            async def fetch(path: Path):
                 async with session.get(url) as resp:
-                    if resp.status == 200:
-                        async with aiofiles.open(filepath, mode="wb") as f:
-                            await f.write(await resp.read())
-                        return filepath
-                    else:
+                    if resp.status != 200:
                         raise Exception(f"Download failed: {resp.status}")
-        except Exception as e:
-            logger.error("Download error", url=url, error=str(e))
-            raise
+                    async with aiofiles.open(path, mode="wb") as f:
+                        async for chunk in resp.content.iter_chunked(1024 * 1024):
+                            await f.write(chunk)
+                            
+            try:
+                validators = await self._remote_validators(session, url)
+                if validators is None:
+                    path = Path(self.work_dir) / filename
+                    await fetch(path)
+                    return str(path)
+                    
+                path = await self.cache.get_or_create(
+                    "download", {"url": url, **validators}, build=fetch, suffix=suffix
+                )
+                os.utime(path)  # Recently used: evicted last
+                await asyncio.to_thread(self._prune_downloads)
+                return str(path)
+            except Exception as e:
+                logger.error("Download error", url=url, error=str(e))
+                raise
+                
+    async def _remote_validators(self, session: aiohttp.ClientSession, url: str) -> Optional[Dict[str, str]]:
+        """ETag / Last-Modified / Content-Length of a remote file (None: not cacheable)"""
+        try:
+            async with session.head(url, allow_redirects=True) as resp:
+                if resp.status != 200:
+                    return None
+                validators = {
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                    "content_length": resp.headers.get("Content-Length"),
+                }
+        except aiohttp.ClientError:
+            return None
+        if not (validators["etag"] or validators["last_modified"]):
+            return None
+        return {name: value for name, value in validators.items() if value}
+        
+    def _prune_downloads(self):
+        """Drop cached downloads past DOWNLOAD_CACHE_TTL, then the least recently used over DOWNLOAD_CACHE_MAX_BYTES"""
+        now = time.time()
+        entries = []
+        for path in self.cache.cache_dir.glob("download-*"):
+            if ".partial" in path.name:
+                continue  # Download in progress
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > DOWNLOAD_CACHE_TTL:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= DOWNLOAD_CACHE_MAX_BYTES:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            logger.info("Evicted cached download", file=path.name)
     
-    async def _create_placeholder_video(self, filepath: str, duration: int = 5):
+    async def _create_placeholder_video(self, filepath, duration: int = 5):
         """Create a placeholder black video"""
-        cmd = [
-            "ffmpeg", "-y",
-            "-f", "lavfi",
-            "-i", f"color=c=black:s=1920x1080:d={duration}",
-            "-f", "lavfi",
-            "-i", f"anullsrc=r=44100:cl=stereo",
-            "-t", str(duration),
-            "-c:v", "libx264",
-            "-c:a", "aac",
-            "-shortest",
-            filepath
-        ]
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        settings = AssemblyConfig(output_path=str(filepath)).encode_settings()
+        await self.engine.run(
+            build_color_source_args(duration, str(filepath), settings, silent_audio=True),
+            output_path=str(filepath),
+            duration=duration
         )
-        await process.wait()
+        
+    async def _download_segments(self, segments: List[VideoSegment]) -> List[str]:
+        async def download(i: int, seg: VideoSegment) -> Optional[str]:
+            try:
+                return await self.download_file(seg.url, f"segment_{i}.mp4")
+            except Exception as e:
+                logger.error("Failed to download segment", index=i, error=str(e))
+                return None
+                
+        paths = await asyncio.gather(*(download(i, seg) for i, seg in enumerate(segments)))
+        return [path for path in paths if path]
+        
+    async def _download_audio_tracks(self, audio_tracks: List[AudioTrack]) -> List[AudioInput]:
+        async def download(i: int, track: AudioTrack) -> Optional[AudioInput]:
+            try:
+                suffix = "music" if track.is_music else "narration"
+                path = await self.download_file(track.url, f"{suffix}_{i}.mp3")
+                return AudioInput(path=path, volume=track.volume, start_time=track.start_time, fade_in=track.fade_in)
+            except Exception as e:
+                logger.warning("Failed to download audio", index=i, error=str(e))
+                return None
+                
+        inputs = await asyncio.gather(*(download(i, track) for i, track in enumerate(audio_tracks)))
+        return [audio for audio in inputs if audio]
         
     async def concat_videos(
         self,
@@ -119,50 +230,22 @@ class FFmpegService:
         if not config:
             config = AssemblyConfig(output_path=output_path)
             
-        local_files = []
-        for i, seg in enumerate(segments):
-            try:
-                local_path = await self.download_file(seg.url, f"segment_{i}.mp4")
-                local_files.append(local_path)
-            except Exception as e:
-                logger.error("Failed to download segment", index=i, error=str(e))
-                continue
-                
+        local_files = await self._download_segments(segments)
         if not local_files:
             raise Exception("No video segments available")
             
-        concat_file = os.path.join(self.work_dir, "concat.txt")
-        with open(concat_file, "w") as f:
-            for path in local_files:
-                f.write(f"file '{path}'\n")
-                
-        cmd = [
-            "ffmpeg", "-y",
-            "-f", "concat",
-            "-safe", "0",
-            "-i", concat_file,
-            "-c:v", config.codec,
-            "-preset", config.preset,
-            "-crf", str(config.crf),
-            "-c:a", config.audio_codec,
-            "-b:a", config.audio_bitrate,
-            "-s", config.resolution,
-            "-r", str(config.fps),
-            output_path
-        ]
-        
-        logger.info("Running FFmpeg concat", cmd=" ".join(cmd))
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
+        keep_audio = all(await asyncio.gather(*(self.engine.has_audio(path) for path in local_files)))
+        args = build_assembly_args(
+            local_files, output_path, config.encode_settings(), keep_clip_audio=keep_audio
         )
-        stdout, stderr = await process.communicate()
         
-        if process.returncode != 0:
-            logger.error("FFmpeg concat failed", stderr=stderr.decode())
-            raise Exception(f"FFmpeg error: {stderr.decode()[-500:]}")
+        logger.info("Running FFmpeg concat", segments=len(local_files))
+        
+        try:
+            await self.engine.run(args, output_path=output_path)
+        except FFmpegError as e:
+            logger.error("FFmpeg concat failed", stderr=e.stderr[-500:])
+            raise Exception(f"FFmpeg error: {e.stderr[-500:]}")
             
         return output_path
         
@@ -174,15 +257,7 @@ class FFmpegService:
     ) -> str:
         """Add audio tracks (narration and music) to video"""
         
-        audio_inputs = []
-        for i, track in enumerate(audio_tracks):
-            try:
-                suffix = "music" if track.is_music else "narration"
-                local_path = await self.download_file(track.url, f"{suffix}_{i}.mp3")
-                audio_inputs.append((local_path, track))
-            except Exception as e:
-                logger.warning("Failed to download audio", index=i, error=str(e))
-                continue
+        audio_inputs = await self._download_audio_tracks(audio_tracks)
                 
         if not audio_inputs:
             shutil.copy(video_path, output_path)
@@ -191,11 +266,12 @@ class FFmpegService:
         inputs = ["-i", video_path]
         filter_parts = []
         
-        for i, (path, track) in enumerate(audio_inputs):
-            inputs.extend(["-i", path])
+        for i, audio in enumerate(audio_inputs):
+            inputs.extend(["-i", audio.path])
             input_idx = i + 1
+            delay = int(audio.start_time * 1000)
             filter_parts.append(
-                f"[{input_idx}:a]volume={track.volume},adelay={int(track.start_time*1000)}|{int(track.start_time*1000)}[a{i}]"
+                f"[{input_idx}:a]volume={audio.volume},adelay={delay}|{delay}[a{i}]"
             )
             
         audio_labels = "".join([f"[a{i}]" for i in range(len(audio_inputs))])
@@ -203,8 +279,7 @@ class FFmpegService:
         
         filter_complex = ";".join(filter_parts)
         
-        cmd = [
-            "ffmpeg", "-y",
+        args = [
             *inputs,
             "-filter_complex", filter_complex,
             "-map", "0:v",
@@ -217,19 +292,23 @@ class FFmpegService:
         
         logger.info("Adding audio tracks", num_tracks=len(audio_inputs))
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode != 0:
-            logger.error("FFmpeg audio mix failed", stderr=stderr.decode()[-500:])
+        try:
+            await self.engine.run(args, output_path=output_path)
+        except FFmpegError as e:
+            logger.error("FFmpeg audio mix failed", stderr=e.stderr[-500:])
             shutil.copy(video_path, output_path)
             
         return output_path
         
+    def _write_srt(self, subtitles: List[Subtitle]) -> str:
+        srt_path = os.path.join(self.work_dir, "subtitles.srt")
+        with open(srt_path, "w", encoding="utf-8") as f:
+            for i, sub in enumerate(subtitles, 1):
+                start = self._seconds_to_srt_time(sub.start_time)
+                end = self._seconds_to_srt_time(sub.end_time)
+                f.write(f"{i}\n{start} --> {end}\n{sub.text}\n\n")
+        return srt_path
+        
     async def add_subtitles(
         self,
         video_path: str,
@@ -239,29 +318,21 @@ class FFmpegService:
     ) -> str:
         """Add subtitles to video"""
         
-        srt_path = os.path.join(self.work_dir, "subtitles.srt")
-        with open(srt_path, "w", encoding="utf-8") as f:
-            for i, sub in enumerate(subtitles, 1):
-                start = self._seconds_to_srt_time(sub.start_time)
-                end = self._seconds_to_srt_time(sub.end_time)
-                f.write(f"{i}\n{start} --> {end}\n{sub.text}\n\n")
+        srt_path = self._write_srt(subtitles)
         
         if not subtitles:
             shutil.copy(video_path, output_path)
             return output_path
                 
         if burn_in:
-            style = "FontSize=24,PrimaryColour=&H00FFFFFF,OutlineColour=&H00000000,Outline=2"
-            cmd = [
-                "ffmpeg", "-y",
+            args = [
                 "-i", video_path,
-                "-vf", f"subtitles={srt_path}:force_style='{style}'",
+                "-vf", f"subtitles={srt_path}:force_style='{SUBTITLE_STYLE}'",
                 "-c:a", "copy",
                 output_path
             ]
         else:
-            cmd = [
-                "ffmpeg", "-y",
+            args = [
                 "-i", video_path,
                 "-i", srt_path,
                 "-c:v", "copy",
@@ -272,15 +343,10 @@ class FFmpegService:
             
         logger.info("Adding subtitles", num_subs=len(subtitles), burn_in=burn_in)
         
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, stderr = await process.communicate()
-        
-        if process.returncode != 0:
-            logger.error("FFmpeg subtitles failed", stderr=stderr.decode()[-500:])
+        try:
+            await self.engine.run(args, output_path=output_path)
+        except FFmpegError as e:
+            logger.error("FFmpeg subtitles failed", stderr=e.stderr[-500:])
             shutil.copy(video_path, output_path)
             
         return output_path
@@ -299,17 +365,48 @@ class FFmpegService:
         audio_tracks: List[AudioTrack],
         subtitles: List[Subtitle],
         output_path: str,
-        config: Optional[AssemblyConfig] = None
+        config: Optional[AssemblyConfig] = None,
+        on_progress=None
     ) -> Dict[str, Any]:
-        """Full video assembly pipeline"""
+        """
+        Full video assembly pipeline
+
+        One FFmpeg pass: segments are scaled and concatenated, subtitles
+        burned and narration/music mixed in a single filter graph.
+        """
+        if not config:
+            config = AssemblyConfig(output_path=output_path)
+            
         try:
-            temp_concat = os.path.join(self.work_dir, "temp_concat.mp4")
-            await self.concat_videos(segments, temp_concat, config)
+            local_files, audio_inputs = await asyncio.gather(
+                self._download_segments(segments),
+                self._download_audio_tracks(audio_tracks)
+            )
+            if not local_files:
+                raise Exception("No video segments available")
+                
+            keep_audio = all(await asyncio.gather(*(self.engine.has_audio(path) for path in local_files)))
             
-            temp_audio = os.path.join(self.work_dir, "temp_audio.mp4")
-            await self.add_audio_tracks(temp_concat, audio_tracks, temp_audio)
+            args = build_assembly_args(
+                clips=local_files,
+                output_path=output_path,
+                settings=config.encode_settings(),
+                audio=audio_inputs,
+                subtitles_path=self._write_srt(subtitles) if subtitles else None,
+                subtitle_style=SUBTITLE_STYLE,
+                keep_clip_audio=keep_audio
+            )
             
-            await self.add_subtitles(temp_audio, subtitles, output_path)
+            logger.info(
+                "Running single-pass assembly",
+                segments=len(local_files), audio_tracks=len(audio_inputs), subtitles=len(subtitles)
+            )
+            expected_duration = sum(seg.duration for seg in segments) or None
+            try:
+                await self.engine.run(args, output_path=output_path, duration=expected_duration, on_progress=on_progress)
+            except FFmpegError as e:
+                logger.error("FFmpeg assembly failed", stderr=e.stderr[-500:])
+                raise Exception(f"FFmpeg error: {e.stderr[-500:]}")
             
             duration = await self._get_duration(output_path)
             file_size = os.path.getsize(output_path)
@@ -329,31 +426,14 @@ class FFmpegService:
                 "error": str(e)
             }
         finally:
-            for f in ["temp_concat.mp4", "temp_audio.mp4", "concat.txt", "subtitles.srt"]:
-                try:
-                    os.remove(os.path.join(self.work_dir, f))
-                except:
-                    pass
+            try:
+                os.remove(os.path.join(self.work_dir, "subtitles.srt"))
+            except:
+                pass
                     
     async def _get_duration(self, video_path: str) -> float:
         """Get video duration using ffprobe"""
-        cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            video_path
-        ]
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        stdout, _ = await process.communicate()
-        try:
-            return float(stdout.decode().strip())
-        except:
-            return 0.0
+        return await self.engine.probe_duration(video_path)
 
     def cleanup(self):
         """Remove all temp files"""
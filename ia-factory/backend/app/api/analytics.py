@@ -12,6 +12,7 @@ from typing import Optional
 from ..database import get_db, Collections
 from ..models.analytics import TimeRange, PerformanceMetric
 from ..services.analytics_engine import AnalyticsEngine
+from ..services.analytics_rollups import mark_metrics_changed
 
 router = APIRouter(tags=["Analytics"])
 
@@ -127,6 +128,7 @@ async def record_metrics(
     }
     
     result = await db[Collections.METRICS].insert_one(metric)
+    await mark_metrics_changed(db, brand_id)
     
     return {
         "status": "recorded",
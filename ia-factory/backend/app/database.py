@@ -3,6 +3,7 @@ IA Factory - Database Connection
 MongoDB async client with Motor
 """
 
+import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from pymongo import ASCENDING, DESCENDING
 from typing import Optional
@@ -18,6 +19,7 @@ class Database:
     
     client: Optional[AsyncIOMotorClient] = None
     db: Optional[AsyncIOMotorDatabase] = None
+    loop: Optional[asyncio.AbstractEventLoop] = None
 
 
 # Global database instance
@@ -31,6 +33,7 @@ async def connect_db() -> None:
     
     database.client = AsyncIOMotorClient(settings.mongodb_url)
     database.db = database.client[settings.db_name]
+    database.loop = asyncio.get_running_loop()
     
     # Create indexes for optimal queries
     await create_indexes()
@@ -83,6 +86,7 @@ async def create_indexes() -> None:
     await db.scheduled_posts.create_index([("brand_id", ASCENDING)])
     await db.scheduled_posts.create_index([("scheduled_time", ASCENDING)])
     await db.scheduled_posts.create_index([("status", ASCENDING)])
+    await db.scheduled_posts.create_index([("brand_id", ASCENDING), ("status", ASCENDING)])
     await db.scheduled_posts.create_index([
         ("status", ASCENDING),
         ("scheduled_time", ASCENDING)
@@ -92,6 +96,11 @@ async def create_indexes() -> None:
     await db.metrics.create_index([("brand_id", ASCENDING), ("timestamp", DESCENDING)])
     await db.metrics.create_index([("content_id", ASCENDING)])
     await db.metrics.create_index([("platform", ASCENDING), ("timestamp", DESCENDING)])
+    await db.metrics.create_index([("brand_id", ASCENDING), ("content_id", ASCENDING)])
+    await db.metrics.create_index([("brand_id", ASCENDING), ("views", DESCENDING)])
+    
+    # Daily metric rollups (maintained by analytics_tasks)
+    await db.metrics_daily.create_index([("brand_id", ASCENDING), ("day", ASCENDING)])
     
     # Jobs queue
     await db.jobs.create_index([("status", ASCENDING)])
@@ -101,6 +110,26 @@ async def create_indexes() -> None:
     logger.info("✅ Database indexes created")
 
 
+async def get_database() -> AsyncIOMotorDatabase:
+    """
+    Get database instance for background tasks
+    
+    Celery tasks run each coroutine in a fresh event loop, and a Motor
+    client is bound to the loop it was first used on: reconnect when the
+    loop changed.
+    """
+    
+    loop = asyncio.get_running_loop()
+    if database.db is None or database.loop is not loop:
+        if database.client:
+            database.client.close()
+        database.client = AsyncIOMotorClient(settings.mongodb_url)
+        database.db = database.client[settings.db_name]
+        database.loop = loop
+    
+    return database.db
+
+
 async def get_db() -> AsyncIOMotorDatabase:
     """Get database instance (dependency injection)"""
     
@@ -123,5 +152,7 @@ class Collections:
     SCHEDULED_POSTS = "scheduled_posts"
     METRICS = "metrics"
     JOBS = "jobs"
+    METRICS_DAILY = "metrics_daily"
+    ANALYTICS_STATE = "analytics_state"
     PUBLISH_RESULTS = "publish_results"
     ANALYTICS_REPORTS = "analytics_reports"
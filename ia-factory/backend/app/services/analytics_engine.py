@@ -6,7 +6,9 @@ Phase 4: Performance Analytics & AI Optimization
 import asyncio
 import json
 import logging
-from typing import Dict, Any, List, Optional
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from anthropic import Anthropic
 
@@ -22,9 +24,67 @@ from ..models.analytics import (
     DashboardSummary,
     TimeRange
 )
+from .analytics_rollups import (
+    day_start,
+    engagement,
+    fetch_buckets,
+    fold_buckets,
+    get_metrics_version,
+    total_of,
+)
 
 logger = logging.getLogger(__name__)
 
+SUMMARY_CACHE_TTL_SECONDS = 300
+SUMMARY_CACHE_MAX_ENTRIES = 1024
+
+TIME_RANGE_DAYS = {
+    TimeRange.DAY: 1,
+    TimeRange.WEEK: 7,
+    TimeRange.MONTH: 30,
+    TimeRange.QUARTER: 90,
+    TimeRange.YEAR: 365
+}
+
+
+class SummaryCache:
+    """
+    Dashboard summaries per brand
+    
+    An entry is valid while the brand's metrics version is unchanged (the
+    version is bumped whenever metrics are recorded) and for at most
+    SUMMARY_CACHE_TTL_SECONDS, which bounds staleness of the scheduled
+    posts count.
+    """
+    
+    def __init__(self, max_entries: int = SUMMARY_CACHE_MAX_ENTRIES, ttl_seconds: float = SUMMARY_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[int, float, DashboardSummary]]" = OrderedDict()
+    
+    def get(self, key: Tuple, version: int) -> Optional[DashboardSummary]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        cached_version, stored_at, summary = entry
+        if cached_version != version or time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        
+        self._entries.move_to_end(key)
+        return summary
+    
+    def set(self, key: Tuple, version: int, summary: DashboardSummary):
+        self._entries[key] = (version, time.monotonic(), summary)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+# Shared by all AnalyticsEngine instances of the process
+summary_cache = SummaryCache()
+
 
 class AnalyticsEngine:
     """
@@ -47,6 +107,10 @@ class AnalyticsEngine:
         """
         Get performance summary for dashboard
         
+        Periods are whole days: the current period is today and the
+        `days - 1` days before it. Totals are aggregated by MongoDB from the
+        daily rollups, so the cost does not depend on history length.
+        
         Args:
             brand_id: Brand identifier
             days: Number of days to analyze
@@ -55,34 +119,33 @@ class AnalyticsEngine:
             Dashboard summary with key metrics
         """
         
-        end_date = datetime.now()
+        end_date = self._period_end()
         start_date = end_date - timedelta(days=days)
         prev_start = start_date - timedelta(days=days)
         
-        # Get current period metrics
-        current_metrics = await self.db.metrics.find({
-            "brand_id": brand_id,
-            "timestamp": {"$gte": start_date, "$lte": end_date}
-        }).to_list(None)
-        
-        # Get previous period metrics
-        prev_metrics = await self.db.metrics.find({
-            "brand_id": brand_id,
-            "timestamp": {"$gte": prev_start, "$lt": start_date}
-        }).to_list(None)
+        cache_key = (brand_id, days, start_date)
+        version = await get_metrics_version(self.db, brand_id)
+        cached = summary_cache.get(cache_key, version)
+        if cached is not None:
+            return cached
+        
+        current_buckets, prev_buckets, scheduled_posts = await asyncio.gather(
+            fetch_buckets(self.db, brand_id, start_date, end_date),
+            fetch_buckets(self.db, brand_id, prev_start, start_date),
+            self.db.scheduled_posts.count_documents({
+                "brand_id": brand_id,
+                "status": "scheduled"
+            })
+        )
+        current = total_of(current_buckets)
+        previous = total_of(prev_buckets)
         
         # Calculate totals
-        current_views = sum(m.get('views', 0) for m in current_metrics)
-        current_engagement = sum(
-            m.get('likes', 0) + m.get('comments', 0) + m.get('shares', 0) + m.get('saves', 0)
-            for m in current_metrics
-        )
+        current_views = current["views"]
+        current_engagement = engagement(current)
         
-        prev_views = sum(m.get('views', 0) for m in prev_metrics) or 1
-        prev_engagement = sum(
-            m.get('likes', 0) + m.get('comments', 0) + m.get('shares', 0) + m.get('saves', 0)
-            for m in prev_metrics
-        ) or 1
+        prev_views = previous["views"] or 1
+        prev_engagement = engagement(previous) or 1
         
         # Calculate changes
         views_change = ((current_views - prev_views) / prev_views) * 100
@@ -93,26 +156,13 @@ class AnalyticsEngine:
         prev_rate = (prev_engagement / max(prev_views, 1)) * 100
         rate_change = current_rate - prev_rate
         
-        # Get scheduled posts count
-        scheduled_posts = await self.db.scheduled_posts.count_documents({
-            "brand_id": brand_id,
-            "status": "scheduled"
-        })
-        
-        # Find top post
-        top_post = None
-        if current_metrics:
-            sorted_metrics = sorted(current_metrics, key=lambda x: x.get('views', 0), reverse=True)
-            if sorted_metrics:
-                top_post = sorted_metrics[0]
-        
         # Generate AI insight
         ai_insight = await self._generate_quick_insight(
             current_views, current_engagement, current_rate,
             views_change, engagement_change
         )
         
-        return DashboardSummary(
+        summary = DashboardSummary(
             brand_id=brand_id,
             current_period=f"Last {days} days",
             previous_period=f"Previous {days} days",
@@ -132,16 +182,24 @@ class AnalyticsEngine:
                 "trend": "up" if rate_change > 0 else "down"
             },
             followers={
-                "value": sum(m.get('followers_gained', 0) for m in current_metrics),
+                "value": current["followers_gained"],
                 "change": 0
             },
-            posts_this_period=len(current_metrics),
+            posts_this_period=current["count"],
             posts_scheduled=scheduled_posts,
-            top_post_thumbnail=top_post.get('thumbnail_url') if top_post else None,
-            top_post_views=top_post.get('views', 0) if top_post else 0,
+            top_post_thumbnail=current["top_thumbnail"],
+            top_post_views=current["top_views"],
             ai_insight=ai_insight,
             last_updated=datetime.now()
         )
+        
+        summary_cache.set(cache_key, version, summary)
+        return summary
+    
+    @staticmethod
+    def _period_end() -> datetime:
+        """End (exclusive) of reporting periods: next midnight"""
+        return day_start(datetime.now()) + timedelta(days=1)
     
     async def _generate_quick_insight(
         self,
@@ -237,55 +295,22 @@ Return ONLY the insight sentence.
     ) -> List[PillarPerformance]:
         """Get performance aggregated by content pillar"""
         
-        days = {
-            TimeRange.DAY: 1,
-            TimeRange.WEEK: 7,
-            TimeRange.MONTH: 30,
-            TimeRange.QUARTER: 90,
-            TimeRange.YEAR: 365
-        }.get(time_range, 30)
-        
-        start_date = datetime.now() - timedelta(days=days)
-        
-        # Get all content with metrics
-        pipeline = [
-            {"$match": {"brand_id": brand_id, "timestamp": {"$gte": start_date}}},
-            {"$lookup": {
-                "from": "content",
-                "localField": "content_id",
-                "foreignField": "_id",
-                "as": "content_info"
-            }},
-            {"$unwind": "$content_info"},
-            {"$group": {
-                "_id": "$content_info.pillar_name",
-                "total_posts": {"$sum": 1},
-                "total_views": {"$sum": "$views"},
-                "total_likes": {"$sum": "$likes"},
-                "total_comments": {"$sum": "$comments"},
-                "total_shares": {"$sum": "$shares"},
-                "total_saves": {"$sum": "$saves"}
-            }}
-        ]
+        days = TIME_RANGE_DAYS.get(time_range, 30)
+        end_date = self._period_end()
         
-        results = await self.db.metrics.aggregate(pipeline).to_list(None)
+        buckets = await fetch_buckets(self.db, brand_id, end_date - timedelta(days=days), end_date)
         
         performances = []
-        for result in results:
-            total_engagement = (
-                result.get('total_likes', 0) +
-                result.get('total_comments', 0) +
-                result.get('total_shares', 0) +
-                result.get('total_saves', 0)
-            )
+        for pillar_name, totals in fold_buckets(buckets, "pillar_name").items():
+            total_engagement = engagement(totals)
             
             performances.append(PillarPerformance(
-                pillar_name=result['_id'] or 'Unknown',
+                pillar_name=pillar_name or 'Unknown',
                 brand_id=brand_id,
-                total_posts=result.get('total_posts', 0),
-                total_views=result.get('total_views', 0),
+                total_posts=totals["count"],
+                total_views=totals["views"],
                 total_engagement=total_engagement,
-                avg_engagement_rate=(total_engagement / max(result.get('total_views', 1), 1)) * 100
+                avg_engagement_rate=(total_engagement / max(totals["views"], 1)) * 100
             ))
         
         return performances
@@ -297,48 +322,23 @@ Return ONLY the insight sentence.
     ) -> List[PlatformPerformance]:
         """Get performance aggregated by platform"""
         
-        days = {
-            TimeRange.DAY: 1,
-            TimeRange.WEEK: 7,
-            TimeRange.MONTH: 30,
-            TimeRange.QUARTER: 90
-        }.get(time_range, 30)
+        days = TIME_RANGE_DAYS.get(time_range, 30)
+        end_date = self._period_end()
         
-        start_date = datetime.now() - timedelta(days=days)
-        
-        pipeline = [
-            {"$match": {"brand_id": brand_id, "timestamp": {"$gte": start_date}}},
-            {"$group": {
-                "_id": "$platform",
-                "total_posts": {"$sum": 1},
-                "total_views": {"$sum": "$views"},
-                "total_likes": {"$sum": "$likes"},
-                "total_comments": {"$sum": "$comments"},
-                "total_shares": {"$sum": "$shares"},
-                "total_saves": {"$sum": "$saves"},
-                "followers_gained": {"$sum": "$followers_gained"}
-            }}
-        ]
-        
-        results = await self.db.metrics.aggregate(pipeline).to_list(None)
+        buckets = await fetch_buckets(self.db, brand_id, end_date - timedelta(days=days), end_date)
         
         performances = []
-        for result in results:
-            total_engagement = (
-                result.get('total_likes', 0) +
-                result.get('total_comments', 0) +
-                result.get('total_shares', 0) +
-                result.get('total_saves', 0)
-            )
+        for platform, totals in fold_buckets(buckets, "platform").items():
+            total_engagement = engagement(totals)
             
             performances.append(PlatformPerformance(
-                platform=result['_id'] or 'unknown',
+                platform=platform or 'unknown',
                 brand_id=brand_id,
-                total_posts=result.get('total_posts', 0),
-                total_views=result.get('total_views', 0),
+                total_posts=totals["count"],
+                total_views=totals["views"],
                 total_engagement=total_engagement,
-                avg_engagement_rate=(total_engagement / max(result.get('total_views', 1), 1)) * 100,
-                followers_gained=result.get('followers_gained', 0)
+                avg_engagement_rate=(total_engagement / max(totals["views"], 1)) * 100,
+                followers_gained=totals["followers_gained"]
             ))
         
         return performances
@@ -351,9 +351,11 @@ Return ONLY the insight sentence.
         """Get AI-powered optimization recommendations"""
         
         # Gather data
-        summary = await self.get_dashboard_summary(brand_id, days=30)
-        pillar_perf = await self.get_pillar_performance(brand_id)
-        platform_perf = await self.get_platform_performance(brand_id)
+        summary, pillar_perf, platform_perf = await asyncio.gather(
+            self.get_dashboard_summary(brand_id, days=30),
+            self.get_pillar_performance(brand_id),
+            self.get_platform_performance(brand_id)
+        )
         
         # Prepare data for Claude
         data_summary = {
@@ -567,20 +569,14 @@ Ideas should be:
         start_date = end_date - timedelta(days=days)
         
         # Gather all data
-        summary = await self.get_dashboard_summary(brand_id, days)
-        pillar_perf = await self.get_pillar_performance(brand_id, time_range)
-        platform_perf = await self.get_platform_performance(brand_id, time_range)
+        summary, pillar_perf, platform_perf = await asyncio.gather(
+            self.get_dashboard_summary(brand_id, days),
+            self.get_pillar_performance(brand_id, time_range),
+            self.get_platform_performance(brand_id, time_range)
+        )
         recommendations = await self.get_ai_recommendations(brand_id, brand_guidelines)
         content_ideas = await self.generate_content_ideas(brand_id, brand_guidelines)
         
-        # Get top and worst posts
-        all_metrics = await self.db.metrics.find({
-            "brand_id": brand_id,
-            "timestamp": {"$gte": start_date}
-        }).to_list(None)
-        
-        sorted_by_views = sorted(all_metrics, key=lambda x: x.get('views', 0), reverse=True)
-        
         # Generate AI summary
         ai_summary = await self._generate_report_summary(
             summary, pillar_perf, platform_perf
@@ -0,0 +1,285 @@
+"""
+IA Factory - Analytics Rollups
+Phase 4: Server-side metric aggregation & daily rollups
+
+Dashboards never load raw metric documents. Metrics are folded by MongoDB
+into buckets (platform x pillar) carrying sums and the top post:
+
+- closed days come from the `metrics_daily` rollup collection, maintained
+  by `analytics_tasks.update_all_analytics` through `roll_up_metrics`;
+- days after the brand's rollup watermark (normally only today) are
+  aggregated from `metrics` on the (brand_id, timestamp) index.
+
+A dashboard query therefore reads at most one rollup document per day,
+platform and pillar, whatever the length of the metric history.
+"""
+
+import logging
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..database import Collections
+
+logger = logging.getLogger(__name__)
+
+METRICS_COLLECTION = Collections.METRICS
+ROLLUP_COLLECTION = Collections.METRICS_DAILY
+STATE_COLLECTION = Collections.ANALYTICS_STATE
+
+# Counters summed into every bucket
+SUM_FIELDS = ("views", "likes", "comments", "shares", "saves", "followers_gained")
+ENGAGEMENT_FIELDS = ("likes", "comments", "shares", "saves")
+
+# Rollups recompute the last closed day to absorb late writes
+ROLLUP_OVERLAP_DAYS = 1
+MAX_BACKFILL_DAYS = 400
+
+
+def day_start(moment: datetime) -> datetime:
+    """Midnight of the day containing `moment`"""
+    return datetime.combine(moment.date(), time.min)
+
+
+def engagement(bucket: Dict[str, Any]) -> int:
+    """Likes + comments + shares + saves of a bucket or metric"""
+    return sum(bucket.get(field, 0) or 0 for field in ENGAGEMENT_FIELDS)
+
+
+def _sum_accumulators() -> Dict[str, Any]:
+    return {field: {"$sum": f"${field}"} for field in SUM_FIELDS}
+
+
+def bucket_pipeline(match: Dict[str, Any], by_day: bool = False) -> List[Dict[str, Any]]:
+    """
+    Fold raw metrics into platform x pillar buckets
+
+    Metrics are first grouped per content so the pillar lookup runs once per
+    content instead of once per metric point.
+
+    Args:
+        match: $match on the metrics collection (brand_id + timestamp range)
+        by_day: Also group by calendar day (rollup granularity)
+
+    Returns:
+        Aggregation pipeline producing bucket documents
+    """
+    content_key: Dict[str, Any] = {"platform": "$platform", "content_id": "$content_id"}
+    if by_day:
+        content_key["day"] = {"$dateFromParts": {
+            "year": {"$year": "$timestamp"},
+            "month": {"$month": "$timestamp"},
+            "day": {"$dayOfMonth": "$timestamp"}
+        }}
+
+    bucket_key = {"platform": "$_id.platform", "pillar_name": "$pillar_name"}
+    if by_day:
+        bucket_key["day"] = "$_id.day"
+
+    return [
+        {"$match": match},
+        {"$sort": {"views": -1}},
+        {"$group": {
+            "_id": content_key,
+            "count": {"$sum": 1},
+            **_sum_accumulators(),
+            "top_views": {"$first": "$views"},
+            "top_thumbnail": {"$first": "$thumbnail_url"},
+            "top_content_id": {"$first": "$content_id"}
+        }},
+        # content_id is stored as a string, content._id as an ObjectId
+        {"$addFields": {"content_oid": {"$convert": {
+            "input": "$_id.content_id", "to": "objectId",
+            "onError": "$_id.content_id", "onNull": None
+        }}}},
+        {"$lookup": {
+            "from": "content",
+            "localField": "content_oid",
+            "foreignField": "_id",
+            "as": "content_info"
+        }},
+        {"$addFields": {"pillar_name": {"$arrayElemAt": ["$content_info.pillar_name", 0]}}},
+        {"$sort": {"top_views": -1}},
+        {"$group": {
+            "_id": bucket_key,
+            "count": {"$sum": "$count"},
+            **_sum_accumulators(),
+            "top_views": {"$first": "$top_views"},
+            "top_thumbnail": {"$first": "$top_thumbnail"},
+            "top_content_id": {"$first": "$top_content_id"}
+        }}
+    ]
+
+
+def _flatten(doc: Dict[str, Any]) -> Dict[str, Any]:
+    key = doc.pop("_id")
+    doc["platform"] = key.get("platform")
+    doc["pillar_name"] = key.get("pillar_name")
+    return doc
+
+
+async def get_rollup_watermark(db, brand_id: str) -> Optional[datetime]:
+    """First day not covered by rollups (None = no rollups yet)"""
+    state = await db[STATE_COLLECTION].find_one({"_id": brand_id}, {"rolled_until": 1})
+    return state.get("rolled_until") if state else None
+
+
+async def get_metrics_version(db, brand_id: str) -> int:
+    """Counter bumped every time metrics are recorded for the brand"""
+    state = await db[STATE_COLLECTION].find_one({"_id": brand_id}, {"metrics_version": 1})
+    return state.get("metrics_version", 0) if state else 0
+
+
+async def mark_metrics_changed(db, brand_id: Optional[str]) -> None:
+    """Invalidate cached summaries of a brand (call after inserting metrics)"""
+    if not brand_id:
+        return
+    await db[STATE_COLLECTION].update_one(
+        {"_id": brand_id},
+        {"$inc": {"metrics_version": 1}},
+        upsert=True
+    )
+
+
+async def fetch_buckets(
+    db,
+    brand_id: str,
+    start: datetime,
+    end: datetime
+) -> List[Dict[str, Any]]:
+    """
+    Platform x pillar buckets for [start, end)
+
+    Days before the rollup watermark are read from `metrics_daily` (day
+    granularity: `start` is rounded down to midnight); the rest is
+    aggregated from raw metrics.
+
+    Returns:
+        Bucket dicts: platform, pillar_name, count, sums, top_views, top_thumbnail
+    """
+    watermark = await get_rollup_watermark(db, brand_id)
+    buckets: List[Dict[str, Any]] = []
+    raw_start = start
+
+    if watermark and day_start(start) < watermark:
+        rolled_end = min(watermark, end)
+        pipeline = [
+            {"$match": {"brand_id": brand_id, "day": {"$gte": day_start(start), "$lt": rolled_end}}},
+            {"$sort": {"top_views": -1}},
+            {"$group": {
+                "_id": {"platform": "$platform", "pillar_name": "$pillar_name"},
+                "count": {"$sum": "$count"},
+                **_sum_accumulators(),
+                "top_views": {"$first": "$top_views"},
+                "top_thumbnail": {"$first": "$top_thumbnail"},
+                "top_content_id": {"$first": "$top_content_id"}
+            }}
+        ]
+        docs = await db[ROLLUP_COLLECTION].aggregate(pipeline).to_list(None)
+        buckets += [_flatten(doc) for doc in docs]
+        raw_start = rolled_end
+
+    if raw_start < end:
+        match = {"brand_id": brand_id, "timestamp": {"$gte": raw_start, "$lt": end}}
+        docs = await db[METRICS_COLLECTION].aggregate(bucket_pipeline(match), allowDiskUse=True).to_list(None)
+        buckets += [_flatten(doc) for doc in docs]
+
+    return buckets
+
+
+def fold_buckets(buckets: Iterable[Dict[str, Any]], key: Optional[str] = None) -> Dict[Any, Dict[str, Any]]:
+    """
+    Merge buckets by `key` ("platform", "pillar_name" or None for a grand total)
+
+    Returns:
+        {key value: totals with count, sums, top_views, top_thumbnail}
+    """
+    folded: Dict[Any, Dict[str, Any]] = {}
+    for bucket in buckets:
+        group = bucket.get(key) if key else None
+        totals = folded.get(group)
+        if totals is None:
+            totals = folded[group] = _empty_totals()
+            totals["top_views"] = -1
+        totals["count"] += bucket.get("count", 0) or 0
+        for field in SUM_FIELDS:
+            totals[field] += bucket.get(field, 0) or 0
+        if (bucket.get("top_views") or 0) > totals["top_views"]:
+            totals["top_views"] = bucket.get("top_views") or 0
+            totals["top_thumbnail"] = bucket.get("top_thumbnail")
+            totals["top_content_id"] = bucket.get("top_content_id")
+    return folded
+
+
+def total_of(buckets: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """Grand total of buckets (zeros when there are none)"""
+    return fold_buckets(buckets).get(None) or _empty_totals()
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {
+        "count": 0, **{field: 0 for field in SUM_FIELDS},
+        "top_views": 0, "top_thumbnail": None, "top_content_id": None
+    }
+
+
+async def roll_up_metrics(db, brand_id: str, now: Optional[datetime] = None) -> int:
+    """
+    Bring the brand's daily rollups up to yesterday
+
+    Idempotent: buckets are replaced through $merge, and the watermark
+    only moves forward once the merge succeeded.
+
+    Returns:
+        Number of days (re)computed
+    """
+    until = day_start(now or datetime.now())
+    watermark = await get_rollup_watermark(db, brand_id)
+
+    if watermark:
+        since = watermark - timedelta(days=ROLLUP_OVERLAP_DAYS)
+    else:
+        first = await db[METRICS_COLLECTION].find_one(
+            {"brand_id": brand_id}, {"timestamp": 1}, sort=[("timestamp", 1)]
+        )
+        if not first or not first.get("timestamp"):
+            return 0
+        since = max(day_start(first["timestamp"]), until - timedelta(days=MAX_BACKFILL_DAYS))
+
+    if since >= until:
+        return 0
+
+    pipeline = bucket_pipeline(
+        {"brand_id": brand_id, "timestamp": {"$gte": since, "$lt": until}},
+        by_day=True
+    )
+    pipeline += [
+        {"$project": {
+            "_id": {
+                "brand_id": brand_id,
+                "day": "$_id.day",
+                "platform": "$_id.platform",
+                "pillar_name": "$_id.pillar_name"
+            },
+            "brand_id": brand_id,
+            "day": "$_id.day",
+            "platform": "$_id.platform",
+            "pillar_name": "$_id.pillar_name",
+            "count": 1,
+            **{field: 1 for field in SUM_FIELDS},
+            "top_views": 1,
+            "top_thumbnail": 1,
+            "top_content_id": 1
+        }},
+        {"$merge": {"into": ROLLUP_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+    await db[METRICS_COLLECTION].aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+    await db[STATE_COLLECTION].update_one(
+        {"_id": brand_id},
+        {"$set": {"rolled_until": until, "rolled_at": datetime.now()}},
+        upsert=True
+    )
+
+    days = (until - since).days
+    logger.info(f"Rolled up {days} day(s) of metrics for brand {brand_id}")
+    return days
@@ -4,15 +4,22 @@ Phase 3: Video format conversion for multiple platforms
 """
 
 import asyncio
-import subprocess
 import os
+import shutil
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 from dataclasses import dataclass
 
 from ..models.distribution import Platform, PLATFORM_SPECS
 from ..config import settings
+from .ffmpeg_engine import (
+    EncodeSettings,
+    FFmpegError,
+    RenditionOutput,
+    build_multi_output_args,
+    get_ffmpeg_engine,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -42,12 +49,14 @@ class PlatformConverter:
     def __init__(self):
         self.output_dir = Path(settings.output_dir) / "converted"
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.engine = get_ffmpeg_engine()
     
     async def convert_for_platforms(
         self,
         source_video: str,
         platforms: List[Platform],
-        base_name: str = None
+        base_name: str = None,
+        multi_output: bool = True
     ) -> Dict[str, ConversionResult]:
         """
         Convert video for multiple platforms
@@ -56,6 +65,8 @@ class PlatformConverter:
             source_video: Path to source video
             platforms: List of target platforms
             base_name: Base name for output files
+            multi_output: Decode the source once and encode every platform
+                in a single FFmpeg run (False = one FFmpeg run per platform)
         
         Returns:
             Dictionary mapping platform to conversion result
@@ -64,39 +75,169 @@ class PlatformConverter:
         if base_name is None:
             base_name = Path(source_video).stem
         
-        results = {}
-        
+        specs = []
         for platform in platforms:
+            spec = PLATFORM_SPECS.get(platform)
+            if not spec:
+                logger.warning(f"No spec for platform: {platform}")
+                continue
+            specs.append(spec)
+        
+        if not specs:
+            return {}
+        
+        if multi_output:
             try:
-                spec = PLATFORM_SPECS.get(platform)
-                if not spec:
-                    logger.warning(f"No spec for platform: {platform}")
-                    continue
-                
-                result = await self._convert_video(
-                    source=source_video,
-                    spec=spec,
-                    base_name=base_name
-                )
-                
-                results[platform.value] = result
-                
-            except Exception as e:
-                logger.error(f"Conversion failed for {platform}: {e}")
-                results[platform.value] = ConversionResult(
-                    platform=platform.value,
-                    input_path=source_video,
-                    output_path="",
-                    success=False,
-                    width=0,
-                    height=0,
-                    duration=0,
-                    file_size_mb=0,
-                    error=str(e)
-                )
+                return await self._convert_multi_output(source_video, specs, base_name)
+            except FFmpegError as e:
+                # One bad rendition fails the whole run: retry platforms one by one
+                logger.warning(f"Multi-output conversion failed, converting per platform: {e}")
+        
+        converted = await asyncio.gather(
+            *(self._convert_video(source=source_video, spec=spec, base_name=base_name) for spec in specs),
+            return_exceptions=True
+        )
+        
+        results = {}
+        for spec, result in zip(specs, converted):
+            if isinstance(result, Exception):
+                logger.error(f"Conversion failed for {spec.platform}: {result}")
+                result = self._failed_result(spec, source_video, str(result))
+            results[spec.platform.value] = result
         
         return results
     
+    @staticmethod
+    def _rendition_key(spec) -> Tuple[int, int, int, int]:
+        """Platforms sharing this key get byte-identical outputs"""
+        return (spec.width, spec.height, spec.recommended_fps, spec.max_duration)
+    
+    def _output_path(self, spec, base_name: str) -> Path:
+        return self.output_dir / f"{base_name}_{spec.platform.value}_{spec.width}x{spec.height}.mp4"
+    
+    @staticmethod
+    def _encode_settings(spec) -> EncodeSettings:
+        return EncodeSettings(
+            width=spec.width,
+            height=spec.height,
+            fps=spec.recommended_fps,
+            preset="medium",
+            crf=23,
+            audio_bitrate="128k",
+            audio_sample_rate=44100,
+            extra_video_args=["-profile:v", "high", "-level", "4.0"]
+        )
+    
+    async def _convert_multi_output(
+        self,
+        source: str,
+        specs: List,  # List[PlatformSpec]
+        base_name: str
+    ) -> Dict[str, ConversionResult]:
+        """
+        Convert for all platforms with one decode of the source
+        
+        The source is split into one scale/pad branch per distinct rendition
+        (size, fps, duration cap); platforms sharing a rendition reuse the
+        same encode.
+        
+        Raises:
+            FFmpegError: If the FFmpeg run fails
+        """
+        
+        renditions: Dict[Tuple[int, int, int, int], List] = {}
+        for spec in specs:
+            renditions.setdefault(self._rendition_key(spec), []).append(spec)
+        
+        outputs = []
+        for group in renditions.values():
+            spec = group[0]
+            outputs.append(RenditionOutput(
+                path=str(self._output_path(spec, base_name)),
+                settings=self._encode_settings(spec),
+                max_duration=spec.max_duration
+            ))
+        
+        source_duration = await self._get_video_duration(source)
+        longest = max(spec.max_duration for spec in specs)
+        expected = min(source_duration, longest) if source_duration else longest
+        
+        args = build_multi_output_args(
+            source,
+            outputs,
+            encoder_threads=self.engine.encoder_threads(len(outputs))
+        )
+        
+        logger.info(
+            f"Converting {source} for {len(specs)} platforms "
+            f"({len(outputs)} renditions, single decode)"
+        )
+        run = await self.engine.run(args, output_path=[o.path for o in outputs], duration=expected)
+        
+        # Platforms sharing a rendition get a hard link (or copy) of the encode
+        for group, output in zip(renditions.values(), outputs):
+            for spec in group[1:]:
+                self._link_output(Path(output.path), self._output_path(spec, base_name))
+        
+        durations = await asyncio.gather(*(
+            self._get_video_duration(o.path) for o in outputs
+        ))
+        
+        rendition_duration = dict(zip(renditions, durations))
+        results = {
+            spec.platform.value: self._success_result(
+                spec, source, self._output_path(spec, base_name),
+                rendition_duration[self._rendition_key(spec)]
+            )
+            for spec in specs
+        }
+        
+        logger.info(f"✅ Converted {len(specs)} platforms in {run.elapsed_seconds:.1f}s")
+        return results
+    
+    @staticmethod
+    def _link_output(source: Path, target: Path):
+        target.unlink(missing_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+    
+    def _success_result(self, spec, source: str, output_path: Path, duration: float) -> ConversionResult:
+        file_size_mb = output_path.stat().st_size / (1024 * 1024)
+        
+        # Check if file is within size limit
+        if file_size_mb > spec.max_file_size_mb:
+            logger.warning(
+                f"Output file ({file_size_mb:.1f}MB) exceeds "
+                f"{spec.platform.value} limit ({spec.max_file_size_mb}MB)"
+            )
+        
+        return ConversionResult(
+            platform=spec.platform.value,
+            input_path=source,
+            output_path=str(output_path),
+            success=True,
+            width=spec.width,
+            height=spec.height,
+            duration=duration,
+            file_size_mb=round(file_size_mb, 2)
+        )
+    
+    @staticmethod
+    def _failed_result(spec, source: str, error: str) -> ConversionResult:
+        return ConversionResult(
+            platform=spec.platform.value,
+            input_path=source,
+            output_path="",
+            success=False,
+            width=spec.width,
+            height=spec.height,
+            duration=0,
+            file_size_mb=0,
+            error=error
+        )
+    
     async def _convert_video(
         self,
         source: str,
@@ -107,134 +248,48 @@ class PlatformConverter:
         Convert single video using FFmpeg
         """
         
-        output_filename = f"{base_name}_{spec.platform.value}_{spec.width}x{spec.height}.mp4"
-        output_path = self.output_dir / output_filename
-        
-        # Build FFmpeg command
-        cmd = [
-            "ffmpeg", "-y",
-            "-i", source,
-            # Video filters
-            "-vf", (
-                f"scale={spec.width}:{spec.height}:"
-                f"force_original_aspect_ratio=decrease,"
-                f"pad={spec.width}:{spec.height}:(ow-iw)/2:(oh-ih)/2:black"
-            ),
-            # Video codec
-            "-c:v", "libx264",
-            "-preset", "medium",
-            "-crf", "23",
-            "-profile:v", "high",
-            "-level", "4.0",
-            # Frame rate
-            "-r", str(spec.recommended_fps),
-            # Audio codec
-            "-c:a", "aac",
-            "-b:a", "128k",
-            "-ar", "44100",
-            # Duration limit
-            "-t", str(spec.max_duration),
-            # Optimize for streaming
-            "-movflags", "+faststart",
-            "-pix_fmt", "yuv420p",
-            str(output_path)
-        ]
+        output_path = self._output_path(spec, base_name)
+        args = build_multi_output_args(
+            source,
+            [RenditionOutput(
+                path=str(output_path),
+                settings=self._encode_settings(spec),
+                max_duration=spec.max_duration
+            )],
+            encoder_threads=self.engine.encoder_threads()
+        )
         
         logger.info(f"Converting for {spec.platform.value}: {spec.width}x{spec.height}")
         
         try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, stderr = await process.communicate()
-            
-            if process.returncode != 0:
-                error_msg = stderr.decode() if stderr else "Unknown error"
+            try:
+                await self.engine.run(args, output_path=str(output_path), duration=spec.max_duration)
+            except FFmpegError as e:
+                error_msg = e.stderr or str(e)
                 logger.error(f"FFmpeg failed: {error_msg}")
-                return ConversionResult(
-                    platform=spec.platform.value,
-                    input_path=source,
-                    output_path="",
-                    success=False,
-                    width=spec.width,
-                    height=spec.height,
-                    duration=0,
-                    file_size_mb=0,
-                    error=error_msg[:500]
-                )
-            
-            # Get output file info
-            file_size_mb = output_path.stat().st_size / (1024 * 1024)
-            
-            # Check if file is within size limit
-            if file_size_mb > spec.max_file_size_mb:
-                logger.warning(
-                    f"Output file ({file_size_mb:.1f}MB) exceeds "
-                    f"{spec.platform.value} limit ({spec.max_file_size_mb}MB)"
-                )
+                return self._failed_result(spec, source, error_msg[:500])
             
             # Get duration using ffprobe
             duration = await self._get_video_duration(str(output_path))
             
-            logger.info(f"✅ Converted: {output_filename} ({file_size_mb:.1f}MB)")
+            logger.info(f"✅ Converted: {output_path.name}")
             
-            return ConversionResult(
-                platform=spec.platform.value,
-                input_path=source,
-                output_path=str(output_path),
-                success=True,
-                width=spec.width,
-                height=spec.height,
-                duration=duration,
-                file_size_mb=round(file_size_mb, 2)
-            )
+            return self._success_result(spec, source, output_path, duration)
             
         except Exception as e:
             logger.error(f"Conversion error: {e}")
-            return ConversionResult(
-                platform=spec.platform.value,
-                input_path=source,
-                output_path="",
-                success=False,
-                width=spec.width,
-                height=spec.height,
-                duration=0,
-                file_size_mb=0,
-                error=str(e)
-            )
+            return self._failed_result(spec, source, str(e))
     
     async def _get_video_duration(self, video_path: str) -> float:
         """Get video duration using ffprobe"""
         
-        cmd = [
-            "ffprobe",
-            "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "default=noprint_wrappers=1:nokey=1",
-            video_path
-        ]
-        
-        try:
-            process = await asyncio.create_subprocess_exec(
-                *cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            stdout, _ = await process.communicate()
-            return float(stdout.decode().strip())
-            
-        except:
-            return 0.0
+        return await self.engine.probe_duration(video_path)
     
     async def convert_bulk(
         self,
         videos: List[str],
         platforms: List[Platform],
-        batch_size: int = 2
+        batch_size: Optional[int] = None
     ) -> Dict[str, Dict[str, ConversionResult]]:
         """
         Convert multiple videos for multiple platforms
@@ -242,32 +297,30 @@ class PlatformConverter:
         Args:
             videos: List of video paths
             platforms: Target platforms
-            batch_size: Videos to process in parallel
+            batch_size: Videos converted in parallel (default: FFmpeg worker
+                pool size, derived from the CPU count)
         
         Returns:
             Dictionary mapping video name to platform results
         """
         
-        all_results = {}
+        # Sliding window: a new video starts as soon as one finishes
+        window = asyncio.Semaphore(batch_size or self.engine.max_workers)
         
-        for i in range(0, len(videos), batch_size):
-            batch = videos[i:i+batch_size]
-            
-            # Process batch
-            batch_tasks = [
-                self.convert_for_platforms(video, platforms)
-                for video in batch
-            ]
-            
-            batch_results = await asyncio.gather(*batch_tasks, return_exceptions=True)
-            
-            for video, result in zip(batch, batch_results):
-                video_name = Path(video).stem
-                if isinstance(result, Exception):
-                    logger.error(f"Batch conversion failed for {video}: {result}")
-                    all_results[video_name] = {"error": str(result)}
-                else:
-                    all_results[video_name] = result
+        async def convert(video: str):
+            async with window:
+                return await self.convert_for_platforms(video, platforms)
+        
+        results = await asyncio.gather(*(convert(video) for video in videos), return_exceptions=True)
+        
+        all_results = {}
+        for video, result in zip(videos, results):
+            video_name = Path(video).stem
+            if isinstance(result, Exception):
+                logger.error(f"Batch conversion failed for {video}: {result}")
+                all_results[video_name] = {"error": str(result)}
+            else:
+                all_results[video_name] = result
         
         return all_results
     
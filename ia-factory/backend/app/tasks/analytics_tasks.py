@@ -32,6 +32,7 @@ def update_all_analytics() -> Dict[str, Any]:
         logger.info("Starting analytics update for all brands...")
         
         from app.services.analytics_engine import AnalyticsEngine
+        from app.services.analytics_rollups import roll_up_metrics
         from app.database import get_database
         
         async def _update_all():
@@ -50,6 +51,9 @@ def update_all_analytics() -> Dict[str, Any]:
                     # Fetch latest metrics from platforms
                     await _fetch_platform_metrics(db, brand_id)
                     
+                    # Fold closed days into the daily rollups read by dashboards
+                    rolled_days = await roll_up_metrics(db, brand_id)
+                    
                     # Update analytics summary
                     summary = await engine.get_dashboard_summary(brand_id)
                     
@@ -57,7 +61,8 @@ def update_all_analytics() -> Dict[str, Any]:
                         "brand_id": brand_id,
                         "brand_name": brand.get("name"),
                         "status": "updated",
-                        "total_views": summary.get("total_views", 0)
+                        "rolled_days": rolled_days,
+                        "total_views": summary.views.get("value", 0)
                     })
                     
                 except Exception as e:
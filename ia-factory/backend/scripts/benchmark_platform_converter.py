@@ -0,0 +1,75 @@
+"""
+IA Factory - Platform conversion benchmark
+Per-platform runs vs single-decode multi-output run
+
+Generates a synthetic 1080p source (60s by default) and converts it for
+5 platforms both ways. Run from the backend directory (or in the container):
+
+    python scripts/benchmark_platform_converter.py --duration 60
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PLATFORMS = ["tiktok", "instagram_reels", "youtube_shorts", "linkedin", "twitter"]
+
+
+async def benchmark(duration: int, workdir: Path):
+    os.environ["OUTPUT_DIR"] = str(workdir)
+
+    from app.models.distribution import Platform
+    from app.services.ffmpeg_engine import EncodeSettings, get_ffmpeg_engine
+    from app.services.platform_converter import PlatformConverter
+
+    engine = get_ffmpeg_engine()
+    source = workdir / "source_1080p.mp4"
+    settings = EncodeSettings(width=1920, height=1080, preset="ultrafast")
+    await engine.run([
+        "-f", "lavfi", "-i", f"testsrc2=s=1920x1080:r=30:d={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+        *settings.audio_args(), *settings.video_args(), str(source)
+    ], output_path=str(source))
+
+    converter = PlatformConverter()
+    platforms = [Platform(p) for p in PLATFORMS]
+
+    print(f"Source: {duration}s 1080p, {len(platforms)} platforms, "
+          f"{engine.max_workers} FFmpeg workers, {os.cpu_count()} CPUs")
+
+    timings = {}
+    for label, multi_output in (("per-platform", False), ("multi-output", True)):
+        started = time.perf_counter()
+        results = await converter.convert_for_platforms(str(source), platforms, multi_output=multi_output)
+        timings[label] = time.perf_counter() - started
+
+        failed = [name for name, result in results.items() if not result.success]
+        status = f"FAILED: {', '.join(failed)}" if failed else "ok"
+        print(f"  {label:<13} {timings[label]:7.1f}s  ({status})")
+
+    print(f"  speedup       {timings['per-platform'] / timings['multi-output']:7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=int, default=60, help="Source duration in seconds")
+    parser.add_argument("--keep", action="store_true", help="Keep generated files")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="iaf-bench-"))
+    asyncio.run(benchmark(args.duration, workdir))
+    if args.keep:
+        print(f"Files kept in {workdir}")
+    else:
+        import shutil
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
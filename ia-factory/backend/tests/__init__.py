@@ -0,0 +1 @@
+"""Tests package for IA Factory backend"""
@@ -0,0 +1,288 @@
+"""
+Unit tests for analytics rollups and the dashboard summary cache
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import mongomock
+
+from app.services import analytics_engine
+from app.services.analytics_engine import SummaryCache
+from app.services.analytics_rollups import (
+    METRICS_COLLECTION,
+    ROLLUP_COLLECTION,
+    STATE_COLLECTION,
+    bucket_pipeline,
+    fetch_buckets,
+    fold_buckets,
+    get_rollup_watermark,
+    roll_up_metrics,
+    total_of,
+)
+
+DAY0 = datetime(2026, 3, 1)
+PLATFORMS = ["tiktok", "instagram", "youtube"]
+PILLARS = ["tips", "recettes", None]
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeCollection:
+    """Motor-like async facade over a mongomock collection"""
+
+    def __init__(self, db, name):
+        self.db = db
+        self.collection = db[name]
+
+    def aggregate(self, pipeline, **options):
+        # mongomock implements neither $convert nor $merge: content ids are
+        # stored as strings in the fixtures and $merge is applied here
+        stages, merge = [], None
+        for stage in pipeline:
+            if "$merge" in stage:
+                merge = stage["$merge"]
+            elif "content_oid" in stage.get("$addFields", {}):
+                stages.append({"$addFields": {"content_oid": "$_id.content_id"}})
+            else:
+                stages.append(stage)
+        docs = list(self.collection.aggregate(stages))
+        if merge is None:
+            return FakeCursor(docs)
+        for doc in docs:
+            self.db[merge["into"]].replace_one({"_id": doc["_id"]}, doc, upsert=True)
+        return FakeCursor([])
+
+    async def find_one(self, *args, **kwargs):
+        return self.collection.find_one(*args, **kwargs)
+
+    async def update_one(self, *args, **kwargs):
+        return self.collection.update_one(*args, **kwargs)
+
+    async def count_documents(self, query):
+        return self.collection.count_documents(query)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.db = mongomock.MongoClient().iafactory
+
+    def __getitem__(self, name):
+        return FakeCollection(self.db, name)
+
+    def __getattr__(self, name):
+        return self[name]
+
+
+def _seed(db: FakeDatabase, days: int = 10, contents: int = 12, points: int = 120, seed: int = 7):
+    """Metrics of several contents, platforms and pillars spread over `days` days"""
+    rng = random.Random(seed)
+    content_ids = [f"content-{i}" for i in range(contents)]
+    for i, content_id in enumerate(content_ids):
+        pillar = PILLARS[i % len(PILLARS)]
+        db.db.content.insert_one({"_id": content_id, **({"pillar_name": pillar} if pillar else {})})
+    # Distinct view counts keep the "top post" of every bucket unambiguous
+    views = rng.sample(range(10, 100000), points)
+    db.db[METRICS_COLLECTION].insert_many([
+        {
+            "brand_id": "brand-1",
+            "content_id": rng.choice(content_ids),
+            "platform": rng.choice(PLATFORMS),
+            "timestamp": DAY0 + timedelta(days=rng.randrange(days), minutes=rng.randrange(24 * 60)),
+            "views": views[n],
+            "likes": rng.randrange(500),
+            "comments": rng.randrange(50),
+            "shares": rng.randrange(50),
+            "saves": rng.randrange(50),
+            "followers_gained": rng.randrange(10),
+            "thumbnail_url": f"thumb-{n}.jpg",
+        }
+        for n in range(points)
+    ] + [{"brand_id": "brand-2", "content_id": "content-0", "platform": "tiktok",
+          "timestamp": DAY0 + timedelta(days=3), "views": 999999, "likes": 1}])
+
+
+async def _raw_buckets(db: FakeDatabase, start: datetime, end: datetime):
+    """Reference: aggregate the whole range from raw metrics"""
+    match = {"brand_id": "brand-1", "timestamp": {"$gte": start, "$lt": end}}
+    docs = await db[METRICS_COLLECTION].aggregate(bucket_pipeline(match)).to_list(None)
+    return [{**doc, "platform": doc["_id"].get("platform"), "pillar_name": doc["_id"].get("pillar_name")}
+            for doc in docs]
+
+
+def _assert_same_totals(buckets, reference):
+    for key in ("platform", "pillar_name", None):
+        assert fold_buckets(buckets, key) == fold_buckets(reference, key)
+
+
+class TestFoldBuckets:
+    """Test suite for merging buckets into totals"""
+
+    BUCKETS = [
+        {"platform": "tiktok", "pillar_name": "tips", "count": 2, "views": 100, "likes": 10,
+         "top_views": 80, "top_thumbnail": "a.jpg", "top_content_id": "c1"},
+        {"platform": "tiktok", "pillar_name": "recettes", "count": 1, "views": 300, "likes": None,
+         "top_views": 300, "top_thumbnail": "b.jpg", "top_content_id": "c2"},
+        {"platform": "instagram", "pillar_name": "tips", "count": 3, "views": 50, "shares": 4,
+         "top_views": 40, "top_thumbnail": "c.jpg", "top_content_id": "c3"},
+    ]
+
+    def test_fold_by_platform(self):
+        """Counts and sums add up per key, the top post is the most viewed"""
+        folded = fold_buckets(self.BUCKETS, "platform")
+
+        assert set(folded) == {"tiktok", "instagram"}
+        tiktok = folded["tiktok"]
+        assert (tiktok["count"], tiktok["views"], tiktok["likes"]) == (3, 400, 10)
+        assert (tiktok["top_views"], tiktok["top_thumbnail"], tiktok["top_content_id"]) == (300, "b.jpg", "c2")
+        assert folded["instagram"]["shares"] == 4
+        assert folded["instagram"]["comments"] == 0
+
+    def test_fold_by_pillar(self):
+        """Buckets of different platforms merge under the same pillar"""
+        folded = fold_buckets(self.BUCKETS, "pillar_name")
+
+        assert folded["tips"]["count"] == 5
+        assert folded["tips"]["top_content_id"] == "c1"
+
+    def test_grand_total(self):
+        """total_of folds everything under one key"""
+        total = total_of(self.BUCKETS)
+
+        assert (total["count"], total["views"], total["likes"], total["shares"]) == (6, 450, 10, 4)
+        assert total["top_content_id"] == "c2"
+
+    def test_total_of_nothing(self):
+        """No buckets gives zeros and no top post"""
+        total = total_of([])
+
+        assert total["count"] == total["views"] == total["top_views"] == 0
+        assert total["top_thumbnail"] is None and total["top_content_id"] is None
+
+
+class TestSummaryCache:
+    """Test suite for dashboard summary invalidation"""
+
+    def test_version_bump_invalidates(self):
+        """A new metrics version misses and drops the stale entry"""
+        cache = SummaryCache()
+        cache.set(("brand-1", 30), 1, "summary")
+
+        assert cache.get(("brand-1", 30), 1) == "summary"
+        assert cache.get(("brand-1", 30), 2) is None
+        assert cache.get(("brand-1", 30), 1) is None
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Entries expire after ttl_seconds even if the version is unchanged"""
+        now = [1000.0]
+        monkeypatch.setattr(analytics_engine.time, "monotonic", lambda: now[0])
+        cache = SummaryCache(ttl_seconds=300)
+        cache.set(("brand-1", 30), 1, "summary")
+
+        now[0] += 299
+        assert cache.get(("brand-1", 30), 1) == "summary"
+        now[0] += 2
+        assert cache.get(("brand-1", 30), 1) is None
+
+    def test_least_recently_used_is_evicted(self):
+        """Past max_entries the least recently read entry goes first"""
+        cache = SummaryCache(max_entries=2)
+        cache.set("a", 1, "A")
+        cache.set("b", 1, "B")
+        cache.get("a", 1)
+        cache.set("c", 1, "C")
+
+        assert cache.get("b", 1) is None
+        assert (cache.get("a", 1), cache.get("c", 1)) == ("A", "C")
+
+
+class TestRollups:
+    """Test suite for daily rollups read together with the raw tail"""
+
+    def test_rollup_plus_tail_equals_raw_aggregation(self):
+        """Closed days from metrics_daily and today from metrics give the raw totals"""
+        db = FakeDatabase()
+        _seed(db)
+        now = DAY0 + timedelta(days=9, hours=12)
+
+        async def scenario():
+            days = await roll_up_metrics(db, "brand-1", now=now)
+            start, end = DAY0 + timedelta(days=2), DAY0 + timedelta(days=10)
+            return days, await fetch_buckets(db, "brand-1", start, end), await _raw_buckets(db, start, end)
+
+        days, buckets, reference = asyncio.run(scenario())
+
+        assert days == 9
+        assert db.db[ROLLUP_COLLECTION].count_documents({"brand_id": "brand-2"}) == 0
+        _assert_same_totals(buckets, reference)
+
+    def test_range_entirely_before_watermark(self):
+        """A range of closed days is served from rollups alone"""
+        db = FakeDatabase()
+        _seed(db)
+
+        async def scenario():
+            await roll_up_metrics(db, "brand-1", now=DAY0 + timedelta(days=9, hours=12))
+            db.db[METRICS_COLLECTION].delete_many({"timestamp": {"$lt": DAY0 + timedelta(days=9)}})
+            return await fetch_buckets(db, "brand-1", DAY0, DAY0 + timedelta(days=5))
+
+        buckets = asyncio.run(scenario())
+
+        # Raw metrics of those days are gone: the totals can only come from metrics_daily
+        fresh = FakeDatabase()
+        _seed(fresh)
+        reference = asyncio.run(_raw_buckets(fresh, DAY0, DAY0 + timedelta(days=5)))
+        _assert_same_totals(buckets, reference)
+
+    def test_late_metrics_of_yesterday_are_absorbed(self):
+        """The next rollup recomputes the overlap day and moves the watermark forward"""
+        db = FakeDatabase()
+        _seed(db)
+        today = DAY0 + timedelta(days=9)
+
+        async def scenario():
+            await roll_up_metrics(db, "brand-1", now=today - timedelta(hours=1))
+            db.db[METRICS_COLLECTION].insert_one({
+                "brand_id": "brand-1", "content_id": "content-1", "platform": "tiktok",
+                "timestamp": today - timedelta(hours=3), "views": 123456, "likes": 7,
+                "thumbnail_url": "late.jpg",
+            })
+            days = await roll_up_metrics(db, "brand-1", now=today + timedelta(hours=1))
+            watermark = await get_rollup_watermark(db, "brand-1")
+            start, end = DAY0, today + timedelta(days=1)
+            return days, watermark, await fetch_buckets(db, "brand-1", start, end), await _raw_buckets(db, start, end)
+
+        days, watermark, buckets, reference = asyncio.run(scenario())
+
+        assert days == 2 and watermark == today
+        assert total_of(buckets)["top_thumbnail"] == "late.jpg"
+        _assert_same_totals(buckets, reference)
+
+    def test_rollup_is_idempotent(self):
+        """Running the rollup again replaces buckets instead of adding to them"""
+        db = FakeDatabase()
+        _seed(db)
+        now = DAY0 + timedelta(days=9, hours=12)
+
+        async def scenario():
+            await roll_up_metrics(db, "brand-1", now=now)
+            first = list(db.db[ROLLUP_COLLECTION].find({}, {"_id": 0}).sort([("day", 1), ("views", 1)]))
+            # Same day: only the overlap day is recomputed
+            assert await roll_up_metrics(db, "brand-1", now=now) == 1
+            await db[STATE_COLLECTION].update_one({"_id": "brand-1"}, {"$set": {"rolled_until": DAY0}})
+            await roll_up_metrics(db, "brand-1", now=now)
+            return first, list(db.db[ROLLUP_COLLECTION].find({}, {"_id": 0}).sort([("day", 1), ("views", 1)]))
+
+        first, second = asyncio.run(scenario())
+
+        assert first == second
+
+    def test_no_metrics(self):
+        """A brand without metrics has nothing to roll up"""
+        assert asyncio.run(roll_up_metrics(FakeDatabase(), "brand-1", now=DAY0)) == 0
@@ -0,0 +1,123 @@
+"""
+Unit tests for single-decode multi-platform conversion and its per-platform fallback
+"""
+import asyncio
+import os
+
+import pytest
+
+from app.models.distribution import Platform
+from app.services import platform_converter
+from app.services.ffmpeg_engine import FFmpegError, FFmpegResult
+from app.services.platform_converter import PlatformConverter
+
+
+class FakeEngine:
+    """FFmpegEngine recording its runs and writing each output path"""
+
+    max_workers = 2
+
+    def __init__(self, fail_multi_output=False):
+        self.fail_multi_output = fail_multi_output
+        self.runs = []
+
+    def encoder_threads(self, encoders=1):
+        return 4 // encoders
+
+    async def run(self, args, output_path=None, duration=None):
+        self.runs.append((args, output_path, duration))
+        paths = output_path if isinstance(output_path, list) else [output_path]
+        if self.fail_multi_output and len(paths) > 1:
+            raise FFmpegError("FFmpeg exited with code 1", returncode=1, stderr="Error initializing filter")
+        for path in paths:
+            with open(path, "wb") as f:
+                f.write(os.path.basename(path).encode())
+        return FFmpegResult(output_path=paths[0], elapsed_seconds=1.0, queued_seconds=0.0)
+
+    async def probe_duration(self, path):
+        return 120.0 if path.endswith("source.mp4") else 42.0
+
+
+@pytest.fixture
+def converter(tmp_path, monkeypatch):
+    monkeypatch.setattr(platform_converter.settings, "output_dir", str(tmp_path))
+    monkeypatch.setattr(platform_converter, "get_ffmpeg_engine", lambda: FakeEngine())
+    return PlatformConverter()
+
+
+def _graph(args):
+    return args[args.index("-filter_complex") + 1].split(";")
+
+
+class TestMultiOutputConversion:
+    """Test suite for converting every platform in one FFmpeg run"""
+
+    def test_one_run_for_three_platforms(self, converter):
+        """Three distinct renditions come from a single split of one decode"""
+        platforms = [Platform.TIKTOK, Platform.LINKEDIN, Platform.TWITTER]
+
+        results = asyncio.run(converter.convert_for_platforms("/videos/source.mp4", platforms))
+
+        assert len(converter.engine.runs) == 1
+        args, output_paths, duration = converter.engine.runs[0]
+        graph = _graph(args)
+        assert args.count("-i") == 1 and graph[0] == "[0:v]split=3[s0][s1][s2]"
+        assert [branch.split("scale=")[1].split(":force")[0] for branch in graph[1:]] == ["1080:1920", "1080:1350", "1920:1080"]
+        assert [args[args.index(path) - 1] for path in output_paths] == ["+faststart"] * 3
+        assert args.count("-threads") == 3 and args[args.index("-threads") + 1] == "1"
+        assert duration == 120.0  # min(source, longest cap)
+
+        assert set(results) == {p.value for p in platforms}
+        for platform, path in zip(platforms, output_paths):
+            result = results[platform.value]
+            assert result.success and result.output_path == path and result.duration == 42.0
+
+    def test_platforms_sharing_a_rendition_share_one_encode(self, converter):
+        """Instagram and Facebook Reels (same size, fps and cap) are encoded once and hard-linked"""
+        platforms = [Platform.INSTAGRAM_REELS, Platform.FACEBOOK_REELS, Platform.YOUTUBE_SHORTS]
+
+        results = asyncio.run(converter.convert_for_platforms("/videos/source.mp4", platforms))
+
+        args, output_paths, _ = converter.engine.runs[0]
+        assert len(output_paths) == 2
+        assert _graph(args)[0] == "[0:v]split=2[s0][s1]"
+        assert args[args.index("-t") + 1] == "90"
+
+        instagram = results[Platform.INSTAGRAM_REELS.value]
+        facebook = results[Platform.FACEBOOK_REELS.value]
+        assert instagram.output_path in output_paths and facebook.output_path not in output_paths
+        assert os.path.samefile(instagram.output_path, facebook.output_path)
+        assert facebook.success and facebook.width == 1080 and facebook.height == 1920
+        assert "facebook_reels" in os.path.basename(facebook.output_path)
+
+    def test_rendition_key(self):
+        """Only size, fps and duration cap decide whether platforms share an encode"""
+        specs = platform_converter.PLATFORM_SPECS
+        key = PlatformConverter._rendition_key
+
+        assert key(specs[Platform.INSTAGRAM_REELS]) == key(specs[Platform.FACEBOOK_REELS])
+        assert key(specs[Platform.INSTAGRAM_REELS]) != key(specs[Platform.TIKTOK])
+        assert key(specs[Platform.INSTAGRAM_REELS]) != key(specs[Platform.YOUTUBE_SHORTS])
+
+    def test_failed_multi_output_falls_back_to_per_platform(self, converter):
+        """When the single run fails, each platform is converted on its own"""
+        converter.engine = FakeEngine(fail_multi_output=True)
+        platforms = [Platform.TIKTOK, Platform.LINKEDIN]
+
+        results = asyncio.run(converter.convert_for_platforms("/videos/source.mp4", platforms))
+
+        runs = converter.engine.runs
+        assert isinstance(runs[0][1], list) and len(runs) == 3
+        assert sorted(output_path for _, output_path, _ in runs[1:]) == sorted(r.output_path for r in results.values())
+        for args, _, _ in runs[1:]:
+            assert "split" not in args[args.index("-filter_complex") + 1]
+        assert all(result.success for result in results.values())
+
+    def test_multi_output_disabled_runs_per_platform(self, converter):
+        """multi_output=False keeps one FFmpeg run per platform"""
+        asyncio.run(converter.convert_for_platforms(
+            "/videos/source.mp4", [Platform.TIKTOK, Platform.LINKEDIN], multi_output=False
+        ))
+
+        assert len(converter.engine.runs) == 2
+        assert all(isinstance(output_path, str) for _, output_path, _ in converter.engine.runs)
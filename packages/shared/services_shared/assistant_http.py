@@ -0,0 +1,233 @@
+"""
+Assistant HTTP runtime
+Shared by services/fiscal-assistant and services/legal-assistant
+
+Canonical copy: packages/shared/services_shared/assistant_http.py. Each
+service is built from its own Docker context, so the module is vendored into
+every service with `make sync-assistant-http` - edit this copy, then sync.
+
+- ClientPool keeps one httpx.AsyncClient per upstream (RAG API, Groq) for
+  the lifetime of the app: connections and TLS sessions are reused across
+  requests instead of being opened per call.
+- TTLCache is an async get-or-fetch cache with a TTL, an LRU bound and
+  single-flight: concurrent identical lookups share one upstream request.
+  Failures raise out of the fetch and are never cached.
+- LatencyTracker times the stages of a request (rules, rag, llm...) and
+  keeps rolling percentiles per stage; ServerTimingMiddleware (pure ASGI)
+  opens the per-request scope and publishes the breakdown in a
+  `Server-Timing` response header.
+
+Requires httpx.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional, TypeVar
+
+import httpx
+
+T = TypeVar("T")
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+
+
+class ClientPool:
+    """
+    Long-lived httpx.AsyncClient per upstream
+
+        clients = ClientPool(rag={"base_url": RAG_API_URL, "timeout": 30})
+        async with clients:          # app lifespan
+            await clients["rag"].get("/api/search", params=...)
+
+    A client used before start() (app served without lifespan, scripts) is
+    created on first access.
+    """
+
+    def __init__(self, **upstreams: Dict[str, Any]):
+        self.upstreams = upstreams
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+
+    def _create(self, name: str) -> httpx.AsyncClient:
+        options = {
+            "limits": httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ),
+            **self.upstreams[name],
+        }
+        return httpx.AsyncClient(**options)
+
+    def __getitem__(self, name: str) -> httpx.AsyncClient:
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            client = self._clients[name] = self._create(name)
+        return client
+
+    async def start(self):
+        for name in self.upstreams:
+            self[name]
+
+    async def aclose(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+
+class TTLCache:
+    """Async get-or-fetch cache: TTL, LRU bound, single-flight"""
+
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await fetch()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # waiters get the error; avoid "never retrieved" warnings
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._inflight[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "ttl_seconds": self.ttl,
+        }
+
+
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+class LatencyTracker:
+    """Per-request stage timings and rolling per-stage percentiles"""
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+        self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """{stage: {count, mean_ms, p50_ms, p95_ms, max_ms}} over the rolling window"""
+        result = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            count = len(ordered)
+            result[stage] = {
+                "count": count,
+                "mean_ms": round(sum(ordered) / count * 1000, 1),
+                "p50_ms": round(ordered[count // 2] * 1000, 1),
+                "p95_ms": round(ordered[min(count - 1, int(count * 0.95))] * 1000, 1),
+                "max_ms": round(ordered[-1] * 1000, 1),
+            }
+        return result
+
+
+class ServerTimingMiddleware:
+    """
+    Pure ASGI middleware: per-request timing scope + Server-Timing header
+
+    Stages recorded by the handler (tracker.stage(...)) are reported as
+    `Server-Timing: rag;dur=12.3, llm;dur=840.0, total;dur=861.2`; requests
+    that recorded at least one stage also feed the tracker's "total".
+    """
+
+    def __init__(self, app, tracker: LatencyTracker):
+        self.app = app
+        self.tracker = tracker
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and timings:
+                total = time.perf_counter() - started
+                metrics = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+                header = ", ".join(metrics + [f"total;dur={total * 1000:.1f}"])
+                self.tracker.record("total", total)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
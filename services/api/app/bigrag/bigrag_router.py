@@ -7,9 +7,10 @@ DZ 🇩🇿 + CH 🇨🇭 + GLOBAL 🌍
 
 from datetime import datetime
 from typing import Optional, List
-from fastapi import APIRouter, HTTPException, Query, Header, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Query, Header, BackgroundTasks, Request
 from pydantic import BaseModel, Field
 
+from ..tenant_middleware import get_request_tenant_id
 from .country_detector import (
     CountryDetectionResult, Country, Language,
     get_country_emoji, get_country_name,
@@ -67,7 +68,7 @@ class IngestBatchRequest(BaseModel):
 # ============================================
 
 @router.post("/query", response_model=BigRAGResponse)
-async def multi_query(request: BigRAGRequest):
+async def multi_query(request: BigRAGRequest, http_request: Request):
     """
     🌍 Query RAG Multi-Pays
     
@@ -93,14 +94,14 @@ async def multi_query(request: BigRAGRequest):
     - Texte en allemand
     """
     try:
-        response = await bigrag_service.query(request)
+        response = await bigrag_service.query(request, tenant_id=get_request_tenant_id(http_request))
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("/quick")
-async def quick_query(request: QuickQueryRequest):
+async def quick_query(request: QuickQueryRequest, http_request: Request):
     """
     ⚡ Query rapide (paramètres par défaut)
     
@@ -116,7 +117,7 @@ async def quick_query(request: QuickQueryRequest):
     )
     
     try:
-        response = await bigrag_service.query(full_request)
+        response = await bigrag_service.query(full_request, tenant_id=get_request_tenant_id(http_request))
         return {
             "answer": response.answer,
             "country": response.country_detected.value,
@@ -566,7 +567,7 @@ class AgenticQueryResponse(BaseModel):
 
 
 @router.post("/agentic/query", response_model=AgenticQueryResponse)
-async def agentic_query(request: AgenticQueryRequest):
+async def agentic_query(request: AgenticQueryRequest, http_request: Request):
     """
     🧠 Query RAG Agentic (Advanced)
     
@@ -680,12 +681,14 @@ async def agentic_query(request: AgenticQueryRequest):
             answer = await bigrag_service.generate_answer(
                 prompt=enhanced_prompt,
                 contexts=[],  # Déjà inclus dans le prompt
+                tenant_id=get_request_tenant_id(http_request),
             )
         else:
             # Génération classique
             answer = await bigrag_service.generate_answer_from_contexts(
                 query=request.query,
                 contexts=contexts,
+                tenant_id=get_request_tenant_id(http_request),
             )
         
         timings["llm"] = (time.time() - llm_start) * 1000
@@ -26,9 +26,16 @@ from .qdrant_multi import (
     IndexName, SearchResult, MultiSearchResult,
     get_index_for_country,
 )
+from ..config import get_settings
+from ..llm_cache import completion_cache, estimate_cost_usd
+from ..tracing import stage
 
 logger = logging.getLogger(__name__)
 
+# Génération des réponses RAG
+RAG_TEMPERATURE = 0.3
+RAG_MAX_TOKENS = 2000
+
 
 # ============================================
 # ENUMS & MODELS
@@ -210,9 +217,9 @@ class BigRAGService:
         elif self.anthropic_api_key and self.anthropic_api_key.startswith("sk-ant-api03-"):
             self.default_model = LLMModel.CLAUDE_SONNET
     
-    async def query(self, request: BigRAGRequest) -> BigRAGResponse:
+    async def query(self, request: BigRAGRequest, tenant_id: Optional[str] = None) -> BigRAGResponse:
         """
-        Pipeline principal BIG RAG
+        Pipeline principal BIG RAG (tenant_id: portée du cache de complétions)
         
         1. Détection pays
         2. Embedding de la requête
@@ -235,34 +242,36 @@ class BigRAGService:
             country_result = self.country_detector.detect(request.query)
         
         # 2. Embedding de la requête
-        query_embedding = await self.embedding_pipeline.embed_query(request.query)
+        with stage("embed"):
+            query_embedding = await self.embedding_pipeline.embed_query(request.query)
         
         # 3. Recherche hybride
-        search_start = time.time()
-        
         # Index principal selon le pays
         primary_country = country_result.country.value
         
-        search_result = await self.qdrant.hybrid_search(
-            query_vector=query_embedding,
-            primary_country=primary_country,
-            top_k_primary=request.top_k,
-            top_k_secondary=3 if request.include_global else 0,
-        )
+        with stage("search", country=primary_country) as search_span:
+            search_result = await self.qdrant.hybrid_search(
+                query_vector=query_embedding,
+                primary_country=primary_country,
+                top_k_primary=request.top_k,
+                top_k_secondary=3 if request.include_global else 0,
+            )
         
-        search_time = (time.time() - search_start) * 1000
+        search_time = search_span.duration_ms
         
         # 4. Reranking
-        rerank_start = time.time()
+        rerank_time = 0.0
         contexts = []
         
         if request.rerank and search_result.results:
             texts = [r.text for r in search_result.results]
-            reranked = await self.reranker_pipeline.rerank(
-                query=request.query,
-                documents=texts,
-                top_k=request.top_k,
-            )
+            with stage("rerank", documents=len(texts)) as rerank_span:
+                reranked = await self.reranker_pipeline.rerank(
+                    query=request.query,
+                    documents=texts,
+                    top_k=request.top_k,
+                )
+            rerank_time = rerank_span.duration_ms
             
             for ranked_doc in reranked.documents:
                 original = search_result.results[ranked_doc.index]
@@ -286,11 +295,7 @@ class BigRAGService:
                     url=result.metadata.get("url"),
                 ))
         
-        rerank_time = (time.time() - rerank_start) * 1000
-        
         # 5. Génération LLM
-        llm_start = time.time()
-        
         # Préparer le contexte
         context_text = self._format_contexts(contexts)
         
@@ -305,13 +310,15 @@ class BigRAGService:
         
         # Appeler le LLM
         model = request.model or self.default_model.value
-        answer, tokens_used = await self._call_llm(
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            model=model,
-        )
+        with stage("llm", model=model) as llm_span:
+            answer, tokens_used = await self._call_llm(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                model=model,
+                tenant_id=tenant_id,
+            )
         
-        llm_time = (time.time() - llm_start) * 1000
+        llm_time = llm_span.duration_ms
         
         # 6. Préparer les sources
         sources = self._prepare_sources(contexts)
@@ -377,36 +384,69 @@ class BigRAGService:
         system_prompt: str,
         user_prompt: str,
         model: str,
+        tenant_id: Optional[str] = None,
     ) -> tuple[str, int]:
         """
-        Appeler le LLM
+        Appeler le LLM (via le cache de complétions)
         
         Returns:
             Tuple (réponse, tokens utilisés)
         """
+        # Réponses factuelles à 0.3; à 0 (déterministe) quand le cache de
+        # complétions peut les servir, sinon elles ne seraient jamais cachées
+        use_cache = get_settings().enable_llm_cache and completion_cache.cacheable(0.0, tenant_id)
+        temperature = 0.0 if use_cache else RAG_TEMPERATURE
+        if not use_cache:
+            return await self._dispatch_llm(system_prompt, user_prompt, model, temperature)
+
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+        cached = await completion_cache.aget(model, messages, temperature, RAG_MAX_TOKENS, tenant_id)
+        if cached:
+            return cached.content, 0
+
+        answer, tokens = await self._dispatch_llm(system_prompt, user_prompt, model, temperature)
+        if tokens:
+            await completion_cache.aset(
+                model, messages, answer, temperature, RAG_MAX_TOKENS, tenant_id,
+                tokens_output=tokens,
+                cost_usd=estimate_cost_usd(model, tokens),
+            )
+        return answer, tokens
+
+    async def _dispatch_llm(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        temperature: float = RAG_TEMPERATURE,
+    ) -> tuple[str, int]:
+        """Router l'appel vers le provider du modèle"""
         provider = self._get_provider(model)
         
         if provider == LLMProvider.OPENAI.value:
-            return await self._call_openai(system_prompt, user_prompt, model)
+            return await self._call_openai(system_prompt, user_prompt, model, temperature)
         elif provider == LLMProvider.ANTHROPIC.value:
-            return await self._call_anthropic(system_prompt, user_prompt, model)
+            return await self._call_anthropic(system_prompt, user_prompt, model, temperature)
         elif provider == LLMProvider.GROQ.value:
-            return await self._call_groq(system_prompt, user_prompt, model)
+            return await self._call_groq(system_prompt, user_prompt, model, temperature)
         elif provider == LLMProvider.GOOGLE.value:
-            return await self._call_google(system_prompt, user_prompt, model)
+            return await self._call_google(system_prompt, user_prompt, model, temperature)
         else:
             # Fallback: utiliser Google si disponible, sinon OpenAI
             if self.google_api_key:
                 return await self._call_google(
-                    system_prompt, user_prompt, LLMModel.GEMINI_FLASH.value
+                    system_prompt, user_prompt, LLMModel.GEMINI_FLASH.value, temperature
                 )
             elif self.openai_api_key:
                 return await self._call_openai(
-                    system_prompt, user_prompt, LLMModel.GPT4O_MINI.value
+                    system_prompt, user_prompt, LLMModel.GPT4O_MINI.value, temperature
                 )
             elif self.anthropic_api_key:
                 return await self._call_anthropic(
-                    system_prompt, user_prompt, LLMModel.CLAUDE_SONNET.value
+                    system_prompt, user_prompt, LLMModel.CLAUDE_SONNET.value, temperature
                 )
             else:
                 return "Erreur: Aucun LLM configuré", 0
@@ -416,6 +456,7 @@ class BigRAGService:
         system_prompt: str,
         user_prompt: str,
         model: str,
+        temperature: float = RAG_TEMPERATURE,
     ) -> tuple[str, int]:
         """Appeler OpenAI"""
         async with httpx.AsyncClient(timeout=120.0) as client:
@@ -431,8 +472,8 @@ class BigRAGService:
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": user_prompt},
                     ],
-                    "max_tokens": 2000,
-                    "temperature": 0.3,
+                    "max_tokens": RAG_MAX_TOKENS,
+                    "temperature": temperature,
                 },
             )
             response.raise_for_status()
@@ -448,6 +489,7 @@ class BigRAGService:
         system_prompt: str,
         user_prompt: str,
         model: str,
+        temperature: float = RAG_TEMPERATURE,
     ) -> tuple[str, int]:
         """Appeler Anthropic Claude"""
         async with httpx.AsyncClient(timeout=120.0) as client:
@@ -464,7 +506,8 @@ class BigRAGService:
                     "messages": [
                         {"role": "user", "content": user_prompt},
                     ],
-                    "max_tokens": 2000,
+                    "max_tokens": RAG_MAX_TOKENS,
+                    "temperature": temperature,
                 },
             )
             response.raise_for_status()
@@ -481,6 +524,7 @@ class BigRAGService:
         system_prompt: str,
         user_prompt: str,
         model: str,
+        temperature: float = RAG_TEMPERATURE,
     ) -> tuple[str, int]:
         """Appeler Groq"""
         async with httpx.AsyncClient(timeout=60.0) as client:
@@ -496,8 +540,8 @@ class BigRAGService:
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": user_prompt},
                     ],
-                    "max_tokens": 2000,
-                    "temperature": 0.3,
+                    "max_tokens": RAG_MAX_TOKENS,
+                    "temperature": temperature,
                 },
             )
             response.raise_for_status()
@@ -513,6 +557,7 @@ class BigRAGService:
         system_prompt: str,
         user_prompt: str,
         model: str,
+        temperature: float = RAG_TEMPERATURE,
     ) -> tuple[str, int]:
         """Appeler Google Gemini"""
         async with httpx.AsyncClient(timeout=60.0) as client:
@@ -528,8 +573,8 @@ class BigRAGService:
                         }]
                     }],
                     "generationConfig": {
-                        "temperature": 0.3,
-                        "maxOutputTokens": 2000,
+                        "temperature": temperature,
+                        "maxOutputTokens": RAG_MAX_TOKENS,
                     }
                 },
             )
@@ -634,6 +679,7 @@ class BigRAGService:
         prompt: str,
         contexts: List[Dict[str, Any]] = None,
         model: str = None,
+        tenant_id: Optional[str] = None,
     ) -> str:
         """
         Générer une réponse à partir d'un prompt (pour Agentic RAG)
@@ -642,6 +688,7 @@ class BigRAGService:
             prompt: Prompt complet (peut inclure contextes et raisonnement)
             contexts: Contextes additionnels (optionnel)
             model: Modèle à utiliser (optionnel)
+            tenant_id: Tenant pour l'isolation du cache de complétions
             
         Returns:
             Réponse générée
@@ -660,6 +707,7 @@ class BigRAGService:
             system_prompt="Tu es un assistant expert qui répond de manière précise et structurée.",
             user_prompt=prompt,
             model=model,
+            tenant_id=tenant_id,
         )
         
         return answer
@@ -670,6 +718,7 @@ class BigRAGService:
         contexts: List[Dict[str, Any]],
         model: str = None,
         country: Country = None,
+        tenant_id: Optional[str] = None,
     ) -> str:
         """
         Générer une réponse à partir de contextes (pipeline classique)
@@ -679,6 +728,7 @@ class BigRAGService:
             contexts: Liste de contextes {id, text, score, ...}
             model: Modèle à utiliser
             country: Pays pour le system prompt
+            tenant_id: Tenant pour l'isolation du cache de complétions
             
         Returns:
             Réponse générée
@@ -712,6 +762,7 @@ class BigRAGService:
             system_prompt=system_prompt,
             user_prompt=user_prompt,
             model=model,
+            tenant_id=tenant_id,
         )
         
         return answer
@@ -12,6 +12,7 @@ Ce service:
 
 import os
 import json
+import importlib.util
 import time
 import logging
 import uuid
@@ -24,6 +25,9 @@ from qdrant_client import QdrantClient
 from qdrant_client.http import models as qdrant_models
 from qdrant_client.http.exceptions import UnexpectedResponse
 
+from ..chunking import get_chunker
+from ..tracing import stage
+
 # Models
 from .ingest_models import (
     RAGDocument,
@@ -39,24 +43,24 @@ from .ingest_models import (
     DEFAULT_COLLECTIONS,
 )
 
-# Embedding (sentence-transformers)
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
+# Embedding (sentence-transformers, importé au chargement du modèle)
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
 
 # OpenAI embeddings (fallback)
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
 
 
 logger = logging.getLogger(__name__)
 
 
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+    except (ValueError, TypeError, AttributeError):
+        return False
+    return True
+
+
 # ============================================
 # EMBEDDING PIPELINE
 # ============================================
@@ -92,12 +96,14 @@ class EmbeddingPipeline:
         if self.use_openai:
             if not OPENAI_AVAILABLE:
                 raise ImportError("OpenAI not installed")
+            from openai import OpenAI
             self._openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
             self._vector_size = 1536 if "3-small" in self.openai_model else 3072
             logger.info(f"Using OpenAI embeddings: {self.openai_model}")
         else:
             if not SENTENCE_TRANSFORMERS_AVAILABLE:
                 raise ImportError("sentence-transformers not installed")
+            from sentence_transformers import SentenceTransformer
             self._model = SentenceTransformer(self.model_name, device=self.device)
             self._vector_size = self._model.get_sentence_embedding_dimension()
             logger.info(f"Using local embeddings: {self.model_name} (dim={self._vector_size})")
@@ -267,70 +273,60 @@ class IngestService:
             result.errors.append(f"Failed to ensure collection '{collection}'")
             return result
         
-        # Préparer les points
-        points = []
+        # Découper les documents longs, puis embeddings de tous les chunks en un lot
+        pieces = []  # (doc, point_id, texte à embedder, payload)
         errors = []
         
         for doc in docs:
             try:
-                # Générer ID si absent
-                doc_id = doc.id or str(uuid.uuid4())
-                
-                # Texte pour embedding (title + text)
-                embed_text = f"{doc.title}\n\n{doc.text}"
-                if doc.summary:
-                    embed_text = f"{doc.title}\n\n{doc.summary}\n\n{doc.text}"
-                
-                # Générer embedding
-                embedding = self.embedder.embed_text(embed_text)
-                
-                # Payload (métadonnées)
-                payload = {
-                    "title": doc.title,
-                    "text": doc.text,
-                    "country": doc.country,
-                    "language": doc.language,
-                    "theme": doc.theme,
-                    "source": doc.source,
-                    "url": doc.url,
-                    "date": doc.date.isoformat() if doc.date else None,
-                    "tags": doc.tags,
-                    "is_official": doc.is_official,
-                    "summary": doc.summary,
-                    "chunk_index": doc.chunk_index,
-                    "total_chunks": doc.total_chunks,
-                    "parent_id": doc.parent_id,
-                    "extra": doc.extra,
-                    "ingested_at": datetime.utcnow().isoformat(),
-                }
-                
-                # Créer le point Qdrant
-                point = qdrant_models.PointStruct(
-                    id=doc_id,
-                    vector=embedding,
-                    payload=payload,
-                )
-                points.append(point)
-                
+                pieces.extend(self._split_document(doc))
             except Exception as e:
                 errors.append(f"Doc '{doc.id or doc.title[:30]}': {str(e)}")
                 result.failed_ids.append(doc.id or "unknown")
         
+        points = []
+        ingested_docs = set()
+        if pieces:
+            try:
+                with stage("embed", chunks=len(pieces)):
+                    embeddings = self.embedder.embed_batch([text for _, _, text, _ in pieces])
+                
+                for (doc, point_id, _, payload), embedding in zip(pieces, embeddings):
+                    # Créer le point Qdrant
+                    points.append(qdrant_models.PointStruct(
+                        id=point_id,
+                        vector=embedding,
+                        payload=payload,
+                    ))
+                    ingested_docs.add(id(doc))
+            except Exception as e:
+                errors.append(f"Embedding error: {str(e)}")
+                failed = {id(doc): doc for doc, _, _, _ in pieces}
+                result.failed_ids.extend(doc.id or "unknown" for doc in failed.values())
+        
         # Upsert les points dans Qdrant
         if points:
             try:
-                self.qdrant.upsert(
-                    collection_name=collection,
-                    points=points,
-                    wait=True,
-                )
-                result.inserted = len(points)
+                with stage("upsert", points=len(points)):
+                    self.qdrant.upsert(
+                        collection_name=collection,
+                        points=points,
+                        wait=True,
+                    )
+                result.inserted = len(ingested_docs)
             except Exception as e:
                 errors.append(f"Qdrant upsert error: {str(e)}")
                 result.status = IngestStatus.FAILED
+            else:
+                replaced = [doc.id for doc in docs if doc.id and id(doc) in ingested_docs and doc.chunk_index is None]
+                try:
+                    with stage("delete_stale", docs=len(replaced)):
+                        self._delete_stale_points(collection, replaced, [point.id for point in points])
+                except Exception as e:
+                    errors.append(f"Qdrant stale chunks cleanup error: {str(e)}")
         
         # Finaliser le résultat
-        result.failed = len(docs) - len(points)
+        result.failed = len(docs) - result.inserted
         result.errors = errors
         result.processing_time_ms = int((time.time() - start_time) * 1000)
         
@@ -344,9 +340,94 @@ class IngestService:
             result.status = IngestStatus.FAILED
             result.success = False
         
-        logger.info(f"Ingest batch: {collection} - {result.inserted}/{result.total} docs, {result.processing_time_ms}ms")
+        logger.info(
+            f"Ingest batch: {collection} - {result.inserted}/{result.total} docs "
+            f"({len(points)} chunks), {result.processing_time_ms}ms"
+        )
         return result
     
+    def _split_document(self, doc: RAGDocument) -> List[Tuple[RAGDocument, str, str, Dict[str, Any]]]:
+        """
+        Points Qdrant d'un document: un seul si le texte tient dans un chunk
+        (ID du document, comme avant), sinon un par chunk avec un ID stable
+        dérivé du document et du contenu (parent_id = ID du document). Les
+        points de la version précédente sont supprimés après l'upsert
+        (_delete_stale_points).
+        
+        Returns:
+            [(doc, point_id, texte à embedder, payload)]
+        """
+        # Générer ID si absent
+        doc_id = doc.id or str(uuid.uuid4())
+        
+        # Payload (métadonnées)
+        payload = {
+            "title": doc.title,
+            "text": doc.text,
+            "country": doc.country,
+            "language": doc.language,
+            "theme": doc.theme,
+            "source": doc.source,
+            "url": doc.url,
+            "date": doc.date.isoformat() if doc.date else None,
+            "tags": doc.tags,
+            "is_official": doc.is_official,
+            "summary": doc.summary,
+            "chunk_index": doc.chunk_index,
+            "total_chunks": doc.total_chunks,
+            "parent_id": doc.parent_id,
+            "extra": doc.extra,
+            "ingested_at": datetime.utcnow().isoformat(),
+        }
+        
+        # Déjà découpé par l'appelant
+        chunks = [] if doc.chunk_index is not None else list(get_chunker().stream([doc.text], namespace=doc_id))
+        
+        if len(chunks) <= 1:
+            # Texte pour embedding (title + text)
+            embed_text = f"{doc.title}\n\n{doc.text}"
+            if doc.summary:
+                embed_text = f"{doc.title}\n\n{doc.summary}\n\n{doc.text}"
+            return [(doc, doc_id, embed_text, payload)]
+        
+        return [
+            (
+                doc,
+                chunk.id,
+                f"{doc.title}\n\n{chunk.text}",
+                {
+                    **payload,
+                    "text": chunk.text,
+                    "chunk_index": chunk.index,
+                    "total_chunks": len(chunks),
+                    "parent_id": doc_id,
+                },
+            )
+            for chunk in chunks
+        ]
+    
+    def _delete_stale_points(self, collection: str, doc_ids: List[str], point_ids: List[str]):
+        """
+        Supprime les points d'une version précédente des documents ré-ingérés:
+        leurs chunks (parent_id) et l'ancien point unique (ID du document) qui
+        ne font pas partie des points qui viennent d'être écrits.
+        """
+        if not doc_ids:
+            return
+        stale = [qdrant_models.FieldCondition(key="parent_id", match=qdrant_models.MatchAny(any=doc_ids))]
+        # Seuls les IDs de documents au format UUID ont pu servir d'ID de point
+        point_doc_ids = [doc_id for doc_id in doc_ids if _is_uuid(doc_id)]
+        if point_doc_ids:
+            stale.append(qdrant_models.HasIdCondition(has_id=point_doc_ids))
+        self.qdrant.delete(
+            collection_name=collection,
+            points_selector=qdrant_models.FilterSelector(filter=qdrant_models.Filter(
+                should=stale,
+                must_not=[qdrant_models.HasIdCondition(has_id=point_ids)],
+            )),
+            wait=True,
+        )
+    
     # ----------------------------------------
     # COUNTRY-SPECIFIC HELPERS
     # ----------------------------------------
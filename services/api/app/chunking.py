@@ -0,0 +1,36 @@
+"""
+Découpage en chunks commun à toutes les ingestions
+
+Moteur partagé (services/text_chunker.py, copie de
+packages/shared/services_shared/text_chunker.py): lecture page par page,
+taille en tokens BPE (même comptage que app.tokens), coupure sur les fins
+de phrase arabes/françaises et IDs de chunks stables pour la déduplication.
+"""
+from functools import lru_cache
+from typing import List, Sequence
+
+from .config import get_settings
+from .services.text_chunker import Chunk, TextChunker, chunk_id
+from .tokens.counter import token_counter
+
+# Encodage BPE utilisé pour dimensionner les chunks (cl100k_base)
+CHUNK_TOKENIZER_MODEL = "text-embedding-3-small"
+
+__all__ = ["Chunk", "TextChunker", "chunk_id", "count_chunk_tokens", "get_chunker"]
+
+
+def count_chunk_tokens(texts: Sequence[str]) -> List[int]:
+    """Comptage par lot (un appel par page)"""
+    return token_counter.count_batch(texts, CHUNK_TOKENIZER_MODEL)
+
+
+@lru_cache()
+def get_chunker(min_chars: int = 50) -> TextChunker:
+    """Chunker configuré (CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS); chunks plus courts que min_chars ignorés"""
+    settings = get_settings()
+    return TextChunker(
+        max_tokens=settings.chunk_max_tokens,
+        overlap_tokens=settings.chunk_overlap_tokens,
+        min_chars=min_chars,
+        count_tokens=count_chunk_tokens,
+    )
@@ -2,8 +2,9 @@
 Cloud LLM Client - Support OpenAI, Anthropic, Groq
 """
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from ..config import get_settings
+from ..llm_cache import completion_cache, estimate_cost_usd
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -44,7 +45,9 @@ class CloudLLMClient:
         prompt: str,
         system: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 512
+        max_tokens: int = 512,
+        tenant_id: Optional[str] = None,
+        use_cache: bool = True
     ) -> Optional[str]:
         """
         Generate text using cloud LLM
@@ -54,6 +57,8 @@ class CloudLLMClient:
             system: System message
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
+            tenant_id: Tenant scope for the completion cache (no caching without one)
+            use_cache: Use the completion cache (deterministic temperatures only)
 
         Returns:
             Generated text or None on error
@@ -62,11 +67,19 @@ class CloudLLMClient:
             logger.warning("No LLM client available")
             return None
 
+        use_cache = use_cache and settings.enable_llm_cache and completion_cache.cacheable(temperature, tenant_id)
+        cache_messages = [{"role": "system", "content": system or ""}, {"role": "user", "content": prompt}]
+        cache_model = f"{self.provider}:{self.model}"
+        if use_cache:
+            cached = completion_cache.get(cache_model, cache_messages, temperature, max_tokens, tenant_id)
+            if cached:
+                return cached.content
+
         try:
             if self.provider == 'openai':
-                return self._generate_openai(prompt, system, temperature, max_tokens)
+                answer, tokens_input, tokens_output = self._generate_openai(prompt, system, temperature, max_tokens)
             elif self.provider == 'anthropic':
-                return self._generate_anthropic(prompt, system, temperature, max_tokens)
+                answer, tokens_input, tokens_output = self._generate_anthropic(prompt, system, temperature, max_tokens)
             else:
                 logger.error(f"Unsupported provider: {self.provider}")
                 return None
@@ -74,8 +87,19 @@ class CloudLLMClient:
             logger.error(f"LLM generation error: {e}")
             return None
 
-    def _generate_openai(self, prompt: str, system: Optional[str], temperature: float, max_tokens: int) -> str:
-        """Generate using OpenAI API"""
+        if use_cache:
+            completion_cache.set(
+                cache_model, cache_messages, answer, temperature, max_tokens, tenant_id,
+                tokens_input=tokens_input,
+                tokens_output=tokens_output,
+                cost_usd=estimate_cost_usd(self.model, tokens_input + tokens_output),
+            )
+        return answer
+
+    def _generate_openai(
+        self, prompt: str, system: Optional[str], temperature: float, max_tokens: int
+    ) -> Tuple[str, int, int]:
+        """Generate using OpenAI API (text, input tokens, output tokens)"""
         messages = []
         if system:
             messages.append({"role": "system", "content": system})
@@ -87,10 +111,17 @@ class CloudLLMClient:
             temperature=temperature,
             max_tokens=max_tokens
         )
-        return response.choices[0].message.content
+        usage = response.usage
+        return (
+            response.choices[0].message.content,
+            getattr(usage, "prompt_tokens", 0) or 0,
+            getattr(usage, "completion_tokens", 0) or 0,
+        )
 
-    def _generate_anthropic(self, prompt: str, system: Optional[str], temperature: float, max_tokens: int) -> str:
-        """Generate using Anthropic API"""
+    def _generate_anthropic(
+        self, prompt: str, system: Optional[str], temperature: float, max_tokens: int
+    ) -> Tuple[str, int, int]:
+        """Generate using Anthropic API (text, input tokens, output tokens)"""
         response = self.client.messages.create(
             model=self.model,
             max_tokens=max_tokens,
@@ -100,13 +131,19 @@ class CloudLLMClient:
                 {"role": "user", "content": prompt}
             ]
         )
-        return response.content[0].text
+        usage = response.usage
+        return (
+            response.content[0].text,
+            getattr(usage, "input_tokens", 0) or 0,
+            getattr(usage, "output_tokens", 0) or 0,
+        )
 
     def generate_rag_answer(
         self,
         query: str,
         context_chunks: List[Dict],
-        language: str = "fr"
+        language: str = "fr",
+        tenant_id: Optional[str] = None
     ) -> str:
         """
         Generate RAG answer from query and context
@@ -115,6 +152,7 @@ class CloudLLMClient:
             query: User question
             context_chunks: List of relevant document chunks
             language: Language for response
+            tenant_id: Tenant scope for the completion cache
 
         Returns:
             Generated answer
@@ -162,12 +200,17 @@ Answer the question based on the documents above. Be precise and concise."""
         system_prompt = system_prompts.get(language, system_prompts["fr"])
         user_prompt = prompts.get(language, prompts["fr"])
 
+        # Lower temperature for factual answers; deterministic when the
+        # completion cache can serve them (it only keeps temperature 0 answers)
+        cacheable = settings.enable_llm_cache and completion_cache.cacheable(0.0, tenant_id)
+
         # Generate answer
         answer = self.generate(
             prompt=user_prompt,
             system=system_prompt,
-            temperature=0.3,  # Lower temperature for factual answers
-            max_tokens=512
+            temperature=0.0 if cacheable else 0.3,
+            max_tokens=512,
+            tenant_id=tenant_id
         )
 
         if answer:
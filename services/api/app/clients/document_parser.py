@@ -1,12 +1,73 @@
 import PyPDF2
 import docx
 import io
-from typing import List, Dict, Tuple
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Dict, Optional, Tuple, Union
 import re
 import logging
 
+from ..chunking import Chunk, TextChunker, get_chunker
+from ..uploads import SpooledUpload
+
 logger = logging.getLogger(__name__)
 
+# Contenu d'un fichier: bytes, ou upload spoolé lu sans copie
+FileContent = Union[bytes, SpooledUpload]
+
+# Échantillon pour la détection de langue: fenêtres réparties sur chaque
+# page (début, milieu, fin), jusqu'à LANGUAGE_SAMPLE_MAX_CHARS au total
+LANGUAGE_SAMPLE_WINDOW = 500
+LANGUAGE_SAMPLE_WINDOWS_PER_PAGE = 3
+LANGUAGE_SAMPLE_MAX_CHARS = 6000
+
+
+def _open_stream(file_content: FileContent) -> BinaryIO:
+    """File-like sur le contenu, sans copie (BytesIO partage les bytes tant qu'il n'est pas modifié)"""
+    if isinstance(file_content, SpooledUpload):
+        return file_content.stream()
+    return io.BytesIO(file_content)
+
+
+def _decode_text(data) -> str:
+    """Décode un buffer (bytes, memoryview, mmap): UTF-8, sinon ISO-8859-1"""
+    try:
+        return str(data, 'utf-8')
+    except UnicodeDecodeError:
+        return str(data, 'iso-8859-1')
+
+
+class LanguageSample:
+    """Fenêtres de texte prélevées au fil des pages pour detect_language"""
+
+    def __init__(self, max_chars: int = LANGUAGE_SAMPLE_MAX_CHARS):
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.size = 0
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.max_chars
+
+    def add(self, text: str):
+        text = text.strip()
+        if not text or self.full:
+            return
+        window, count = LANGUAGE_SAMPLE_WINDOW, LANGUAGE_SAMPLE_WINDOWS_PER_PAGE
+        if len(text) <= window * count:
+            windows = [text]
+        else:
+            step = (len(text) - window) // (count - 1)
+            windows = [text[i * step:i * step + window] for i in range(count)]
+        for part in windows:
+            part = part[:self.max_chars - self.size]
+            if not part:
+                break
+            self.parts.append(part)
+            self.size += len(part)
+
+    def language(self) -> str:
+        return DocumentParser.detect_language("\n".join(self.parts))
+
+
 class DocumentParser:
     @staticmethod
     def detect_language(text: str) -> str:
@@ -32,108 +93,172 @@ class DocumentParser:
             return "fr"  # Default pour l'Algérie
     
     @staticmethod
-    def chunk_text(text: str, language: str, chunk_size: int = None) -> List[str]:
-        """Chunking adaptatif selon la langue"""
-        if chunk_size is None:
-            chunk_sizes = {"ar": 800, "fr": 1200, "en": 1000}
-            chunk_size = chunk_sizes.get(language, 1000)
-        
-        chunks = []
-        current_chunk = ""
-        
-        paragraphs = text.split("\n\n")
-        
-        for paragraph in paragraphs:
-            paragraph = paragraph.strip()
-            if not paragraph:
-                continue
-                
-            if len(current_chunk) + len(paragraph) < chunk_size:
-                current_chunk += paragraph + "\n\n"
-            else:
-                if current_chunk:
-                    chunks.append(current_chunk.strip())
-                current_chunk = paragraph + "\n\n"
-        
-        if current_chunk:
-            chunks.append(current_chunk.strip())
-        
-        return [chunk for chunk in chunks if len(chunk) > 50]
+    def chunk_text(text: str, language: str = "fr", max_tokens: int = None) -> List[str]:
+        """
+        Chunking en tokens aligné sur les phrases (moteur commun app.chunking)
+
+        La langue n'influe plus sur la taille: le budget est en tokens BPE,
+        l'arabe (plus de tokens par caractère) donne naturellement des chunks plus courts.
+        """
+        chunker = get_chunker()
+        if max_tokens is not None:
+            chunker = TextChunker(
+                max_tokens=max_tokens,
+                overlap_tokens=min(chunker.overlap_tokens, max_tokens // 4),
+                min_chars=chunker.min_chars,
+                count_tokens=chunker.count_tokens,
+            )
+        return chunker.chunk(text)
+    
+    @staticmethod
+    def iter_pdf_pages(file_content: FileContent) -> Iterator[str]:
+        """Texte du PDF page par page (extraction à la demande)"""
+        pdf_reader = PyPDF2.PdfReader(_open_stream(file_content))
+        for page in pdf_reader.pages:
+            yield page.extract_text() or ""
+    
+    @staticmethod
+    def iter_docx_paragraphs(file_content: FileContent) -> Iterator[str]:
+        """Paragraphes du DOCX"""
+        doc = docx.Document(_open_stream(file_content))
+        for paragraph in doc.paragraphs:
+            yield paragraph.text
+    
+    @staticmethod
+    def iter_txt(file_content: FileContent) -> Iterator[str]:
+        """Texte brut (UTF-8, sinon ISO-8859-1), décodé directement depuis le buffer"""
+        if isinstance(file_content, SpooledUpload):
+            with file_content.view() as data:
+                text = _decode_text(data)
+        else:
+            text = _decode_text(file_content)
+        yield text
     
     @classmethod
-    def parse_pdf(cls, file_content: bytes) -> Tuple[str, str]:
-        """Parse PDF et retourne (texte, langue)"""
+    def readers(cls) -> Dict[str, Tuple[Callable[[FileContent], Iterator[str]], str]]:
+        """Lecteur de pages et libellé par extension"""
+        return {
+            'pdf': (cls.iter_pdf_pages, "PDF"),
+            'docx': (cls.iter_docx_paragraphs, "DOCX"),
+            'txt': (cls.iter_txt, "TXT"),
+            'text': (cls.iter_txt, "TXT")
+        }
+    
+    @classmethod
+    def iter_pages(cls, filename: str, file_content: FileContent) -> Iterator[Tuple[int, str]]:
+        """
+        (numéro de page, texte) à la demande, selon l'extension
+
+        Une page PDF n'est extraite que lorsqu'elle est demandée; pour un
+        DOCX, les "pages" sont les paragraphes, un TXT est une seule page.
+        """
+        extension = filename.lower().split('.')[-1]
+        readers = cls.readers()
+        if extension not in readers:
+            raise ValueError(f"Type de fichier non supporté: {extension}")
+        reader, _ = readers[extension]
+        return enumerate(reader(file_content), start=1)
+    
+    @classmethod
+    def _parse_pages(cls, pages: Iterable[str], label: str) -> Tuple[str, str]:
+        """Texte complet et langue (détectée sur un échantillon des pages)"""
         try:
-            pdf_file = io.BytesIO(file_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            language = cls.detect_language(text)
-            return text.strip(), language
+            sample = LanguageSample()
+            parts = []
+            for page in pages:
+                sample.add(page)
+                parts.append(page)
+            return "\n".join(parts).strip(), sample.language()
             
         except Exception as e:
-            logger.error(f"PDF parsing error: {e}")
-            raise ValueError(f"Erreur lors du parsing PDF: {str(e)}")
+            logger.error(f"{label} parsing error: {e}")
+            raise ValueError(f"Erreur lors du parsing {label}: {str(e)}")
     
     @classmethod
-    def parse_docx(cls, file_content: bytes) -> Tuple[str, str]:
+    def parse_pdf(cls, file_content: FileContent) -> Tuple[str, str]:
+        """Parse PDF et retourne (texte, langue)"""
+        return cls._parse_pages(cls.iter_pdf_pages(file_content), "PDF")
+    
+    @classmethod
+    def parse_docx(cls, file_content: FileContent) -> Tuple[str, str]:
         """Parse DOCX et retourne (texte, langue)"""
-        try:
-            doc_file = io.BytesIO(file_content)
-            doc = docx.Document(doc_file)
-            
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            
-            language = cls.detect_language(text)
-            return text.strip(), language
-            
-        except Exception as e:
-            logger.error(f"DOCX parsing error: {e}")
-            raise ValueError(f"Erreur lors du parsing DOCX: {str(e)}")
+        return cls._parse_pages(cls.iter_docx_paragraphs(file_content), "DOCX")
     
     @classmethod
-    def parse_txt(cls, file_content: bytes) -> Tuple[str, str]:
+    def parse_txt(cls, file_content: FileContent) -> Tuple[str, str]:
         """Parse TXT et retourne (texte, langue)"""
-        try:
-            try:
-                text = file_content.decode('utf-8')
-            except UnicodeDecodeError:
-                text = file_content.decode('iso-8859-1')
-            
-            language = cls.detect_language(text)
-            return text.strip(), language
-            
-        except Exception as e:
-            logger.error(f"TXT parsing error: {e}")
-            raise ValueError(f"Erreur lors du parsing TXT: {str(e)}")
+        return cls._parse_pages(cls.iter_txt(file_content), "TXT")
     
     @classmethod
-    def parse_file(cls, filename: str, file_content: bytes) -> Dict:
-        """Parse fichier selon extension"""
-        extension = filename.lower().split('.')[-1]
-        
-        parsers = {
-            'pdf': cls.parse_pdf,
-            'docx': cls.parse_docx,
-            'txt': cls.parse_txt,
-            'text': cls.parse_txt
-        }
-        
-        if extension not in parsers:
-            raise ValueError(f"Type de fichier non supporté: {extension}")
-        
-        text, language = parsers[extension](file_content)
-        chunks = cls.chunk_text(text, language)
+    def parse_file(cls, filename: str, file_content: FileContent) -> Dict:
+        """
+        Parse fichier selon extension
+
+        Les pages sont découpées au fil de l'extraction: les chunks ne
+        dépendent pas du texte complet.
+        """
+        document = DocumentStream(filename, file_content, keep_text=True)
+        chunks = list(document.chunks())
         
         return {
-            'text': text,
-            'language': language,
-            'chunks': chunks,
+            'text': document.text,
+            'language': document.language,
+            'chunks': [chunk.text for chunk in chunks],
+            'chunk_ids': [chunk.id for chunk in chunks],
             'filename': filename,
-            'extension': extension
+            'extension': document.extension,
+            'pages': document.pages
         }
+
+
+class DocumentStream:
+    """
+    Document lu page par page: chunks produits au fil de l'extraction,
+    langue détectée sur un échantillon des pages lues
+
+    Example:
+        >>> document = DocumentStream("loi.pdf", upload)
+        >>> for chunk in document.chunks():
+        ...     batch.append(chunk)  # embedding pendant que la suite est parsée
+        >>> document.language, document.pages
+    """
+
+    def __init__(self, filename: str, file_content: FileContent, keep_text: bool = False):
+        self.filename = filename
+        self.extension = filename.lower().split('.')[-1]
+        readers = DocumentParser.readers()
+        if self.extension not in readers:
+            raise ValueError(f"Type de fichier non supporté: {self.extension}")
+        self.label = readers[self.extension][1]
+        self.file_content = file_content
+        self.pages = 0
+        self.sample = LanguageSample()
+        self._text: Optional[List[str]] = [] if keep_text else None
+
+    def iter_pages(self) -> Iterator[Tuple[int, str]]:
+        for page_no, page in DocumentParser.iter_pages(self.filename, self.file_content):
+            self.pages = page_no
+            self.sample.add(page)
+            if self._text is not None:
+                self._text.append(page)
+            yield page_no, page
+
+    def chunks(self) -> Iterator[Chunk]:
+        """Chunks dès qu'ils sont complets (erreurs de lecture -> ValueError)"""
+        pages = (page for _, page in self.iter_pages())
+        try:
+            yield from get_chunker().stream(pages, namespace=self.filename)
+        except Exception as e:
+            logger.error(f"{self.label} parsing error: {e}")
+            raise ValueError(f"Erreur lors du parsing {self.label}: {str(e)}")
+
+    @property
+    def language(self) -> str:
+        return self.sample.language()
+
+    @property
+    def text(self) -> str:
+        """Texte complet (keep_text=True uniquement)"""
+        if self._text is None:
+            raise ValueError("Texte non conservé (keep_text=False)")
+        return "\n".join(self._text).strip()
@@ -1,4 +1,3 @@
-from sentence_transformers import SentenceTransformer
 import threading
 import logging
 from ..config import get_settings
@@ -17,6 +16,9 @@ def get_embedding_model():
     if _model is None:
         with _lock:
             if _model is None:
+                # Import différé: torch + sentence-transformers (~2 s, plusieurs centaines de Mo)
+                from sentence_transformers import SentenceTransformer
+
                 logger.info(f"Loading embedding model: {MODEL_NAME}")
                 _model = SentenceTransformer(
                     MODEL_NAME,
@@ -72,6 +72,13 @@ class HybridSearchEngine:
         except Exception as e:
             logger.error(f"Meilisearch indexing error: {e}")
 
+    def delete_from_meilisearch(self, collection_name: str, ids: List[str]):
+        """Supprimer des documents de Meilisearch (chunks remplacés)"""
+        try:
+            self.meili_client.index(collection_name).delete_documents(ids)
+        except Exception as e:
+            logger.error(f"Meilisearch delete error: {e}")
+
     def _search_meilisearch(self, collection_name: str, query: str, tenant_id: str, max_results: int) -> List[Dict[str, Any]]:
         """Recherche lexicale via Meilisearch (exécutée dans un thread)."""
         index = self.setup_meilisearch_index(collection_name)
@@ -28,3 +28,31 @@ def search_vectors(collection: str, vector: list[float], limit: int = 10):
     except Exception as e:
         print(f"Search error: {e}")
         return []
+
+def delete_stale_points(collection: str, key: str, value: str, keep_ids: list) -> list:
+    """
+    Supprime les points dont le payload `key` vaut `value` mais qui ne sont pas
+    dans keep_ids: chunks d'une version précédente du même document, dont les
+    IDs (dérivés du contenu) ne sont plus réécrits. Retourne leurs IDs.
+    """
+    from qdrant_client.http import models as qm
+    stale_filter = qm.Filter(
+        must=[qm.FieldCondition(key=key, match=qm.MatchValue(value=value))],
+        must_not=[qm.HasIdCondition(has_id=keep_ids)],
+    )
+    stale, offset = [], None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection,
+            scroll_filter=stale_filter,
+            limit=256,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        stale.extend(str(record.id) for record in records)
+        if offset is None:
+            break
+    if stale:
+        client.delete(collection_name=collection, points_selector=qm.PointIdsList(points=stale))
+    return stale
@@ -32,6 +32,17 @@ class Settings(BaseSettings):
     anthropic_api_key: str = ""
     enable_llm: bool = True
 
+    # Cache des complétions LLM
+    enable_llm_cache: bool = True
+    llm_cache_ttl_seconds: int = 3600
+    llm_cache_max_entries: int = 1000  # Par tenant
+    llm_cache_semantic_threshold: float = 0.0  # 0 = tier sémantique désactivé (ex: 0.95)
+    llm_cache_max_temperature: float = 0.0  # Au-delà, réponses non déterministes: pas de cache
+
+    # Ledger de crédits (postgresql://... en production, SQLite en développement)
+    billing_ledger_url: str = "sqlite:///data/billing_ledger.db"
+    billing_ledger_pool_size: int = 10  # Connexions PostgreSQL max par worker
+
     # Security - REQUIRED in production
     api_secret_key: str = ""  # Must be set via API_SECRET_KEY env var
     allowed_origins: str = "http://localhost:3000,http://localhost:5173,http://localhost:8180"
@@ -48,6 +59,20 @@ class Settings(BaseSettings):
     embedding_device: str = "cpu"
     embedding_batch_size: int = 32
 
+    # Chunking (app/chunking.py)
+    chunk_max_tokens: int = 300
+    chunk_overlap_tokens: int = 40
+
+    # Uploads (app/uploads.py): au-delà du seuil, l'upload est spoolé sur disque
+    upload_spool_max_memory: int = 8 * 1024 * 1024
+
+    # WebSocket (app/websocket.py): file d'envoi bornée par client, diffusion
+    # entre workers via Redis pub/sub
+    ws_send_queue_size: int = 64
+    ws_send_timeout_seconds: float = 10.0
+    ws_backplane_enabled: bool = True
+    ws_backplane_channel: str = "iafactory:ws:broadcast"
+
     # Service
     service_name: str = "rag-dz-api"
     service_version: str = "1.0.0"
@@ -59,6 +84,9 @@ class Settings(BaseSettings):
     enable_metrics: bool = True
     enable_api_key_auth: bool = True
     metrics_port: int = 9090
+    slow_trace_threshold_ms: int = 1000  # Traces conservées pour /debug/traces/slow
+    slow_trace_buffer_size: int = 200
+    router_groups: str = "all"  # ex: "rag,ocr" - voir app/router_groups.py
 
     # Nouvelles variables Archon
     supabase_url: str = ""
@@ -0,0 +1,127 @@
+"""
+Ingestion en pipeline - parsing/chunking et embeddings qui se recouvrent
+
+- Le document est lu page par page dans un thread (DocumentStream): chaque
+  chunk complet est mis en lot dès qu'il sort du chunker
+- Chaque lot (`embedding_batch_size` chunks) est embeddé dans un autre
+  thread pendant que les pages suivantes sont encore parsées
+- IngestStats: temps jusqu'au premier chunk et au premier lot embeddé,
+  durée totale et débits (pages/s, chunks/s), reportés dans le span
+  "ingest" et l'histogramme `ingest_time_to_first_chunk_seconds`
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .chunking import Chunk
+from .clients.document_parser import DocumentStream
+from .config import get_settings
+from .monitoring import INGEST_TIME_TO_FIRST_CHUNK
+from .tracing import stage
+
+Embedder = Callable[[List[str]], List[List[float]]]
+
+
+class EmbeddingError(RuntimeError):
+    """Échec du calcul des embeddings d'un lot (distinct des erreurs de parsing)"""
+
+
+@dataclass
+class IngestStats:
+    """Chronologie d'une ingestion en pipeline"""
+    pages: int = 0
+    chunks: int = 0
+    batches: int = 0
+    time_to_first_chunk_ms: Optional[float] = None
+    time_to_first_embedding_ms: Optional[float] = None
+    total_ms: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        seconds = self.total_ms / 1000
+        return {
+            "pages": self.pages,
+            "chunks": self.chunks,
+            "batches": self.batches,
+            "time_to_first_chunk_ms": self.time_to_first_chunk_ms,
+            "time_to_first_embedding_ms": self.time_to_first_embedding_ms,
+            "total_ms": self.total_ms,
+            "pages_per_second": round(self.pages / seconds, 1) if seconds else None,
+            "chunks_per_second": round(self.chunks / seconds, 1) if seconds else None,
+        }
+
+
+async def embed_document(
+    document: DocumentStream,
+    embed: Embedder,
+    batch_size: Optional[int] = None,
+) -> Tuple[List[Chunk], List[List[float]], IngestStats]:
+    """
+    Chunks et embeddings d'un document, parsing et embedding en parallèle
+
+    Les erreurs de lecture remontent en ValueError (DocumentStream), celles
+    de l'embedder en EmbeddingError.
+
+    Example:
+        >>> document = DocumentStream(file.filename, upload)
+        >>> chunks, vectors, stats = await embed_document(document, embed_documents)
+    """
+    batch_size = batch_size or get_settings().embedding_batch_size
+    stats = IngestStats()
+    started = time.perf_counter()
+    # File non bornée: tous les chunks sont de toute façon gardés jusqu'à l'upsert
+    queue: asyncio.Queue = asyncio.Queue()
+    stopped = False
+
+    def elapsed_ms() -> float:
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    async def produce():
+        stream = document.chunks()
+        batch: List[Chunk] = []
+        try:
+            while not stopped and (chunk := await asyncio.to_thread(next, stream, None)) is not None:
+                if stats.time_to_first_chunk_ms is None:
+                    stats.time_to_first_chunk_ms = elapsed_ms()
+                    INGEST_TIME_TO_FIRST_CHUNK.observe(stats.time_to_first_chunk_ms / 1000)
+                batch.append(chunk)
+                if len(batch) >= batch_size:
+                    queue.put_nowait(batch)
+                    batch = []
+            if batch:
+                queue.put_nowait(batch)
+        finally:
+            queue.put_nowait(None)
+
+    chunks: List[Chunk] = []
+    embeddings: List[List[float]] = []
+
+    with stage("ingest", filename=document.filename) as span:
+        producer = asyncio.create_task(produce())
+        try:
+            while (batch := await queue.get()) is not None:
+                with stage("embed", chunks=len(batch)):
+                    try:
+                        vectors = await asyncio.to_thread(embed, [chunk.text for chunk in batch])
+                    except Exception as e:
+                        raise EmbeddingError(f"Erreur lors de la génération des embeddings: {e}") from e
+                if len(vectors) != len(batch):
+                    raise EmbeddingError(f"{len(vectors)} embeddings pour {len(batch)} chunks")
+                if stats.time_to_first_embedding_ms is None:
+                    stats.time_to_first_embedding_ms = elapsed_ms()
+                chunks.extend(batch)
+                embeddings.extend(vectors)
+                stats.batches += 1
+        except BaseException:
+            # Le parsing s'arrête après la page en cours (le thread ne peut pas être interrompu)
+            stopped = True
+            await asyncio.gather(producer, return_exceptions=True)
+            raise
+        await producer
+
+        stats.pages = document.pages
+        stats.chunks = len(chunks)
+        stats.total_ms = elapsed_ms()
+        span.attributes.update(stats.as_dict())
+
+    return chunks, embeddings, stats
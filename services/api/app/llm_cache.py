@@ -0,0 +1,298 @@
+"""
+Cache des complétions LLM - tier exact + tier sémantique optionnel
+Isolation par tenant, éviction TTL/LRU, métriques hit-rate et dollars économisés
+
+- Sans tenant_id, rien n'est lu ni écrit (pas de bucket partagé entre tenants)
+- Seules les requêtes déterministes (temperature <= llm_cache_max_temperature,
+  0 par défaut) sont mises en cache
+- Depuis du code async, aget()/aset(): avec le tier sémantique, l'embedding
+  et le parcours des entrées tournent dans un thread, pas sur la boucle
+"""
+import asyncio
+import json
+import math
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class CachedCompletion:
+    """Complétion mise en cache"""
+    content: str
+    model: str
+    tokens_input: int
+    tokens_output: int
+    cost_usd: float
+    created_at: float
+    embedding: Optional[List[float]] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+
+def normalize_messages(messages: List[Dict[str, str]]) -> List[Tuple[str, str]]:
+    """Normalise les messages (espaces superflus) pour un hash stable"""
+    return [(m.get("role", "user"), " ".join(m.get("content", "").split())) for m in messages]
+
+
+def make_cache_key(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: Optional[float],
+    max_tokens: Optional[int],
+) -> str:
+    """Clé exacte: hash du tuple normalisé (model, messages, temperature, max_tokens)"""
+    payload = json.dumps(
+        [model, normalize_messages(messages), round(temperature or 0.0, 3), max_tokens],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _semantic_scope(
+    model: str,
+    messages: List[Dict[str, str]],
+    temperature: Optional[float],
+    max_tokens: Optional[int],
+) -> str:
+    """
+    Portée du tier sémantique: tout sauf le dernier message utilisateur.
+    Deux requêtes ne sont comparables que si modèle, paramètres et historique
+    (system prompt inclus) sont identiques.
+    """
+    return make_cache_key(model, messages[:-1], temperature, max_tokens)
+
+
+def estimate_cost_usd(model_name: str, tokens: int) -> float:
+    """Coût estimé d'un appel d'après les tarifs du LLM router (0 si modèle inconnu)"""
+    # Import différé: le package llm_router importe ce module
+    from .llm_router.config import MODELS_CONFIG
+
+    for models in MODELS_CONFIG.values():
+        for config in models.values():
+            if config["name"] == model_name:
+                return (tokens / 1_000_000) * config["cost_per_1m_tokens"]
+    return 0.0
+
+
+def _normalize_vector(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class CompletionCache:
+    """
+    Cache de complétions LLM en mémoire, isolé par tenant
+
+    - Tier exact: clé hash normalisée, O(1)
+    - Tier sémantique (optionnel): réutilise une réponse si l'embedding du
+      dernier message utilisateur est à une similarité cosinus >= threshold
+    """
+
+    def __init__(
+        self,
+        max_entries_per_tenant: int = 1000,
+        ttl_seconds: int = 3600,
+        semantic_threshold: float = 0.0,
+        embed_fn: Optional[Callable[[str], List[float]]] = None,
+        max_temperature: float = 0.0,
+    ):
+        self.max_entries_per_tenant = max_entries_per_tenant
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.semantic_threshold = semantic_threshold
+        self.embed_fn = embed_fn
+
+        self._entries: Dict[str, "OrderedDict[str, Tuple[str, CachedCompletion]]"] = {}
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.dollars_saved = 0.0
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.embed_fn is not None and self.semantic_threshold > 0
+
+    def cacheable(self, temperature: Optional[float], tenant_id: Optional[str]) -> bool:
+        """Une requête n'est cachée que pour un tenant connu et à température déterministe"""
+        return bool(tenant_id) and (temperature or 0.0) <= self.max_temperature
+
+    def _embed(self, messages: List[Dict[str, str]]) -> Optional[List[float]]:
+        if not self.semantic_enabled or not messages:
+            return None
+        try:
+            return _normalize_vector(self.embed_fn(messages[-1].get("content", "")))
+        except Exception as e:
+            logger.warning(f"Completion cache embedding failed: {e}")
+            return None
+
+    def _is_expired(self, entry: CachedCompletion, now: float) -> bool:
+        return now - entry.created_at > self.ttl_seconds
+
+    def get(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        tenant_id: Optional[str] = None,
+    ) -> Optional[CachedCompletion]:
+        """Récupère une complétion (exacte puis sémantique), ou None (toujours None sans tenant)"""
+        if not tenant_id:
+            return None
+        tenant = tenant_id
+        key = make_cache_key(model, messages, temperature, max_tokens)
+        now = time.time()
+
+        with self._lock:
+            entries = self._entries.get(tenant)
+            if entries is not None and key in entries:
+                _, entry = entries[key]
+                if self._is_expired(entry, now):
+                    del entries[key]
+                else:
+                    entries.move_to_end(key)
+                    self.exact_hits += 1
+                    self.dollars_saved += entry.cost_usd
+                    return entry
+
+        if self.semantic_enabled:
+            match = self._semantic_lookup(tenant, model, messages, temperature, max_tokens, now)
+            if match is not None:
+                return match
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    async def aget(self, *args, **kwargs) -> Optional[CachedCompletion]:
+        """get() pour du code async (embedding et parcours sémantique hors de la boucle)"""
+        if self.semantic_enabled:
+            return await asyncio.to_thread(self.get, *args, **kwargs)
+        return self.get(*args, **kwargs)
+
+    def _semantic_lookup(
+        self,
+        tenant: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        now: float,
+    ) -> Optional[CachedCompletion]:
+        query_vector = self._embed(messages)
+        if query_vector is None:
+            return None
+
+        scope = _semantic_scope(model, messages, temperature, max_tokens)
+        best_key, best_score = None, self.semantic_threshold
+        with self._lock:
+            entries = self._entries.get(tenant)
+            if not entries:
+                return None
+            for key, (entry_scope, entry) in entries.items():
+                if entry_scope != scope or entry.embedding is None or self._is_expired(entry, now):
+                    continue
+                score = sum(a * b for a, b in zip(query_vector, entry.embedding))
+                if score >= best_score:
+                    best_key, best_score = key, score
+
+            if best_key is None:
+                return None
+            entries.move_to_end(best_key)
+            entry = entries[best_key][1]
+            self.semantic_hits += 1
+            self.dollars_saved += entry.cost_usd
+            return entry
+
+    def set(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        content: str,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        tenant_id: Optional[str] = None,
+        tokens_input: int = 0,
+        tokens_output: int = 0,
+        cost_usd: float = 0.0,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Stocke une complétion (éviction LRU au-delà de max_entries_per_tenant), jamais sans tenant"""
+        if not content or not tenant_id:
+            return
+
+        tenant = tenant_id
+        key = make_cache_key(model, messages, temperature, max_tokens)
+        entry = CachedCompletion(
+            content=content,
+            model=model,
+            tokens_input=tokens_input,
+            tokens_output=tokens_output,
+            cost_usd=cost_usd,
+            created_at=time.time(),
+            embedding=self._embed(messages),
+            metadata=metadata,
+        )
+        scope = _semantic_scope(model, messages, temperature, max_tokens)
+
+        with self._lock:
+            entries = self._entries.setdefault(tenant, OrderedDict())
+            entries[key] = (scope, entry)
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries_per_tenant:
+                entries.popitem(last=False)
+
+    async def aset(self, *args, **kwargs) -> None:
+        """set() pour du code async (embedding hors de la boucle)"""
+        if self.semantic_enabled:
+            await asyncio.to_thread(self.set, *args, **kwargs)
+        else:
+            self.set(*args, **kwargs)
+
+    def invalidate_tenant(self, tenant_id: str) -> int:
+        """Supprime toutes les entrées d'un tenant"""
+        with self._lock:
+            return len(self._entries.pop(tenant_id, {}))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques: hit-rate par tier et dollars économisés"""
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+                "dollars_saved": round(self.dollars_saved, 6),
+                "tenants": len(self._entries),
+                "entries": sum(len(e) for e in self._entries.values()),
+                "semantic_enabled": self.semantic_enabled,
+            }
+
+
+def _default_embed_fn(text: str) -> List[float]:
+    """Embedding via le modèle local (import différé: sentence-transformers est lourd)"""
+    from .clients.embeddings import embed_queries
+    return embed_queries([text])[0]
+
+
+# Instance globale
+completion_cache = CompletionCache(
+    max_entries_per_tenant=settings.llm_cache_max_entries,
+    ttl_seconds=settings.llm_cache_ttl_seconds,
+    semantic_threshold=settings.llm_cache_semantic_threshold,
+    embed_fn=_default_embed_fn if settings.llm_cache_semantic_threshold > 0 else None,
+    max_temperature=settings.llm_cache_max_temperature,
+)
@@ -1,4 +1,5 @@
 from .router import LLMRouter
 from .config import Provider, TaskComplexity, UseCaseType
+from .health import ProviderHealthTracker, CircuitState
 
-__all__ = ["LLMRouter", "Provider", "TaskComplexity", "UseCaseType"]
+__all__ = ["LLMRouter", "Provider", "TaskComplexity", "UseCaseType", "ProviderHealthTracker", "CircuitState"]
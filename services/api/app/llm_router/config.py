@@ -461,3 +461,46 @@ COST_TIERS = {
         "avoid_models": []
     }
 }
+
+
+# SLO de latence p95 (ms) par cas d'usage - utilisé par le mode adaptatif
+LATENCY_SLO_MS = {
+    UseCaseType.CLASSIFICATION: 1500,
+    UseCaseType.EXTRACTION: 2000,
+    UseCaseType.CONVERSATION: 3000,
+    UseCaseType.SUMMARIZATION: 5000,
+    UseCaseType.TRANSLATION: 5000,
+    UseCaseType.WEB_SEARCH: 8000,
+    UseCaseType.CODE_GENERATION: 15000,
+    UseCaseType.ANALYSIS: 15000,
+    UseCaseType.LONG_CONTEXT: 20000,
+    UseCaseType.REASONING: 30000,
+}
+
+DEFAULT_LATENCY_SLO_MS = 10000
+
+
+# Candidats supplémentaires considérés par le mode adaptatif (en plus de primary/fallback)
+ADAPTIVE_CANDIDATES = {
+    UseCaseType.CLASSIFICATION: [(Provider.GROQ, "mixtral"), (Provider.OPENAI, "gpt4o-mini")],
+    UseCaseType.EXTRACTION: [(Provider.GROQ, "mixtral"), (Provider.OPENAI, "gpt4o-mini")],
+    UseCaseType.SUMMARIZATION: [(Provider.GEMINI, "flash"), (Provider.CLAUDE, "haiku")],
+    UseCaseType.CONVERSATION: [(Provider.GEMINI, "flash"), (Provider.CLAUDE, "haiku")],
+    UseCaseType.TRANSLATION: [(Provider.GEMINI, "flash"), (Provider.MISTRAL, "large")],
+    UseCaseType.ANALYSIS: [(Provider.MISTRAL, "large")],
+    UseCaseType.CODE_GENERATION: [(Provider.OPENAI, "gpt4o")],
+    UseCaseType.REASONING: [(Provider.CLAUDE, "sonnet")],
+    UseCaseType.LONG_CONTEXT: [(Provider.GEMINI, "flash")],
+    UseCaseType.WEB_SEARCH: [],
+}
+
+
+# Paramètres du suivi de santé des providers (circuit breaker + fenêtres glissantes)
+HEALTH_CONFIG = {
+    "window_size": 200,            # Nombre d'appels conservés par modèle
+    "min_samples": 5,              # En dessous, le p95 est considéré inconnu (exploration)
+    "failure_threshold": 5,        # Échecs consécutifs avant ouverture du circuit
+    "error_rate_threshold": 0.5,   # Taux d'erreur sur la fenêtre avant ouverture
+    "open_seconds": 30,            # Durée d'ouverture avant half-open
+    "hedge_quantile": 0.90,        # Budget de latence avant de lancer la requête de couverture
+}
@@ -0,0 +1,124 @@
+"""
+Provider Health Tracking - latences glissantes, taux d'erreur et circuit breaker
+Alimente le mode adaptatif de LLMRouter
+"""
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from .config import Provider, HEALTH_CONFIG
+
+
+class CircuitState(str, Enum):
+    """États du circuit breaker"""
+    CLOSED = "closed"         # Trafic normal
+    OPEN = "open"             # Provider exclu du routage
+    HALF_OPEN = "half_open"   # Un appel d'essai est autorisé
+
+
+@dataclass
+class ModelHealth:
+    """Statistiques glissantes pour un couple (provider, model_key)"""
+    latencies_ms: Deque[float]
+    outcomes: Deque[bool]
+    consecutive_failures: int = 0
+    state: CircuitState = CircuitState.CLOSED
+    opened_at: float = 0.0
+    total_calls: int = 0
+    total_failures: int = 0
+
+    @classmethod
+    def create(cls, window_size: int) -> "ModelHealth":
+        return cls(latencies_ms=deque(maxlen=window_size), outcomes=deque(maxlen=window_size))
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Percentile (nearest-rank) des latences des appels réussis"""
+        if not self.latencies_ms:
+            return None
+        ordered = sorted(self.latencies_ms)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - (sum(self.outcomes) / len(self.outcomes))
+
+
+class ProviderHealthTracker:
+    """
+    Suit la santé de chaque modèle: histogramme glissant des latences,
+    taux d'erreur et état du circuit breaker
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = {**HEALTH_CONFIG, **(config or {})}
+        self._models: Dict[Tuple[Provider, str], ModelHealth] = {}
+
+    def _get(self, provider: Provider, model_key: str) -> ModelHealth:
+        key = (provider, model_key)
+        if key not in self._models:
+            self._models[key] = ModelHealth.create(self.config["window_size"])
+        return self._models[key]
+
+    def record_success(self, provider: Provider, model_key: str, latency_ms: float) -> None:
+        """Enregistre un appel réussi et referme le circuit si besoin"""
+        health = self._get(provider, model_key)
+        health.latencies_ms.append(latency_ms)
+        health.outcomes.append(True)
+        health.total_calls += 1
+        health.consecutive_failures = 0
+        health.state = CircuitState.CLOSED
+
+    def record_failure(self, provider: Provider, model_key: str) -> None:
+        """Enregistre un échec et ouvre le circuit si les seuils sont dépassés"""
+        health = self._get(provider, model_key)
+        health.outcomes.append(False)
+        health.total_calls += 1
+        health.total_failures += 1
+        health.consecutive_failures += 1
+
+        too_many_failures = health.consecutive_failures >= self.config["failure_threshold"]
+        error_rate_exceeded = (
+            len(health.outcomes) >= self.config["min_samples"]
+            and health.error_rate >= self.config["error_rate_threshold"]
+        )
+        if health.state == CircuitState.HALF_OPEN or too_many_failures or error_rate_exceeded:
+            health.state = CircuitState.OPEN
+            health.opened_at = time.monotonic()
+
+    def is_available(self, provider: Provider, model_key: str) -> bool:
+        """True si le circuit autorise un appel (closed ou half-open)"""
+        health = self._models.get((provider, model_key))
+        if health is None or health.state == CircuitState.CLOSED:
+            return True
+        if health.state == CircuitState.OPEN:
+            if time.monotonic() - health.opened_at >= self.config["open_seconds"]:
+                health.state = CircuitState.HALF_OPEN
+                return True
+            return False
+        return True
+
+    def latency_percentile(self, provider: Provider, model_key: str, q: float) -> Optional[float]:
+        """Percentile de latence, ou None si l'échantillon est trop petit"""
+        health = self._models.get((provider, model_key))
+        if health is None or len(health.latencies_ms) < self.config["min_samples"]:
+            return None
+        return health.percentile(q)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Vue sérialisable de l'état de santé de chaque modèle"""
+        return {
+            f"{provider.value}:{model_key}": {
+                "state": health.state.value,
+                "p50_ms": health.percentile(0.50),
+                "p95_ms": health.percentile(0.95),
+                "error_rate": round(health.error_rate, 4),
+                "total_calls": health.total_calls,
+                "total_failures": health.total_failures,
+            }
+            for (provider, model_key), health in self._models.items()
+        }
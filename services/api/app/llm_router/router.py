@@ -1,6 +1,18 @@
 import os
+import time
+import asyncio
+import inspect
+from collections import deque
 from typing import List, Dict, Any, Optional, Tuple
-from .config import Provider, TaskComplexity, UseCaseType, MODELS_CONFIG, ROUTING_RULES, COST_TIERS
+from .config import (
+    Provider, TaskComplexity, UseCaseType, MODELS_CONFIG, ROUTING_RULES, COST_TIERS,
+    LATENCY_SLO_MS, DEFAULT_LATENCY_SLO_MS, ADAPTIVE_CANDIDATES, HEALTH_CONFIG
+)
+from .health import ProviderHealthTracker
+from ..config import get_settings
+from ..llm_cache import completion_cache
+from ..tokens.counter import token_counter
+from ..tracing import stage
 
 # Import all 15 providers
 from .providers.base import BaseProvider, Message, LLMResponse
@@ -20,14 +32,31 @@ from .providers.huggingface_provider import HuggingFaceProvider
 from .providers.github_provider import GitHubModelsProvider
 from .providers.copilot_provider import CopilotProvider
 
+def _model_key(model: Tuple[Provider, str]) -> str:
+    return f"{model[0].value}:{model[1]}"
+
+
+class HedgeFailure(Exception):
+    """Toutes les tentatives d'un appel hedgé ont échoué (erreur par modèle tenté)"""
+
+    def __init__(self, errors: Dict[str, str]):
+        super().__init__("; ".join(f"{key}: {error}" for key, error in errors.items()))
+        self.errors = errors
+
+
 class LLMRouter:
     """
     Intelligent router qui sélectionne le meilleur LLM pour chaque tâche
     Support de 15 providers: Claude, OpenAI, Mistral, Gemini, Qwen, Groq, DeepSeek,
     Kimi, GLM, Grok, Perplexity, OpenRouter, HuggingFace, GitHub, Copilot
+
+    Mode adaptatif (adaptive=True): choisit le modèle le moins cher qui respecte
+    le SLO p95 du cas d'usage, en s'appuyant sur les latences glissantes, le taux
+    d'erreur et le circuit breaker de chaque modèle. Avec hedge=True, une seconde
+    requête est lancée si la première dépasse le budget p90.
     """
 
-    def __init__(self):
+    def __init__(self, adaptive: bool = False, hedge: bool = False, max_decisions: int = 1000):
         # Charger les API keys depuis l'environnement (15 providers)
         self.api_keys = {
             # Tier 1: Premium
@@ -63,11 +92,18 @@ class LLMRouter:
         # Cost tracking
         self.total_cost = 0.0
 
+        # Routage adaptatif
+        self.adaptive = adaptive
+        self.hedge = hedge
+        self.health = ProviderHealthTracker()
+        self.routing_decisions: deque = deque(maxlen=max_decisions)
+
     def select_model(
         self,
         use_case: UseCaseType,
         complexity: Optional[TaskComplexity] = None,
-        budget_tier: str = "standard"
+        budget_tier: str = "standard",
+        estimated_tokens: int = 1000
     ) -> Tuple[Provider, str]:
         """
         Sélectionne le meilleur modèle basé sur le cas d'usage et la complexité
@@ -76,10 +112,14 @@ class LLMRouter:
             use_case: Type de tâche (ANALYSIS, CODE_GEN, etc.)
             complexity: Complexité de la tâche (SIMPLE, MODERATE, COMPLEX, EXPERT)
             budget_tier: Tier de budget client (ultra_economy, economy, standard, premium, enterprise)
+            estimated_tokens: Estimation des tokens (entrée + sortie) pour le calcul du coût
 
         Returns:
             Tuple (Provider, model_name)
         """
+        if self.adaptive:
+            return self.rank_candidates(use_case, budget_tier, estimated_tokens)[0]
+
         # Récupérer la règle de routing
         rule = ROUTING_RULES.get(use_case)
         if not rule:
@@ -100,8 +140,7 @@ class LLMRouter:
         model_config = MODELS_CONFIG[primary_provider][primary_model_key]
         max_cost = tier_config["max_cost_per_request"]
 
-        # Estimation tokens pour calcul coût (assume 1000 tokens average)
-        estimated_cost = (1000 / 1_000_000) * model_config["cost_per_1m_tokens"]
+        estimated_cost = self._estimate_cost(primary_provider, primary_model_key, estimated_tokens)
 
         if estimated_cost > max_cost:
             # Utiliser fallback si primary trop cher
@@ -110,6 +149,69 @@ class LLMRouter:
 
         return (primary_provider, primary_model_key)
 
+    def _estimate_cost(self, provider: Provider, model_key: str, estimated_tokens: int) -> float:
+        """Coût estimé d'un appel pour un nombre de tokens donné"""
+        return (estimated_tokens / 1_000_000) * MODELS_CONFIG[provider][model_key]["cost_per_1m_tokens"]
+
+    def _candidates(self, use_case: UseCaseType) -> List[Tuple[Provider, str]]:
+        """Candidats du mode adaptatif: primary, fallback puis candidats additionnels"""
+        rule = ROUTING_RULES.get(use_case)
+        if not rule:
+            return [(Provider.CLAUDE, "sonnet")]
+
+        candidates = [rule["primary"], rule["fallback"], *ADAPTIVE_CANDIDATES.get(use_case, [])]
+        seen = set()
+        unique = []
+        for candidate in candidates:
+            if candidate not in seen and candidate[1] in MODELS_CONFIG.get(candidate[0], {}):
+                seen.add(candidate)
+                unique.append(candidate)
+        return unique
+
+    def rank_candidates(
+        self,
+        use_case: UseCaseType,
+        budget_tier: str = "standard",
+        estimated_tokens: int = 1000
+    ) -> List[Tuple[Provider, str]]:
+        """
+        Classe les candidats pour le mode adaptatif
+
+        Ordre: modèles disponibles (circuit non ouvert, clé API présente) qui
+        respectent le SLO p95 du cas d'usage, du moins cher au plus cher; puis
+        ceux hors SLO par p95 croissant; puis ceux hors budget; enfin les
+        modèles indisponibles.
+        Un modèle sans historique suffisant est présumé dans le SLO.
+        """
+        slo_ms = LATENCY_SLO_MS.get(use_case, DEFAULT_LATENCY_SLO_MS)
+        max_cost = COST_TIERS.get(budget_tier, COST_TIERS["standard"])["max_cost_per_request"]
+
+        within_slo, over_slo, over_budget, unavailable = [], [], [], []
+        for provider, model_key in self._candidates(use_case):
+            cost = self._estimate_cost(provider, model_key, estimated_tokens)
+            if not self.api_keys.get(provider) or not self.health.is_available(provider, model_key):
+                unavailable.append((cost, (provider, model_key)))
+            elif cost > max_cost:
+                over_budget.append((cost, (provider, model_key)))
+            else:
+                p95 = self.health.latency_percentile(provider, model_key, 0.95)
+                if p95 is None or p95 <= slo_ms:
+                    within_slo.append((cost, (provider, model_key)))
+                else:
+                    over_slo.append((p95, (provider, model_key)))
+
+        ranked = []
+        for group in (within_slo, over_slo, over_budget, unavailable):
+            ranked += [candidate for _, candidate in sorted(group, key=lambda x: x[0])]
+        return ranked
+
+    def _hedge_delay_seconds(self, provider: Provider, model_key: str, use_case: UseCaseType) -> float:
+        """Budget p90 avant de lancer la requête de couverture"""
+        p90 = self.health.latency_percentile(provider, model_key, HEALTH_CONFIG["hedge_quantile"])
+        if p90 is None:
+            p90 = LATENCY_SLO_MS.get(use_case, DEFAULT_LATENCY_SLO_MS) * HEALTH_CONFIG["hedge_quantile"]
+        return p90 / 1000
+
     def get_provider(self, provider: Provider, model_key: str) -> BaseProvider:
         """
         Récupère ou crée une instance du provider (support de 15 providers)
@@ -193,6 +295,8 @@ class LLMRouter:
         budget_tier: str = "standard",
         temperature: float = 0.7,
         max_tokens: int = 2000,
+        tenant_id: Optional[str] = None,
+        use_cache: bool = True,
         **kwargs
     ) -> Dict[str, Any]:
         """
@@ -205,12 +309,62 @@ class LLMRouter:
             budget_tier: Tier de budget (ultra_economy, economy, standard, premium, enterprise)
             temperature: Temperature pour génération
             max_tokens: Nombre max de tokens
+            tenant_id: Tenant pour l'isolation du cache de complétions (pas de cache sans tenant)
+            use_cache: Utiliser le cache de complétions (températures déterministes seulement)
 
         Returns:
             Dict avec response, metadata, cost, etc.
         """
-        # Sélectionner le meilleur modèle
-        provider, model_key = self.select_model(use_case, complexity, budget_tier)
+        # Le modèle est choisi dynamiquement: la clé de cache porte sur la route
+        use_cache = use_cache and get_settings().enable_llm_cache and completion_cache.cacheable(temperature, tenant_id)
+        cache_model = f"router:{use_case.value}:{complexity.value if complexity else ''}:{budget_tier}"
+        if use_cache:
+            cached = await completion_cache.aget(cache_model, messages, temperature, max_tokens, tenant_id)
+            if cached:
+                return {
+                    "success": True,
+                    "content": cached.content,
+                    "provider": (cached.metadata or {}).get("provider"),
+                    "model": (cached.metadata or {}).get("model"),
+                    "tokens_used": cached.tokens_input + cached.tokens_output,
+                    "cost": 0.0,
+                    "latency_ms": 0,
+                    "total_session_cost": self.total_cost,
+                    "cached": True
+                }
+
+        with stage("llm", use_case=use_case.value):
+            result = await self._generate_uncached(
+                messages, use_case, complexity, budget_tier, temperature, max_tokens, **kwargs
+            )
+        if use_cache and result.get("success"):
+            await completion_cache.aset(
+                cache_model, messages, result["content"], temperature, max_tokens, tenant_id,
+                tokens_output=result.get("tokens_used") or 0,
+                cost_usd=result.get("cost") or 0.0,
+                metadata={"provider": result.get("provider"), "model": result.get("model")},
+            )
+        return result
+
+    async def _generate_uncached(
+        self,
+        messages: List[Dict[str, str]],
+        use_case: UseCaseType,
+        complexity: Optional[TaskComplexity],
+        budget_tier: str,
+        temperature: float,
+        max_tokens: int,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Génération sans cache (routage statique ou adaptatif)"""
+        if self.adaptive:
+            return await self._generate_adaptive(
+                messages, use_case, budget_tier, temperature, max_tokens, **kwargs
+            )
+
+        # Sélectionner le meilleur modèle (coût estimé sur les tokens réels du prompt)
+        estimated_tokens = token_counter.count_messages(messages) + max_tokens
+        provider, model_key = self.select_model(use_case, complexity, budget_tier, estimated_tokens)
 
         # Convertir messages en format Message
         formatted_messages = [Message(role=m["role"], content=m["content"]) for m in messages]
@@ -282,9 +436,187 @@ class LLMRouter:
                 "error": str(e)
             }
 
+    async def _call_provider(
+        self,
+        provider: Provider,
+        model_key: str,
+        messages: List[Message],
+        temperature: float,
+        max_tokens: int,
+        **kwargs
+    ) -> LLMResponse:
+        """Appelle un provider en mesurant sa latence et en alimentant le suivi de santé"""
+        start = time.perf_counter()
+        try:
+            llm_provider = self.get_provider(provider, model_key)
+            if inspect.iscoroutinefunction(llm_provider.generate):
+                response = await llm_provider.generate(
+                    messages=messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+                )
+            else:
+                # Certains SDK (Groq) sont synchrones: ne pas bloquer l'event loop
+                response = await asyncio.to_thread(
+                    llm_provider.generate,
+                    messages=messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.health.record_failure(provider, model_key)
+            raise
+
+        self.health.record_success(provider, model_key, (time.perf_counter() - start) * 1000)
+        return response
+
+    async def _hedged_call(
+        self,
+        primary: Tuple[Provider, str],
+        secondary: Tuple[Provider, str],
+        use_case: UseCaseType,
+        messages: List[Message],
+        temperature: float,
+        max_tokens: int,
+        **kwargs
+    ) -> Tuple[LLMResponse, Tuple[Provider, str], bool]:
+        """
+        Lance primary puis, si aucune réponse n'arrive dans le budget p90,
+        lance secondary en parallèle. Retourne la première réponse réussie et
+        si la requête a été doublée (hedge): un primary en échec avant la fin
+        du budget donne une simple bascule vers secondary, pas un hedge.
+
+        Chaque tentative lancée alimente le suivi de santé de son propre
+        modèle (_call_provider); si toutes échouent, HedgeFailure porte
+        l'erreur de chacune.
+        """
+        first = asyncio.create_task(
+            self._call_provider(*primary, messages, temperature, max_tokens, **kwargs)
+        )
+        done, _ = await asyncio.wait({first}, timeout=self._hedge_delay_seconds(*primary, use_case))
+        if done and first.exception() is None:
+            return first.result(), primary, False
+        hedged = not done
+
+        second = asyncio.create_task(
+            self._call_provider(*secondary, messages, temperature, max_tokens, **kwargs)
+        )
+        tasks = {first: primary, second: secondary}
+        pending = set(tasks)
+        errors: Dict[str, str] = {}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return task.result(), tasks[task], hedged
+                errors[_model_key(tasks[task])] = str(task.exception())
+        raise HedgeFailure(errors)
+
+    async def _generate_adaptive(
+        self,
+        messages: List[Dict[str, str]],
+        use_case: UseCaseType,
+        budget_tier: str,
+        temperature: float,
+        max_tokens: int,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Génération en mode adaptatif (SLO de latence, circuit breaker, hedging)"""
+        estimated_tokens = token_counter.count_messages(messages) + max_tokens
+        candidates = self.rank_candidates(use_case, budget_tier, estimated_tokens)
+        formatted_messages = [Message(role=m["role"], content=m["content"]) for m in messages]
+        slo_ms = LATENCY_SLO_MS.get(use_case, DEFAULT_LATENCY_SLO_MS)
+
+        start = time.perf_counter()
+        errors: Dict[str, str] = {}
+        hedged = False
+        response = None
+        chosen = None
+        index = 0
+        while index < len(candidates) and response is None:
+            primary = candidates[index]
+            secondary = candidates[index + 1] if index + 1 < len(candidates) else None
+            try:
+                if self.hedge and secondary is not None:
+                    response, chosen, hedged = await self._hedged_call(
+                        primary, secondary, use_case, formatted_messages, temperature, max_tokens, **kwargs
+                    )
+                else:
+                    response = await self._call_provider(
+                        *primary, formatted_messages, temperature, max_tokens, **kwargs
+                    )
+                    chosen = primary
+            except HedgeFailure as e:
+                errors.update(e.errors)
+            except Exception as e:
+                errors[_model_key(primary)] = str(e)
+            # En mode hedge, primary et secondary ont déjà été tentés
+            index += 2 if self.hedge and secondary is not None else 1
+
+        latency_ms = int((time.perf_counter() - start) * 1000)
+        # Bascule: une tentative a échoué et un autre modèle a répondu (hors hedge)
+        failover = response is not None and (bool(errors) or (chosen != candidates[0] and not hedged))
+        decision = {
+            "timestamp": time.time(),
+            "use_case": use_case.value,
+            "budget_tier": budget_tier,
+            "selected": f"{candidates[0][0].value}:{candidates[0][1]}" if candidates else None,
+            "served_by": f"{chosen[0].value}:{chosen[1]}" if chosen else None,
+            "hedged": hedged,
+            "failover": failover,
+            "latency_ms": latency_ms,
+            "slo_ms": slo_ms,
+            "slo_met": response is not None and latency_ms <= slo_ms,
+            "cost": response.cost if response else 0.0,
+            "success": response is not None,
+        }
+        self.routing_decisions.append(decision)
+
+        if response is None:
+            return {"success": False, "error": "Tous les providers ont échoué", "errors": errors}
+
+        self.total_cost += response.cost
+        return {
+            "success": True,
+            "content": response.content,
+            "provider": response.provider,
+            "model": response.model,
+            "tokens_used": response.tokens_used,
+            "cost": response.cost,
+            "latency_ms": latency_ms,
+            "total_session_cost": self.total_cost,
+            "fallback_used": chosen != candidates[0],
+            "hedged": hedged,
+            "failover": failover,
+            "routing": decision,
+        }
+
     def get_cost_summary(self) -> Dict[str, Any]:
-        """Retourne un résumé des coûts de la session"""
+        """Retourne un résumé des coûts de la session (et du routage adaptatif)"""
+        by_model: Dict[str, Dict[str, Any]] = {}
+        for decision in self.routing_decisions:
+            key = decision["served_by"] or "failed"
+            stats = by_model.setdefault(key, {
+                "requests": 0, "total_cost": 0.0, "total_latency_ms": 0, "slo_met": 0,
+                "hedged": 0, "failover": 0
+            })
+            stats["requests"] += 1
+            stats["total_cost"] += decision["cost"]
+            stats["total_latency_ms"] += decision["latency_ms"]
+            stats["slo_met"] += int(decision["slo_met"])
+            stats["hedged"] += int(decision["hedged"])
+            stats["failover"] += int(decision["failover"])
+
+        for stats in by_model.values():
+            stats["avg_latency_ms"] = stats.pop("total_latency_ms") / stats["requests"]
+            stats["slo_met_ratio"] = stats["slo_met"] / stats["requests"]
+
         return {
             "total_cost": self.total_cost,
-            "providers_used": list(self.provider_cache.keys())
+            "providers_used": list(self.provider_cache.keys()),
+            "adaptive": self.adaptive,
+            "routing_by_model": by_model,
+            "routing_decisions": list(self.routing_decisions),
+            "provider_health": self.health.snapshot(),
+            "completion_cache": completion_cache.get_stats()
         }
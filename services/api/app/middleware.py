@@ -1,18 +1,230 @@
 import time
-import hashlib
 import logging
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+from uuid import UUID
 from fastapi import Request
+from starlette.datastructures import Headers, MutableHeaders
 from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import get_settings
 from .db import get_tenant_by_key, insert_usage
+from .monitoring import REQ_LATENCY, REQUEST_COUNT
+from .security.middleware import (
+    PUBLIC_ROUTES,
+    SECURITY_HEADERS,
+    extract_api_key,
+    is_auth_exempt,
+    rate_limit_headers,
+    rate_limit_response,
+    rate_limiter,
+    requires_upgrade,
+    resolve_api_key,
+)
+from .tenant_middleware import (
+    development_tenant_id,
+    is_public_tenant_route,
+    tenant_error_response,
+    tenant_id_from_jwt,
+)
+from .tracing import Trace, finish_trace, new_request_id, start_trace
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
+
+_UNSET = object()
+
+
+def record_request(trace: Trace, method: str, scope: Scope, status_code: int):
+    """Clôt la trace et alimente les métriques HTTP de la requête"""
+    # Template de route (/api/items/{id}) pour borner la cardinalité des labels
+    route = scope.get("route")
+    route_path = getattr(route, "path", None) or "unmatched"
+    finish_trace(trace, status_code, route_path)
+    REQ_LATENCY.labels(method=method, route=route_path).observe(
+        trace.duration_ms / 1000, exemplar={"request_id": trace.request_id}
+    )
+    REQUEST_COUNT.labels(method=method, route=route_path, status_code=status_code).inc()
+
+
+@dataclass
+class RequestCredentials:
+    """
+    Credentials lus une seule fois dans les headers de la requête
+
+    Le JWT n'est décodé qu'au premier appel de `jwt_tenant_id()`, puis mis en
+    cache. Disponible dans les handlers via `request.state.credentials`.
+    """
+    api_key: str = ""
+    bearer_token: Optional[str] = None
+    tenant_header: Optional[str] = None
+    _jwt_tenant_id: Any = field(default=_UNSET, repr=False)
+
+    @classmethod
+    def from_headers(cls, headers: Headers) -> "RequestCredentials":
+        authorization = headers.get("Authorization", "")
+        return cls(
+            api_key=extract_api_key(headers),
+            bearer_token=authorization.replace("Bearer ", "") if authorization.startswith("Bearer ") else None,
+            tenant_header=headers.get("X-Tenant-ID"),
+        )
+
+    def jwt_tenant_id(self) -> Optional[str]:
+        if self._jwt_tenant_id is _UNSET:
+            self._jwt_tenant_id = tenant_id_from_jwt(self.bearer_token) if self.bearer_token else None
+        return self._jwt_tenant_id
+
+
+class RequestPipelineMiddleware:
+    """
+    Middleware ASGI unique: request ID/trace, auth, tenant et rate limit
+
+    Remplace la pile RequestIDMiddleware → EnhancedAuthMiddleware →
+    TenantContextMiddleware → RateLimitMiddleware (BaseHTTPMiddleware) par une
+    seule passe avec les mêmes règles et les mêmes headers de réponse.
+    Aucune tâche ni stream intermédiaire: le corps des réponses (streaming
+    compris) est transmis tel quel, seuls les headers sont complétés.
+
+    Résultats partagés via scope["state"] (request.state.*): request_id,
+    credentials, tenant (API key) et tenant_id (contexte RLS).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        headers = Headers(scope=scope)
+        state = scope.setdefault("state", {})
+
+        request_id = new_request_id(headers.get("X-Request-Id"))
+        state["request_id"] = request_id
+        trace = start_trace(request_id, method, scope["path"])
+
+        response_headers: List[Tuple[str, str]] = [("X-Request-Id", request_id)]
+        rejection, rate_limit_key = self._admit(scope, headers, state, response_headers)
+        trace.tenant_id = state.get("tenant_id")
+        status_code = 500
+
+        async def send_with_headers(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                extra = MutableHeaders(scope=message)
+                if rate_limit_key is not None:
+                    extra.update(rate_limit_headers(rate_limit_key))
+                for name, value in response_headers:
+                    extra[name] = value
+            await send(message)
+
+        try:
+            await (rejection or self.app)(scope, receive, send_with_headers)
+        finally:
+            record_request(trace, method, scope, status_code)
+
+    def _admit(
+        self,
+        scope: Scope,
+        headers: Headers,
+        state: dict,
+        response_headers: List[Tuple[str, str]]
+    ) -> Tuple[Optional[Response], Optional[str]]:
+        """
+        Auth, tenant puis rate limit, dans l'ordre de l'ancienne pile
+
+        Returns:
+            (réponse d'erreur ou None, identifiant de rate limit pour les headers X-RateLimit-*)
+        """
+        method = scope["method"]
+        path = scope["path"]
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+
+        credentials = RequestCredentials.from_headers(headers)
+        state["credentials"] = credentials
+
+        # Auth (API key)
+        if method != "OPTIONS" and not is_auth_exempt(path):
+            if settings.enable_api_key_auth:
+                if not credentials.api_key:
+                    logger.warning(f"Missing API key from {client_ip}")
+                    return JSONResponse(
+                        {"error": "API key required", "details": "Provide API key via X-API-Key header"},
+                        status_code=401
+                    ), None
+
+                tenant = resolve_api_key(credentials.api_key)
+                if not tenant:
+                    logger.warning(f"Invalid API key attempt from {client_ip}")
+                    return JSONResponse({"error": "Invalid API key"}, status_code=401), None
+                state["tenant"] = tenant
+
+                if requires_upgrade(tenant, path):
+                    return JSONResponse(
+                        {"error": "Upgrade required", "message": "This endpoint requires a Pro or Enterprise plan"},
+                        status_code=403
+                    ), None
+
+            response_headers.extend(SECURITY_HEADERS.items())
+
+        # Tenant (contexte RLS): header X-Tenant-ID, JWT puis tenant de l'API key
+        if method != "OPTIONS" and not is_public_tenant_route(path):
+            tenant_id = (
+                credentials.tenant_header
+                or credentials.jwt_tenant_id()
+                or (state.get("tenant") or {}).get("id")
+            )
+            if not tenant_id:
+                tenant_id = development_tenant_id()
+                if not tenant_id:
+                    logger.warning(f"No tenant_id for request: {path}")
+
+            error = tenant_error_response(tenant_id)
+            if error is not None:
+                return error, None
+
+            state["tenant_id"] = str(UUID(tenant_id))
+            response_headers.append(("X-Tenant-Context", state["tenant_id"]))
+
+        # Rate limit (IP + tenant)
+        if path in PUBLIC_ROUTES:
+            return None, None
+
+        identifier = f"{(state.get('tenant') or {}).get('id', 'anonymous')}:{client_ip}"
+        is_allowed, retry_after = rate_limiter.check_rate_limit(identifier)
+        if not is_allowed:
+            logger.warning(f"Rate limit exceeded for {identifier}")
+            return rate_limit_response(retry_after), None
+
+        return None, identifier
+
 
 class RequestIDMiddleware(BaseHTTPMiddleware):
+    """
+    Attribue le request ID et ouvre la trace de la requête
+
+    Les middlewares et handlers en aval héritent du contexte: les étapes
+    chronométrées avec `tracing.stage()` s'attachent à cette trace.
+    Intégré à RequestPipelineMiddleware dans main.py.
+    """
+
     async def dispatch(self, request: Request, call_next):
-        request_id = hashlib.sha256(str(time.time_ns()).encode()).hexdigest()[:16]
+        request_id = new_request_id(request.headers.get("X-Request-Id"))
         request.state.request_id = request_id
-        response = await call_next(request)
+        trace = start_trace(request_id, request.method, request.url.path)
+
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            record_request(trace, request.method, request.scope, status_code)
+
         response.headers["X-Request-Id"] = request_id
         return response
 
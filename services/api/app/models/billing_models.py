@@ -500,6 +500,7 @@ class ConsumeCreditsRequest(BaseModel):
     service_reference: Optional[str] = None
     credits_override: Optional[int] = None  # Pour override le coût par défaut
     metadata: dict[str, Any] = Field(default_factory=dict)
+    idempotency_key: Optional[str] = None  # Retry sans double débit
 
 
 class ConsumeCreditsResponse(BaseModel):
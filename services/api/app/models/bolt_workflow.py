@@ -77,6 +77,7 @@ class ExportZipRequest(BaseModel):
     include_docs: bool = Field(default=True, description="Inclure la documentation")
     include_tests: bool = Field(default=True, description="Inclure les tests")
     include_deployment: bool = Field(default=True, description="Inclure les configs de déploiement")
+    stream: bool = Field(default=False, description="Streamer l'archive dans la réponse sans l'écrire sur disque")
 
 
 # ==================== Réponses ====================
@@ -208,6 +208,8 @@ class CouncilConfig(BaseModel):
     # Options
     ENABLE_REVIEW: bool = True
     ANONYMIZE_MODELS: bool = True
+    # Accord minimal entre opinions (Jaccard moyen) pour sauter la review. > 1 = jamais
+    EARLY_EXIT_AGREEMENT: float = 0.6
 
     # API Keys (lues depuis env)
     ANTHROPIC_API_KEY: str = ""
@@ -235,6 +237,7 @@ class CouncilConfig(BaseModel):
             OPEN_ROUTER_API_KEY=os.getenv("OPEN_ROUTER_API_KEY", ""),
             OLLAMA_BASE_URL=os.getenv("OLLAMA_BASE_URL", "http://iaf-ollama:11434"),
             ENABLE_REVIEW=os.getenv("COUNCIL_ENABLE_REVIEW", "true").lower() == "true",
+            EARLY_EXIT_AGREEMENT=float(os.getenv("COUNCIL_EARLY_EXIT_AGREEMENT", "0.6")),
             CHAIRMAN=os.getenv("COUNCIL_CHAIRMAN", "groq-llama")
         )
 
@@ -0,0 +1,82 @@
+"""
+Council Consensus - Outils partagés pour la review croisée
+Mesure d'accord entre opinions (early exit) et exécution des reviews avec deadline
+"""
+import asyncio
+import re
+import time
+from itertools import combinations
+from typing import Awaitable, Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w{4,}", re.UNICODE)
+
+
+def _terms(text: str) -> set:
+    """Termes significatifs (>= 4 caractères) d'une opinion"""
+    return set(_WORD_RE.findall(text.lower()))
+
+
+def opinion_agreement(opinions: List[str]) -> float:
+    """
+    Accord moyen entre opinions: similarité de Jaccard des termes, moyennée
+    sur toutes les paires. 1.0 = opinions lexicalement identiques.
+    """
+    term_sets = [_terms(o) for o in opinions if o]
+    if len(term_sets) < 2:
+        return 1.0
+
+    scores = []
+    for a, b in combinations(term_sets, 2):
+        union = a | b
+        scores.append(len(a & b) / len(union) if union else 1.0)
+    return sum(scores) / len(scores)
+
+
+async def gather_with_deadline(
+    calls: Dict[str, Awaitable[str]],
+    timeout: float
+) -> Tuple[Dict[str, str], Dict[str, str], List[str]]:
+    """
+    Exécute les reviews en parallèle et abandonne celles qui dépassent la deadline
+
+    Returns:
+        (résultats réussis, erreurs, membres hors délai)
+    """
+    tasks = {asyncio.ensure_future(call): member for member, call in calls.items()}
+    if not tasks:
+        return {}, {}, []
+
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+
+    results, errors = {}, {}
+    for task in done:
+        member = tasks[task]
+        if task.exception() is not None:
+            errors[member] = str(task.exception())
+            logger.error(f"Review error for {member}: {task.exception()}")
+        else:
+            results[member] = task.result()
+
+    timed_out = [tasks[task] for task in pending]
+    if timed_out:
+        logger.warning(f"Reviewers dropped after {timeout}s deadline: {timed_out}")
+    return results, errors, timed_out
+
+
+class StageTimer:
+    """Chronomètre les étapes du pipeline Council"""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self._start = 0.0
+
+    def start(self) -> None:
+        self._start = time.perf_counter()
+
+    def stop(self, stage: str) -> None:
+        self.durations[stage] = round(time.perf_counter() - self._start, 3)
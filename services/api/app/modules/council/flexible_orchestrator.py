@@ -1,13 +1,15 @@
 """
 Flexible Council Orchestrator - Accepte n'importe quelle combinaison de LLMs
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import asyncio
 from datetime import datetime
 import logging
 
 from .universal_provider import UniversalProvider
 from .models_config import AvailableModels
+from .config import council_config
+from .consensus import opinion_agreement, gather_with_deadline, StageTimer
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +28,7 @@ class FlexibleCouncilOrchestrator:
         self.experts = [expert1, expert2, expert3]
         self.chairman = chairman
         self.enable_review = enable_review
+        self._failed_experts: set = set()
 
         # Validation
         all_models = self.experts + [self.chairman]
@@ -54,22 +57,41 @@ class FlexibleCouncilOrchestrator:
 
         logger.info(f"Début traitement query. Coût estimé: ${estimated_cost:.4f}")
 
+        timer = StageTimer()
+
         # Stage 1: Opinions des experts
+        timer.start()
         opinions = await self._gather_opinions(user_query, context)
+        timer.stop("stage1_opinions")
 
-        # Stage 2: Review croisée (optionnel)
+        # Stage 2: Review croisée (optionnel, sautée si les opinions concordent)
         rankings = None
+        review_info: Dict[str, Any] = {"skipped": not self.enable_review}
         if self.enable_review:
-            logger.info("Stage 2: Review croisée activée")
-            rankings = await self._cross_review(opinions, user_query)
+            valid = [o for e, o in opinions.items() if e not in self._failed_experts]
+            agreement = opinion_agreement(valid)
+            review_info["agreement"] = round(agreement, 3)
+
+            if len(valid) > 1 and agreement >= council_config.EARLY_EXIT_AGREEMENT:
+                logger.info(f"Stage 2 sautée: opinions concordantes ({agreement:.2f})")
+                review_info["skipped"] = True
+                review_info["reason"] = "early_exit_agreement"
+            else:
+                logger.info("Stage 2: Review croisée activée")
+                timer.start()
+                rankings, dropped = await self._cross_review(opinions, user_query)
+                timer.stop("stage2_review")
+                review_info["reviewers_dropped"] = dropped
 
         # Stage 3: Synthèse par chairman
         logger.info("Stage 3: Synthèse finale par chairman")
+        timer.start()
         final_response = await self._chairman_synthesis(
             opinions,
             rankings,
             user_query
         )
+        timer.stop("stage3_synthesis")
 
         execution_time = (datetime.now() - start_time).total_seconds()
 
@@ -100,7 +122,9 @@ class FlexibleCouncilOrchestrator:
                 "estimated_cost": estimated_cost,
                 "actual_cost": actual_cost,
                 "estimated_time_range": estimated_time,
-                "review_enabled": self.enable_review
+                "review_enabled": self.enable_review,
+                "review": review_info,
+                "stage_latency": timer.durations
             }
         }
 
@@ -129,6 +153,7 @@ class FlexibleCouncilOrchestrator:
 
         # Exécution parallèle
         opinions = {}
+        self._failed_experts = set()
         results = await asyncio.gather(
             *[task for _, task in tasks],
             return_exceptions=True
@@ -139,6 +164,7 @@ class FlexibleCouncilOrchestrator:
             if isinstance(result, Exception):
                 logger.error(f"Erreur {expert_name}: {result}")
                 opinions[expert] = f"❌ Erreur: {str(result)}"
+                self._failed_experts.add(expert)
             else:
                 logger.info(f"✓ Opinion reçue de {expert_name}")
                 opinions[expert] = result
@@ -149,8 +175,13 @@ class FlexibleCouncilOrchestrator:
         self,
         opinions: Dict[str, str],
         query: str
-    ) -> Dict[str, Any]:
-        """Review croisée des opinions"""
+    ) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Review croisée des opinions, en parallèle avec deadline
+
+        Returns:
+            (rankings par expert, experts abandonnés pour dépassement de délai)
+        """
 
         # Anonymiser
         anonymized = {}
@@ -160,18 +191,16 @@ class FlexibleCouncilOrchestrator:
             anonymized[anon_key] = opinion
             reverse_map[anon_key] = model_id
 
-        rankings = {}
-
-        for expert in self.experts:
-            review_prompt = f"""Question: {query}
+        # Le prompt de review est identique pour tous les experts
+        review_prompt = f"""Question: {query}
 
 Voici plusieurs réponses à évaluer:
 
 """
-            for key, opinion in anonymized.items():
-                review_prompt += f"\n{key}:\n{opinion}\n\n---\n"
+        for key, opinion in anonymized.items():
+            review_prompt += f"\n{key}:\n{opinion}\n\n---\n"
 
-            review_prompt += """
+        review_prompt += """
 Note chaque réponse sur:
 - Précision (1-10)
 - Pertinence (1-10)
@@ -184,15 +213,20 @@ Format JSON:
 }
 """
 
+        calls = {}
+        for expert in self.experts:
+            if expert in self._failed_experts:
+                continue
             provider = UniversalProvider.get_provider(expert)
-            try:
-                review = await provider.generate(review_prompt)
-                rankings[expert] = review
-            except Exception as e:
-                logger.error(f"Erreur review {expert}: {e}")
-                rankings[expert] = f"Erreur review: {e}"
-
-        return rankings
+            calls[expert] = provider.generate(review_prompt)
+
+        rankings, errors, timed_out = await gather_with_deadline(
+            calls, council_config.STAGE2_TIMEOUT
+        )
+        for expert, error in errors.items():
+            rankings[expert] = f"Erreur review: {error}"
+
+        return rankings, timed_out
 
     async def _chairman_synthesis(
         self,
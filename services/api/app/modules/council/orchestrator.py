@@ -8,8 +8,9 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 import logging
 
-from .providers import get_provider
+from .providers import get_provider, LLMProvider
 from .config import council_config
+from .consensus import opinion_agreement, gather_with_deadline, StageTimer
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,9 @@ class CouncilOrchestrator:
     1. Stage 1: Chaque LLM donne son opinion indépendante
     2. Stage 2 (optionnel): Review croisée des opinions
     3. Stage 3: Chairman synthétise la réponse finale
+
+    Le stage 2 est exécuté en parallèle avec une deadline (STAGE2_TIMEOUT) et
+    sauté si les opinions du stage 1 sont déjà en accord (EARLY_EXIT_AGREEMENT).
     """
 
     def __init__(
@@ -45,6 +49,10 @@ class CouncilOrchestrator:
             # Fallback au premier membre disponible
             self.chairman = self.members[0]
 
+        # Instances de providers réutilisées entre les étapes
+        self._providers: Dict[str, LLMProvider] = {}
+        self._failed_members: set = set()
+
         logger.info(f"Council initialized with members: {self.members}, chairman: {self.chairman}")
 
     async def process_query(
@@ -65,25 +73,46 @@ class CouncilOrchestrator:
             Dict contenant la réponse finale, opinions, rankings et metadata
         """
         start_time = datetime.now()
+        timer = StageTimer()
 
         try:
             # Stage 1: Opinions initiales
             logger.info("Stage 1: Gathering opinions from council members")
+            timer.start()
             opinions = await self._stage1_opinions(user_query, context)
+            timer.stop("stage1_opinions")
 
-            # Stage 2: Review (optionnel)
+            # Stage 2: Review (optionnel, sauté si les opinions concordent déjà)
             rankings = None
+            review_info: Dict[str, Any] = {"skipped": not self.enable_review}
             if self.enable_review and len(opinions) > 1:
-                logger.info("Stage 2: Cross-review of opinions")
-                rankings = await self._stage2_review(opinions, user_query)
+                valid = [o for m, o in opinions.items() if m not in self._failed_members]
+                agreement = opinion_agreement(valid)
+                review_info["agreement"] = round(agreement, 3)
+
+                if len(valid) > 1 and agreement >= council_config.EARLY_EXIT_AGREEMENT:
+                    logger.info(f"Stage 2 skipped: opinions agree ({agreement:.2f})")
+                    review_info["skipped"] = True
+                    review_info["reason"] = "early_exit_agreement"
+                else:
+                    logger.info("Stage 2: Cross-review of opinions")
+                    timer.start()
+                    rankings = await self._stage2_review(opinions, user_query)
+                    timer.stop("stage2_review")
+                    review_info["reviewers_dropped"] = [
+                        m for m, r in rankings.items() if r.get("timed_out")
+                    ]
+                    rankings = {m: r for m, r in rankings.items() if not r.get("timed_out")}
 
             # Stage 3: Synthèse finale
             logger.info("Stage 3: Chairman synthesis")
+            timer.start()
             final_response = await self._stage3_synthesis(
                 opinions,
                 rankings,
                 user_query
             )
+            timer.stop("stage3_synthesis")
 
             execution_time = (datetime.now() - start_time).total_seconds()
 
@@ -96,6 +125,8 @@ class CouncilOrchestrator:
                     "council_members": self.members,
                     "chairman": self.chairman,
                     "review_enabled": self.enable_review,
+                    "review": review_info,
+                    "stage_latency": timer.durations,
                     "timestamp": datetime.now().isoformat(),
                     **(metadata or {})
                 }
@@ -130,9 +161,10 @@ Sois concis mais complet."""
 
         # Appels parallèles pour rapidité
         tasks = []
+        self._failed_members = set()
         for member in self.members:
             try:
-                provider = get_provider(member)
+                provider = self._get_member_provider(member)
                 if provider.is_available():
                     task = provider.generate(prompt, system_prompt)
                     tasks.append((member, task))
@@ -152,6 +184,7 @@ Sois concis mais complet."""
             if isinstance(result, Exception):
                 error_msg = f"Erreur lors de la génération: {str(result)}"
                 opinions[member] = error_msg
+                self._failed_members.add(member)
                 logger.error(f"Provider {member} failed: {error_msg}")
             else:
                 opinions[member] = result
@@ -175,31 +208,45 @@ Sois concis mais complet."""
         # Anonymiser les réponses si configuré
         anonymized = self._anonymize_opinions(opinions) if council_config.ANONYMIZE_MODELS else opinions
 
-        rankings = {}
-
-        # Chaque membre évalue les autres
+        # Chaque membre évalue les autres, en parallèle, avec deadline
+        calls = {}
+        rankings: Dict[str, Dict] = {}
         for reviewer in self.members:
+            if reviewer in self._failed_members:
+                continue
             try:
-                # Créer prompt de review
+                provider = self._get_member_provider(reviewer)
+                if not provider.is_available():
+                    continue
+
                 review_prompt = self._create_review_prompt(
                     anonymized,
                     original_query,
                     reviewer
                 )
-
-                provider = get_provider(reviewer)
-                if not provider.is_available():
-                    continue
-
-                review = await provider.generate(review_prompt)
-                rankings[reviewer] = self._parse_ranking(review)
-
+                calls[reviewer] = provider.generate(review_prompt)
             except Exception as e:
                 rankings[reviewer] = {"error": str(e)}
                 logger.error(f"Review error for {reviewer}: {e}")
 
+        reviews, errors, timed_out = await gather_with_deadline(
+            calls, council_config.STAGE2_TIMEOUT
+        )
+        for reviewer, review in reviews.items():
+            rankings[reviewer] = self._parse_ranking(review)
+        for reviewer, error in errors.items():
+            rankings[reviewer] = {"error": error}
+        for reviewer in timed_out:
+            rankings[reviewer] = {"timed_out": True}
+
         return rankings
 
+    def _get_member_provider(self, member: str) -> LLMProvider:
+        """Instance de provider d'un membre (créée une seule fois)"""
+        if member not in self._providers:
+            self._providers[member] = get_provider(member)
+        return self._providers[member]
+
     async def _stage3_synthesis(
         self,
         opinions: Dict[str, str],
@@ -245,7 +292,7 @@ Ta mission: Synthétiser ces réponses en UNE réponse finale optimale qui:
 Fournis UNIQUEMENT la synthèse finale, sans préambule du type "Voici ma synthèse..."."""
 
         try:
-            chairman_provider = get_provider(self.chairman)
+            chairman_provider = self._get_member_provider(self.chairman)
             final = await chairman_provider.generate(synthesis_prompt)
             return final
         except Exception as e:
@@ -27,6 +27,47 @@ ACTIVE_CONNECTIONS = Gauge(
     'Number of active connections'
 )
 
+# Étapes des pipelines internes (RAG, voix, OCR, LLM, ingestion)
+PIPELINE_STAGES = ("embed", "search", "rerank", "llm", "stt", "tts", "ocr_page", "upsert", "upload", "ingest")
+
+STAGE_LATENCY = Histogram(
+    'pipeline_stage_duration_seconds',
+    'Latency of internal pipeline stages',
+    ['stage'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+
+STAGE_ERRORS = Counter(
+    'pipeline_stage_errors_total',
+    'Pipeline stages that raised an exception',
+    ['stage']
+)
+
+# Pic des octets d'upload tenus en RAM par requête (app/uploads.py)
+UPLOAD_PEAK_MEMORY = Histogram(
+    'upload_peak_memory_bytes',
+    'Peak upload bytes held in memory per request',
+    buckets=(64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 8 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2, 256 * 1024 ** 2)
+)
+
+# Délai avant le premier chunk d'un document ingéré (app/ingest_pipeline.py)
+INGEST_TIME_TO_FIRST_CHUNK = Histogram(
+    'ingest_time_to_first_chunk_seconds',
+    'Time from the start of parsing to the first complete chunk',
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+
+# Messages WebSocket non envoyés: progression fusionnée/écartée, client trop lent (app/websocket.py)
+WS_MESSAGES_DROPPED = Counter(
+    'websocket_messages_dropped_total',
+    'WebSocket messages coalesced or dropped by per-client send queues',
+    ['reason']
+)
+
 def init_metrics():
     """Initialize monitoring system"""
+    # Séries exposées à 0 dès le démarrage pour que les requêtes PromQL aient une base
+    for stage in PIPELINE_STAGES:
+        STAGE_LATENCY.labels(stage=stage)
+        STAGE_ERRORS.labels(stage=stage)
     logger.info("Prometheus metrics initialized")
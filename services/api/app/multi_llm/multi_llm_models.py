@@ -249,6 +249,7 @@ class ChatResponse(BaseModel):
     
     # Performance
     latency_ms: int
+    cached: bool = False
     
     # Metadata
     finish_reason: Optional[str] = None
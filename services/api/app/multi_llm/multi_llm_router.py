@@ -14,6 +14,7 @@ from .multi_llm_models import (
     LLMModelTier, LLMProviderType, LLMModelType,
 )
 from .multi_llm_service import multi_llm_service
+from ..llm_cache import completion_cache
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +35,7 @@ async def llm_health():
         "version": "1.0.0",
         "models_available": models.total,
         "default_model": models.default_model,
+        "completion_cache": completion_cache.get_stats(),
     }
 
 
@@ -4,6 +4,7 @@ Multi-LLM Service
 Logique métier pour gestion des appels LLM multi-providers avec comptage crédits
 """
 
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from decimal import Decimal
@@ -17,6 +18,9 @@ from .multi_llm_models import (
     DEFAULT_MODELS, MODELS_BY_CODE, LLMModelTier, LLMProviderType, LLMModelType,
 )
 from .providers_client import call_llm, LLMResponse
+from ..config import get_settings
+from ..llm_cache import completion_cache
+from ..tokens.counter import token_counter
 
 # Import Billing V2 service
 from ..services.billing_service import billing_service
@@ -160,14 +164,14 @@ class MultiLLMService:
             raise ValueError(f"Model {request.model} is not active")
         
         # 2. Estimer les tokens (approximation avant appel)
-        estimated_input_tokens = self._estimate_tokens(request.messages)
+        estimated_input_tokens = self._estimate_tokens(request.messages, model.code)
         estimated_total = estimated_input_tokens + (request.max_tokens or model.max_tokens)
         estimated_credits = max(1, int((estimated_total / 1000) * model.cost_credits_per_1k))
         
         # 3. Vérifier les crédits
         if check_credits:
-            can_consume, cost, available = billing_service.can_consume(user_id, ServiceType.RAG_QUERY)
-            user_credits = billing_service.get_or_create_user_credits(user_id)
+            # Le ledger est synchrone: appels hors de la boucle d'événements
+            user_credits = await asyncio.to_thread(billing_service.get_or_create_user_credits, user_id)
             
             if user_credits.total_available < estimated_credits:
                 raise ValueError(
@@ -175,33 +179,63 @@ class MultiLLMService:
                     f"~{estimated_credits} requis pour {model.display_name}"
                 )
         
-        # 4. Appeler le LLM
+        # 4. Appeler le LLM (ou servir depuis le cache de complétions)
         messages_dict = [{"role": m.role, "content": m.content} for m in request.messages]
+        use_cache = (
+            get_settings().enable_llm_cache
+            and not request.stream
+            and completion_cache.cacheable(request.temperature, user_id)
+        )
+        cached = None
+        if use_cache:
+            cached = await completion_cache.aget(
+                request.model, messages_dict, request.temperature, request.max_tokens, tenant_id=user_id
+            )
         
-        try:
-            llm_response: LLMResponse = await call_llm(
-                model_code=request.model,
-                messages=messages_dict,
-                temperature=request.temperature,
-                max_tokens=request.max_tokens,
+        if cached:
+            llm_response = LLMResponse(
+                content=cached.content,
+                tokens_input=cached.tokens_input,
+                tokens_output=cached.tokens_output,
+                model=cached.model,
+                finish_reason="cached",
             )
-        except Exception as e:
-            logger.error(f"LLM call failed for {request.model}: {e}")
-            raise ValueError(f"LLM call failed: {str(e)}")
+        else:
+            try:
+                llm_response: LLMResponse = await call_llm(
+                    model_code=request.model,
+                    messages=messages_dict,
+                    temperature=request.temperature,
+                    max_tokens=request.max_tokens,
+                )
+            except Exception as e:
+                logger.error(f"LLM call failed for {request.model}: {e}")
+                raise ValueError(f"LLM call failed: {str(e)}")
         
-        # 5. Calculer les crédits réels
+        # 5. Calculer les crédits réels (rien n'est facturé pour une réponse servie du cache)
         tokens_total = llm_response.tokens_total
-        credits_consumed = max(1, int((tokens_total / 1000) * model.cost_credits_per_1k))
+        credits_consumed = 0 if cached else max(1, int((tokens_total / 1000) * model.cost_credits_per_1k))
         
-        # Coût USD estimé
+        # Coût USD estimé (nul si servi depuis le cache)
         cost_usd = (
             (Decimal(llm_response.tokens_input) / 1000) * model.cost_usd_input_per_1k +
             (Decimal(llm_response.tokens_output) / 1000) * model.cost_usd_output_per_1k
         )
+        if cached:
+            cost_usd = Decimal(0)
+        elif use_cache:
+            await completion_cache.aset(
+                request.model, messages_dict, llm_response.content,
+                request.temperature, request.max_tokens, tenant_id=user_id,
+                tokens_input=llm_response.tokens_input,
+                tokens_output=llm_response.tokens_output,
+                cost_usd=float(cost_usd),
+            )
         
         # 6. Déduire les crédits via Billing V2
-        if check_credits:
-            consume_result = billing_service.consume_credits(
+        if check_credits and credits_consumed:
+            consume_result = await asyncio.to_thread(
+                billing_service.consume_credits,
                 user_id=user_id,
                 service_type=ServiceType.RAG_QUERY,  # TODO: Ajouter ServiceType.LLM_CHAT
                 credits_override=credits_consumed,
@@ -214,7 +248,8 @@ class MultiLLMService:
             )
             remaining_credits = consume_result.balance_after
         else:
-            remaining_credits = billing_service.get_or_create_user_credits(user_id).total_available
+            user_credits = await asyncio.to_thread(billing_service.get_or_create_user_credits, user_id)
+            remaining_credits = user_credits.total_available
         
         # 7. Logger l'usage
         usage_log = AIUsageLog(
@@ -250,6 +285,7 @@ class MultiLLMService:
             credits_remaining=remaining_credits,
             cost_usd_estimated=float(cost_usd),
             latency_ms=llm_response.latency_ms,
+            cached=cached is not None,
             finish_reason=llm_response.finish_reason,
         )
     
@@ -395,11 +431,12 @@ class MultiLLMService:
     # Helpers
     # ========================================
     
-    def _estimate_tokens(self, messages: List[ChatMessage]) -> int:
-        """Estimer le nombre de tokens d'entrée (approximation simple)"""
-        total_chars = sum(len(m.content) for m in messages)
-        # Approximation: 1 token ≈ 4 caractères en anglais, 2-3 en français/arabe
-        return int(total_chars / 3)
+    def _estimate_tokens(self, messages: List[ChatMessage], model_code: Optional[str] = None) -> int:
+        """Estimer le nombre de tokens d'entrée (tokenizer du modèle ou fallback calibré par écriture)"""
+        return token_counter.count_messages(
+            [{"role": m.role, "content": m.content} for m in messages],
+            model=model_code,
+        )
     
     def get_pricing_table(self) -> Dict[str, Any]:
         """
@@ -30,6 +30,8 @@ from .ocr_utils import (
     estimate_confidence,
     LanguageCode,
 )
+from ..tracing import stage
+from ..uploads import SpooledUpload
 
 logger = logging.getLogger(__name__)
 
@@ -333,7 +335,7 @@ class OCRPipeline:
     
     def extract_text_from_pdf(
         self,
-        pdf_data: Union[bytes, BinaryIO, str, Path],
+        pdf_data: Union[bytes, BinaryIO, str, Path, SpooledUpload],
         language_hint: Optional[LanguageCode] = None,
         max_pages: Optional[int] = None,
         dpi: int = 300,
@@ -341,8 +343,13 @@ class OCRPipeline:
         """
         Extraire le texte d'un PDF (scanné ou non).
         
+        Poppler lit le PDF depuis un fichier: un SpooledUpload donne son
+        chemin, bytes et file-likes sont spoolés sur disque par blocs (pas de
+        copie complète en mémoire). Les pages sont rendues une à une: une
+        seule image de page en RAM à la fois.
+        
         Args:
-            pdf_data: Données PDF (bytes, file-like, ou chemin)
+            pdf_data: Données PDF (bytes, file-like, chemin ou SpooledUpload)
             language_hint: Indice sur la langue
             max_pages: Nombre max de pages à traiter
             dpi: Résolution pour conversion en image
@@ -350,34 +357,48 @@ class OCRPipeline:
         Returns:
             OCRResult complet
         """
+        if isinstance(pdf_data, (str, Path)):
+            return self._extract_text_from_pdf_path(str(pdf_data), language_hint, max_pages, dpi)
+        if isinstance(pdf_data, SpooledUpload):
+            return self._extract_text_from_pdf_path(pdf_data.path(), language_hint, max_pages, dpi)
+        
+        with SpooledUpload(max_memory=0) as spool:
+            if isinstance(pdf_data, bytes):
+                spool.write(pdf_data)
+            else:
+                # File-like object: copié par blocs
+                while chunk := pdf_data.read(1024 * 1024):
+                    spool.write(chunk)
+            return self._extract_text_from_pdf_path(spool.path(), language_hint, max_pages, dpi)
+    
+    def _render_pdf_page(self, path: str, page: int, dpi: int) -> "Image.Image":
+        """Rendre une seule page du PDF en image"""
+        from pdf2image import convert_from_path
+        
+        return convert_from_path(
+            path,
+            dpi=dpi,
+            first_page=page,
+            last_page=page,
+            poppler_path=self.poppler_path,
+        )[0]
+    
+    def _extract_text_from_pdf_path(
+        self,
+        path: str,
+        language_hint: Optional[LanguageCode],
+        max_pages: Optional[int],
+        dpi: int,
+    ) -> OCRResult:
+        """OCR d'un PDF sur disque, page par page"""
         import time
         start_time = time.time()
         
-        from pdf2image import convert_from_bytes, convert_from_path
-        from PIL import Image
+        from pdf2image import pdfinfo_from_path
         
-        # Charger le PDF
+        # Nombre de pages (sans rendre le PDF)
         try:
-            if isinstance(pdf_data, (str, Path)):
-                images = convert_from_path(
-                    str(pdf_data),
-                    dpi=dpi,
-                    poppler_path=self.poppler_path,
-                )
-            elif isinstance(pdf_data, bytes):
-                images = convert_from_bytes(
-                    pdf_data,
-                    dpi=dpi,
-                    poppler_path=self.poppler_path,
-                )
-            else:
-                # File-like object
-                pdf_bytes = pdf_data.read()
-                images = convert_from_bytes(
-                    pdf_bytes,
-                    dpi=dpi,
-                    poppler_path=self.poppler_path,
-                )
+            total_pages = int(pdfinfo_from_path(path, poppler_path=self.poppler_path)["Pages"])
         except Exception as e:
             logger.error(f"Erreur conversion PDF: {e}")
             return OCRResult(
@@ -390,19 +411,32 @@ class OCRPipeline:
         
         # Limiter le nombre de pages
         if max_pages:
-            images = images[:max_pages]
+            total_pages = min(total_pages, max_pages)
         
-        total_pages = len(images)
         pages_results: List[PageOCRResult] = []
         warnings: List[str] = []
         
-        # OCR page par page
-        for i, img in enumerate(images, 1):
+        # Rendu + OCR page par page
+        for i in range(1, total_pages + 1):
             logger.info(f"OCR page {i}/{total_pages}")
             
-            page_result = self.extract_text_from_image(img, language_hint)
+            try:
+                img = self._render_pdf_page(path, i, dpi)
+            except Exception as e:
+                logger.error(f"Erreur conversion PDF: {e}")
+                return OCRResult(
+                    text="",
+                    language="unknown",
+                    is_pdf=True,
+                    pages=0,
+                    error=f"Erreur conversion PDF: {str(e)}",
+                )
+            
+            with stage("ocr_page", page=i):
+                page_result = self.extract_text_from_image(img, language_hint)
             page_result.page_number = i
             pages_results.append(page_result)
+            img.close()
             
             # Vérifier si fallback nécessaire
             if page_result.confidence < self.CONFIDENCE_THRESHOLD and self.enable_fallback:
@@ -422,7 +456,7 @@ class OCRPipeline:
             for i, page_result in enumerate(pages_results):
                 if page_result.confidence < self.CONFIDENCE_THRESHOLD:
                     try:
-                        img_bytes = self._image_to_bytes(images[i])
+                        img_bytes = self._image_to_bytes(self._render_pdf_page(path, i + 1, dpi))
                         fallback_result = self.fallback_llm_ocr(img_bytes)
                         if fallback_result and len(fallback_result) > len(page_result.text) * 0.5:
                             pages_results[i].text = fallback_result
@@ -658,7 +692,7 @@ Retourne UNIQUEMENT le texte, sans commentaires."""
     
     async def auto_ocr(
         self,
-        file_data: Union[bytes, BinaryIO],
+        file_data: Union[bytes, BinaryIO, SpooledUpload],
         filename: Optional[str] = None,
         language_hint: Optional[LanguageCode] = None,
     ) -> OCRResult:
@@ -670,40 +704,52 @@ Retourne UNIQUEMENT le texte, sans commentaires."""
         - Fallback IA si confiance faible
         
         Args:
-            file_data: Données du fichier
+            file_data: Données du fichier (un file-like est spoolé par blocs)
             filename: Nom du fichier (pour détecter le type)
             language_hint: Indice sur la langue
         
         Returns:
             OCRResult complet
         """
+        if hasattr(file_data, 'read') and not isinstance(file_data, SpooledUpload):
+            with SpooledUpload.from_file(file_data, filename or "") as spool:
+                return await self._auto_ocr(spool, filename, language_hint)
+        return await self._auto_ocr(file_data, filename, language_hint)
+    
+    async def _auto_ocr(
+        self,
+        file_data: Union[bytes, SpooledUpload],
+        filename: Optional[str],
+        language_hint: Optional[LanguageCode],
+    ) -> OCRResult:
+        """auto_ocr sur des bytes ou un SpooledUpload (lu sans copie)"""
         import time
         from PIL import Image
         
         start_time = time.time()
-        
-        # Lire les bytes
-        if hasattr(file_data, 'read'):
-            file_bytes = file_data.read()
-        else:
-            file_bytes = file_data
+        spooled = isinstance(file_data, SpooledUpload)
         
         # Détecter le type de fichier
-        is_pdf = self._is_pdf(file_bytes, filename)
+        is_pdf = self._is_pdf(file_data.head(4) if spooled else file_data, filename)
         
         if is_pdf:
             # Traiter comme PDF
-            result = self.extract_text_from_pdf(file_bytes, language_hint)
+            result = self.extract_text_from_pdf(file_data, language_hint)
         else:
             # Traiter comme image
             try:
-                image = Image.open(io.BytesIO(file_bytes))
-                page_result = self.extract_text_from_image(image, language_hint)
+                image = Image.open(file_data.stream() if spooled else io.BytesIO(file_data))
+                with stage("ocr_page", page=1):
+                    page_result = self.extract_text_from_image(image, language_hint)
                 
                 # Vérifier si fallback nécessaire
                 fallback_used = False
                 if page_result.confidence < self.CONFIDENCE_THRESHOLD and self.enable_fallback:
-                    fallback_text = await self.fallback_llm_ocr_async(file_bytes, language_hint)
+                    if spooled:
+                        with file_data.view() as data:
+                            fallback_text = await self.fallback_llm_ocr_async(data, language_hint)
+                    else:
+                        fallback_text = await self.fallback_llm_ocr_async(file_data, language_hint)
                     if fallback_text and len(fallback_text) > len(page_result.text) * 0.5:
                         page_result.text = fallback_text
                         page_result.engine = (
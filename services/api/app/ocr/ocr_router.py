@@ -14,6 +14,7 @@ from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
 from pydantic import BaseModel, Field
 
 from .ocr_dz_pipeline import OCRPipeline, OCRResult, ocr_pipeline, OCREngine
+from ..uploads import SpooledUpload, UploadTooLarge, upload_scope
 from .ocr_utils import (
     detect_language,
     clean_arabic,
@@ -26,6 +27,8 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/ocr", tags=["OCR Multilingue DZ"])
 
+MAX_OCR_UPLOAD_BYTES = 50 * 1024 * 1024  # 50 MB
+
 
 # ============================================
 # REQUEST/RESPONSE MODELS
@@ -148,39 +151,18 @@ async def extract_text(
         )
     
     try:
-        # Lire le fichier
-        file_bytes = await file.read()
-        
-        if len(file_bytes) == 0:
-            raise HTTPException(status_code=400, detail="Fichier vide")
-        
-        if len(file_bytes) > 50 * 1024 * 1024:  # 50 MB
-            raise HTTPException(status_code=400, detail="Fichier trop volumineux (max 50 MB)")
-        
-        # Configurer le pipeline
-        pipeline = OCRPipeline(
-            enable_fallback=enable_fallback,
-            fallback_provider="claude",
-        )
-        
-        # Parser language_hint
-        lang_hint: Optional[LanguageCode] = None
-        if language_hint:
-            if language_hint.lower() in ["ar", "ara", "arabe", "arabic"]:
-                lang_hint = "ar"
-            elif language_hint.lower() in ["fr", "fra", "french", "français"]:
-                lang_hint = "fr"
-            elif language_hint.lower() in ["en", "eng", "english", "anglais"]:
-                lang_hint = "en"
-        
-        # OCR
-        result = await pipeline.auto_ocr(
-            file_data=file_bytes,
-            filename=filename,
-            language_hint=lang_hint,
-        )
-        
-        return result
+        with upload_scope(filename=filename):
+            # Lire le fichier par blocs (spoolé sur disque au-delà du seuil mémoire)
+            try:
+                upload = await SpooledUpload.from_upload(file, max_bytes=MAX_OCR_UPLOAD_BYTES)
+            except UploadTooLarge:
+                raise HTTPException(status_code=400, detail="Fichier trop volumineux (max 50 MB)")
+            
+            with upload:
+                if upload.size == 0:
+                    raise HTTPException(status_code=400, detail="Fichier vide")
+                
+                return await _ocr_upload(upload, filename, language_hint, enable_fallback)
         
     except HTTPException:
         raise
@@ -192,6 +174,37 @@ async def extract_text(
         )
 
 
+async def _ocr_upload(
+    upload: SpooledUpload,
+    filename: str,
+    language_hint: Optional[str],
+    enable_fallback: bool,
+) -> OCRResult:
+    """OCR d'un upload spoolé (lu sans copie par le pipeline)"""
+    # Configurer le pipeline
+    pipeline = OCRPipeline(
+        enable_fallback=enable_fallback,
+        fallback_provider="claude",
+    )
+    
+    # Parser language_hint
+    lang_hint: Optional[LanguageCode] = None
+    if language_hint:
+        if language_hint.lower() in ["ar", "ara", "arabe", "arabic"]:
+            lang_hint = "ar"
+        elif language_hint.lower() in ["fr", "fra", "french", "français"]:
+            lang_hint = "fr"
+        elif language_hint.lower() in ["en", "eng", "english", "anglais"]:
+            lang_hint = "en"
+    
+    # OCR
+    return await pipeline.auto_ocr(
+        file_data=upload,
+        filename=filename,
+        language_hint=lang_hint,
+    )
+
+
 @router.post("/extract/quick")
 async def extract_text_quick(
     file: UploadFile = File(...),
@@ -342,13 +355,14 @@ async def extract_text_batch(
     
     for file in files:
         try:
-            file_bytes = await file.read()
-            
-            result = await pipeline.auto_ocr(
-                file_data=file_bytes,
-                filename=file.filename,
-                language_hint=language_hint,  # type: ignore
-            )
+            with upload_scope(filename=file.filename):
+                upload = await SpooledUpload.from_upload(file, max_bytes=MAX_OCR_UPLOAD_BYTES)
+                with upload:
+                    result = await pipeline.auto_ocr(
+                        file_data=upload,
+                        filename=file.filename,
+                        language_hint=language_hint,  # type: ignore
+                    )
             
             results.append(result)
             
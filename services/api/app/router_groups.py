@@ -0,0 +1,156 @@
+"""
+Groupes de routers montés selon ROUTER_GROUPS
+
+Chaque router appartient à un groupe fonctionnel (rag, ocr, voice...). Seuls
+les groupes activés sont importés: un déploiement RAG seul ne charge ni
+Coqui/torch, ni pdf2image, ni les SDK des assistants.
+
+    ROUTER_GROUPS=all              # défaut: tous les groupes
+    ROUTER_GROUPS=rag,ocr          # "core" est toujours monté
+
+Profil du coût d'import par groupe: python -m app.startup_profile
+"""
+import time
+import logging
+import importlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+CORE_GROUP = "core"
+
+
+@dataclass(frozen=True)
+class RouterMount:
+    """Router à inclure: module (relatif à app), attribut et options include_router"""
+    module: str
+    group: str
+    tags: Tuple[str, ...]
+    attr: str = "router"
+    prefix: str = ""
+
+
+# Ordre d'inclusion = ordre historique de main.py (priorité des routes)
+ROUTER_MOUNTS: Tuple[RouterMount, ...] = (
+    RouterMount("routers.auth", "core", ("Auth",)),  # Auth routes (no prefix - already has /api/auth)
+    RouterMount("routers.test", "core", ("Test",), prefix="/api"),
+    RouterMount("routers.upload", "rag", ("Upload",), prefix="/api"),
+    RouterMount("routers.query", "rag", ("Query",), prefix="/api"),
+    RouterMount("routers.knowledge", "rag", ("Knowledge",)),
+    RouterMount("routers.progress", "core", ("Progress",)),
+    RouterMount("routers.bmad", "bmad", ("BMAD",)),
+    RouterMount("routers.bmad_chat", "bmad", ("BMAD Chat",)),
+    RouterMount("routers.bmad_orchestration", "bmad", ("BMAD Orchestration",)),
+    RouterMount("routers.coordination", "bmad", ("Coordination",)),
+    RouterMount("routers.orchestrator", "bmad", ("Orchestrator",)),
+    RouterMount("routers.bolt", "bmad", ("Bolt SuperPower",)),
+    RouterMount("routers.agent_chat", "bmad", ("Agent Chat",)),  # Compatibilité Archon-UI
+    RouterMount("routers.calendar", "assistants", ("Calendar",)),  # Gestion des rendez-vous
+    RouterMount("routers.voice", "assistants", ("Voice Agent",)),  # Agent vocal Vapi.ai
+    RouterMount("routers.google", "assistants", ("Google Integration",)),  # Google Calendar & Gmail
+    RouterMount("routers.email_agent", "assistants", ("Email Agent",)),  # Agent Email (6ème agent)
+    RouterMount("routers.twilio", "assistants", ("Twilio SMS",)),  # SMS et rappels Twilio
+    RouterMount("routers.whatsapp", "assistants", ("WhatsApp",)),  # WhatsApp Business via Twilio
+    RouterMount("routers.user_keys", "core", ("User Keys",)),  # Gestion clés API (Key Reselling)
+    RouterMount("routers.studio_video", "media", ("Creative Studio",)),  # Studio Creatif (Video/Image/Presentation)
+    RouterMount("routers.rag_public", "rag", ("RAG Public",)),  # RAG API publique pour Bolt
+    RouterMount("routers.credentials", "core", ("Credentials",)),  # Gestion des credentials AI providers
+    RouterMount("routers.council", "llm", ("Council",)),  # LLM Council - Multi-AI deliberation
+    RouterMount("routers.council_custom", "llm", ("Council Custom",)),  # Council personnalisable
+    RouterMount("routers.ithy", "llm", ("Ithy MoA",)),  # Mixture-of-Agents research assistant
+    RouterMount("routers.billing", "business", ("Billing",)),  # Gestion crédits et facturation
+    RouterMount("routers.crm", "business", ("CRM",)),  # Gestion des leads
+    RouterMount("routers.pme", "business", ("PME Copilot",)),  # Analyse PME DZ (v1)
+    RouterMount("routers.pme_v2", "business", ("PME Analyzer PRO V2",)),  # Analyse PME DZ PRO
+    RouterMount("routers.billing_v2", "business", ("Billing PRO V2",)),  # Gestion crédits SaaS PRO
+    RouterMount("routers.crm_pro", "business", ("CRM PRO",)),  # CRM HubSpot-like DZ/CH powered by IA
+    RouterMount("bigrag", "rag", ("BIG RAG Multi-Pays",), attr="bigrag_router"),  # RAG Multi-Pays DZ/CH/GLOBAL
+    RouterMount("bigrag_ingest", "rag", ("BigRAG Ingest",), attr="ingest_router"),  # Ingestion documents RAG
+    RouterMount("ocr", "ocr", ("OCR Multilingue DZ",), attr="ocr_router"),  # OCR arabe/français/anglais
+    RouterMount("darija", "darija", ("Darija NLP",), attr="darija_router"),  # NLP Darija algérienne
+    RouterMount("voice.stt_router", "voice", ("STT Voice DZ",)),  # Speech-to-Text arabe/darija
+    RouterMount("voice.tts_router", "voice", ("TTS Voice DZ",)),  # Text-to-Speech arabe/darija
+    RouterMount("voice.voice_agent_router", "voice", ("Voice Agent DZ",)),  # Agent vocal complet
+    RouterMount("multi_llm", "llm", ("Multi-LLM",), attr="multi_llm_router"),  # Multi-providers IA + Crédit Manager
+    RouterMount("team_seats", "business", ("Team Seats",), attr="team_seats_router"),  # ChatGPT Team Seats Manager
+    RouterMount("routers.dzirvideo", "media", ("Dzir IA Video",), prefix="/api"),  # Dzir IA Video - Génération vidéo IA
+    RouterMount("routers.growth_grid", "business", ("Growth Grid",)),  # Business Plan Generator IA
+    RouterMount("routers.notebook_lm", "rag", ("Notebook LM",)),  # Document Q&A avec RAG
+    RouterMount("routers.prompt_creator", "llm", ("Prompt Creator",)),  # Générateur de prompts pro
+    RouterMount("routers.promo_codes", "business", ("Promo Codes",)),  # Codes promo lancement 30 clients
+    RouterMount("routers.agents", "llm", ("IA Factory Agents",)),  # 7 Agents IA Pro
+    RouterMount("routers.tenants", "core", ("Tenants",)),  # Multi-Tenant Management
+    RouterMount("routers.websocket_router", "core", ("WebSocket",)),
+)
+
+ROUTER_GROUPS: Tuple[str, ...] = tuple(dict.fromkeys(mount.group for mount in ROUTER_MOUNTS))
+
+
+@dataclass
+class GroupLoadStats:
+    """Temps d'import et d'inclusion d'un groupe"""
+    group: str
+    routers: int = 0
+    duration_ms: float = 0.0
+    modules: List[str] = field(default_factory=list)
+
+
+def parse_router_groups(value: str) -> List[str]:
+    """
+    Groupes activés depuis ROUTER_GROUPS ("all" ou liste séparée par des virgules)
+
+    Raises:
+        ValueError: Groupe inconnu
+    """
+    requested = [name.strip().lower() for name in (value or "all").split(",") if name.strip()]
+    if not requested or "all" in requested:
+        return list(ROUTER_GROUPS)
+
+    unknown = sorted(set(requested) - set(ROUTER_GROUPS))
+    if unknown:
+        raise ValueError(f"Groupes de routers inconnus: {', '.join(unknown)} (disponibles: {', '.join(ROUTER_GROUPS)})")
+
+    enabled = set(requested) | {CORE_GROUP}
+    return [group for group in ROUTER_GROUPS if group in enabled]
+
+
+def mounts_for(groups: List[str]) -> List[RouterMount]:
+    """Routers des groupes donnés, dans l'ordre d'inclusion"""
+    return [mount for mount in ROUTER_MOUNTS if mount.group in groups]
+
+
+def load_router(mount: RouterMount):
+    """Importe le module du router et retourne l'APIRouter"""
+    module = importlib.import_module(f".{mount.module}", __package__)
+    return getattr(module, mount.attr)
+
+
+def include_router_groups(app: FastAPI, groups: List[str]) -> Dict[str, GroupLoadStats]:
+    """
+    Importe et inclut les routers des groupes activés
+
+    Returns:
+        Statistiques par groupe (temps d'import + inclusion)
+    """
+    stats = {group: GroupLoadStats(group) for group in groups}
+
+    for mount in mounts_for(groups):
+        started = time.perf_counter()
+        router = load_router(mount)
+        app.include_router(router, prefix=mount.prefix, tags=list(mount.tags))
+
+        group_stats = stats[mount.group]
+        group_stats.routers += 1
+        group_stats.duration_ms += (time.perf_counter() - started) * 1000
+        group_stats.modules.append(mount.module)
+
+    skipped = [group for group in ROUTER_GROUPS if group not in groups]
+    logger.info(
+        "Router groups: "
+        + ", ".join(f"{s.group} ({s.routers} routers, {s.duration_ms:.0f} ms)" for s in stats.values())
+        + (f" | non montés: {', '.join(skipped)}" if skipped else "")
+    )
+    return stats
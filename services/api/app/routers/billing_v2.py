@@ -4,6 +4,7 @@ Billing PRO - Router FastAPI
 Endpoints complets pour gestion des crédits SaaS
 """
 
+import asyncio
 from datetime import datetime
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query, Request, Header, BackgroundTasks
@@ -65,7 +66,7 @@ async def get_credits(
     - Quota mensuel et usage
     - Alertes (solde bas, quota atteint)
     """
-    return billing_service.get_credits_response(user_id)
+    return await asyncio.to_thread(billing_service.get_credits_response, user_id)
 
 
 @router.get("/credits/check")
@@ -83,7 +84,7 @@ async def check_can_consume(
     except ValueError:
         raise HTTPException(status_code=400, detail=f"Service invalide: {service}")
     
-    can_consume, cost, available = billing_service.can_consume(user_id, service_type)
+    can_consume, cost, available = await asyncio.to_thread(billing_service.can_consume, user_id, service_type)
     
     return {
         "can_consume": can_consume,
@@ -118,12 +119,14 @@ async def consume_credits(
     if not request:
         raise HTTPException(status_code=400, detail="Request body required")
     
-    result = billing_service.consume_credits(
+    result = await asyncio.to_thread(
+        billing_service.consume_credits,
         user_id=user_id,
         service_type=request.service_type,
         service_reference=request.service_reference,
         credits_override=request.credits_override,
         metadata=request.metadata,
+        idempotency_key=request.idempotency_key,
     )
     
     if not result.success:
@@ -158,20 +161,18 @@ async def add_credits_manual(
     if not request or request.credits <= 0:
         raise HTTPException(status_code=400, detail="Credits must be positive")
     
-    credits = billing_service.get_or_create_user_credits(user_id)
-    credits.balance += request.credits
-    
-    billing_service._record_transaction(
-        user_id=user_id,
+    result = await asyncio.to_thread(
+        billing_service.add_credits,
+        user_id,
+        request.credits,
         type=TransactionType.ADJUSTMENT,
-        credits_amount=request.credits,
         description=f"Ajustement manuel: {request.reason}",
     )
     
     return {
         "success": True,
         "credits_added": request.credits,
-        "new_balance": credits.total_available,
+        "new_balance": result.balance_after,
         "reason": request.reason,
     }
 
@@ -271,7 +272,8 @@ async def upgrade_plan(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
-    result = billing_service.upgrade_plan(
+    result = await asyncio.to_thread(
+        billing_service.upgrade_plan,
         user_id=user_id,
         new_plan=plan_type,
         billing_cycle=billing_cycle,
@@ -291,7 +293,7 @@ async def cancel_plan(user_id: str = Query(...)):
     
     L'abonnement reste actif jusqu'à la fin de la période payée.
     """
-    success = billing_service.cancel_subscription(user_id)
+    success = await asyncio.to_thread(billing_service.cancel_subscription, user_id)
     
     if not success:
         raise HTTPException(status_code=404, detail="Aucun abonnement actif trouvé")
@@ -347,7 +349,8 @@ async def purchase_credits(
     if not request.package_id and not request.credits_amount:
         raise HTTPException(status_code=400, detail="package_id ou credits_amount requis")
     
-    result = billing_service.create_purchase(
+    result = await asyncio.to_thread(
+        billing_service.create_purchase,
         user_id=user_id,
         package_id=request.package_id,
         custom_credits=request.credits_amount,
@@ -398,7 +401,7 @@ async def get_usage(
     """
     📊 Statistiques d'utilisation
     """
-    return billing_service.get_usage_stats(user_id, period)
+    return await asyncio.to_thread(billing_service.get_usage_stats, user_id, period)
 
 
 @router.get("/transactions")
@@ -418,7 +421,8 @@ async def get_transactions(
         except ValueError:
             pass
     
-    transactions = billing_service.get_transaction_history(
+    transactions = await asyncio.to_thread(
+        billing_service.get_transaction_history,
         user_id=user_id,
         limit=limit,
         offset=offset,
@@ -571,7 +575,7 @@ async def admin_reset_monthly(
     if x_admin_key != "admin-secret-key-2025":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    success = billing_service.reset_monthly_credits(user_id)
+    success = await asyncio.to_thread(billing_service.reset_monthly_credits, user_id)
     
     if not success:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
@@ -589,11 +593,12 @@ async def admin_stats(
     if x_admin_key != "admin-secret-key-2025":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    from ..services.billing_service import users_credits, transactions, purchases
+    from ..services.billing_service import users_credits, purchases
     
-    total_users = len(users_credits)
-    total_credits = sum(u.total_available for u in users_credits.values())
-    total_transactions = len(transactions)
+    ledger_stats = await asyncio.to_thread(billing_service.ledger.stats)
+    total_users = ledger_stats["accounts"]
+    total_credits = ledger_stats["credits_in_circulation"]
+    total_transactions = ledger_stats["transactions"]
     total_purchases = len([p for p in purchases.values() if p.payment_status.value == "completed"])
     
     plan_distribution = {}
@@ -619,14 +624,14 @@ async def health_check():
     """
     🏥 Vérifier l'état du service Billing
     """
-    from ..services.billing_service import users_credits, transactions
+    ledger_stats = await asyncio.to_thread(billing_service.ledger.stats)
     
     return {
         "status": "healthy",
         "service": "Billing PRO V2",
         "version": "2.0.0",
-        "users_count": len(users_credits),
-        "transactions_count": len(transactions),
+        "users_count": ledger_stats["accounts"],
+        "transactions_count": ledger_stats["transactions"],
         "features": [
             "credits_management",
             "subscription_plans",
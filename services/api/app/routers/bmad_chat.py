@@ -14,7 +14,6 @@ from datetime import datetime
 
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from openai import OpenAI
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +32,8 @@ def get_llm_client():
     """Lazy load LLM client based on LLM_PROVIDER env var"""
     global llm_client, llm_model
     if llm_client is None:
+        from openai import OpenAI
+
         provider = os.getenv("LLM_PROVIDER", "groq").lower()
 
         if provider == "groq":
@@ -6,7 +6,7 @@ import logging
 import asyncio
 from typing import Optional
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Header
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 import os
 
 from app.models.bolt_workflow import (
@@ -212,6 +212,7 @@ async def export_workflow_zip(
     - include_docs: Inclure la documentation (ARCHITECTURE.md, etc.)
     - include_tests: Inclure les tests
     - include_deployment: Inclure les configs de déploiement
+    - stream: Streamer l'archive pendant sa construction (aucun fichier écrit)
 
     Le ZIP est créé à la volée et retourné immédiatement.
     """
@@ -231,6 +232,22 @@ async def export_workflow_zip(
                 detail=f"Workflow is not completed yet. Current status: {workflow['status']}"
             )
 
+        zip_headers = {
+            "Content-Disposition": f'attachment; filename="project-{workflow_id}.zip"'
+        }
+
+        # Archive construite et envoyée en flux
+        if request.stream:
+            return StreamingResponse(
+                zip_service.stream_project_zip(
+                    include_docs=request.include_docs,
+                    include_tests=request.include_tests,
+                    include_deployment=request.include_deployment
+                ),
+                media_type="application/zip",
+                headers=zip_headers
+            )
+
         # Générer le ZIP si nécessaire
         if not workflow["zip_file_path"] or not os.path.exists(workflow["zip_file_path"]):
             logger.info(f"Generating ZIP for workflow {workflow_id}")
@@ -254,9 +271,7 @@ async def export_workflow_zip(
             path=zip_path,
             media_type="application/zip",
             filename=f"project-{workflow_id}.zip",
-            headers={
-                "Content-Disposition": f'attachment; filename="project-{workflow_id}.zip"'
-            }
+            headers=zip_headers
         )
 
     except HTTPException:
@@ -2,19 +2,22 @@ from fastapi import APIRouter, Request, UploadFile, File, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
 import time
-import uuid
 import logging
 
 from ..clients.embeddings import embed_documents
-from ..clients.qdrant_client import create_collection, client as qdrant_client
-from ..clients.document_parser import DocumentParser
+from ..clients.qdrant_client import create_collection, delete_stale_points, client as qdrant_client
+from ..clients.document_parser import DocumentStream
 from ..clients.hybrid_search import HybridSearchEngine
+from ..ingest_pipeline import EmbeddingError, embed_document
+from ..uploads import SpooledUpload, UploadTooLarge, upload_scope
 from qdrant_client.http import models as qm
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 search_engine = HybridSearchEngine()
 
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
 @router.post("/upload")
 async def upload_document(file: UploadFile = File(...), req: Request = None):
     """Upload et indexation de document avec parsing avancé"""
@@ -30,61 +33,59 @@ async def upload_document(file: UploadFile = File(...), req: Request = None):
     if file_extension not in allowed_extensions:
         raise HTTPException(400, f"Type de fichier non supporté. Autorisés: {', '.join(allowed_extensions)}")
     
-    try:
-        file_content = await file.read()
-        if len(file_content) == 0:
-            raise HTTPException(400, "Fichier vide")
-        
-        if len(file_content) > 10 * 1024 * 1024:
+    # Upload spoolé (mémoire sous le seuil, disque au-delà), haché à la lecture,
+    # parsé sans copie; le span "upload" porte le pic mémoire de la requête
+    with upload_scope(filename=file.filename) as memory:
+        try:
+            upload = await SpooledUpload.from_upload(file, max_bytes=MAX_UPLOAD_BYTES)
+        except UploadTooLarge:
             raise HTTPException(400, "Fichier trop volumineux (max 10MB)")
+        except Exception as e:
+            logger.error(f"File reading error: {e}")
+            raise HTTPException(500, "Erreur lors de la lecture du fichier")
         
-    except Exception as e:
-        logger.error(f"File reading error: {e}")
-        raise HTTPException(500, "Erreur lors de la lecture du fichier")
+        with upload:
+            if upload.size == 0:
+                raise HTTPException(400, "Fichier vide")
+            
+            # Pages lues, découpées et embeddées au fil de l'eau: le premier lot
+            # de chunks est embeddé pendant que les pages suivantes sont parsées
+            try:
+                document = DocumentStream(file.filename, upload)
+                chunks, embeddings, stats = await embed_document(document, embed_documents)
+            except ValueError as e:
+                raise HTTPException(400, str(e))
+            except EmbeddingError as e:
+                logger.error(f"Embedding generation error: {e}")
+                raise HTTPException(500, "Erreur lors de la génération des embeddings")
+            except Exception as e:
+                logger.error(f"Document parsing error: {e}")
+                raise HTTPException(500, "Erreur lors du parsing du document")
     
-    try:
-        parsed_doc = DocumentParser.parse_file(file.filename, file_content)
-    except ValueError as e:
-        raise HTTPException(400, str(e))
-    except Exception as e:
-        logger.error(f"Document parsing error: {e}")
-        raise HTTPException(500, "Erreur lors du parsing du document")
+    if not chunks:
+        raise HTTPException(400, "Aucun contenu textuel extractible du fichier")
     
+    language = document.language
     create_collection(collection_name)
     
-    documents = []
     chunk_metadatas = []
     
-    for i, chunk in enumerate(parsed_doc['chunks']):
-        doc_id = str(uuid.uuid4())
-        doc_title = f"{parsed_doc['filename']} - Partie {i+1}"
+    for chunk in chunks:
+        # ID stable (fichier + contenu): un ré-upload remplace au lieu de dupliquer
+        doc_title = f"{document.filename} - Partie {chunk.index + 1}"
         
         chunk_metadatas.append({
-            'id': doc_id,
+            'id': chunk.id,
             'title': doc_title,
-            'text': chunk,
-            'language': parsed_doc['language'],
+            'text': chunk.text,
+            'language': language,
             'tenant_id': tenant['id'],
-            'filename': parsed_doc['filename'],
-            'extension': parsed_doc['extension'],
-            'chunk_index': i,
+            'filename': document.filename,
+            'extension': document.extension,
+            'chunk_index': chunk.index,
             'created_at': time.time()
         })
     
-    if not chunk_metadatas:
-        raise HTTPException(400, "Aucun contenu textuel extractible du fichier")
-    
-    try:
-        texts = [meta['text'] for meta in chunk_metadatas]
-        embeddings = embed_documents(texts)
-        
-        if len(embeddings) != len(chunk_metadatas):
-            raise HTTPException(500, "Erreur de génération des embeddings")
-            
-    except Exception as e:
-        logger.error(f"Embedding generation error: {e}")
-        raise HTTPException(500, "Erreur lors de la génération des embeddings")
-    
     try:
         points = []
         for embedding, metadata in zip(embeddings, chunk_metadatas):
@@ -95,6 +96,10 @@ async def upload_document(file: UploadFile = File(...), req: Request = None):
             ))
         
         qdrant_client.upsert(collection_name=collection_name, points=points)
+        # Chunks de l'upload précédent du même fichier absents de cette version
+        stale_ids = delete_stale_points(
+            collection_name, "filename", document.filename, [meta['id'] for meta in chunk_metadatas]
+        )
         
     except Exception as e:
         logger.error(f"Qdrant indexing error: {e}")
@@ -115,6 +120,8 @@ async def upload_document(file: UploadFile = File(...), req: Request = None):
         ]
         
         search_engine.add_to_meilisearch(collection_name, meili_docs)
+        if stale_ids:
+            search_engine.delete_from_meilisearch(collection_name, stale_ids)
         
     except Exception as e:
         logger.warning(f"Meilisearch indexing warning: {e}")
@@ -122,9 +129,13 @@ async def upload_document(file: UploadFile = File(...), req: Request = None):
     return {
         'success': True,
         'file_name': file.filename,
-        'file_size_bytes': len(file_content),
-        'language_detected': parsed_doc['language'],
-        'total_chunks': len(parsed_doc['chunks']),
+        'file_size_bytes': upload.size,
+        'sha256': upload.sha256,
+        'upload_memory': memory.as_dict(),
+        'language_detected': language,
+        'total_pages': document.pages,
+        'total_chunks': len(chunks),
         'documents_indexed': len(chunk_metadatas),
-        'collection': collection_name
+        'collection': collection_name,
+        'pipeline': stats.as_dict()
     }
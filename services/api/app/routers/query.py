@@ -75,7 +75,8 @@ async def search_documents(request: QueryRequest, req: Request):
             answer = llm_client.generate_rag_answer(
                 query=request.query,
                 context_chunks=results,
-                language=language
+                language=language,
+                tenant_id=tenant['id']
             )
         else:
             # Fallback basique
@@ -1,11 +1,14 @@
 from fastapi import APIRouter, UploadFile, File, Request
-import uuid
+from ..chunking import get_chunker
 from ..clients.embeddings import embed_documents
-from ..clients.qdrant_client import create_collection, client as qdrant_client
+from ..clients.qdrant_client import create_collection, delete_stale_points, client as qdrant_client
 from qdrant_client.http import models as qm
 
 router = APIRouter()
 
+# Un fichier texte est indexé dès 21 caractères utiles (même seuil qu'avant le chunker commun)
+UPLOAD_MIN_CHARS = 21
+
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...), req: Request = None):
     tenant = req.state.tenant
@@ -17,21 +20,9 @@ async def upload_file(file: UploadFile = File(...), req: Request = None):
     content = await file.read()
     text_content = content.decode('utf-8', errors='ignore')
     
-    # Chunking plus flexible - essayer plusieurs séparateurs
-    chunks = []
-    
-    # Essayer d'abord par double retour
-    if '\n\n' in text_content:
-        chunks = [chunk.strip() for chunk in text_content.split('\n\n') if chunk.strip()]
-    # Sinon par retour simple
-    elif '\n' in text_content:
-        chunks = [chunk.strip() for chunk in text_content.split('\n') if chunk.strip()]
-    # Sinon prendre tout le contenu
-    else:
-        chunks = [text_content.strip()] if text_content.strip() else []
-    
-    # Filtrer chunks trop courts
-    chunks = [chunk for chunk in chunks if len(chunk) > 20]  # Seuil réduit
+    # Chunking commun (tokens, fins de phrase, IDs stables)
+    chunk_items = list(get_chunker(UPLOAD_MIN_CHARS).stream([text_content], namespace=file.filename or ""))
+    chunks = [chunk.text for chunk in chunk_items]
     
     if not chunks:
         return {"error": "No valid content found in file", "raw_content": text_content[:200]}
@@ -43,17 +34,19 @@ async def upload_file(file: UploadFile = File(...), req: Request = None):
     points = []
     for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
         points.append(qm.PointStruct(
-            id=str(uuid.uuid4()),
+            id=chunk_items[i].id,
             vector=embedding,
             payload={
                 "title": f"{file.filename} - Part {i+1}",
                 "text": chunk,
-                "tenant_id": tenant["id"]
+                "tenant_id": tenant["id"],
+                "filename": file.filename or ""
             }
         ))
     
-    # Insérer dans Qdrant
+    # Insérer dans Qdrant, puis retirer les chunks de l'upload précédent du même fichier
     qdrant_client.upsert(collection_name=collection_name, points=points)
+    delete_stale_points(collection_name, "filename", file.filename or "", [item.id for item in chunk_items])
     
     return {
         "success": True,
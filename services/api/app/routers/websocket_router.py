@@ -8,7 +8,8 @@ from ..db import get_tenant_by_key
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# Stop send writers and the Redis subscriber on app shutdown
+router = APIRouter(on_shutdown=[manager.close])
 
 
 @router.websocket("/ws")
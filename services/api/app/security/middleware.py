@@ -91,12 +91,81 @@ class RateLimiter:
 rate_limiter = RateLimiter()
 
 
+# Routes sans authentification ni rate limiting
+PUBLIC_ROUTES = ("/health", "/metrics", "/docs", "/openapi.json", "/")
+
+# Allow frontend access without auth for essential endpoints
+PUBLIC_API_PREFIXES = (
+    "/api/bmad",
+    "/api/dzirvideo",
+    "/api/agent-chat",
+    "/api/credentials",  # AI models & API keys
+    "/api/query",        # RAG queries
+    "/api/upload",       # File uploads
+    "/api/knowledge",    # Knowledge base
+    "/api/progress",     # Progress tracking
+    "/api/test",         # Test endpoints
+    "/api/websocket"     # WebSocket
+)
+
+SECURITY_HEADERS = {
+    "X-Content-Type-Options": "nosniff",
+    "X-Frame-Options": "DENY",
+    "X-XSS-Protection": "1; mode=block",
+    "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+}
+
+
+def is_auth_exempt(path: str) -> bool:
+    """Routes publiques et préfixes API ouverts au frontend"""
+    return path in PUBLIC_ROUTES or path.startswith(PUBLIC_API_PREFIXES)
+
+
+def extract_api_key(headers) -> str:
+    """API key depuis X-API-Key ou Authorization: Bearer"""
+    return headers.get("X-API-Key") or headers.get("Authorization", "").replace("Bearer ", "")
+
+
+def resolve_api_key(api_key: str) -> Optional[dict]:
+    """Tenant associé à l'API key (API_SECRET_KEY = tenant de développement)"""
+    if api_key == settings.api_secret_key:
+        return {"id": "dev", "name": "Development", "plan": "enterprise"}
+    return get_tenant_by_key(api_key)
+
+
+def requires_upgrade(tenant: dict, path: str) -> bool:
+    """Endpoints premium refusés au plan free"""
+    return tenant.get("id") != "dev" and tenant.get("plan") == "free" and path.startswith("/api/premium")
+
+
+def rate_limit_headers(identifier: str) -> Dict[str, str]:
+    """Headers X-RateLimit-* pour l'identifiant"""
+    stats = rate_limiter.get_usage_stats(identifier)
+    return {
+        "X-RateLimit-Limit": str(settings.rate_limit_per_minute),
+        "X-RateLimit-Remaining": str(stats["minute_remaining"]),
+        "X-RateLimit-Reset": str(int(time.time()) + 60),
+    }
+
+
+def rate_limit_response(retry_after: Optional[int]) -> JSONResponse:
+    return JSONResponse(
+        {
+            "error": "Rate limit exceeded",
+            "retry_after": retry_after,
+            "message": f"Too many requests. Please retry after {retry_after} seconds."
+        },
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(retry_after)}
+    )
+
+
 class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware de rate limiting"""
+    """Middleware de rate limiting (remplacé par RequestPipelineMiddleware dans main.py)"""
 
     async def dispatch(self, request: Request, call_next):
         # Skip pour routes publiques
-        if request.url.path in ["/health", "/metrics", "/docs", "/openapi.json", "/"]:
+        if request.url.path in PUBLIC_ROUTES:
             return await call_next(request)
 
         # Identifier (IP + tenant)
@@ -109,22 +178,11 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
 
         if not is_allowed:
             logger.warning(f"Rate limit exceeded for {identifier}")
-            return JSONResponse(
-                {
-                    "error": "Rate limit exceeded",
-                    "retry_after": retry_after,
-                    "message": f"Too many requests. Please retry after {retry_after} seconds."
-                },
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                headers={"Retry-After": str(retry_after)}
-            )
+            return rate_limit_response(retry_after)
 
         # Ajouter headers de rate limit
         response = await call_next(request)
-        stats = rate_limiter.get_usage_stats(identifier)
-        response.headers["X-RateLimit-Limit"] = str(settings.rate_limit_per_minute)
-        response.headers["X-RateLimit-Remaining"] = str(stats["minute_remaining"])
-        response.headers["X-RateLimit-Reset"] = str(int(time.time()) + 60)
+        response.headers.update(rate_limit_headers(identifier))
 
         return response
 
@@ -135,6 +193,8 @@ class EnhancedAuthMiddleware(BaseHTTPMiddleware):
     - Validation tenant
     - Logging sécurisé
     - Headers de sécurité
+
+    Remplacé par RequestPipelineMiddleware dans main.py.
     """
 
     async def dispatch(self, request: Request, call_next):
@@ -142,31 +202,12 @@ class EnhancedAuthMiddleware(BaseHTTPMiddleware):
         if request.method == "OPTIONS":
             return await call_next(request)
 
-        # Routes publiques
-        public_routes = ["/health", "/metrics", "/docs", "/openapi.json", "/"]
-        # Allow frontend access without auth for essential endpoints
-        public_api_prefixes = [
-            "/api/bmad",
-            "/api/dzirvideo",
-            "/api/agent-chat",
-            "/api/credentials",  # AI models & API keys
-            "/api/query",        # RAG queries
-            "/api/upload",       # File uploads
-            "/api/knowledge",    # Knowledge base
-            "/api/progress",     # Progress tracking
-            "/api/test",         # Test endpoints
-            "/api/websocket"     # WebSocket
-        ]
-
-        if request.url.path in public_routes or any(request.url.path.startswith(prefix) for prefix in public_api_prefixes):
+        if is_auth_exempt(request.url.path):
             return await call_next(request)
 
         # Vérifier API key si activé
         if settings.enable_api_key_auth:
-            api_key = (
-                request.headers.get("X-API-Key") or
-                request.headers.get("Authorization", "").replace("Bearer ", "")
-            )
+            api_key = extract_api_key(request.headers)
 
             if not api_key:
                 logger.warning(f"Missing API key from {request.client.host if request.client else 'unknown'}")
@@ -175,35 +216,26 @@ class EnhancedAuthMiddleware(BaseHTTPMiddleware):
                     status_code=status.HTTP_401_UNAUTHORIZED
                 )
 
-            # Dev bypass: accept API_SECRET_KEY directly
-            if api_key == settings.api_secret_key:
-                request.state.tenant = {"id": "dev", "name": "Development", "plan": "enterprise"}
-            else:
-                tenant = get_tenant_by_key(api_key)
-                if not tenant:
-                    logger.warning(f"Invalid API key attempt from {request.client.host if request.client else 'unknown'}")
-                    return JSONResponse(
-                        {"error": "Invalid API key"},
-                        status_code=status.HTTP_401_UNAUTHORIZED
-                    )
-                request.state.tenant = tenant
-
-            # Vérifier statut tenant (only if not dev tenant)
-            if request.state.tenant.get("id") != "dev":
-                if request.state.tenant.get("plan") == "free" and request.url.path.startswith("/api/premium"):
-                    return JSONResponse(
-                        {"error": "Upgrade required", "message": "This endpoint requires a Pro or Enterprise plan"},
-                        status_code=status.HTTP_403_FORBIDDEN
-                    )
+            tenant = resolve_api_key(api_key)
+            if not tenant:
+                logger.warning(f"Invalid API key attempt from {request.client.host if request.client else 'unknown'}")
+                return JSONResponse(
+                    {"error": "Invalid API key"},
+                    status_code=status.HTTP_401_UNAUTHORIZED
+                )
+            request.state.tenant = tenant
+
+            if requires_upgrade(tenant, request.url.path):
+                return JSONResponse(
+                    {"error": "Upgrade required", "message": "This endpoint requires a Pro or Enterprise plan"},
+                    status_code=status.HTTP_403_FORBIDDEN
+                )
 
         # Continuer avec la requête
         response = await call_next(request)
 
         # Ajouter headers de sécurité
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
+        response.headers.update(SECURITY_HEADERS)
 
         return response
 
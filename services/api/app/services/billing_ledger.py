@@ -0,0 +1,531 @@
+"""
+Billing Ledger - Persistance des crédits
+========================================
+Ledger append-only des transactions + solde matérialisé mis à jour par
+UPDATE conditionnel atomique. Partagé entre workers uvicorn et persistant
+entre redémarrages (PostgreSQL en production, SQLite en développement).
+
+Les méthodes sont synchrones (connexions prises dans un pool psycopg_pool
+en PostgreSQL): depuis du code async, les appeler via asyncio.to_thread.
+"""
+
+import os
+import json
+import uuid
+import atexit
+import sqlite3
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# Schéma SQLite (PostgreSQL: migrations/013_billing_ledger.sql)
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS billing_credit_accounts (
+    user_id TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 0 CHECK (balance >= 0),
+    bonus_balance INTEGER NOT NULL DEFAULT 0 CHECK (bonus_balance >= 0),
+    monthly_used INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS billing_transactions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    credits_amount INTEGER NOT NULL,
+    balance_before INTEGER NOT NULL,
+    balance_after INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    service_type TEXT,
+    service_reference TEXT,
+    price_amount NUMERIC,
+    payment_provider TEXT,
+    external_payment_id TEXT,
+    idempotency_key TEXT,
+    metadata TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL,
+    UNIQUE (user_id, idempotency_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_billing_txn_user_created
+    ON billing_transactions (user_id, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS billing_daily_usage (
+    user_id TEXT NOT NULL,
+    usage_date TEXT NOT NULL,
+    rag_queries INTEGER NOT NULL DEFAULT 0,
+    pme_quick INTEGER NOT NULL DEFAULT 0,
+    pme_full INTEGER NOT NULL DEFAULT 0,
+    fiscal_simulations INTEGER NOT NULL DEFAULT 0,
+    creative_generations INTEGER NOT NULL DEFAULT 0,
+    voice_minutes INTEGER NOT NULL DEFAULT 0,
+    emails_sent INTEGER NOT NULL DEFAULT 0,
+    total_requests INTEGER NOT NULL DEFAULT 0,
+    total_credits_used INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, usage_date)
+);
+"""
+
+TRANSACTION_COLUMNS = (
+    "id", "user_id", "type", "credits_amount", "balance_before", "balance_after",
+    "description", "service_type", "service_reference", "price_amount",
+    "payment_provider", "external_payment_id", "idempotency_key", "metadata", "created_at",
+)
+
+USAGE_COUNTERS = (
+    "rag_queries", "pme_quick", "pme_full", "fiscal_simulations",
+    "creative_generations", "voice_minutes", "emails_sent",
+    "total_requests", "total_credits_used",
+)
+
+
+@dataclass
+class LedgerResult:
+    """Résultat d'une écriture dans le ledger"""
+    success: bool
+    transaction_id: Optional[str]
+    balance_before: int
+    balance_after: int
+    balance: int = 0
+    bonus_balance: int = 0
+    monthly_used: int = 0
+    duplicate: bool = False
+
+
+class _DuplicateTransaction(Exception):
+    """Clé d'idempotence déjà utilisée: la transaction SQL est annulée"""
+
+
+class CreditLedger:
+    """
+    Ledger de crédits
+
+    - billing_transactions: journal append-only, clé d'idempotence unique par utilisateur
+    - billing_credit_accounts: solde matérialisé, débité par un UPDATE conditionnel
+      (WHERE balance + bonus_balance >= cost) - jamais de read-modify-write côté Python
+    """
+
+    def __init__(self, url: str, pool_size: int = 10):
+        self.url = url
+        self.is_sqlite = url.startswith("sqlite")
+        self.pool_size = pool_size
+        self._local = threading.local()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+        if self.is_sqlite:
+            self.sqlite_path = url.split(":///", 1)[-1]
+            os.makedirs(os.path.dirname(os.path.abspath(self.sqlite_path)), exist_ok=True)
+            with self._sqlite_connection() as conn:
+                conn.executescript(SQLITE_SCHEMA)
+
+    # ========================================
+    # Connexions
+    # ========================================
+
+    def _sqlite_connection(self) -> sqlite3.Connection:
+        """Connexion SQLite par thread (autocommit, transactions explicites)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.sqlite_path, timeout=30, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _pg_pool(self):
+        """Pool de connexions PostgreSQL partagé par les threads (ouvert au premier usage)"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    from psycopg_pool import ConnectionPool
+                    self._pool = ConnectionPool(self.url, min_size=1, max_size=self.pool_size, open=True)
+        return self._pool
+
+    def close(self) -> None:
+        """Ferme le pool PostgreSQL (arrêt de l'application)"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def _sql(self, query: str) -> str:
+        """Requêtes écrites avec %s (psycopg), converties pour SQLite"""
+        return query.replace("%s", "?") if self.is_sqlite else query
+
+    def _now(self) -> Any:
+        now = datetime.now()
+        return now.isoformat() if self.is_sqlite else now
+
+    @contextmanager
+    def _transaction(self) -> Iterator[Any]:
+        """Transaction SQL; rollback automatique sur exception"""
+        if self.is_sqlite:
+            conn = self._sqlite_connection()
+            # IMMEDIATE: verrou d'écriture pris dès le début, pas d'upgrade en deadlock
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn.cursor()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        else:
+            # Commit en sortie du bloc, rollback sur exception; la connexion retourne au pool
+            with self._pg_pool().connection() as conn:
+                with conn.cursor() as cur:
+                    yield cur
+
+    # ========================================
+    # Comptes
+    # ========================================
+
+    def open_account(self, user_id: str, balance: int, description: str) -> Dict[str, int]:
+        """Créer le compte s'il n'existe pas (idempotent), avec transaction de bienvenue"""
+        now = self._now()
+        with self._transaction() as cur:
+            cur.execute(self._sql("""
+                INSERT INTO billing_credit_accounts (user_id, balance, bonus_balance, monthly_used, created_at, updated_at)
+                VALUES (%s, %s, 0, 0, %s, %s)
+                ON CONFLICT (user_id) DO NOTHING
+                RETURNING user_id
+            """), (user_id, balance, now, now))
+            created = cur.fetchone() is not None
+
+            if created and balance > 0:
+                self._insert_transaction(cur, {
+                    "user_id": user_id, "type": "bonus", "credits_amount": balance,
+                    "balance_before": 0, "balance_after": balance, "description": description,
+                    "idempotency_key": "account_opening",
+                })
+
+        return self.get_account(user_id)
+
+    def get_account(self, user_id: str) -> Optional[Dict[str, int]]:
+        """Solde matérialisé d'un compte"""
+        with self._transaction() as cur:
+            cur.execute(self._sql(
+                "SELECT balance, bonus_balance, monthly_used FROM billing_credit_accounts WHERE user_id = %s"
+            ), (user_id,))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return {"balance": row[0], "bonus_balance": row[1], "monthly_used": row[2]}
+
+    # ========================================
+    # Écritures
+    # ========================================
+
+    def consume(
+        self,
+        user_id: str,
+        cost: int,
+        description: str,
+        service_type: Optional[str] = None,
+        service_reference: Optional[str] = None,
+        metadata: Optional[dict] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> LedgerResult:
+        """
+        Débit atomique: bonus d'abord, puis solde régulier.
+        Sans effet si le solde est insuffisant ou si la clé d'idempotence a déjà été utilisée.
+        """
+        try:
+            with self._transaction() as cur:
+                existing = self._lookup_idempotency_key(cur, user_id, idempotency_key)
+                if existing:
+                    return existing
+
+                # Les expressions SET lisent toutes les valeurs d'avant l'UPDATE
+                cur.execute(self._sql("""
+                    UPDATE billing_credit_accounts
+                    SET bonus_balance = CASE WHEN bonus_balance >= %s THEN bonus_balance - %s ELSE 0 END,
+                        balance = CASE WHEN bonus_balance >= %s THEN balance ELSE balance + bonus_balance - %s END,
+                        monthly_used = monthly_used + %s,
+                        updated_at = %s
+                    WHERE user_id = %s AND balance + bonus_balance >= %s
+                    RETURNING balance, bonus_balance, monthly_used
+                """), (cost, cost, cost, cost, cost, self._now(), user_id, cost))
+                row = cur.fetchone()
+
+                if row is None:
+                    available = self._available(cur, user_id)
+                    return LedgerResult(False, None, available, available)
+
+                balance_after = row[0] + row[1]
+                txn_id = self._insert_transaction(cur, {
+                    "user_id": user_id, "type": "consumption", "credits_amount": -cost,
+                    "balance_before": balance_after + cost, "balance_after": balance_after,
+                    "description": description, "service_type": service_type,
+                    "service_reference": service_reference, "metadata": metadata,
+                    "idempotency_key": idempotency_key,
+                })
+                return LedgerResult(True, txn_id, balance_after + cost, balance_after, *row)
+
+        except _DuplicateTransaction:
+            # Course perdue contre une requête concurrente portant la même clé
+            return self._find_by_idempotency_key(user_id, idempotency_key)
+
+    def credit(
+        self,
+        user_id: str,
+        amount: int,
+        type: str,
+        description: str,
+        reset_cycle: bool = False,
+        idempotency_key: Optional[str] = None,
+        **fields: Any,
+    ) -> LedgerResult:
+        """
+        Crédit atomique (achat, bonus, ajustement). Avec reset_cycle=True le solde
+        régulier est remis à `amount` et l'usage mensuel à zéro (reset mensuel).
+        """
+        if reset_cycle:
+            update = """
+                UPDATE billing_credit_accounts
+                SET balance = %s, monthly_used = 0, updated_at = %s
+                WHERE user_id = %s
+                RETURNING balance, bonus_balance, monthly_used
+            """
+        else:
+            update = """
+                UPDATE billing_credit_accounts
+                SET balance = balance + %s, updated_at = %s
+                WHERE user_id = %s
+                RETURNING balance, bonus_balance, monthly_used
+            """
+
+        try:
+            with self._transaction() as cur:
+                existing = self._lookup_idempotency_key(cur, user_id, idempotency_key)
+                if existing:
+                    return existing
+
+                balance_before = self._available(cur, user_id)
+                cur.execute(self._sql(update), (amount, self._now(), user_id))
+                row = cur.fetchone()
+                if row is None:
+                    return LedgerResult(False, None, 0, 0)
+
+                balance_after = row[0] + row[1]
+                txn_id = self._insert_transaction(cur, {
+                    "user_id": user_id, "type": type, "credits_amount": amount,
+                    "balance_before": balance_before, "balance_after": balance_after,
+                    "description": description, "idempotency_key": idempotency_key, **fields,
+                })
+                return LedgerResult(True, txn_id, balance_before, balance_after, *row)
+
+        except _DuplicateTransaction:
+            return self._find_by_idempotency_key(user_id, idempotency_key)
+
+    def _available(self, cur: Any, user_id: str) -> int:
+        cur.execute(self._sql(
+            "SELECT balance + bonus_balance FROM billing_credit_accounts WHERE user_id = %s"
+        ), (user_id,))
+        row = cur.fetchone()
+        return row[0] if row else 0
+
+    def _insert_transaction(self, cur: Any, txn: Dict[str, Any]) -> str:
+        """Ajoute une ligne au journal; lève _DuplicateTransaction si la clé existe déjà"""
+        values = {column: txn.get(column) for column in TRANSACTION_COLUMNS}
+        values["id"] = f"txn_{uuid.uuid4().hex[:12]}"
+        values["metadata"] = json.dumps(txn.get("metadata") or {}, default=str)
+        values["created_at"] = self._now()
+        if values["price_amount"] is not None:
+            values["price_amount"] = str(values["price_amount"])
+
+        placeholders = ", ".join(["%s"] * len(TRANSACTION_COLUMNS))
+        cur.execute(self._sql(f"""
+            INSERT INTO billing_transactions ({", ".join(TRANSACTION_COLUMNS)})
+            VALUES ({placeholders})
+            ON CONFLICT (user_id, idempotency_key) DO NOTHING
+            RETURNING id
+        """), tuple(values[c] for c in TRANSACTION_COLUMNS))
+
+        if cur.fetchone() is None:
+            raise _DuplicateTransaction(txn.get("idempotency_key"))
+        return values["id"]
+
+    def _lookup_idempotency_key(
+        self, cur: Any, user_id: str, idempotency_key: Optional[str]
+    ) -> Optional[LedgerResult]:
+        """Transaction déjà enregistrée sous cette clé, dans la transaction SQL en cours"""
+        if not idempotency_key:
+            return None
+        cur.execute(self._sql("""
+            SELECT id, balance_before, balance_after FROM billing_transactions
+            WHERE user_id = %s AND idempotency_key = %s
+        """), (user_id, idempotency_key))
+        row = cur.fetchone()
+        if row is None:
+            return None
+        return LedgerResult(True, row[0], row[1], row[2], duplicate=True)
+
+    def _find_by_idempotency_key(self, user_id: str, idempotency_key: str) -> Optional[LedgerResult]:
+        with self._transaction() as cur:
+            return self._lookup_idempotency_key(cur, user_id, idempotency_key)
+
+    # ========================================
+    # Lectures
+    # ========================================
+
+    def list_transactions(
+        self,
+        user_id: str,
+        limit: int = 50,
+        offset: int = 0,
+        type: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Historique des transactions, plus récentes d'abord"""
+        query = f"SELECT {', '.join(TRANSACTION_COLUMNS)} FROM billing_transactions WHERE user_id = %s"
+        params: List[Any] = [user_id]
+        if type:
+            query += " AND type = %s"
+            params.append(type)
+        query += " ORDER BY created_at DESC LIMIT %s OFFSET %s"
+        params += [limit, offset]
+
+        with self._transaction() as cur:
+            cur.execute(self._sql(query), tuple(params))
+            rows = cur.fetchall()
+
+        results = []
+        for row in rows:
+            txn = dict(zip(TRANSACTION_COLUMNS, row))
+            if isinstance(txn["metadata"], str):
+                txn["metadata"] = json.loads(txn["metadata"] or "{}")
+            results.append(txn)
+        return results
+
+    def usage_totals(self, user_id: str) -> Dict[str, Any]:
+        """Agrégats d'usage calculés côté base"""
+        with self._transaction() as cur:
+            cur.execute(self._sql("""
+                SELECT type, service_type, SUM(credits_amount), SUM(COALESCE(price_amount, 0))
+                FROM billing_transactions
+                WHERE user_id = %s
+                GROUP BY type, service_type
+            """), (user_id,))
+            rows = cur.fetchall()
+
+        totals = {"consumed": 0, "purchased": 0, "spent": 0.0, "by_service": {}}
+        for txn_type, service_type, credits, price in rows:
+            if txn_type == "consumption":
+                totals["consumed"] += abs(credits)
+                if service_type:
+                    totals["by_service"][service_type] = totals["by_service"].get(service_type, 0) + abs(credits)
+            elif txn_type == "purchase":
+                totals["purchased"] += credits
+                totals["spent"] += float(price or 0)
+        return totals
+
+    def stats(self) -> Dict[str, int]:
+        """Statistiques globales (admin / health)"""
+        with self._transaction() as cur:
+            cur.execute("SELECT COUNT(*), COALESCE(SUM(balance + bonus_balance), 0) FROM billing_credit_accounts")
+            accounts, credits = cur.fetchone()
+            cur.execute("SELECT COUNT(*) FROM billing_transactions")
+            (txns,) = cur.fetchone()
+        return {"accounts": accounts, "credits_in_circulation": credits, "transactions": txns}
+
+
+class UsageBatcher:
+    """
+    Write-behind pour l'usage quotidien: les incréments sont agrégés en mémoire
+    et écrits en un seul upsert par (user_id, jour) toutes les `flush_interval` secondes
+    """
+
+    def __init__(self, ledger: CreditLedger, flush_interval: float = 2.0, max_pending: int = 1000):
+        self.ledger = ledger
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[tuple, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, user_id: str, counter: Optional[str], credits: int) -> None:
+        """Enregistre une requête (et son compteur de service) pour aujourd'hui"""
+        with self._lock:
+            key = (user_id, date.today().isoformat())
+            counters = self._pending.setdefault(key, defaultdict(int))
+            if counter:
+                counters[counter] += 1
+            counters["total_requests"] += 1
+            counters["total_credits_used"] += credits
+            should_flush = len(self._pending) >= self.max_pending
+
+        self._ensure_thread()
+        if should_flush:
+            self._wakeup.set()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="billing-usage-flush", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Daily usage flush failed: {e}")
+
+    def flush(self) -> int:
+        """Écrit les incréments en attente; retourne le nombre de lignes upsertées"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        columns = ", ".join(USAGE_COUNTERS)
+        updates = ", ".join(f"{c} = billing_daily_usage.{c} + excluded.{c}" for c in USAGE_COUNTERS)
+        placeholders = ", ".join(["%s"] * (len(USAGE_COUNTERS) + 2))
+        query = self.ledger._sql(f"""
+            INSERT INTO billing_daily_usage (user_id, usage_date, {columns})
+            VALUES ({placeholders})
+            ON CONFLICT (user_id, usage_date) DO UPDATE SET {updates}
+        """)
+        rows = [
+            (user_id, day, *(counters.get(c, 0) for c in USAGE_COUNTERS))
+            for (user_id, day), counters in pending.items()
+        ]
+
+        try:
+            with self.ledger._transaction() as cur:
+                cur.executemany(query, rows)
+        except Exception:
+            # Réinjecter pour le prochain flush: aucun incrément n'est perdu
+            with self._lock:
+                for key, counters in pending.items():
+                    merged = self._pending.setdefault(key, defaultdict(int))
+                    for column, value in counters.items():
+                        merged[column] += value
+            raise
+        return len(rows)
+
+    def get_daily_usage(self, user_id: str, day: date) -> Dict[str, int]:
+        """Usage d'une journée (persisté + en attente)"""
+        with self.ledger._transaction() as cur:
+            cur.execute(self.ledger._sql(
+                f"SELECT {', '.join(USAGE_COUNTERS)} FROM billing_daily_usage WHERE user_id = %s AND usage_date = %s"
+            ), (user_id, day.isoformat()))
+            row = cur.fetchone()
+
+        usage = dict(zip(USAGE_COUNTERS, row)) if row else {c: 0 for c in USAGE_COUNTERS}
+        with self._lock:
+            for column, value in self._pending.get((user_id, day.isoformat()), {}).items():
+                usage[column] += value
+        return usage
@@ -5,11 +5,14 @@ Logique métier complète pour gestion des crédits SaaS
 """
 
 import uuid
+import threading
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 from typing import Optional
 import logging
 
+from ..config import get_settings
+
 from ..models.billing_models import (
     # Enums
     PlanType, BillingCycle, TransactionType, TransactionStatus,
@@ -23,22 +26,58 @@ from ..models.billing_models import (
     # Responses
     CreditsResponse, ConsumeCreditsResponse, PurchaseResponse,
 )
+from .billing_ledger import CreditLedger, LedgerResult, UsageBatcher
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 
 
 # ============================================
-# In-Memory Storage (à remplacer par PostgreSQL)
+# Storage
 # ============================================
+# Soldes et transactions: ledger persistant (billing_ledger.py), partagé entre workers.
+# users_credits n'est qu'un cache local des métadonnées de plan, resynchronisé
+# depuis le ledger à chaque lecture.
 
 users_credits: dict[str, UserCredits] = {}
 subscriptions: dict[str, Subscription] = {}
-transactions: list[Transaction] = []
 purchases: dict[str, CreditPurchase] = {}
-daily_usage: dict[str, DailyUsage] = {}  # Key: "user_id:date"
 monthly_usage: dict[str, MonthlyUsage] = {}  # Key: "user_id:month"
 alerts: list[UsageAlert] = []
 
+# Compteur d'usage quotidien par service (colonnes de billing_daily_usage)
+SERVICE_USAGE_COUNTERS: dict[ServiceType, str] = {
+    ServiceType.RAG_QUERY: "rag_queries",
+    ServiceType.PME_QUICK: "pme_quick",
+    ServiceType.PME_FULL: "pme_full",
+    ServiceType.FISCAL_SIM: "fiscal_simulations",
+    ServiceType.CREATIVE_GEN: "creative_generations",
+    ServiceType.EMAIL_SEND: "emails_sent",
+}
+
+_ledger: Optional[CreditLedger] = None
+_usage_batcher: Optional[UsageBatcher] = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> CreditLedger:
+    """Ledger de crédits (initialisé au premier usage)"""
+    global _ledger, _usage_batcher
+    if _ledger is None:
+        with _ledger_lock:
+            if _ledger is None:
+                _usage_batcher = UsageBatcher(
+                    CreditLedger(settings.billing_ledger_url, pool_size=settings.billing_ledger_pool_size)
+                )
+                _ledger = _usage_batcher.ledger
+    return _ledger
+
+
+def get_usage_batcher() -> UsageBatcher:
+    """Batcher write-behind de l'usage quotidien"""
+    get_ledger()
+    return _usage_batcher
+
 
 # ============================================
 # Billing Service
@@ -47,44 +86,60 @@ alerts: list[UsageAlert] = []
 class BillingService:
     """Service de gestion des crédits et facturation"""
     
-    def __init__(self):
+    def __init__(self, ledger: Optional[CreditLedger] = None):
         self.chargily_api_key: Optional[str] = None
         self.stripe_api_key: Optional[str] = None
+        self._ledger = ledger
+        self._usage_batcher = UsageBatcher(ledger) if ledger else None
+
+    @property
+    def ledger(self) -> CreditLedger:
+        return self._ledger or get_ledger()
+
+    @property
+    def usage_batcher(self) -> UsageBatcher:
+        return self._usage_batcher or get_usage_batcher()
     
     # ========================================
     # User Credits Management
     # ========================================
     
     def get_or_create_user_credits(self, user_id: str, email: Optional[str] = None) -> UserCredits:
-        """Récupérer ou créer les crédits d'un utilisateur"""
-        if user_id not in users_credits:
-            # Créer avec le plan gratuit
+        """Récupérer ou créer les crédits d'un utilisateur (solde lu depuis le ledger)"""
+        credits = users_credits.get(user_id)
+        
+        if credits is None:
+            # Créer avec le plan gratuit (sans effet si le compte existe déjà dans le ledger)
             plan = PLANS[PlanType.FREE]
             today = date.today()
             
-            users_credits[user_id] = UserCredits(
+            account = self.ledger.open_account(
+                user_id,
+                balance=plan.features.monthly_credits,
+                description=f"Crédits de bienvenue - Plan {plan.name}",
+            )
+            
+            credits = users_credits.setdefault(user_id, UserCredits(
                 user_id=user_id,
                 email=email,
-                balance=plan.features.monthly_credits,
+                balance=account["balance"],
+                bonus_balance=account["bonus_balance"],
                 plan_type=PlanType.FREE,
                 plan_started_at=datetime.now(),
                 monthly_limit=plan.features.monthly_credits,
-                monthly_used=0,
+                monthly_used=account["monthly_used"],
                 cycle_start_date=today,
                 cycle_end_date=today.replace(day=1) + timedelta(days=32),
-            )
-            
-            # Transaction initiale
-            self._record_transaction(
-                user_id=user_id,
-                type=TransactionType.BONUS,
-                credits_amount=plan.features.monthly_credits,
-                description=f"Crédits de bienvenue - Plan {plan.name}",
-            )
+            ))
             
-            logger.info(f"Created credits for user {user_id} with {plan.features.monthly_credits} credits")
-        
-        return users_credits[user_id]
+            logger.info(f"Loaded credits for user {user_id}: {credits.total_available} credits")
+            return credits
+        
+        # Un autre worker a pu modifier le solde
+        account = self.ledger.get_account(user_id)
+        if account:
+            self._sync_balance(credits, account)
+        return credits
     
     def get_credits_response(self, user_id: str) -> CreditsResponse:
         """Obtenir le résumé des crédits"""
@@ -116,10 +171,15 @@ class BillingService:
         service_reference: Optional[str] = None,
         credits_override: Optional[int] = None,
         metadata: Optional[dict] = None,
+        idempotency_key: Optional[str] = None,
     ) -> ConsumeCreditsResponse:
         """
         Consommer des crédits pour un service
         
+        Le débit est un UPDATE conditionnel atomique dans le ledger: aucun crédit
+        perdu ni dépensé deux fois entre workers. Rejouer une requête avec la même
+        idempotency_key renvoie la transaction d'origine sans nouveau débit.
+        
         Returns:
             ConsumeCreditsResponse avec succès ou erreur
         
@@ -142,48 +202,40 @@ class BillingService:
                 service_type=service_type,
             )
         
-        # Vérifier le solde
-        if credits.total_available < cost:
-            logger.warning(f"Insufficient credits for user {user_id}: {credits.total_available} < {cost}")
+        # Débit atomique (bonus d'abord), refusé par la base si le solde est insuffisant
+        result = self.ledger.consume(
+            user_id,
+            cost,
+            description=f"Consommation {service_type.value}",
+            service_type=service_type.value,
+            service_reference=service_reference,
+            metadata=metadata,
+            idempotency_key=idempotency_key,
+        )
+        
+        if not result.success:
+            logger.warning(f"Insufficient credits for user {user_id}: {result.balance_before} < {cost}")
             return ConsumeCreditsResponse(
                 success=False,
                 credits_consumed=0,
-                balance_before=credits.total_available,
-                balance_after=credits.total_available,
+                balance_before=result.balance_before,
+                balance_after=result.balance_after,
                 transaction_id="insufficient_credits",
                 service_type=service_type,
             )
         
-        balance_before = credits.total_available
-        
-        # Consommer les bonus d'abord
-        remaining_cost = cost
-        bonus_consumed = 0
-        regular_consumed = 0
-        
-        if credits.bonus_balance > 0:
-            bonus_consumed = min(credits.bonus_balance, remaining_cost)
-            credits.bonus_balance -= bonus_consumed
-            remaining_cost -= bonus_consumed
-        
-        if remaining_cost > 0:
-            regular_consumed = remaining_cost
-            credits.balance -= regular_consumed
-        
-        # Mettre à jour l'usage mensuel
-        credits.monthly_used += cost
-        credits.updated_at = datetime.now()
+        if result.duplicate:
+            logger.info(f"Replayed consumption {idempotency_key} for user {user_id}")
+            return ConsumeCreditsResponse(
+                success=True,
+                credits_consumed=result.balance_before - result.balance_after,
+                balance_before=result.balance_before,
+                balance_after=result.balance_after,
+                transaction_id=result.transaction_id,
+                service_type=service_type,
+            )
         
-        # Enregistrer la transaction
-        txn = self._record_transaction(
-            user_id=user_id,
-            type=TransactionType.CONSUMPTION,
-            credits_amount=-cost,
-            description=f"Consommation {service_type.value}",
-            service_type=service_type,
-            service_reference=service_reference,
-            metadata=metadata or {},
-        )
+        self._sync_balance(credits, result)
         
         # Mettre à jour l'usage quotidien
         self._update_daily_usage(user_id, service_type, cost)
@@ -196,12 +248,35 @@ class BillingService:
         return ConsumeCreditsResponse(
             success=True,
             credits_consumed=cost,
-            balance_before=balance_before,
-            balance_after=credits.total_available,
-            transaction_id=txn.id,
+            balance_before=result.balance_before,
+            balance_after=result.balance_after,
+            transaction_id=result.transaction_id,
             service_type=service_type,
         )
     
+    def add_credits(
+        self,
+        user_id: str,
+        amount: int,
+        type: TransactionType,
+        description: str,
+        idempotency_key: Optional[str] = None,
+        **fields,
+    ) -> LedgerResult:
+        """Créditer un compte (achat, bonus, ajustement manuel)"""
+        credits = self.get_or_create_user_credits(user_id)
+        result = self.ledger.credit(
+            user_id,
+            amount,
+            type=type.value,
+            description=description,
+            idempotency_key=idempotency_key,
+            **fields,
+        )
+        if result.success and not result.duplicate:
+            self._sync_balance(credits, result)
+        return result
+    
     def can_consume(self, user_id: str, service_type: ServiceType) -> tuple[bool, int, int]:
         """
         Vérifier si l'utilisateur peut consommer des crédits
@@ -314,19 +389,15 @@ class BillingService:
         purchase.external_payment_id = payment_id
         purchase.paid_at = datetime.now()
         
-        # Ajouter les crédits
-        credits = self.get_or_create_user_credits(purchase.user_id)
-        credits.balance += purchase.credits_amount
-        credits.updated_at = datetime.now()
-        
-        # Enregistrer la transaction
-        self._record_transaction(
-            user_id=purchase.user_id,
+        # Ajouter les crédits (idempotent: un webhook rejoué ne crédite qu'une fois)
+        self.add_credits(
+            purchase.user_id,
+            purchase.credits_amount,
             type=TransactionType.PURCHASE,
-            credits_amount=purchase.credits_amount,
             description=f"Achat de {purchase.credits_amount} crédits",
+            idempotency_key=f"purchase:{purchase_id}",
             price_amount=purchase.price_amount,
-            payment_provider=purchase.payment_provider,
+            payment_provider=purchase.payment_provider.value,
             external_payment_id=payment_id,
         )
         
@@ -384,11 +455,10 @@ class BillingService:
         # Ajouter les crédits du nouveau plan
         bonus_credits = plan.features.monthly_credits - credits.monthly_used
         if bonus_credits > 0:
-            credits.balance += bonus_credits
-            self._record_transaction(
-                user_id=user_id,
+            self.add_credits(
+                user_id,
+                bonus_credits,
                 type=TransactionType.BONUS,
-                credits_amount=bonus_credits,
                 description=f"Upgrade vers plan {plan.name}",
             )
         
@@ -426,29 +496,30 @@ class BillingService:
         if user_id not in users_credits:
             return False
         
-        credits = users_credits[user_id]
+        credits = self.get_or_create_user_credits(user_id)
         plan = PLANS.get(credits.plan_type, PLANS[PlanType.FREE])
         
         old_used = credits.monthly_used
+        cycle_start = date.today()
         
-        # Reset l'usage
-        credits.monthly_used = 0
-        credits.cycle_start_date = date.today()
-        credits.cycle_end_date = date.today().replace(day=1) + timedelta(days=32)
-        
-        # Remettre les crédits mensuels
-        credits.balance = plan.features.monthly_credits
-        credits.low_balance_notified = False
-        credits.updated_at = datetime.now()
-        
-        # Enregistrer la transaction
-        self._record_transaction(
-            user_id=user_id,
-            type=TransactionType.RESET,
-            credits_amount=plan.features.monthly_credits,
+        # Remettre les crédits mensuels et l'usage à zéro (une seule fois par cycle)
+        result = self.ledger.credit(
+            user_id,
+            plan.features.monthly_credits,
+            type=TransactionType.RESET.value,
             description=f"Reset mensuel - Plan {plan.name}",
+            reset_cycle=True,
+            idempotency_key=f"reset:{cycle_start.isoformat()}",
             metadata={"previous_used": old_used},
         )
+        if not result.success:
+            return False
+        
+        if not result.duplicate:
+            self._sync_balance(credits, result)
+        credits.cycle_start_date = cycle_start
+        credits.cycle_end_date = cycle_start.replace(day=1) + timedelta(days=32)
+        credits.low_balance_notified = False
         
         logger.info(f"Monthly reset for user {user_id}: {plan.features.monthly_credits} credits")
         
@@ -461,33 +532,18 @@ class BillingService:
     def get_usage_stats(self, user_id: str, period: str = "monthly") -> dict:
         """Obtenir les statistiques d'usage"""
         
-        # Filtrer les transactions
-        user_txns = [t for t in transactions if t.user_id == user_id]
-        
-        # Consommations uniquement
-        consumptions = [t for t in user_txns if t.type == TransactionType.CONSUMPTION]
-        
-        # Par service
-        usage_by_service = {}
-        for txn in consumptions:
-            if txn.service_type:
-                service = txn.service_type.value
-                usage_by_service[service] = usage_by_service.get(service, 0) + abs(txn.credits_amount)
-        
-        # Totaux
-        total_consumed = sum(abs(t.credits_amount) for t in consumptions)
-        total_purchased = sum(t.credits_amount for t in user_txns if t.type == TransactionType.PURCHASE)
-        total_spent = sum(float(t.price_amount or 0) for t in user_txns if t.type == TransactionType.PURCHASE)
+        # Agrégats calculés par la base
+        totals = self.ledger.usage_totals(user_id)
         
         credits = self.get_or_create_user_credits(user_id)
         
         return {
             "user_id": user_id,
             "period": period,
-            "total_credits_used": total_consumed,
-            "total_credits_purchased": total_purchased,
-            "total_amount_spent": total_spent,
-            "usage_by_service": usage_by_service,
+            "total_credits_used": totals["consumed"],
+            "total_credits_purchased": totals["purchased"],
+            "total_amount_spent": totals["spent"],
+            "usage_by_service": totals["by_service"],
             "current_balance": credits.total_available,
             "plan": credits.plan_type.value,
         }
@@ -499,16 +555,14 @@ class BillingService:
         offset: int = 0,
         type_filter: Optional[TransactionType] = None,
     ) -> list[Transaction]:
-        """Obtenir l'historique des transactions"""
-        user_txns = [t for t in transactions if t.user_id == user_id]
-        
-        if type_filter:
-            user_txns = [t for t in user_txns if t.type == type_filter]
-        
-        # Trier par date décroissante
-        user_txns.sort(key=lambda t: t.created_at, reverse=True)
-        
-        return user_txns[offset:offset + limit]
+        """Obtenir l'historique des transactions (plus récentes d'abord)"""
+        rows = self.ledger.list_transactions(
+            user_id,
+            limit=limit,
+            offset=offset,
+            type=type_filter.value if type_filter else None,
+        )
+        return [self._to_transaction(row) for row in rows]
     
     # ========================================
     # Webhooks
@@ -565,68 +619,40 @@ class BillingService:
     # Private Helpers
     # ========================================
     
-    def _record_transaction(
-        self,
-        user_id: str,
-        type: TransactionType,
-        credits_amount: int,
-        description: str,
-        service_type: Optional[ServiceType] = None,
-        service_reference: Optional[str] = None,
-        price_amount: Optional[Decimal] = None,
-        payment_provider: Optional[PaymentProvider] = None,
-        external_payment_id: Optional[str] = None,
-        metadata: Optional[dict] = None,
-    ) -> Transaction:
-        """Enregistrer une transaction"""
-        
-        credits = users_credits.get(user_id)
-        balance_before = credits.total_available + abs(credits_amount) if credits else 0
-        balance_after = credits.total_available if credits else credits_amount
-        
-        txn = Transaction(
-            user_id=user_id,
-            type=type,
+    def _sync_balance(self, credits: UserCredits, source) -> None:
+        """Recopier le solde du ledger (compte ou LedgerResult) dans le cache local"""
+        if isinstance(source, dict):
+            source = LedgerResult(True, None, 0, 0, **source)
+        credits.balance = source.balance
+        credits.bonus_balance = source.bonus_balance
+        credits.monthly_used = source.monthly_used
+        credits.updated_at = datetime.now()
+    
+    @staticmethod
+    def _to_transaction(row: dict) -> Transaction:
+        """Construire une Transaction depuis une ligne du ledger"""
+        return Transaction(
+            id=row["id"],
+            user_id=row["user_id"],
+            type=TransactionType(row["type"]),
             status=TransactionStatus.COMPLETED,
-            credits_amount=credits_amount,
-            balance_before=balance_before,
-            balance_after=balance_after,
-            description=description,
-            service_type=service_type,
-            service_reference=service_reference,
-            price_amount=price_amount,
-            payment_provider=payment_provider,
-            external_payment_id=external_payment_id,
-            metadata=metadata or {},
-            completed_at=datetime.now(),
+            credits_amount=row["credits_amount"],
+            balance_before=row["balance_before"],
+            balance_after=row["balance_after"],
+            description=row["description"],
+            service_type=ServiceType(row["service_type"]) if row["service_type"] else None,
+            service_reference=row["service_reference"],
+            price_amount=row["price_amount"],
+            payment_provider=PaymentProvider(row["payment_provider"]) if row["payment_provider"] else None,
+            external_payment_id=row["external_payment_id"],
+            metadata=row["metadata"] or {},
+            created_at=row["created_at"],
+            completed_at=row["created_at"],
         )
-        
-        transactions.append(txn)
-        return txn
     
     def _update_daily_usage(self, user_id: str, service_type: ServiceType, credits: int):
-        """Mettre à jour l'usage quotidien"""
-        today = date.today()
-        key = f"{user_id}:{today.isoformat()}"
-        
-        if key not in daily_usage:
-            daily_usage[key] = DailyUsage(date=today, user_id=user_id)
-        
-        usage = daily_usage[key]
-        usage.total_requests += 1
-        usage.total_credits_used += credits
-        
-        # Mettre à jour le compteur spécifique
-        if service_type == ServiceType.RAG_QUERY:
-            usage.rag_queries += 1
-        elif service_type == ServiceType.PME_QUICK:
-            usage.pme_quick += 1
-        elif service_type == ServiceType.PME_FULL:
-            usage.pme_full += 1
-        elif service_type == ServiceType.FISCAL_SIM:
-            usage.fiscal_simulations += 1
-        elif service_type == ServiceType.CREATIVE_GEN:
-            usage.creative_generations += 1
+        """Mettre à jour l'usage quotidien (write-behind, upserts groupés)"""
+        self.usage_batcher.add(user_id, SERVICE_USAGE_COUNTERS.get(service_type), credits)
     
     def _check_alerts(self, user_id: str, credits: UserCredits):
         """Vérifier et créer des alertes si nécessaire"""
@@ -0,0 +1,257 @@
+"""
+Planificateur DAG des agents BMAD
+=================================
+Chaque agent déclare les agents dont il consomme la sortie. Les agents
+indépendants (ex: architect et pm) s'exécutent en parallèle, dans la limite
+d'un plafond de concurrence; un agent ne démarre qu'une fois toutes ses
+dépendances terminées et ne reçoit que leurs résultats.
+
+Le rapport d'exécution donne le chemin critique: la chaîne de dépendances
+dont la durée cumulée borne le temps total de génération.
+"""
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Entrées consommées par chaque agent BMAD
+AGENT_DEPENDENCIES: Dict[str, Tuple[str, ...]] = {
+    "architect": (),
+    "pm": (),
+    "backend": ("architect", "pm"),
+    "frontend": ("architect", "pm"),
+    "devops": ("architect",),
+    "qa": ("pm", "backend", "frontend"),
+}
+
+
+def resolve_dependencies(
+    agents: Sequence[str],
+    declared: Dict[str, Sequence[str]] = AGENT_DEPENDENCIES
+) -> Dict[str, Tuple[str, ...]]:
+    """
+    Restreint le graphe déclaré aux agents demandés
+
+    Une dépendance vers un agent non demandé est remplacée par les dépendances
+    de celui-ci (qa sans backend dépend alors d'architect et pm). Un agent sans
+    déclaration dépend de tous les agents listés avant lui, comme dans
+    l'exécution séquentielle.
+
+    Args:
+        agents: Agents demandés, dans l'ordre de la requête
+        declared: Dépendances déclarées par agent
+
+    Returns:
+        Dépendances directes de chaque agent demandé
+    """
+    requested = list(dict.fromkeys(agents))
+    selected = set(requested)
+
+    def expand(agent_id: str, seen: set) -> List[str]:
+        if agent_id in selected:
+            return [agent_id]
+        if agent_id in seen:
+            return []
+        seen.add(agent_id)
+        return [dep for parent in declared.get(agent_id, ()) for dep in expand(parent, seen)]
+
+    resolved = {}
+    for index, agent_id in enumerate(requested):
+        if agent_id in declared:
+            deps = [dep for parent in declared[agent_id] for dep in expand(parent, {agent_id})]
+        else:
+            deps = requested[:index]
+        resolved[agent_id] = tuple(dict.fromkeys(dep for dep in deps if dep != agent_id))
+    return resolved
+
+
+@dataclass
+class AgentTiming:
+    """Fenêtre d'exécution d'un agent (secondes depuis le début du run)"""
+    agent_id: str
+    depends_on: Tuple[str, ...]
+    started_at: float
+    finished_at: float
+
+    @property
+    def duration(self) -> float:
+        return self.finished_at - self.started_at
+
+
+@dataclass
+class ScheduleReport:
+    """Résultats et chronologie d'une exécution du DAG"""
+    results: Dict[str, Any]
+    timings: Dict[str, AgentTiming]
+    wall_time: float
+    max_concurrency: int
+    critical_path: List[str] = field(default_factory=list)
+    critical_path_time: float = 0.0
+
+    @property
+    def sequential_time(self) -> float:
+        """Durée qu'aurait pris l'exécution strictement séquentielle"""
+        return sum(timing.duration for timing in self.timings.values())
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """Représentation JSON stockée dans les métadonnées du workflow"""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "wall_time_seconds": round(self.wall_time, 3),
+            "sequential_time_seconds": round(self.sequential_time, 3),
+            "critical_path": self.critical_path,
+            "critical_path_seconds": round(self.critical_path_time, 3),
+            "agents": {
+                agent_id: {
+                    "depends_on": list(timing.depends_on),
+                    "started_at": round(timing.started_at, 3),
+                    "duration_seconds": round(timing.duration, 3),
+                }
+                for agent_id, timing in self.timings.items()
+            },
+        }
+
+
+class AgentDAGScheduler:
+    """Exécute un graphe d'agents en parallèle sous plafond de concurrence"""
+
+    def __init__(self, dependencies: Dict[str, Sequence[str]], max_concurrency: int = 3):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+
+        self.dependencies = {agent_id: tuple(deps) for agent_id, deps in dependencies.items()}
+        self.max_concurrency = max_concurrency
+        self.dependents: Dict[str, List[str]] = {agent_id: [] for agent_id in self.dependencies}
+
+        for agent_id, deps in self.dependencies.items():
+            for dep in deps:
+                if dep not in self.dependencies:
+                    raise ValueError(f"Agent {agent_id} depends on unknown agent {dep}")
+                self.dependents[dep].append(agent_id)
+
+        self.order = self._topological_order()
+        self._priority = self._chain_lengths()
+
+    def _topological_order(self) -> List[str]:
+        remaining = {agent_id: len(deps) for agent_id, deps in self.dependencies.items()}
+        ready = [agent_id for agent_id, count in remaining.items() if count == 0]
+        order = []
+
+        while ready:
+            agent_id = ready.pop(0)
+            order.append(agent_id)
+            for child in self.dependents[agent_id]:
+                remaining[child] -= 1
+                if remaining[child] == 0:
+                    ready.append(child)
+
+        if len(order) != len(self.dependencies):
+            cycle = sorted(agent_id for agent_id, count in remaining.items() if count)
+            raise ValueError(f"Dependency cycle between agents: {', '.join(cycle)}")
+        return order
+
+    def _chain_lengths(self) -> Dict[str, int]:
+        """Longueur de la plus longue chaîne de descendants (priorité au démarrage)"""
+        lengths: Dict[str, int] = {}
+        for agent_id in reversed(self.order):
+            lengths[agent_id] = 1 + max((lengths[child] for child in self.dependents[agent_id]), default=0)
+        return lengths
+
+    async def run(
+        self,
+        run_agent: Callable[[str, Dict[str, Any]], Awaitable[Any]],
+        on_start: Optional[Callable[[str], None]] = None,
+        on_complete: Optional[Callable[[str, Any], None]] = None
+    ) -> ScheduleReport:
+        """
+        Exécute tous les agents du graphe
+
+        Quand plusieurs agents sont prêts, ceux qui ouvrent la plus longue
+        chaîne de dépendants démarrent en premier. Une exception levée par un
+        agent annule les agents en cours et est propagée.
+
+        Args:
+            run_agent: Coroutine (agent_id, résultats des dépendances) -> résultat
+            on_start: Callback appelé au démarrage d'un agent
+            on_complete: Callback appelé à la fin d'un agent avec son résultat
+
+        Returns:
+            ScheduleReport avec les résultats dans l'ordre de déclaration
+        """
+        origin = time.monotonic()
+        index = {agent_id: i for i, agent_id in enumerate(self.dependencies)}
+        waiting = {agent_id: set(deps) for agent_id, deps in self.dependencies.items()}
+        ready = [(-self._priority[a], index[a], a) for a, deps in waiting.items() if not deps]
+        heapq.heapify(ready)
+
+        results: Dict[str, Any] = {}
+        started: Dict[str, float] = {}
+        timings: Dict[str, AgentTiming] = {}
+        running: Dict[asyncio.Task, str] = {}
+
+        try:
+            while ready or running:
+                while ready and len(running) < self.max_concurrency:
+                    _, _, agent_id = heapq.heappop(ready)
+                    inputs = {dep: results[dep] for dep in self.dependencies[agent_id]}
+                    started[agent_id] = time.monotonic() - origin
+                    if on_start:
+                        on_start(agent_id)
+                    running[asyncio.ensure_future(run_agent(agent_id, inputs))] = agent_id
+
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    agent_id = running.pop(task)
+                    results[agent_id] = task.result()
+                    timings[agent_id] = AgentTiming(
+                        agent_id=agent_id,
+                        depends_on=self.dependencies[agent_id],
+                        started_at=started[agent_id],
+                        finished_at=time.monotonic() - origin,
+                    )
+                    if on_complete:
+                        on_complete(agent_id, results[agent_id])
+
+                    for child in self.dependents[agent_id]:
+                        waiting[child].discard(agent_id)
+                        if not waiting[child]:
+                            heapq.heappush(ready, (-self._priority[child], index[child], child))
+        finally:
+            for task in running:
+                task.cancel()
+            if running:
+                await asyncio.gather(*running, return_exceptions=True)
+
+        report = ScheduleReport(
+            results={agent_id: results[agent_id] for agent_id in self.dependencies},
+            timings={agent_id: timings[agent_id] for agent_id in self.dependencies},
+            wall_time=time.monotonic() - origin,
+            max_concurrency=self.max_concurrency,
+        )
+        report.critical_path, report.critical_path_time = self._critical_path(timings)
+        return report
+
+    def _critical_path(self, timings: Dict[str, AgentTiming]) -> Tuple[List[str], float]:
+        """Chaîne de dépendances de durée cumulée maximale"""
+        chain_time: Dict[str, float] = {}
+        previous: Dict[str, Optional[str]] = {}
+
+        for agent_id in self.order:
+            parent = max(self.dependencies[agent_id], key=chain_time.__getitem__, default=None)
+            previous[agent_id] = parent
+            chain_time[agent_id] = timings[agent_id].duration + (chain_time[parent] if parent else 0.0)
+
+        if not chain_time:
+            return [], 0.0
+
+        last = max(self.order, key=chain_time.__getitem__)
+        path = []
+        node: Optional[str] = last
+        while node:
+            path.append(node)
+            node = previous[node]
+        return path[::-1], chain_time[last]
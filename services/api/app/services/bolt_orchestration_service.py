@@ -1,6 +1,6 @@
 """
 Service d'orchestration pour les workflows Bolt SuperPower
-Gère l'exécution séquentielle des agents BMAD et la génération finale
+Gère l'exécution des agents BMAD (graphe de dépendances) et la génération finale
 """
 import logging
 import asyncio
@@ -18,7 +18,8 @@ from app.models.bolt_workflow import (
     AgentResult,
     ProjectSynthesis
 )
-from app.services.bolt_workflow_service import BoltWorkflowService
+from app.services.bolt_workflow_service import BoltWorkflowService, WorkflowStatusWriter
+from app.services.bmad_scheduler import AgentDAGScheduler, resolve_dependencies
 from app.services.bolt_zip_service import BoltZipService
 from app.services.bmad_orchestrator import BMADOrchestrator
 from app.services.archon_integration_service import ArchonIntegrationService
@@ -42,6 +43,9 @@ class BoltOrchestrationService:
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
 
+        # Agents BMAD exécutés en parallèle (limite de débit des providers LLM)
+        self.max_concurrent_agents = int(os.getenv("BMAD_MAX_CONCURRENT_AGENTS", "3"))
+
         if not self.groq_api_key:
             logger.warning("GROQ_API_KEY not set - LLM calls may fail")
 
@@ -135,7 +139,7 @@ class BoltOrchestrationService:
 
         Steps:
         1. Mettre statut à ORCHESTRATING
-        2. Exécuter chaque agent séquentiellement
+        2. Exécuter les agents selon leurs dépendances (agents indépendants en parallèle)
         3. Synthétiser les résultats
         4. Créer projet dans Archon
         5. Mettre statut à GENERATING
@@ -152,39 +156,60 @@ class BoltOrchestrationService:
                 WorkflowStatus.ORCHESTRATING
             )
 
-            # Étape 2: Exécuter les agents séquentiellement
-            agent_results = {}
-            previous_context = {
+            # Étape 2: Exécuter le graphe d'agents
+            scheduler = AgentDAGScheduler(
+                resolve_dependencies(request.agents_to_use),
+                max_concurrency=self.max_concurrent_agents
+            )
+            executions = {
+                execution["agent_id"]: execution
+                for execution in await self.workflow_service.get_agent_executions(workflow_id)
+            }
+            base_context = {
                 "user_description": request.user_description,
                 "constraints": request.constraints.dict(),
                 "preferences": request.preferences.dict()
             }
 
-            for agent_id in request.agents_to_use:
+            async def run_agent(agent_id: str, dependency_results: Dict[str, AgentResult]) -> AgentResult:
                 logger.info(f"Executing agent {agent_id} for workflow {workflow_id}")
 
-                # Mettre à jour le current_agent
-                await self.workflow_service.update_workflow_status(
-                    workflow_id,
-                    WorkflowStatus.ORCHESTRATING,
-                    current_agent=agent_id
-                )
+                # Contexte enrichi des seules sorties dont l'agent dépend
+                context = dict(base_context)
+                context.update({dep: result.output for dep, result in dependency_results.items()})
 
-                # Exécuter l'agent
-                result = await self.execute_agent(
+                return await self.execute_agent(
                     workflow_id=workflow_id,
                     agent_id=agent_id,
-                    context=previous_context,
-                    previous_results=agent_results
+                    context=context,
+                    previous_results=dependency_results,
+                    execution=executions.get(agent_id)
                 )
 
-                agent_results[agent_id] = result
-
-                # Ajouter l'agent aux agents complétés
-                await self.workflow_service.add_completed_agent(workflow_id, agent_id)
-
-                # Enrichir le contexte pour le prochain agent
-                previous_context[agent_id] = result.output
+            status_writer = WorkflowStatusWriter(
+                self.workflow_service,
+                workflow_id,
+                WorkflowStatus.ORCHESTRATING
+            )
+            try:
+                report = await scheduler.run(
+                    run_agent,
+                    on_start=status_writer.agent_started,
+                    on_complete=lambda agent_id, _: status_writer.agent_completed(agent_id)
+                )
+            finally:
+                await status_writer.close()
+
+            agent_results = report.results
+            logger.info(
+                f"Agents for workflow {workflow_id} done in {report.wall_time:.1f}s "
+                f"(sequential {report.sequential_time:.1f}s), critical path "
+                f"{' -> '.join(report.critical_path)} ({report.critical_path_time:.1f}s)"
+            )
+            await self.workflow_service.merge_workflow_metadata(
+                workflow_id,
+                {"agents_schedule": report.to_metadata()}
+            )
 
             # Étape 3: Synthétiser tous les résultats
             logger.info(f"Synthesizing results for workflow {workflow_id}")
@@ -255,7 +280,8 @@ class BoltOrchestrationService:
         workflow_id: str,
         agent_id: str,
         context: Dict[str, Any],
-        previous_results: Dict[str, AgentResult]
+        previous_results: Dict[str, AgentResult],
+        execution: Optional[Dict[str, Any]] = None
     ) -> AgentResult:
         """
         Exécute un agent BMAD individuel
@@ -264,7 +290,8 @@ class BoltOrchestrationService:
             workflow_id: ID du workflow
             agent_id: ID de l'agent à exécuter
             context: Contexte de base
-            previous_results: Résultats des agents précédents
+            previous_results: Résultats des agents dont celui-ci dépend
+            execution: Exécution d'agent déjà chargée (évite une lecture en base)
 
         Returns:
             AgentResult avec la sortie de l'agent
@@ -273,8 +300,9 @@ class BoltOrchestrationService:
 
         try:
             # Récupérer l'exécution d'agent depuis la DB
-            executions = await self.workflow_service.get_agent_executions(workflow_id)
-            execution = next((e for e in executions if e["agent_id"] == agent_id), None)
+            if execution is None:
+                executions = await self.workflow_service.get_agent_executions(workflow_id)
+                execution = next((e for e in executions if e["agent_id"] == agent_id), None)
 
             if not execution:
                 raise ValueError(f"Agent execution not found for agent {agent_id}")
@@ -1,6 +1,7 @@
 """
 Service pour gérer les workflows Bolt SuperPower
 """
+import asyncio
 import logging
 import uuid
 import json
@@ -172,6 +173,70 @@ class BoltWorkflowService:
 
             return result == "UPDATE 1"
 
+    async def update_agents_progress(
+        self,
+        workflow_id: str,
+        status: WorkflowStatus,
+        current_agent: Optional[str],
+        completed_agents: List[str]
+    ) -> bool:
+        """
+        Met à jour statut, agent(s) en cours et agents complétés en une écriture
+
+        Args:
+            workflow_id: UUID du workflow
+            status: Nouveau statut
+            current_agent: Agent(s) actuellement en cours
+            completed_agents: Agents complétés depuis la dernière écriture
+
+        Returns:
+            True si mis à jour, False sinon
+        """
+        async with self.db_pool.acquire() as conn:
+            result = await conn.execute(
+                """
+                UPDATE bolt_workflows
+                SET status = $2,
+                    current_agent = $3,
+                    agents_completed = agents_completed || $4::jsonb
+                WHERE workflow_id = $1
+                """,
+                workflow_id,
+                status.value,
+                current_agent,
+                json.dumps(completed_agents)
+            )
+
+            return result == "UPDATE 1"
+
+    async def merge_workflow_metadata(
+        self,
+        workflow_id: str,
+        metadata: Dict[str, Any]
+    ) -> bool:
+        """
+        Fusionne des clés dans les métadonnées du workflow
+
+        Args:
+            workflow_id: UUID du workflow
+            metadata: Clés à ajouter ou remplacer
+
+        Returns:
+            True si mis à jour, False sinon
+        """
+        async with self.db_pool.acquire() as conn:
+            result = await conn.execute(
+                """
+                UPDATE bolt_workflows
+                SET metadata = COALESCE(metadata, '{}'::jsonb) || $2::jsonb
+                WHERE workflow_id = $1
+                """,
+                workflow_id,
+                json.dumps(metadata)
+            )
+
+            return result == "UPDATE 1"
+
     async def set_archon_project(
         self,
         workflow_id: str,
@@ -536,3 +601,98 @@ class BoltWorkflowService:
             )
             logger.info(f"Cleaned up {count} old workflows")
             return count if count else 0
+
+
+
+class WorkflowStatusWriter:
+    """
+    Coalesce les mises à jour de progression d'un workflow
+
+    Les démarrages et fins d'agents sont accumulés en mémoire puis écrits en
+    un seul UPDATE au plus toutes les `min_interval` secondes, au lieu de deux
+    écritures par agent. `close()` écrit l'état final.
+    """
+
+    CURRENT_AGENT_MAX_LENGTH = 50
+
+    def __init__(
+        self,
+        workflow_service: BoltWorkflowService,
+        workflow_id: str,
+        status: WorkflowStatus,
+        min_interval: float = 1.0
+    ):
+        self.workflow_service = workflow_service
+        self.workflow_id = workflow_id
+        self.status = status
+        self.min_interval = min_interval
+        self.writes = 0
+
+        self._running: List[str] = []
+        self._completed: List[str] = []
+        self._written_current: Optional[str] = None
+        self._lock = asyncio.Lock()
+        self._closing = asyncio.Event()
+        self._pending: Optional[asyncio.Task] = None
+
+    def agent_started(self, agent_id: str):
+        self._running.append(agent_id)
+        self._schedule()
+
+    def agent_completed(self, agent_id: str):
+        if agent_id in self._running:
+            self._running.remove(agent_id)
+        self._completed.append(agent_id)
+        self._schedule()
+
+    def _current_agent(self) -> Optional[str]:
+        if not self._running:
+            return None
+        return ", ".join(self._running)[:self.CURRENT_AGENT_MAX_LENGTH]
+
+    def _schedule(self):
+        if self._pending is None or self._pending.done():
+            self._pending = asyncio.ensure_future(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        try:
+            await asyncio.wait_for(self._closing.wait(), timeout=self.min_interval)
+        except asyncio.TimeoutError:
+            pass
+        await self.flush()
+
+        # État modifié pendant l'écriture: programmer la suivante
+        changed = self._completed or self._current_agent() != self._written_current
+        if changed and not self._closing.is_set():
+            self._pending = None
+            self._schedule()
+
+    async def flush(self):
+        """Écrit l'état courant s'il a changé depuis la dernière écriture"""
+        async with self._lock:
+            current_agent = self._current_agent()
+            if not self._completed and current_agent == self._written_current:
+                return
+
+            completed, self._completed = self._completed, []
+            try:
+                await self.workflow_service.update_agents_progress(
+                    self.workflow_id,
+                    self.status,
+                    current_agent,
+                    completed
+                )
+            except Exception as e:
+                logger.warning(f"Failed to write progress for workflow {self.workflow_id}: {e}")
+                self._completed = completed + self._completed
+                return
+
+            self._written_current = current_agent
+            self.writes += 1
+
+    async def close(self):
+        """Attend l'écriture en attente puis écrit l'état final"""
+        self._closing.set()
+        while self._pending is not None and not self._pending.done():
+            await self._pending
+        await self.flush()
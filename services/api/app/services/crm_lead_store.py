@@ -0,0 +1,348 @@
+"""
+CRM PRO - Lead Store indexé
+===========================
+Stockage des leads avec index secondaires, index trigram pour la recherche
+et agrégats par statut maintenus incrémentalement.
+
+- Filtres: intersection des index (plus petit ensemble d'abord) -> O(matches)
+- Page: heap partiel sur les matches -> O(matches + page·log page)
+- Kanban / stats: lecture des compteurs -> O(#statuts)
+"""
+
+import heapq
+import threading
+from array import array
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Champs indexés par égalité; "status" doit rester en tête (agrégats par statut)
+INDEXED_FIELDS = ("status", "source", "sector", "priority", "assigned_to")
+
+# Champs couverts par la recherche plein texte
+SEARCH_FIELDS = ("name", "email", "company", "phone")
+
+SCORE_BUCKETS = 101  # score entier 0-100
+
+# Reconstruction des postings trigram au-delà de cette part d'entrées périmées
+STALE_POSTINGS_RATIO = 0.5
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _search_text(lead: Any) -> str:
+    """
+    Champs de recherche concaténés (séparateur \\0, jamais présent dans une requête).
+    Le téléphone est comparé tel quel, les autres champs en minuscules.
+    """
+    return "\0".join(
+        value if field == "phone" else value.lower()
+        for field in SEARCH_FIELDS
+        if (value := getattr(lead, field, None))
+    )
+
+
+class _IndexEntry:
+    """Valeurs indexées d'un lead, pour désindexer après mutation"""
+    __slots__ = ("seq", "keys", "score", "value", "text", "day")
+
+    def __init__(self, seq: int, lead: Any):
+        self.seq = seq
+        self.keys = tuple(getattr(lead, field, None) for field in INDEXED_FIELDS)
+        self.score = int(lead.score or 0)
+        self.value = lead.estimated_value or Decimal("0")
+        self.text = _search_text(lead)
+        self.day = lead.created_at.date()
+
+
+class LeadStore:
+    """
+    Stockage des leads, interface de type dict (get, [], del, in, values)
+
+    Toute mutation d'un lead déjà stocké doit être suivie de `reindex(lead)`
+    (ou `store[lead.id] = lead`) pour garder les index cohérents. Les leads
+    sont supposés insérés par ordre de création (tri par défaut); à rang égal,
+    les leads sont départagés par ordre de création dans le sens du tri.
+
+    Args:
+        sort_fields: nom -> rang numérique, précalculé à l'indexation
+    """
+
+    def __init__(self, sort_fields: Optional[Dict[str, Callable[[Any], float]]] = None):
+        self.sort_fields = sort_fields or {}
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._leads: Dict[str, Any] = {}  # ordre d'insertion = ordre de création
+        self._entries: Dict[str, _IndexEntry] = {}
+        self._seq = 0
+
+        # Index secondaires: champ -> valeur -> ids
+        self._indexes: Dict[str, Dict[Any, Set[str]]] = {f: defaultdict(set) for f in INDEXED_FIELDS}
+        self._score_buckets: List[Set[str]] = [set() for _ in range(SCORE_BUCKETS)]
+        self._ranks: Dict[str, Dict[str, float]] = {name: {} for name in self.sort_fields}
+
+        # Postings trigram compacts (seq, append-only): les entrées périmées
+        # sont écartées par la vérification exacte puis purgées par _rebuild_postings
+        self._postings: Dict[str, array] = {}
+        self._id_by_seq: Dict[int, str] = {}
+        self._seq_by_id: Dict[str, int] = {}
+        self._stale_postings = 0
+        self._live_postings = 0
+
+        # Agrégats incrémentaux
+        self._value_by_status: Dict[Any, Decimal] = defaultdict(Decimal)
+        self._created_by_day: Counter = Counter()
+        self._score_total = 0
+
+    # ============================================
+    # Interface dict
+    # ============================================
+
+    def __len__(self) -> int:
+        return len(self._leads)
+
+    def __contains__(self, lead_id: str) -> bool:
+        return lead_id in self._leads
+
+    def __getitem__(self, lead_id: str) -> Any:
+        return self._leads[lead_id]
+
+    def __setitem__(self, lead_id: str, lead: Any) -> None:
+        with self._lock:
+            old = self._entries.get(lead_id)
+            if old is not None:
+                self._unindex(lead_id)
+                seq = old.seq
+            else:
+                self._seq += 1
+                seq = self._seq
+            self._leads[lead_id] = lead
+            self._index(lead_id, lead, seq, old_text=old.text if old else None)
+
+    def __delitem__(self, lead_id: str) -> None:
+        with self._lock:
+            entry = self._entries[lead_id]
+            self._unindex(lead_id)
+            del self._id_by_seq[entry.seq]
+            del self._seq_by_id[lead_id]
+            del self._entries[lead_id]
+            del self._leads[lead_id]
+            self._retire_postings(entry.text)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._leads)
+
+    def get(self, lead_id: str, default: Any = None) -> Any:
+        return self._leads.get(lead_id, default)
+
+    def values(self) -> Iterable[Any]:
+        return self._leads.values()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def reindex(self, lead: Any) -> None:
+        """Remettre à jour les index après mutation en place d'un lead"""
+        self[lead.id] = lead
+
+    # ============================================
+    # Maintenance des index
+    # ============================================
+
+    def _index(self, lead_id: str, lead: Any, seq: int, old_text: Optional[str] = None) -> None:
+        entry = _IndexEntry(seq, lead)
+        self._entries[lead_id] = entry
+        self._id_by_seq[seq] = lead_id
+        self._seq_by_id[lead_id] = seq
+
+        for field, key in zip(INDEXED_FIELDS, entry.keys):
+            if key is not None:
+                self._indexes[field][key].add(lead_id)
+        self._score_buckets[entry.score].add(lead_id)
+        for name, rank in self.sort_fields.items():
+            self._ranks[name][lead_id] = rank(lead)
+
+        if entry.text != old_text:
+            grams = _trigrams(entry.text)
+            for gram in grams:
+                postings = self._postings.get(gram)
+                if postings is None:
+                    postings = self._postings[gram] = array("L")
+                postings.append(seq)
+            self._live_postings += len(grams)
+            if old_text is not None:
+                self._retire_postings(old_text)
+
+        self._value_by_status[entry.keys[0]] += entry.value
+        self._created_by_day[entry.day] += 1
+        self._score_total += entry.score
+
+    def _unindex(self, lead_id: str) -> None:
+        entry = self._entries[lead_id]
+
+        for field, key in zip(INDEXED_FIELDS, entry.keys):
+            if key is not None:
+                bucket = self._indexes[field][key]
+                bucket.discard(lead_id)
+                if not bucket:
+                    del self._indexes[field][key]
+        self._score_buckets[entry.score].discard(lead_id)
+        for ranks in self._ranks.values():
+            ranks.pop(lead_id, None)
+
+        self._value_by_status[entry.keys[0]] -= entry.value
+        self._created_by_day[entry.day] -= 1
+        if not self._created_by_day[entry.day]:
+            del self._created_by_day[entry.day]
+        self._score_total -= entry.score
+
+    def _retire_postings(self, text: str) -> None:
+        """Marque les postings d'un ancien texte comme périmés (purge différée)"""
+        count = len(_trigrams(text))
+        self._live_postings -= count
+        self._stale_postings += count
+        if self._stale_postings > 1000 and self._stale_postings > STALE_POSTINGS_RATIO * self._live_postings:
+            self._rebuild_postings()
+
+    def _rebuild_postings(self) -> None:
+        postings: Dict[str, array] = {}
+        for entry in self._entries.values():
+            for gram in _trigrams(entry.text):
+                bucket = postings.get(gram)
+                if bucket is None:
+                    bucket = postings[gram] = array("L")
+                bucket.append(entry.seq)
+        self._postings = postings
+        self._stale_postings = 0
+
+    # ============================================
+    # Requêtes
+    # ============================================
+
+    def _field_candidates(self, field: str, values: Iterable[Any]) -> Set[str]:
+        index = self._indexes[field]
+        buckets = [index[v] for v in values if v in index]
+        if len(buckets) == 1:
+            return buckets[0]
+        return set().union(*buckets)
+
+    def _score_candidates(self, low: int, high: int, candidates: Optional[Set[str]]) -> Set[str]:
+        """Plage de score: union des buckets, ou filtre direct si d'autres index ont déjà réduit les candidats"""
+        if candidates is None:
+            return set().union(*self._score_buckets[low:high + 1])
+        entries = self._entries
+        return {i for i in candidates if low <= entries[i].score <= high}
+
+    def _search_candidates(self, search: str, candidates: Optional[Set[str]]) -> Set[str]:
+        """
+        Recherche par sous-chaîne: le posting trigram le plus court borne les
+        candidats, puis vérification exacte. Les requêtes de moins de 3 caractères
+        n'ont pas de trigram et sont vérifiées sur les candidats déjà filtrés.
+        """
+        needle = search.lower()
+        grams = _trigrams(needle)
+        entries = self._entries
+
+        if grams:
+            shortest = min((self._postings.get(g, ()) for g in grams), key=len)
+            id_by_seq = self._id_by_seq
+            ids = {id_by_seq[seq] for seq in set(shortest) if seq in id_by_seq}
+            if candidates is not None:
+                ids &= candidates
+        else:
+            ids = candidates if candidates is not None else entries.keys()
+
+        return {lead_id for lead_id in ids if needle in entries[lead_id].text}
+
+    def query(
+        self,
+        filters: Optional[Dict[str, Optional[List[Any]]]] = None,
+        min_score: Optional[int] = None,
+        max_score: Optional[int] = None,
+        search: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+        sort_by: Optional[str] = None,
+        descending: bool = True,
+    ) -> Tuple[List[Any], int]:
+        """
+        Page de leads filtrés et total des matches
+
+        Args:
+            filters: champ indexé -> valeurs acceptées (OU), combinés en ET
+            sort_by: nom d'un sort_field; None ou inconnu = ordre de création
+        """
+        with self._lock:
+            candidate_sets = [
+                self._field_candidates(field, values)
+                for field, values in (filters or {}).items()
+                if values
+            ]
+
+            candidates: Optional[Set[str]] = None
+            for matches in sorted(candidate_sets, key=len):
+                candidates = matches if candidates is None else candidates & matches
+                if not candidates:
+                    break
+
+            if min_score is not None or max_score is not None:
+                low = max(0, min_score if min_score is not None else 0)
+                high = min(SCORE_BUCKETS - 1, max_score if max_score is not None else SCORE_BUCKETS - 1)
+                candidates = self._score_candidates(low, high, candidates)
+
+            if search:
+                candidates = self._search_candidates(search, candidates)
+
+            # Aucun filtre, tri par date: l'ordre d'insertion suffit -> O(page)
+            if candidates is None and sort_by not in self.sort_fields:
+                ordered = reversed(self._leads.values()) if descending else iter(self._leads.values())
+                return list(islice(ordered, offset, offset + limit)), len(self._leads)
+
+            if candidates is None:
+                candidates = self._leads.keys()
+
+            # Heap sur des clés décorées construites en C (map/zip, sans callback Python).
+            # Ex-aequo départagés par ordre de création, dans le sens du tri.
+            select = heapq.nlargest if descending else heapq.nsmallest
+            seqs = map(self._seq_by_id.__getitem__, candidates)
+            if sort_by not in self.sort_fields:
+                top = select(offset + limit, seqs)[offset:]
+                return [self._leads[self._id_by_seq[seq]] for seq in top], len(candidates)
+
+            keys = zip(map(self._ranks[sort_by].__getitem__, candidates), seqs, candidates)
+            top = select(offset + limit, keys)[offset:]
+            return [self._leads[lead_id] for _, _, lead_id in top], len(candidates)
+
+    # ============================================
+    # Agrégats
+    # ============================================
+
+    def count_by(self, field: str) -> Dict[Any, int]:
+        """Nombre de leads par valeur d'un champ indexé"""
+        return {key: len(ids) for key, ids in self._indexes[field].items()}
+
+    def value_by_status(self) -> Dict[Any, Decimal]:
+        """Somme des valeurs estimées par statut"""
+        return dict(self._value_by_status)
+
+    def count_created_between(self, start: date, end: date) -> int:
+        """Leads créés entre deux jours inclus (somme des compteurs journaliers)"""
+        return sum(
+            self._created_by_day.get(start + timedelta(days=i), 0)
+            for i in range((end - start).days + 1)
+        )
+
+    def count_score_at_least(self, threshold: int) -> int:
+        """Leads avec score >= threshold"""
+        return sum(len(bucket) for bucket in self._score_buckets[max(0, threshold):])
+
+    @property
+    def score_total(self) -> int:
+        return self._score_total
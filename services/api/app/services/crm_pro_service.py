@@ -24,6 +24,7 @@ from ..models.crm_pro_models import (
     # Constants
     STATUS_COLORS, STATUS_NAMES, SOURCE_LABELS, DEFAULT_SCORING_WEIGHTS,
 )
+from .crm_lead_store import LeadStore
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +33,19 @@ logger = logging.getLogger(__name__)
 # IN-MEMORY STORAGE (Production: PostgreSQL)
 # ============================================
 
-leads_db: Dict[str, LeadPro] = {}
+# Ordres de tri (created_at = ordre d'insertion)
+PRIORITY_ORDER = {LeadPriority.URGENT: 4, LeadPriority.HIGH: 3, LeadPriority.MEDIUM: 2, LeadPriority.LOW: 1}
+STATUS_ORDER = {LeadStatus.WARM: 6, LeadStatus.PROPOSAL: 5, LeadStatus.QUALIFY: 4, LeadStatus.NEW: 3, LeadStatus.WON: 2, LeadStatus.LOST: 1}
+SORT_KEYS = {
+    "score": lambda lead: lead.score,
+    "priority": lambda lead: PRIORITY_ORDER.get(lead.priority, 0),
+    "status": lambda lead: STATUS_ORDER.get(lead.status, 0),
+}
+
+CLOSED_STATUSES = (LeadStatus.WON, LeadStatus.LOST)
+
+# Index secondaires + agrégats incrémentaux (voir crm_lead_store.py)
+leads_db: LeadStore = LeadStore(sort_fields=SORT_KEYS)
 interactions_db: List[Interaction] = []
 
 
@@ -196,54 +209,26 @@ class CRMProService:
     ) -> Tuple[List[LeadPro], int]:
         """
         Liste paginée des leads avec filtres
+        
+        Filtres résolus par les index du store (O(matches)), page extraite
+        par heap partiel au lieu d'un tri complet.
         """
-        leads = list(leads_db.values())
-        
-        # Filtres
-        if status:
-            leads = [l for l in leads if l.status in status]
-        if source:
-            leads = [l for l in leads if l.source in source]
-        if sector:
-            leads = [l for l in leads if l.sector in sector]
-        if priority:
-            leads = [l for l in leads if l.priority in priority]
-        if min_score is not None:
-            leads = [l for l in leads if l.score >= min_score]
-        if max_score is not None:
-            leads = [l for l in leads if l.score <= max_score]
-        if assigned_to:
-            leads = [l for l in leads if l.assigned_to == assigned_to]
-        if search:
-            search_lower = search.lower()
-            leads = [l for l in leads if (
-                search_lower in l.name.lower() or
-                (l.email and search_lower in l.email.lower()) or
-                (l.company and search_lower in l.company.lower()) or
-                (l.phone and search_lower in l.phone)
-            )]
-        
-        total = len(leads)
-        
-        # Tri
-        reverse = sort_order == "desc"
-        if sort_by == "score":
-            leads.sort(key=lambda x: x.score, reverse=reverse)
-        elif sort_by == "priority":
-            priority_order = {LeadPriority.URGENT: 4, LeadPriority.HIGH: 3, LeadPriority.MEDIUM: 2, LeadPriority.LOW: 1}
-            leads.sort(key=lambda x: priority_order.get(x.priority, 0), reverse=reverse)
-        elif sort_by == "status":
-            status_order = {LeadStatus.WARM: 6, LeadStatus.PROPOSAL: 5, LeadStatus.QUALIFY: 4, LeadStatus.NEW: 3, LeadStatus.WON: 2, LeadStatus.LOST: 1}
-            leads.sort(key=lambda x: status_order.get(x.status, 0), reverse=reverse)
-        else:  # created_at
-            leads.sort(key=lambda x: x.created_at, reverse=reverse)
-        
-        # Pagination
-        start = (page - 1) * page_size
-        end = start + page_size
-        leads = leads[start:end]
-        
-        return leads, total
+        return leads_db.query(
+            filters={
+                "status": status,
+                "source": source,
+                "sector": sector,
+                "priority": priority,
+                "assigned_to": [assigned_to] if assigned_to else None,
+            },
+            min_score=min_score,
+            max_score=max_score,
+            search=search,
+            offset=(page - 1) * page_size,
+            limit=page_size,
+            sort_by=sort_by,
+            descending=sort_order == "desc",
+        )
     
     # ============================================
     # SCORING IA
@@ -429,6 +414,7 @@ class CRMProService:
         lead.score_reasons = result["reasons"]
         lead.probability = result["probability"]
         lead.updated_at = datetime.utcnow()
+        leads_db.reindex(lead)
         
         # Log
         self._log_interaction(
@@ -926,27 +912,27 @@ Quand seriez-vous disponible ?
         columns = []
         total_value = Decimal("0")
         
+        # Compteurs maintenus par le store: O(#statuts)
+        counts = leads_db.count_by("status")
+        values = leads_db.value_by_status()
+        
         for status in LeadStatus:
-            leads_in_status = [l for l in leads_db.values() if l.status == status]
-            status_value = sum(
-                l.estimated_value or Decimal("0") 
-                for l in leads_in_status
-            )
+            status_value = values.get(status, Decimal("0"))
             
             columns.append(PipelineColumn(
                 status=status,
                 name=STATUS_NAMES.get(status, status.value),
                 color=STATUS_COLORS.get(status, "#666"),
-                count=len(leads_in_status),
+                count=counts.get(status, 0),
                 total_value=status_value,
             ))
             
-            if status not in [LeadStatus.WON, LeadStatus.LOST]:
+            if status not in CLOSED_STATUSES:
                 total_value += status_value
         
         total_leads = len(leads_db)
-        won_count = len([l for l in leads_db.values() if l.status == LeadStatus.WON])
-        closed_count = len([l for l in leads_db.values() if l.status in [LeadStatus.WON, LeadStatus.LOST]])
+        won_count = counts.get(LeadStatus.WON, 0)
+        closed_count = won_count + counts.get(LeadStatus.LOST, 0)
         
         conversion_rate = (won_count / closed_count * 100) if closed_count > 0 else 0.0
         
@@ -971,6 +957,7 @@ Quand seriez-vous disponible ?
         old_status = lead.status
         lead.status = new_status
         lead.updated_at = datetime.utcnow()
+        leads_db.reindex(lead)
         
         # Log
         self._log_interaction(
@@ -993,54 +980,49 @@ Quand seriez-vous disponible ?
         week_start = now - timedelta(days=now.weekday())
         week_start = week_start.replace(hour=0, minute=0, second=0, microsecond=0)
         
-        leads = list(leads_db.values())
-        
-        # Compteurs
-        total_leads = len(leads)
-        leads_this_month = len([l for l in leads if l.created_at >= month_start])
-        leads_this_week = len([l for l in leads if l.created_at >= week_start])
+        # Compteurs (agrégats incrémentaux du store, sans parcours des leads)
+        total_leads = len(leads_db)
+        leads_this_month = leads_db.count_created_between(month_start.date(), now.date())
+        leads_this_week = leads_db.count_created_between(week_start.date(), now.date())
         
         # Par statut
-        by_status = {}
-        for status in LeadStatus:
-            by_status[status.value] = len([l for l in leads if l.status == status])
+        status_counts = leads_db.count_by("status")
+        by_status = {status.value: status_counts.get(status, 0) for status in LeadStatus}
         
         # Par source
-        by_source = {}
-        for source in LeadSource:
-            count = len([l for l in leads if l.source == source])
-            if count > 0:
-                by_source[source.value] = count
+        source_counts = leads_db.count_by("source")
+        by_source = {
+            source.value: source_counts[source]
+            for source in LeadSource
+            if source_counts.get(source, 0) > 0
+        }
         
         # Par secteur
-        by_sector = {}
-        for sector in Sector:
-            count = len([l for l in leads if l.sector == sector])
-            if count > 0:
-                by_sector[sector.value] = count
+        sector_counts = leads_db.count_by("sector")
+        by_sector = {
+            sector.value: sector_counts[sector]
+            for sector in Sector
+            if sector_counts.get(sector, 0) > 0
+        }
         
         # Conversion
-        won = len([l for l in leads if l.status == LeadStatus.WON])
-        closed = len([l for l in leads if l.status in [LeadStatus.WON, LeadStatus.LOST]])
+        won = status_counts.get(LeadStatus.WON, 0)
+        closed = won + status_counts.get(LeadStatus.LOST, 0)
         conversion_rate = (won / closed * 100) if closed > 0 else 0.0
         
         # Score moyen
-        avg_score = sum(l.score for l in leads) / total_leads if total_leads > 0 else 0.0
+        avg_score = leads_db.score_total / total_leads if total_leads > 0 else 0.0
         
         # Valeurs
+        values = leads_db.value_by_status()
         pipeline_value = sum(
-            l.estimated_value or Decimal("0") 
-            for l in leads 
-            if l.status not in [LeadStatus.WON, LeadStatus.LOST]
-        )
-        won_value = sum(
-            l.estimated_value or Decimal("0")
-            for l in leads
-            if l.status == LeadStatus.WON
+            (value for status, value in values.items() if status not in CLOSED_STATUSES),
+            Decimal("0"),
         )
+        won_value = values.get(LeadStatus.WON, Decimal("0"))
         
         # Leads chauds
-        hot_leads = len([l for l in leads if l.score >= 70])
+        hot_leads = leads_db.count_score_at_least(70)
         
         return CRMStats(
             total_leads=total_leads,
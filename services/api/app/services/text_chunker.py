@@ -0,0 +1,281 @@
+"""
+Text Chunker
+Shared by services/api (document parser, uploads, BigRAG ingest) and
+services/connectors
+
+Canonical copy: packages/shared/services_shared/text_chunker.py. Each service
+is built from its own Docker context, so the module is vendored into every
+service with `make sync-text-chunker` - edit this copy, then sync.
+
+- TextChunker.stream() consumes a document page by page (any iterable of
+  str) and yields Chunk objects as soon as they are complete. Only the
+  unconsumed tail of the text is buffered, never the whole document.
+- Chunks are sized in tokens by a pluggable batch counter (tiktoken when
+  available, script-calibrated estimate otherwise) and cut on sentence
+  boundaries for Arabic, French and other Latin-script text. A sentence
+  longer than the budget is split on whitespace.
+- Overlap re-uses the trailing sentences of the previous chunk as offsets
+  into the same buffer: every chunk is exactly one slice of the source.
+- Chunk.id is a UUID derived from a namespace (document id, file name...)
+  and the whitespace-normalised chunk text, so re-ingesting a document
+  yields the same ids and upserts replace instead of duplicating.
+
+Stdlib only (tiktoken optional).
+"""
+
+import bisect
+import logging
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Counts tokens for a batch of texts (one call per page)
+TokenCounter = Callable[[Sequence[str]], List[int]]
+
+CHUNK_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://iafactoryalgeria.com/chunks")
+
+# Characters per token by script (same calibration as the API token counter)
+SCRIPT_RATIOS = {"arabic": 2.2, "latin": 3.8, "digit": 2.5, "other": 1.5}
+
+_ARABIC_RE = re.compile("[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]")
+_LATIN_RE = re.compile("[A-Za-z\u00C0-\u024F]")
+_DIGIT_RE = re.compile("[0-9\u0660-\u0669]")
+_SPACE_RE = re.compile(r"\s")
+
+# Paragraph break, or sentence terminators (Latin and Arabic) + closing quotes + whitespace
+_BOUNDARY_RE = re.compile(
+    r"\n[ \t\r\f\v]*\n\s*"
+    r"|[.!?…؟۔]+[\"'»”’)\]]*\s+"
+)
+_LAST_WORD_RE = re.compile(r"(\w+)\W*$")
+
+# "Art. 12", "M. le Ministre", "n. 3"... : a period after these is not a sentence end
+ABBREVIATIONS = frozenset({
+    "art", "arts", "al", "alin", "ann", "c", "cf", "chap", "dr", "etc", "ex", "fig",
+    "m", "mm", "mme", "mmes", "mlle", "mr", "mrs", "n", "no", "nos", "ord", "p", "pp",
+    "pr", "réf", "ref", "st", "ste", "vol", "vs",
+})
+
+
+def estimate_tokens(texts: Sequence[str]) -> List[int]:
+    """Script-calibrated token estimate (Arabic costs more tokens per character)"""
+    counts = []
+    for text in texts:
+        if not text:
+            counts.append(0)
+            continue
+        arabic = _ARABIC_RE.subn("", text)[1]
+        latin = _LATIN_RE.subn("", text)[1]
+        digits = _DIGIT_RE.subn("", text)[1]
+        spaces = _SPACE_RE.subn("", text)[1]
+        other = max(0, len(text) - arabic - latin - digits - spaces)
+        estimate = (
+            arabic / SCRIPT_RATIOS["arabic"]
+            + latin / SCRIPT_RATIOS["latin"]
+            + digits / SCRIPT_RATIOS["digit"]
+            + other / SCRIPT_RATIOS["other"]
+        )
+        counts.append(max(1, int(round(estimate))))
+    return counts
+
+
+def tiktoken_counter(encoding: str = "cl100k_base") -> TokenCounter:
+    """BPE token counter, or the calibrated estimate if tiktoken is unavailable"""
+    try:
+        import tiktoken
+        encoder = tiktoken.get_encoding(encoding)
+    except Exception as e:
+        logger.warning(f"tiktoken {encoding} unavailable, using estimated token counts: {e}")
+        return estimate_tokens
+
+    def count(texts: Sequence[str]) -> List[int]:
+        return [len(tokens) for tokens in encoder.encode_ordinary_batch(list(texts))]
+
+    return count
+
+
+def chunk_id(text: str, namespace: str = "") -> str:
+    """Stable chunk id: same namespace + same text (modulo whitespace) -> same UUID"""
+    normalized = " ".join(text.split())
+    return str(uuid.uuid5(CHUNK_NAMESPACE, f"{namespace}\x00{normalized}"))
+
+
+@dataclass(frozen=True)
+class Chunk:
+    id: str
+    index: int
+    text: str
+    tokens: int
+    start: int  # character offset in the document stream
+    end: int
+    page: int  # 1-based page where the chunk starts
+
+
+class TextChunker:
+    """Token-budgeted, sentence-aligned chunking over a stream of pages"""
+
+    def __init__(
+        self,
+        max_tokens: int = 300,
+        overlap_tokens: int = 40,
+        min_chars: int = 50,
+        count_tokens: Optional[TokenCounter] = None,
+    ):
+        if overlap_tokens >= max_tokens:
+            raise ValueError("overlap_tokens must be smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_chars = min_chars
+        self.count_tokens = count_tokens or estimate_tokens
+
+    def chunk(self, text: str, namespace: str = "") -> List[str]:
+        """Chunk a whole document, returning the chunk texts"""
+        return [chunk.text for chunk in self.stream([text], namespace)]
+
+    def iter_chunks(self, text: str, namespace: str = "") -> Iterator[Chunk]:
+        return self.stream([text], namespace)
+
+    def stream(self, pages: Iterable[str], namespace: str = "") -> Iterator[Chunk]:
+        """
+        Yield chunks while reading `pages`
+
+        Offsets are absolute in the virtual document made of the pages joined
+        by "\\n"; `buffer` only holds the text from `base` onwards.
+        """
+        buffer = ""
+        base = 0  # absolute offset of buffer[0]
+        scan = 0  # absolute offset of the first sentence not yet split
+        page_starts: List[Tuple[int, int]] = []  # (absolute offset, page number)
+        window: List[Tuple[int, int, int]] = []  # sentences of the current chunk: (start, end, tokens)
+        window_tokens = 0
+        index = 0
+
+        def emit() -> Optional[Chunk]:
+            nonlocal index
+            start, end = window[0][0], window[-1][1]
+            raw = buffer[start - base:end - base]
+            text = raw.strip()
+            if len(text) < self.min_chars:
+                return None
+            offset = start + (len(raw) - len(raw.lstrip()))
+            position = bisect.bisect_right(page_starts, (offset, float("inf"))) - 1
+            chunk = Chunk(
+                id=chunk_id(text, namespace),
+                index=index,
+                text=text,
+                tokens=sum(tokens for _, _, tokens in window),
+                start=offset,
+                end=offset + len(text),
+                page=page_starts[max(position, 0)][1],
+            )
+            index += 1
+            return chunk
+
+        def add(sentences: List[Tuple[int, int, int]]) -> Iterator[Chunk]:
+            nonlocal window, window_tokens
+            for sentence in sentences:
+                if window and window_tokens + sentence[2] > self.max_tokens:
+                    chunk = emit()
+                    if chunk:
+                        yield chunk
+                    # Overlap: trailing sentences of the chunk, within the overlap budget
+                    kept, kept_tokens = [], 0
+                    for previous in reversed(window):
+                        if kept_tokens + previous[2] > self.overlap_tokens:
+                            break
+                        kept.append(previous)
+                        kept_tokens += previous[2]
+                    kept.reverse()
+                    while kept and kept_tokens + sentence[2] > self.max_tokens:
+                        kept_tokens -= kept.pop(0)[2]
+                    window, window_tokens = kept, kept_tokens
+                window.append(sentence)
+                window_tokens += sentence[2]
+
+        page_number = 0
+        for page in pages:
+            page_number += 1
+            separator = "\n" if page_number > 1 else ""
+            # Drop the consumed prefix (before the current chunk and the pending sentence)
+            keep_from = min(window[0][0], scan) if window else scan
+            buffer = buffer[keep_from - base:] + separator + page
+            base = keep_from
+            page_start = base + len(buffer) - len(page)
+            page_starts = page_starts[max(0, bisect.bisect_right(page_starts, (keep_from, float("inf"))) - 1):]
+            page_starts.append((page_start, page_number))
+
+            spans, scan = self._split(buffer, base, scan, final=False)
+            yield from add(self._measure(buffer, base, spans))
+
+        spans, scan = self._split(buffer, base, scan, final=True)
+        yield from add(self._measure(buffer, base, spans))
+        if window:
+            chunk = emit()
+            if chunk:
+                yield chunk
+
+    def _split(self, buffer: str, base: int, scan: int, final: bool) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        Complete sentences of buffer after `scan`, as absolute (start, end)
+
+        The text after the last boundary may continue on the next page: it is
+        left pending unless `final`.
+        """
+        spans = []
+        start = scan
+        for match in _BOUNDARY_RE.finditer(buffer, scan - base):
+            if not self._is_boundary(buffer, match):
+                continue
+            end = base + match.end()
+            spans.append((start, end))
+            start = end
+        if final and buffer[start - base:].strip():
+            spans.append((start, base + len(buffer)))
+            start = base + len(buffer)
+        return spans, start
+
+    @staticmethod
+    def _is_boundary(buffer: str, match: re.Match) -> bool:
+        terminator = match.group()
+        if not terminator.startswith("."):
+            return True
+        if match.end() < len(buffer) and buffer[match.end()].islower():
+            return False  # "etc. et", "cf. la loi"
+        word = _LAST_WORD_RE.search(buffer, max(0, match.start() - 16), match.start() + 1)
+        if not word:
+            return True
+        word = word.group(1)
+        if word.lower() in ABBREVIATIONS:
+            return False
+        return not (len(word) == 1 and word.isupper())  # initial: "J. Dupont"
+
+    def _measure(self, buffer: str, base: int, spans: List[Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+        """Token counts for the sentences (one counter call), oversized ones split on whitespace"""
+        if not spans:
+            return []
+        counts = self.count_tokens([buffer[start - base:end - base] for start, end in spans])
+
+        sentences = []
+        for (start, end), tokens in zip(spans, counts):
+            if tokens <= self.max_tokens:
+                sentences.append((start, end, tokens))
+            else:
+                sentences.extend(self._split_long(buffer, base, start, end, tokens))
+        return sentences
+
+    def _split_long(self, buffer: str, base: int, start: int, end: int, tokens: int) -> List[Tuple[int, int, int]]:
+        """Cut an oversized sentence into pieces of about max_tokens, at whitespace"""
+        target = max(1, int((end - start) * self.max_tokens / tokens * 0.9))
+        cuts = [start]
+        while end - cuts[-1] > target:
+            limit = cuts[-1] + target
+            space = buffer.rfind(" ", cuts[-1] - base + 1, limit - base)
+            cuts.append(base + space + 1 if space != -1 else limit)
+        cuts.append(end)
+
+        pieces = list(zip(cuts, cuts[1:]))
+        counts = self.count_tokens([buffer[a - base:b - base] for a, b in pieces])
+        return [(a, b, count) for (a, b), count in zip(pieces, counts)]
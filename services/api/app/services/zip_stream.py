@@ -0,0 +1,125 @@
+"""
+Écriture ZIP en flux
+====================
+Archive construite entrée par entrée et émise en morceaux d'octets (fichier,
+réponse HTTP...), sans arborescence temporaire ni fichier seekable.
+
+Les entrées sont compressées en mémoire avant émission, ce qui permet de
+réutiliser un payload déjà compressé (cache par hash de contenu).
+"""
+import hashlib
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_OF_CENTRAL_DIR = struct.Struct("<IHHHHIIH")
+
+_VERSION = 20
+_MADE_BY_UNIX = (3 << 8) | _VERSION
+_UTF8_FLAG = 0x0800
+_DEFLATED = 8
+_FILE_MODE = 0o100644 << 16
+
+
+@dataclass(frozen=True)
+class CompressedPayload:
+    """Contenu compressé (deflate brut) d'une entrée"""
+    crc: int
+    size: int
+    data: bytes
+
+
+def compress_payload(content: bytes, level: int = 6) -> CompressedPayload:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    data = compressor.compress(content) + compressor.flush()
+    return CompressedPayload(crc=zlib.crc32(content), size=len(content), data=data)
+
+
+class PayloadCache:
+    """Cache LRU des payloads compressés, indexé par hash du contenu"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CompressedPayload]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compress(self, content: bytes) -> CompressedPayload:
+        key = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+
+        payload = compress_payload(content)
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = payload
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return payload
+
+
+def _dos_datetime(timestamp: float) -> Tuple[int, int]:
+    t = time.localtime(timestamp)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((max(t.tm_year, 1980) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class ZipStreamWriter:
+    """
+    Générateur d'archive ZIP séquentiel
+
+    Chaque `add()` retourne les octets de l'entrée (header local + données),
+    `close()` retourne le répertoire central. Format ZIP standard (pas de ZIP64:
+    entrées et archive < 4 Go).
+    """
+
+    def __init__(self, timestamp: Optional[float] = None):
+        self._dos_time, self._dos_date = _dos_datetime(timestamp or time.time())
+        self._central: List[bytes] = []
+        self._offset = 0
+
+    def add(
+        self,
+        arcname: str,
+        content: bytes,
+        cache: Optional[PayloadCache] = None,
+    ) -> bytes:
+        """Ajoute une entrée; `cache` réutilise le payload compressé d'un contenu identique"""
+        payload = cache.get_or_compress(content) if cache else compress_payload(content)
+        return self.add_payload(arcname, payload)
+
+    def add_payload(self, arcname: str, payload: CompressedPayload) -> bytes:
+        name = arcname.replace("\\", "/").lstrip("/").encode("utf-8")
+        header = _LOCAL_HEADER.pack(
+            0x04034B50, _VERSION, _UTF8_FLAG, _DEFLATED, self._dos_time, self._dos_date,
+            payload.crc, len(payload.data), payload.size, len(name), 0,
+        )
+        self._central.append(_CENTRAL_HEADER.pack(
+            0x02014B50, _MADE_BY_UNIX, _VERSION, _UTF8_FLAG, _DEFLATED, self._dos_time, self._dos_date,
+            payload.crc, len(payload.data), payload.size, len(name), 0, 0, 0, 0, _FILE_MODE, self._offset,
+        ) + name)
+
+        chunk = header + name + payload.data
+        self._offset += len(chunk)
+        return chunk
+
+    def close(self) -> bytes:
+        """Répertoire central + fin d'archive"""
+        directory = b"".join(self._central)
+        end = _END_OF_CENTRAL_DIR.pack(
+            0x06054B50, 0, 0, len(self._central), len(self._central),
+            len(directory), self._offset, 0,
+        )
+        return directory + end
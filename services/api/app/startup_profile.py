@@ -0,0 +1,198 @@
+"""
+Profil de démarrage: coût d'import et mémoire par groupe de routers
+
+Chaque groupe est importé dans un interpréteur neuf (`python -X importtime`)
+après le socle commun (FastAPI, config, middlewares): les chiffres sont le
+coût propre du groupe, indépendamment de l'ordre de chargement.
+
+Usage:
+    python -m app.startup_profile                    # tous les groupes + app complète
+    python -m app.startup_profile --groups rag,ocr   # groupes choisis
+    python -m app.startup_profile --tree --min-ms 20 # arbre des imports > 20 ms
+    python -m app.startup_profile --json             # sortie machine
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from .router_groups import ROUTER_GROUPS, mounts_for
+
+# Socle importé par tous les déploiements, exclu du coût des groupes
+BASELINE_MODULES = ("fastapi", "app.config", "app.middleware", "app.monitoring", "app.tracing")
+MARKER = "--startup-profile-marker--"
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+_CHILD_SCRIPT = """
+import importlib, json, os, resource, sys, time
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        scale = 2**20 if sys.platform == "darwin" else 2**10
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+for name in {baseline!r}:
+    importlib.import_module(name)
+base_rss, base_modules = rss_mb(), len(sys.modules)
+sys.stderr.write({marker!r} + "\\n")
+sys.stderr.flush()
+
+started = time.perf_counter()
+error = None
+try:
+    for module, attr in {targets!r}:
+        getattr(importlib.import_module(module), attr)
+except Exception as e:
+    error = f"{{type(e).__name__}}: {{e}}"
+print(json.dumps({{
+    "import_ms": (time.perf_counter() - started) * 1000,
+    "rss_mb": rss_mb() - base_rss,
+    "modules": len(sys.modules) - base_modules,
+    "error": error,
+}}))
+"""
+
+
+@dataclass
+class ImportNode:
+    """Ligne de `-X importtime` (temps en ms)"""
+    module: str
+    self_ms: float
+    cumulative_ms: float
+    depth: int
+    children: List["ImportNode"] = field(default_factory=list)
+
+
+@dataclass
+class GroupProfile:
+    group: str
+    routers: int
+    import_ms: float = 0.0
+    rss_mb: float = 0.0
+    modules: int = 0
+    error: Optional[str] = None
+    imports: List[ImportNode] = field(default_factory=list)
+
+
+def parse_importtime(lines: List[str]) -> List[ImportNode]:
+    """
+    Arbre des imports depuis la sortie `-X importtime`
+
+    Les lignes sont émises en post-ordre (enfants avant parent); l'indentation
+    du nom donne la profondeur.
+    """
+    pending: List[ImportNode] = []
+    for line in lines:
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped) - 1) // 2
+        node = ImportNode(stripped.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth)
+        while pending and pending[-1].depth > depth:
+            node.children.insert(0, pending.pop())
+        pending.append(node)
+    return pending
+
+
+def profile_targets(label: str, targets: List[tuple], routers: int) -> GroupProfile:
+    """Importe `targets` [(module, attr)] dans un interpréteur neuf"""
+    script = _CHILD_SCRIPT.format(baseline=BASELINE_MODULES, marker=MARKER, targets=targets)
+    pythonpath = os.pathsep.join(filter(None, [str(PROJECT_ROOT), os.getenv("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True, text=True, cwd=PROJECT_ROOT, env={**os.environ, "PYTHONPATH": pythonpath},
+    )
+
+    profile = GroupProfile(group=label, routers=routers)
+    stderr = result.stderr.splitlines()
+    if result.returncode != 0 or MARKER not in stderr:
+        profile.error = (stderr[-1] if stderr else f"exit code {result.returncode}")[:300]
+        return profile
+
+    profile.imports = parse_importtime(stderr[stderr.index(MARKER) + 1:])
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    profile.import_ms = stats["import_ms"]
+    profile.rss_mb = stats["rss_mb"]
+    profile.modules = stats["modules"]
+    profile.error = stats["error"]
+    return profile
+
+
+def profile_groups(groups: List[str]) -> List[GroupProfile]:
+    profiles = []
+    for group in groups:
+        mounts = mounts_for([group])
+        targets = [(f"app.{mount.module}", mount.attr) for mount in mounts]
+        profiles.append(profile_targets(group, targets, len(mounts)))
+    return profiles
+
+
+def heaviest(nodes: List[ImportNode], limit: int) -> List[ImportNode]:
+    """Imports de premier niveau les plus coûteux"""
+    return sorted(nodes, key=lambda n: n.cumulative_ms, reverse=True)[:limit]
+
+
+def print_tree(nodes: List[ImportNode], min_ms: float, indent: int = 2):
+    for node in sorted(nodes, key=lambda n: n.cumulative_ms, reverse=True):
+        if node.cumulative_ms < min_ms:
+            continue
+        print(f"{' ' * indent}{node.cumulative_ms:8.1f} ms  {node.module}  (self {node.self_ms:.1f} ms)")
+        print_tree(node.children, min_ms, indent + 2)
+
+
+def print_report(profiles: List[GroupProfile], top: int, tree: bool, min_ms: float):
+    width = max(len(p.group) for p in profiles)
+    print(f"{'Groupe':<{width}} {'Routers':>7} {'Import (ms)':>12} {'RSS (Mo)':>9} {'Modules':>8}")
+    for p in profiles:
+        status = f"  ERREUR: {p.error}" if p.error else ""
+        print(f"{p.group:<{width}} {p.routers:>7} {p.import_ms:>12.1f} {p.rss_mb:>+9.1f} {p.modules:>8}{status}")
+
+    for p in profiles:
+        if not p.imports:
+            continue
+        print(f"\n[{p.group}]")
+        if tree:
+            print_tree(p.imports, min_ms)
+        else:
+            for node in heaviest(p.imports, top):
+                print(f"  {node.cumulative_ms:8.1f} ms  {node.module}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Profil de démarrage par groupe de routers")
+    parser.add_argument("--groups", default="all", help=f"Groupes à profiler ({', '.join(ROUTER_GROUPS)})")
+    parser.add_argument("--top", type=int, default=8, help="Imports les plus lourds affichés par groupe")
+    parser.add_argument("--tree", action="store_true", help="Afficher l'arbre des imports")
+    parser.add_argument("--min-ms", type=float, default=10.0, help="Seuil d'affichage de l'arbre (ms)")
+    parser.add_argument("--no-app", action="store_true", help="Ne pas profiler app.main complet")
+    parser.add_argument("--json", action="store_true", help="Sortie JSON")
+    args = parser.parse_args(argv)
+
+    groups = list(ROUTER_GROUPS) if args.groups == "all" else [g.strip() for g in args.groups.split(",")]
+    unknown = [g for g in groups if g not in ROUTER_GROUPS]
+    if unknown:
+        parser.error(f"groupes inconnus: {', '.join(unknown)}")
+
+    profiles = profile_groups(groups)
+    if not args.no_app:
+        # Démarrage complet avec ROUTER_GROUPS courant (middlewares, métriques, routes)
+        app_profile = profile_targets("app.main", [("app.main", "app")], 0)
+        app_profile.group = f"app.main ({os.getenv('ROUTER_GROUPS', 'all')})"
+        profiles.append(app_profile)
+
+    if args.json:
+        print(json.dumps([asdict(p) for p in profiles], indent=2))
+    else:
+        print_report(profiles, args.top, args.tree, args.min_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,92 @@ from uuid import UUID
 
 logger = logging.getLogger(__name__)
 
+# Routes publiques ne nécessitant pas de tenant_id
+TENANT_PUBLIC_ROUTES = {
+    "/",
+    "/health",
+    "/metrics",
+    "/docs",
+    "/openapi.json",
+    "/redoc",
+    "/api/auth/login",
+    "/api/auth/login/json",  # Ajouté pour support login JSON
+    "/api/auth/register",
+    "/api/auth/refresh",
+}
+
+# Prefix match pour /docs, /openapi, etc.
+TENANT_PUBLIC_PREFIXES = ("/docs", "/redoc", "/openapi.json")
+
+
+def is_public_tenant_route(path: str) -> bool:
+    """Vérifier si la route est accessible sans tenant_id"""
+    return path in TENANT_PUBLIC_ROUTES or path.startswith(TENANT_PUBLIC_PREFIXES)
+
+
+def tenant_id_from_jwt(token: str) -> Optional[str]:
+    """
+    Extraire tenant_id depuis JWT (Phase 4)
+
+    Format JWT attendu:
+    {
+        "sub": "user_email",
+        "user_id": 123,
+        "tenant_id": "550e8400-e29b-41d4-a716-446655440000",
+        "exp": ...,
+        "iat": ...
+    }
+    """
+    try:
+        from app.services.auth_service import auth_service
+
+        token_data = auth_service.decode_access_token(token)
+
+        # Retourner tenant_id si présent
+        if token_data.tenant_id:
+            logger.debug(f"JWT tenant_id extracted: {token_data.tenant_id}")
+            return token_data.tenant_id
+
+        return None
+
+    except Exception as e:
+        logger.warning(f"Failed to decode JWT: {e}")
+        return None
+
+
+def development_tenant_id() -> Optional[str]:
+    """DEFAULT_TENANT_ID en développement, sinon None"""
+    from app.config import get_settings
+    settings = get_settings()
+
+    if settings.environment == "development":
+        return getattr(settings, "default_tenant_id", None)
+    return None
+
+
+def tenant_error_response(tenant_id: Optional[str]) -> Optional[JSONResponse]:
+    """Réponse d'erreur si tenant_id est absent ou n'est pas un UUID"""
+    if not tenant_id:
+        return JSONResponse(
+            status_code=403,
+            content={
+                "error": "Tenant ID required",
+                "message": "X-Tenant-ID header or valid JWT required"
+            }
+        )
+    try:
+        UUID(tenant_id)
+    except ValueError:
+        logger.error(f"Invalid tenant_id format: {tenant_id}")
+        return JSONResponse(
+            status_code=400,
+            content={
+                "error": "Invalid tenant ID format",
+                "message": "Tenant ID must be a valid UUID"
+            }
+        )
+    return None
+
 
 class TenantContextMiddleware(BaseHTTPMiddleware):
     """
@@ -29,21 +115,9 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
     3. API Key associé à un tenant (existant)
 
     Stocke le tenant_id dans request.state.tenant_id pour usage par DB session
-    """
 
-    # Routes publiques ne nécessitant pas de tenant_id
-    PUBLIC_ROUTES = {
-        "/",
-        "/health",
-        "/metrics",
-        "/docs",
-        "/openapi.json",
-        "/redoc",
-        "/api/auth/login",
-        "/api/auth/login/json",  # Ajouté pour support login JSON
-        "/api/auth/register",
-        "/api/auth/refresh",
-    }
+    Remplacé par RequestPipelineMiddleware dans main.py.
+    """
 
     async def dispatch(self, request: Request, call_next):
         # Autoriser OPTIONS pour CORS
@@ -59,34 +133,17 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
 
         if not tenant_id:
             # En développement, utiliser DEFAULT_TENANT_ID
-            from app.config import get_settings
-            settings = get_settings()
-
-            if settings.environment == "development" and settings.default_tenant_id:
-                tenant_id = settings.default_tenant_id
+            tenant_id = development_tenant_id()
+            if tenant_id:
                 logger.info(f"Using DEFAULT_TENANT_ID for development: {tenant_id}")
             else:
                 logger.warning(f"No tenant_id for request: {request.url.path}")
-                return JSONResponse(
-                    status_code=403,
-                    content={
-                        "error": "Tenant ID required",
-                        "message": "X-Tenant-ID header or valid JWT required"
-                    }
-                )
-
-        # Valider format UUID
-        try:
-            tenant_uuid = UUID(tenant_id)
-        except ValueError:
-            logger.error(f"Invalid tenant_id format: {tenant_id}")
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "error": "Invalid tenant ID format",
-                    "message": "Tenant ID must be a valid UUID"
-                }
-            )
+
+        # Valider présence et format UUID
+        error = tenant_error_response(tenant_id)
+        if error is not None:
+            return error
+        tenant_uuid = UUID(tenant_id)
 
         # Stocker dans request.state pour usage par DB session
         request.state.tenant_id = str(tenant_uuid)
@@ -104,16 +161,7 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
 
     def _is_public_route(self, path: str) -> bool:
         """Vérifier si la route est publique"""
-        # Exact match
-        if path in self.PUBLIC_ROUTES:
-            return True
-
-        # Prefix match pour /docs, /openapi, etc.
-        public_prefixes = ["/docs", "/redoc", "/openapi.json"]
-        if any(path.startswith(prefix) for prefix in public_prefixes):
-            return True
-
-        return False
+        return is_public_tenant_route(path)
 
     async def _extract_tenant_id(self, request: Request) -> Optional[str]:
         """
@@ -148,43 +196,13 @@ class TenantContextMiddleware(BaseHTTPMiddleware):
         return None
 
     def _extract_from_jwt(self, request: Request) -> Optional[str]:
-        """
-        Extraire tenant_id depuis JWT (Phase 4)
-
-        Format JWT attendu:
-        {
-            "sub": "user_email",
-            "user_id": 123,
-            "tenant_id": "550e8400-e29b-41d4-a716-446655440000",
-            "exp": ...,
-            "iat": ...
-        }
-        """
-        # Récupérer Authorization header
+        """Extraire tenant_id depuis le JWT du header Authorization"""
         auth_header = request.headers.get("Authorization", "")
 
         if not auth_header.startswith("Bearer "):
             return None
 
-        token = auth_header.replace("Bearer ", "")
-
-        # Décoder JWT et extraire tenant_id
-        try:
-            from app.services.auth_service import auth_service
-
-            # Décoder le token
-            token_data = auth_service.decode_access_token(token)
-
-            # Retourner tenant_id si présent
-            if token_data.tenant_id:
-                logger.debug(f"JWT tenant_id extracted: {token_data.tenant_id}")
-                return token_data.tenant_id
-
-            return None
-
-        except Exception as e:
-            logger.warning(f"Failed to decode JWT: {e}")
-            return None
+        return tenant_id_from_jwt(auth_header.replace("Bearer ", ""))
 
 
 class SuperAdminMiddleware(BaseHTTPMiddleware):
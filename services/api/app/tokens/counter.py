@@ -0,0 +1,233 @@
+"""
+Comptage de tokens par modèle
+Tokenizers BPE (tiktoken) mis en cache, avec fallback calibré par écriture (arabe, latin)
+
+Les fichiers BPE sont embarqués dans app/tokens/bpe/: aucun téléchargement,
+un encodage dont le fichier manque passe au fallback calibré.
+"""
+import os
+import re
+import base64
+import hashlib
+import logging
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - dépendance optionnelle
+    tiktoken = None
+
+BPE_DIR = os.path.join(os.path.dirname(__file__), "bpe")
+
+# Paramètres des encodages embarqués (identiques à tiktoken_ext.openai_public)
+BPE_SPECS = {
+    "cl100k_base": {
+        "sha256": "223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7",
+        "pat_str": r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s""",
+        "special_tokens": {
+            "<|endoftext|>": 100257,
+            "<|fim_prefix|>": 100258,
+            "<|fim_middle|>": 100259,
+            "<|fim_suffix|>": 100260,
+            "<|endofprompt|>": 100276,
+        },
+    },
+    "o200k_base": {
+        "sha256": "446a9538cb6c348e3516120d7c08b09f57c36495e2acfffe59a5bf8b0cfb1a2d",
+        "pat_str": "|".join([
+            r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+            r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+            r"""\p{N}{1,3}""",
+            r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+            r"""\s*[\r\n]+""",
+            r"""\s+(?!\S)""",
+            r"""\s+""",
+        ]),
+        "special_tokens": {"<|endoftext|>": 199999, "<|endofprompt|>": 200018},
+    },
+}
+
+
+def load_bpe_ranks(path: str, expected_sha256: str) -> Dict[bytes, int]:
+    """Lit un fichier .tiktoken local (token base64, rang) après vérification de son empreinte"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if hashlib.sha256(data).hexdigest() != expected_sha256:
+        raise ValueError(f"Empreinte inattendue pour {path}")
+    ranks = {}
+    for line in data.splitlines():
+        if line:
+            token, rank = line.split()
+            ranks[base64.b64decode(token)] = int(rank)
+    return ranks
+
+
+# Encodage BPE par préfixe de modèle (les autres familles utilisent le fallback calibré)
+MODEL_ENCODINGS = {
+    "gpt-4o": "o200k_base",
+    "gpt-4.1": "o200k_base",
+    "o1": "o200k_base",
+    "o3": "o200k_base",
+    "gpt-4": "cl100k_base",
+    "gpt-3.5": "cl100k_base",
+    "text-embedding": "cl100k_base",
+}
+
+# Préfixes de provider des codes modèle ("openai.gpt-4o" du multi-LLM)
+PROVIDER_PREFIXES = ("openai.", "azure.")
+
+# Caractères par token, calibrés par écriture et par famille de modèle.
+# L'arabe (et la darija en graphie arabe) est bien plus coûteux que le latin.
+SCRIPT_RATIOS = {
+    "default": {"arabic": 2.2, "latin": 3.8, "digit": 2.5, "other": 1.5},
+    "claude": {"arabic": 2.0, "latin": 3.5, "digit": 2.5, "other": 1.5},
+    "llama": {"arabic": 1.8, "latin": 3.7, "digit": 3.0, "other": 1.5},
+    "mistral": {"arabic": 1.6, "latin": 3.5, "digit": 1.0, "other": 1.5},
+    "gemini": {"arabic": 2.8, "latin": 4.0, "digit": 1.0, "other": 2.0},
+    "qwen": {"arabic": 2.4, "latin": 3.8, "digit": 1.0, "other": 1.2},
+}
+
+# Overhead par message de chat (rôle + séparateurs) et amorce de la réponse
+TOKENS_PER_MESSAGE = 4
+TOKENS_REPLY_PRIMING = 3
+
+_ARABIC_RE = re.compile("[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF\uFB50-\uFDFF\uFE70-\uFEFF]")
+_LATIN_RE = re.compile("[A-Za-z\u00C0-\u024F]")
+_DIGIT_RE = re.compile("[0-9\u0660-\u0669]")
+_SPACE_RE = re.compile(r"\s")
+
+
+def _model_family(model: Optional[str]) -> str:
+    name = (model or "").lower()
+    for family in ("claude", "llama", "mistral", "mixtral", "gemini", "qwen"):
+        if family in name:
+            return "mistral" if family == "mixtral" else family
+    return "default"
+
+
+class TokenCounter:
+    """
+    Service de comptage de tokens
+
+    - Tokenizers tiktoken chargés une seule fois par encodage (thread-safe),
+      depuis les fichiers de bpe_dir uniquement
+    - Fallback calibré par écriture quand le modèle n'a pas de BPE public
+    - Cache LRU des comptes par (encodage, texte)
+    """
+
+    def __init__(self, cache_size: int = 8192, bpe_dir: str = BPE_DIR):
+        self.bpe_dir = bpe_dir
+        self._encoders: Dict[str, object] = {}
+        self._unavailable: set = set()
+        self._lock = threading.Lock()
+        self._count_cached = lru_cache(maxsize=cache_size)(self._count_uncached)
+
+    def _encoding_for(self, model: Optional[str]) -> Optional[str]:
+        name = (model or "").lower()
+        if name.startswith(PROVIDER_PREFIXES):
+            name = name.split(".", 1)[1]  # "openai.gpt-4o" -> "gpt-4o" (mais "gpt-4.1" reste entier)
+        for prefix, encoding in MODEL_ENCODINGS.items():
+            if name.startswith(prefix):
+                return encoding
+        return None
+
+    def _load_encoder(self, encoding: str):
+        """Construit l'encodeur depuis le fichier embarqué (jamais de réseau)"""
+        spec = BPE_SPECS[encoding]
+        ranks = load_bpe_ranks(os.path.join(self.bpe_dir, f"{encoding}.tiktoken"), spec["sha256"])
+        return tiktoken.Encoding(
+            name=encoding,
+            pat_str=spec["pat_str"],
+            mergeable_ranks=ranks,
+            special_tokens=spec["special_tokens"],
+        )
+
+    def _get_encoder(self, encoding: Optional[str]):
+        """Charge (une fois) l'encodeur BPE, ou None si tiktoken ou le fichier BPE manque"""
+        if encoding not in BPE_SPECS or tiktoken is None or encoding in self._unavailable:
+            return None
+        encoder = self._encoders.get(encoding)
+        if encoder is not None:
+            return encoder
+
+        with self._lock:
+            if encoding not in self._encoders and encoding not in self._unavailable:
+                try:
+                    self._encoders[encoding] = self._load_encoder(encoding)
+                except Exception as e:
+                    logger.warning(f"BPE {encoding} indisponible, fallback calibré: {e}")
+                    self._unavailable.add(encoding)
+        return self._encoders.get(encoding)
+
+    @staticmethod
+    def estimate_by_script(text: str, family: str = "default") -> int:
+        """Estimation calibrée par écriture (comptage des classes en C via regex)"""
+        if not text:
+            return 0
+        ratios = SCRIPT_RATIOS.get(family, SCRIPT_RATIOS["default"])
+        arabic = _ARABIC_RE.subn("", text)[1]
+        latin = _LATIN_RE.subn("", text)[1]
+        digits = _DIGIT_RE.subn("", text)[1]
+        spaces = _SPACE_RE.subn("", text)[1]
+        other = max(0, len(text) - arabic - latin - digits - spaces)
+        estimate = (
+            arabic / ratios["arabic"]
+            + latin / ratios["latin"]
+            + digits / ratios["digit"]
+            + other / ratios["other"]
+        )
+        return max(1, int(round(estimate)))
+
+    def _count_uncached(self, text: str, encoding: Optional[str], family: str) -> int:
+        encoder = self._get_encoder(encoding)
+        if encoder is not None:
+            return len(encoder.encode_ordinary(text))
+        return self.estimate_by_script(text, family)
+
+    def count(self, text: str, model: Optional[str] = None) -> int:
+        """Nombre de tokens d'un texte pour un modèle donné"""
+        if not text:
+            return 0
+        return self._count_cached(text, self._encoding_for(model), _model_family(model))
+
+    def count_batch(self, texts: Sequence[str], model: Optional[str] = None) -> List[int]:
+        """Compte un lot de textes (encodage BPE multi-thread quand disponible)"""
+        encoding = self._encoding_for(model)
+        encoder = self._get_encoder(encoding)
+        if encoder is not None and len(texts) > 16:
+            return [len(tokens) for tokens in encoder.encode_ordinary_batch(list(texts))]
+        family = _model_family(model)
+        return [self._count_cached(t, encoding, family) if t else 0 for t in texts]
+
+    def count_messages(self, messages: Sequence[Dict[str, str]], model: Optional[str] = None) -> int:
+        """Tokens d'entrée d'une conversation (contenu + overhead par message)"""
+        contents = [m.get("content") or "" for m in messages]
+        return (
+            sum(self.count_batch(contents, model))
+            + TOKENS_PER_MESSAGE * len(messages)
+            + TOKENS_REPLY_PRIMING
+        )
+
+    def count_messages_batch(
+        self,
+        conversations: Sequence[Sequence[Dict[str, str]]],
+        model: Optional[str] = None
+    ) -> List[int]:
+        """Compte plusieurs conversations en un seul passage sur tous les messages"""
+        flat = [m.get("content") or "" for conv in conversations for m in conv]
+        counts = self.count_batch(flat, model)
+
+        results, offset = [], 0
+        for conv in conversations:
+            n = len(conv)
+            results.append(sum(counts[offset:offset + n]) + TOKENS_PER_MESSAGE * n + TOKENS_REPLY_PRIMING)
+            offset += n
+        return results
+
+
+# Instance globale
+token_counter = TokenCounter()
@@ -9,6 +9,7 @@ from typing import Dict, Any, Optional, Callable
 from functools import wraps
 
 from . import repository as tokens_repo
+from .counter import token_counter
 
 logger = logging.getLogger(__name__)
 
@@ -41,13 +42,34 @@ def get_api_keys_from_env() -> Dict[str, Optional[str]]:
     }
 
 
-def check_token_balance(tenant_id: str, estimated_tokens: int = 500) -> bool:
+DEFAULT_OUTPUT_TOKENS = 500
+
+
+def estimate_request_tokens(
+    messages: list,
+    model: Optional[str] = None,
+    max_tokens: Optional[int] = None
+) -> int:
+    """Estimation tokens d'une requête: entrée comptée + sortie maximale"""
+    return token_counter.count_messages(messages, model=model) + (max_tokens or DEFAULT_OUTPUT_TOKENS)
+
+
+def check_token_balance(
+    tenant_id: str,
+    estimated_tokens: int = 500,
+    messages: Optional[list] = None,
+    model: Optional[str] = None,
+    max_tokens: Optional[int] = None
+) -> bool:
     """
     Vérifie si le tenant a assez de tokens AVANT l'appel LLM
 
     Args:
         tenant_id: UUID du tenant
-        estimated_tokens: Estimation tokens requis (sécurité)
+        estimated_tokens: Estimation tokens requis (sécurité, si messages absent)
+        messages: Messages chat - si fournis, l'estimation utilise le tokenizer du modèle
+        model: Modèle cible (choix du tokenizer)
+        max_tokens: Limite de sortie demandée
 
     Returns:
         True si solde suffisant
@@ -55,6 +77,9 @@ def check_token_balance(tenant_id: str, estimated_tokens: int = 500) -> bool:
     Raises:
         InsufficientTokensError si solde insuffisant
     """
+    if messages is not None:
+        estimated_tokens = estimate_request_tokens(messages, model, max_tokens)
+
     balance = tokens_repo.get_balance(tenant_id)
 
     if balance["balance_tokens"] < estimated_tokens:
@@ -192,7 +217,7 @@ def proxy_openai_call(
     from openai import OpenAI
 
     # 1. Vérifier solde
-    check_token_balance(tenant_id)
+    check_token_balance(tenant_id, messages=messages, model=model, max_tokens=kwargs.get("max_tokens"))
 
     # 2. Appel OpenAI
     api_key = get_api_keys_from_env()["openai_key"]
@@ -252,7 +277,7 @@ def proxy_groq_call(
     from groq import Groq
 
     # 1. Vérifier solde
-    check_token_balance(tenant_id)
+    check_token_balance(tenant_id, messages=messages, model=model, max_tokens=kwargs.get("max_tokens"))
 
     # 2. Appel Groq
     api_key = get_api_keys_from_env()["groq_key"]
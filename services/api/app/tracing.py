@@ -0,0 +1,220 @@
+"""
+Tracing des requêtes - spans par étape, histogrammes Prometheus avec exemplars
+Ring buffer des traces lentes exposé en debug pour localiser les régressions p99
+"""
+import re
+import time
+import hashlib
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from .config import get_settings
+from .monitoring import STAGE_ERRORS, STAGE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+MAX_SPANS_PER_TRACE = 256
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{8,64}$")
+
+
+@dataclass
+class Span:
+    """Étape chronométrée d'une requête"""
+    name: str
+    span_id: int
+    parent_id: Optional[int]
+    started_at: float
+    duration_ms: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class Trace:
+    """Spans d'une requête HTTP, identifiée par son request ID"""
+    request_id: str
+    method: str = ""
+    route: str = ""
+    status_code: int = 0
+    tenant_id: Optional[str] = None
+    started_at: float = field(default_factory=time.perf_counter)
+    wall_time: float = field(default_factory=time.time)
+    duration_ms: float = 0.0
+    spans: List[Span] = field(default_factory=list)
+    dropped_spans: int = 0
+    _next_id: int = 0
+
+    def new_span(self, name: str, parent_id: Optional[int], attributes: Dict[str, Any]) -> Span:
+        self._next_id += 1
+        span = Span(
+            name=name,
+            span_id=self._next_id,
+            parent_id=parent_id,
+            started_at=time.perf_counter(),
+            attributes=attributes,
+        )
+        if len(self.spans) < MAX_SPANS_PER_TRACE:
+            self.spans.append(span)
+        else:
+            self.dropped_spans += 1
+        return span
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "route": self.route,
+            "status_code": self.status_code,
+            "tenant_id": self.tenant_id,
+            "timestamp": self.wall_time,
+            "duration_ms": round(self.duration_ms, 2),
+            "spans": [
+                {
+                    "name": s.name,
+                    "span_id": s.span_id,
+                    "parent_id": s.parent_id,
+                    "offset_ms": round((s.started_at - self.started_at) * 1000, 2),
+                    "duration_ms": round(s.duration_ms, 2),
+                    "attributes": s.attributes,
+                    "error": s.error,
+                }
+                for s in self.spans
+            ],
+            "dropped_spans": self.dropped_spans,
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class SlowTraceBuffer:
+    """
+    Ring buffer des traces dépassant un seuil de latence
+
+    Taille bornée: les traces les plus anciennes sont évincées.
+    """
+
+    def __init__(self, threshold_ms: float, max_traces: int = 200):
+        self.threshold_ms = threshold_ms
+        self._traces: Deque[Trace] = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def offer(self, trace: Trace) -> bool:
+        """Conserve la trace si elle est lente"""
+        if trace.duration_ms < self.threshold_ms:
+            return False
+        with self._lock:
+            self._traces.append(trace)
+            self.recorded += 1
+        return True
+
+    def snapshot(
+        self,
+        limit: int = 50,
+        min_duration_ms: float = 0.0,
+        tenant_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Traces les plus récentes d'abord (celles de tenant_id seulement s'il est donné)"""
+        with self._lock:
+            traces = list(self._traces)
+        selected = [
+            t for t in reversed(traces)
+            if t.duration_ms >= min_duration_ms and (tenant_id is None or t.tenant_id == tenant_id)
+        ]
+        return [t.to_dict() for t in selected[:limit]]
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+
+settings = get_settings()
+slow_traces = SlowTraceBuffer(
+    threshold_ms=settings.slow_trace_threshold_ms,
+    max_traces=settings.slow_trace_buffer_size,
+)
+
+
+def new_request_id(incoming: Optional[str] = None) -> str:
+    """Reprend le X-Request-Id amont s'il est valide, sinon en génère un"""
+    if incoming and _VALID_REQUEST_ID.match(incoming):
+        return incoming
+    return hashlib.sha256(str(time.time_ns()).encode()).hexdigest()[:16]
+
+
+def start_trace(request_id: str, method: str = "", route: str = "") -> Trace:
+    """Ouvre la trace de la requête courante (appelé par RequestIDMiddleware)"""
+    trace = Trace(request_id=request_id, method=method, route=route)
+    _current_trace.set(trace)
+    _current_span.set(None)
+    return trace
+
+
+def finish_trace(trace: Trace, status_code: int, route: Optional[str] = None) -> Trace:
+    """Clôt la trace et la propose au ring buffer des traces lentes"""
+    trace.duration_ms = (time.perf_counter() - trace.started_at) * 1000
+    trace.status_code = status_code
+    if route:
+        trace.route = route
+    slow_traces.offer(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_request_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+def exemplar() -> Optional[Dict[str, str]]:
+    """Exemplar Prometheus reliant une observation à la requête courante"""
+    request_id = current_request_id()
+    return {"request_id": request_id} if request_id else None
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Chronomètre une étape de pipeline
+
+    - Histogramme `pipeline_stage_duration_seconds{stage=name}` avec exemplar
+      request_id
+    - Span enfant de l'étape englobante dans la trace de la requête (si une
+      requête HTTP est en cours)
+
+    Le span est renvoyé pour relire `duration_ms` après le bloc.
+
+    Example:
+        >>> with stage("search", country="DZ") as span:
+        ...     results = await qdrant.search(...)
+        >>> search_time_ms = span.duration_ms
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    if trace is not None:
+        span = trace.new_span(name, parent.span_id if parent else None, attributes)
+    else:
+        span = Span(name=name, span_id=0, parent_id=None, started_at=time.perf_counter(), attributes=attributes)
+
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as e:
+        span.error = f"{type(e).__name__}: {e}"[:200]
+        STAGE_ERRORS.labels(stage=name).inc()
+        raise
+    finally:
+        _current_span.reset(token)
+        elapsed = time.perf_counter() - span.started_at
+        span.duration_ms = elapsed * 1000
+        STAGE_LATENCY.labels(stage=name).observe(elapsed, exemplar=exemplar())
@@ -0,0 +1,235 @@
+"""
+Uploads spoolés - une seule copie d'un fichier uploadé, en mémoire ou sur disque
+
+- SpooledUpload: lu par blocs depuis l'UploadFile (taille et SHA-256
+  calculés au fil de la lecture, limite de taille vérifiée avant de tout
+  lire), en mémoire sous `upload_spool_max_memory`, dans un fichier
+  temporaire au-delà; depuis from_upload(), la bascule et les écritures
+  sur disque passent par un thread (la boucle d'événements n'attend pas
+  le disque)
+- Accès sans copie pour les parsers: stream() (le fichier lui-même),
+  view() (memoryview ou mmap), path() (chemin pour poppler/pdf2image)
+- upload_scope(): compte par requête des octets d'upload tenus en RAM
+  (pic) et de la croissance du pic RSS du process, reportés dans le span
+  "upload" et l'histogramme `upload_peak_memory_bytes`
+"""
+import asyncio
+import hashlib
+import io
+import mmap
+import resource
+import tempfile
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Union
+
+from fastapi import UploadFile
+
+from .config import get_settings
+from .monitoring import UPLOAD_PEAK_MEMORY
+from .tracing import stage
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(ValueError):
+    """Upload au-delà de la taille maximale autorisée"""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Fichier trop volumineux (max {max_bytes // (1024 * 1024)} MB)")
+        self.max_bytes = max_bytes
+
+
+def _max_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@dataclass
+class UploadMemory:
+    """Octets d'upload tenus en RAM pendant une requête"""
+    in_memory_bytes: int = 0
+    peak_bytes: int = 0
+    spilled_bytes: int = 0
+    rss_start_kb: int = field(default_factory=_max_rss_kb)
+
+    def add(self, nbytes: int):
+        self.in_memory_bytes += nbytes
+        self.peak_bytes = max(self.peak_bytes, self.in_memory_bytes)
+
+    def release(self, nbytes: int):
+        self.in_memory_bytes -= nbytes
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "peak_upload_bytes": self.peak_bytes,
+            "spilled_bytes": self.spilled_bytes,
+            # Croissance du pic RSS du process pendant la requête (approché si requêtes concurrentes)
+            "rss_peak_growth_kb": max(0, _max_rss_kb() - self.rss_start_kb),
+        }
+
+
+_upload_memory: ContextVar[Optional[UploadMemory]] = ContextVar("upload_memory", default=None)
+
+
+@contextmanager
+def upload_scope(**attributes: Any) -> Iterator[UploadMemory]:
+    """
+    Étape "upload" d'une requête, avec comptage mémoire des SpooledUpload
+
+    Example:
+        >>> with upload_scope(filename=file.filename) as memory:
+        ...     upload = await SpooledUpload.from_upload(file, max_bytes=10 * 1024 * 1024)
+    """
+    memory = UploadMemory()
+    token = _upload_memory.set(memory)
+    with stage("upload", **attributes) as span:
+        try:
+            yield memory
+        finally:
+            _upload_memory.reset(token)
+            span.attributes.update(memory.as_dict())
+            UPLOAD_PEAK_MEMORY.observe(memory.peak_bytes)
+
+
+class SpooledUpload:
+    """
+    Fichier uploadé: BytesIO sous le seuil, fichier temporaire au-delà
+
+    Les octets n'existent qu'une fois; les parsers lisent le stockage
+    directement (stream/view/path) au lieu de recevoir des bytes.
+    """
+
+    def __init__(self, filename: str = "", max_memory: Optional[int] = None):
+        self.filename = filename
+        self.max_memory = get_settings().upload_spool_max_memory if max_memory is None else max_memory
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._buffer: Optional[io.BytesIO] = io.BytesIO()
+        self._buffered = 0
+        self._file = None
+        self._memory = _upload_memory.get()
+
+    @classmethod
+    async def from_upload(
+        cls,
+        upload: UploadFile,
+        max_bytes: Optional[int] = None,
+        max_memory: Optional[int] = None,
+    ) -> "SpooledUpload":
+        """Lit l'UploadFile par blocs; UploadTooLarge dès que max_bytes est dépassé"""
+        spool = cls(upload.filename or "", max_memory)
+        try:
+            while chunk := await upload.read(READ_CHUNK_SIZE):
+                if max_bytes is not None and spool.size + len(chunk) > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                if spool.writes_to_disk(len(chunk)):
+                    await asyncio.to_thread(spool.write, chunk)
+                else:
+                    spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        return spool
+
+    @classmethod
+    def from_file(cls, fileobj: BinaryIO, filename: str = "", max_memory: Optional[int] = None) -> "SpooledUpload":
+        """Spoole un file-like quelconque par blocs (sans le lire d'un coup)"""
+        spool = cls(filename or getattr(fileobj, "name", "") or "", max_memory)
+        while chunk := fileobj.read(READ_CHUNK_SIZE):
+            spool.write(chunk)
+        return spool
+
+    # ---------- Écriture ----------
+
+    def writes_to_disk(self, nbytes: int) -> bool:
+        """Vrai si écrire nbytes de plus touche le disque (bascule ou fichier déjà ouvert)"""
+        return self._file is not None or self.size + nbytes > self.max_memory
+
+    def write(self, chunk: bytes):
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        if self._file is None and self.size > self.max_memory:
+            self.rollover()
+        if self._file is not None:
+            self._file.write(chunk)
+            return
+        self._buffer.write(chunk)
+        self._buffered += len(chunk)
+        if self._memory:
+            self._memory.add(len(chunk))
+
+    def rollover(self):
+        """Déplace le contenu vers un fichier temporaire (libère la RAM)"""
+        if self._file is not None:
+            return
+        self._file = tempfile.NamedTemporaryFile(prefix="upload-", suffix=self._suffix())
+        with self._buffer.getbuffer() as buffer:
+            self._file.write(buffer)
+        if self._memory:
+            self._memory.spilled_bytes += self._buffered
+        self._release_buffer()
+
+    def _suffix(self) -> str:
+        return "." + self.filename.rsplit(".", 1)[-1].lower() if "." in self.filename else ""
+
+    def _release_buffer(self):
+        if self._buffer is not None:
+            if self._memory:
+                self._memory.release(self._buffered)
+            self._buffered = 0
+            self._buffer.close()
+            self._buffer = None
+
+    # ---------- Lecture ----------
+
+    @property
+    def in_memory(self) -> bool:
+        return self._file is None
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 calculé pendant la lecture de l'upload"""
+        return self._hash.hexdigest()
+
+    def stream(self) -> BinaryIO:
+        """Le stockage lui-même, repositionné au début (pas de copie)"""
+        storage = self._buffer if self._file is None else self._file
+        if self._file is not None:
+            self._file.flush()
+        storage.seek(0)
+        return storage
+
+    @contextmanager
+    def view(self) -> Iterator[Union[memoryview, mmap.mmap]]:
+        """Contenu comme buffer sans copie: memoryview en mémoire, mmap sur disque"""
+        if self.size == 0:
+            yield memoryview(b"")
+        elif self._file is None:
+            with self._buffer.getbuffer() as buffer:
+                yield buffer
+        else:
+            self._file.flush()
+            with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
+
+    def head(self, n: int) -> bytes:
+        with self.view() as data:
+            return bytes(data[:n])
+
+    def path(self) -> str:
+        """Chemin d'un fichier contenant l'upload (bascule sur disque si besoin)"""
+        self.rollover()
+        self._file.flush()
+        return self._file.name
+
+    def close(self):
+        self._release_buffer()
+        if self._file is not None:
+            self._file.close()
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -7,6 +7,7 @@ Avec intégration Whisper (OpenAI API ou local) + DARIJA_NLP
 
 import os
 import io
+import importlib.util
 import time
 import tempfile
 import logging
@@ -27,12 +28,8 @@ try:
 except ImportError:
     PYDUB_AVAILABLE = False
 
-# OpenAI
-try:
-    from openai import AsyncOpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# OpenAI (SDK importé à la création du service)
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
 
 # Models
 from .stt_models import (
@@ -209,10 +206,11 @@ class STTService:
         self.enable_darija_nlp = enable_darija_nlp and DARIJA_NLP_AVAILABLE
         
         # OpenAI client
-        self.openai_client: Optional[AsyncOpenAI] = None
+        self.openai_client: Optional["AsyncOpenAI"] = None
         if use_openai and OPENAI_AVAILABLE:
             api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
             if api_key:
+                from openai import AsyncOpenAI
                 self.openai_client = AsyncOpenAI(api_key=api_key)
                 logger.info("STTService: OpenAI Whisper client initialized")
             else:
@@ -20,6 +20,7 @@ LANGUES:
 
 import os
 import io
+import importlib.util
 import base64
 import time
 import logging
@@ -37,20 +38,11 @@ try:
 except ImportError:
     PYDUB_AVAILABLE = False
 
-# OpenAI
-try:
-    from openai import AsyncOpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# OpenAI (SDK importé au premier appel)
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
 
-# Coqui TTS (local)
-try:
-    from TTS.api import TTS as CoquiTTS
-    import torch
-    COQUI_AVAILABLE = True
-except ImportError:
-    COQUI_AVAILABLE = False
+# Coqui TTS (local) - torch/TTS importés au chargement du modèle (plusieurs secondes)
+COQUI_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ("TTS", "torch"))
 
 # gTTS (Google TTS gratuit)
 try:
@@ -422,6 +414,8 @@ class TTSService:
             return self._synthesize_mock(text, request, voice)
         
         try:
+            from openai import AsyncOpenAI
+
             client = AsyncOpenAI(api_key=self.openai_api_key)
             
             # Sélection voix
@@ -551,6 +545,9 @@ class TTSService:
         try:
             # Initialiser le modèle si nécessaire
             if self.coqui_model is None:
+                from TTS.api import TTS as CoquiTTS
+                import torch
+
                 device = "cuda" if torch.cuda.is_available() else "cpu"
                 self.coqui_model = CoquiTTS("tts_models/multilingual/multi-dataset/xtts_v2").to(device)
                 logger.info(f"Coqui XTTS loaded on {device}")
@@ -10,6 +10,7 @@ qui comprend et parle darija algérienne.
 
 import os
 import time
+import importlib.util
 import logging
 import base64
 from typing import Optional, Dict, Any, List, Tuple
@@ -50,6 +51,8 @@ SYSTEM_PROMPT_CH = os.getenv("SYSTEM_PROMPT_CH")
 from .tts_service import get_tts_service, TTSService
 from .tts_models import TTSRequest, TTSLanguage, TTSDialect
 
+from ..tracing import stage
+
 # DARIJA_NLP
 try:
     from app.darija.darija_normalizer import normalize_darija
@@ -71,12 +74,8 @@ except ImportError:
     def get_rag_service():
         return None
 
-# LLM Client
-try:
-    from openai import AsyncOpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+# LLM Client (SDK importé à la création du service)
+OPENAI_AVAILABLE = importlib.util.find_spec("openai") is not None
 
 
 logger = logging.getLogger(__name__)
@@ -175,7 +174,10 @@ class VoiceAgentService:
         
         # OpenAI client
         api_key = openai_api_key or os.getenv("OPENAI_API_KEY")
-        self.openai_client = AsyncOpenAI(api_key=api_key) if OPENAI_AVAILABLE and api_key else None
+        self.openai_client = None
+        if OPENAI_AVAILABLE and api_key:
+            from openai import AsyncOpenAI
+            self.openai_client = AsyncOpenAI(api_key=api_key)
         
         # Services
         self.stt_service: STTService = get_stt_service()
@@ -426,7 +428,8 @@ class VoiceAgentService:
                 enable_darija_normalization=True,
             )
             
-            response = await self.stt_service.transcribe_audio(audio_bytes, request)
+            with stage("stt", audio_bytes=len(audio_bytes)):
+                response = await self.stt_service.transcribe_audio(audio_bytes, request)
             
             duration_ms = int((time.time() - start) * 1000)
             
@@ -577,12 +580,13 @@ class VoiceAgentService:
             
             # Appeler LLM
             if self.openai_client:
-                response = await self.openai_client.chat.completions.create(
-                    model=self.default_model,
-                    messages=messages,
-                    temperature=temperature,
-                    max_tokens=max_tokens,
-                )
+                with stage("llm", model=self.default_model):
+                    response = await self.openai_client.chat.completions.create(
+                        model=self.default_model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    )
                 output_text = response.choices[0].message.content
                 model_used = response.model
             else:
@@ -644,7 +648,8 @@ class VoiceAgentService:
                 voice_id=voice_id,
             )
             
-            response = await self.tts_service.synthesize(request)
+            with stage("tts", chars=len(text)):
+                response = await self.tts_service.synthesize(request)
             
             duration_ms = int((time.time() - start) * 1000)
             
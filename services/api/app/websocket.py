@@ -1,15 +1,37 @@
 """
 WebSocket support for real-time updates
+
+- A broadcast is serialized once, then queued to every connection of the
+  tenant; each connection has its own bounded send queue drained by its
+  own writer task, so a slow client only delays itself
+- Progress events of the same operation are coalesced (latest wins); when
+  a queue is full the oldest progress event is dropped, and a client whose
+  queue is full of other messages (started/completed/error, replies) is
+  disconnected
+- With WS_BACKPLANE_ENABLED, broadcasts are relayed through Redis pub/sub so
+  clients connected to any worker receive them (local delivery while Redis
+  is unreachable)
 """
+import asyncio
 import logging
 import json
-from typing import Dict, Set
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Optional
 from fastapi import WebSocket, WebSocketDisconnect
 from dataclasses import dataclass, asdict
 from datetime import datetime
 
+from .config import get_settings
+from .monitoring import WS_MESSAGES_DROPPED
+
 logger = logging.getLogger(__name__)
 
+# Close code sent to clients that cannot keep up ("Try Again Later")
+SLOW_CLIENT_CLOSE_CODE = 1013
+# After a failed publish, broadcasts stay local this long before retrying Redis
+PUBLISH_RETRY_SECONDS = 30
+
 
 @dataclass
 class ProgressUpdate:
@@ -32,54 +54,281 @@ class ProgressUpdate:
         return result
 
 
+def serialize(message: dict) -> str:
+    """Same encoding as WebSocket.send_json, done once per broadcast"""
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def coalesce_key(message: dict) -> Optional[str]:
+    """Intermediate progress events of one operation replace each other"""
+    if message.get("status") == "progress" and message.get("operation_id"):
+        return message["operation_id"]
+    return None
+
+
+class _Outgoing:
+    __slots__ = ("key", "payload")
+
+    def __init__(self, key: Optional[str], payload: str):
+        self.key = key
+        self.payload = payload
+
+
+class ClientConnection:
+    """A WebSocket with its bounded send queue and writer task"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        tenant_id: str,
+        on_closed: Callable[["ClientConnection"], None],
+        max_queue: int,
+        send_timeout: float,
+    ):
+        self.websocket = websocket
+        self.tenant_id = tenant_id
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self._on_closed = on_closed
+        self._pending: Deque[_Outgoing] = deque()
+        self._by_key: Dict[str, _Outgoing] = {}
+        self._wakeup = asyncio.Event()
+        self._evicted = False
+        self.closed = False
+        self.writer = asyncio.create_task(self._write())
+
+    def enqueue(self, payload: str, key: Optional[str] = None) -> bool:
+        """Queue a serialized message; False if the client is closed or too slow"""
+        if self.closed or self._evicted:
+            return False
+
+        if key is not None:
+            pending = self._by_key.get(key)
+            if pending is not None:
+                pending.payload = payload
+                WS_MESSAGES_DROPPED.labels(reason="coalesced").inc()
+                return True
+
+        if len(self._pending) >= self.max_queue and not self._drop_oldest_progress():
+            WS_MESSAGES_DROPPED.labels(reason="slow_client").inc()
+            logger.warning(f"WebSocket client of tenant {self.tenant_id} too slow, disconnecting")
+            self._evicted = True
+            self._wakeup.set()
+            return False
+
+        outgoing = _Outgoing(key, payload)
+        self._pending.append(outgoing)
+        if key is not None:
+            self._by_key[key] = outgoing
+        self._wakeup.set()
+        return True
+
+    def _drop_oldest_progress(self) -> bool:
+        for i, outgoing in enumerate(self._pending):
+            if outgoing.key is not None:
+                del self._pending[i]
+                del self._by_key[outgoing.key]
+                WS_MESSAGES_DROPPED.labels(reason="dropped").inc()
+                return True
+        return False
+
+    @property
+    def queued(self) -> int:
+        return len(self._pending)
+
+    async def _write(self):
+        """Writer task: the only place that sends on this WebSocket"""
+        try:
+            while True:
+                while not self._pending and not self._evicted:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                if self._evicted:
+                    self._pending.clear()
+                    await asyncio.wait_for(
+                        self.websocket.close(code=SLOW_CLIENT_CLOSE_CODE), self.send_timeout
+                    )
+                    return
+                outgoing = self._pending.popleft()
+                if outgoing.key is not None:
+                    del self._by_key[outgoing.key]
+                await asyncio.wait_for(self.websocket.send_text(outgoing.payload), self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not isinstance(e, WebSocketDisconnect):
+                logger.info(f"WebSocket send failed for tenant {self.tenant_id}: {e}")
+        finally:
+            self.closed = True
+            self._on_closed(self)
+
+    def close(self):
+        """Stop the writer (pending messages are discarded)"""
+        self.closed = True
+        if self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
+
+class RedisBackplane:
+    """
+    Redis pub/sub relay between workers
+
+    Each frame is `["tenant_id", "coalesce key"|null]\\n<serialized message>`:
+    the message published by one worker is forwarded to WebSockets as is.
+    Publishing needs no local clients; the subscriber runs once this worker
+    has accepted a connection.
+    """
+
+    def __init__(self, deliver: Callable[[str, str, Optional[str]], int], channel: str):
+        self.deliver = deliver
+        self.channel = channel
+        self.subscribed = False
+        self._publisher = None
+        self._retry_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _redis(**options):
+        # Deferred import: redis.asyncio is only loaded by the first broadcast or connection
+        from redis.asyncio import Redis
+
+        settings = get_settings()
+        return Redis.from_url(
+            settings.redis_url,
+            password=settings.redis_password or None,
+            decode_responses=True,
+            **options,
+        )
+
+    def start(self):
+        """Start (or restart) the subscriber task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._listen())
+
+    async def publish(self, tenant_id: str, payload: str, key: Optional[str]) -> bool:
+        """False when Redis is unavailable (the caller delivers locally)"""
+        if time.monotonic() < self._retry_at:
+            return False
+        try:
+            if self._publisher is None:
+                self._publisher = self._redis(socket_connect_timeout=2, socket_timeout=2)
+            await self._publisher.publish(self.channel, json.dumps([tenant_id, key]) + "\n" + payload)
+            return True
+        except Exception as e:
+            logger.warning(f"WebSocket backplane publish failed, local delivery for {PUBLISH_RETRY_SECONDS}s: {e}")
+            self._retry_at = time.monotonic() + PUBLISH_RETRY_SECONDS
+            return False
+
+    async def _listen(self):
+        delay = 1
+        while True:
+            client = pubsub = None
+            try:
+                client = self._redis(socket_connect_timeout=5)
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                self.subscribed = True
+                delay = 1
+                logger.info(f"WebSocket backplane subscribed to {self.channel}")
+                async for message in pubsub.listen():
+                    header, _, payload = message["data"].partition("\n")
+                    tenant_id, key = json.loads(header)
+                    self.deliver(tenant_id, payload, key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"WebSocket backplane unavailable ({e}), retrying in {delay}s")
+            finally:
+                self.subscribed = False
+                if pubsub is not None:
+                    await asyncio.shield(pubsub.aclose())
+                if client is not None:
+                    await asyncio.shield(client.aclose())
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._publisher is not None:
+            await self._publisher.aclose()
+            self._publisher = None
+
+
 class ConnectionManager:
     """Manage WebSocket connections"""
 
-    def __init__(self):
-        # tenant_id -> Set of WebSocket connections
-        self.active_connections: Dict[str, Set[WebSocket]] = {}
+    def __init__(
+        self,
+        max_queue: Optional[int] = None,
+        send_timeout: Optional[float] = None,
+        backplane: Optional[bool] = None,
+    ):
+        settings = get_settings()
+        self.max_queue = max_queue or settings.ws_send_queue_size
+        self.send_timeout = send_timeout or settings.ws_send_timeout_seconds
+        # tenant_id -> {WebSocket: ClientConnection} (connections of this worker)
+        self.active_connections: Dict[str, Dict[WebSocket, ClientConnection]] = {}
+        self._clients: Dict[WebSocket, ClientConnection] = {}
+        use_backplane = settings.ws_backplane_enabled if backplane is None else backplane
+        self.backplane = RedisBackplane(self.deliver, settings.ws_backplane_channel) if use_backplane else None
 
     async def connect(self, websocket: WebSocket, tenant_id: str):
         """Accept and store WebSocket connection"""
         await websocket.accept()
-        if tenant_id not in self.active_connections:
-            self.active_connections[tenant_id] = set()
-        self.active_connections[tenant_id].add(websocket)
+        client = ClientConnection(websocket, tenant_id, self._closed, self.max_queue, self.send_timeout)
+        self.active_connections.setdefault(tenant_id, {})[websocket] = client
+        self._clients[websocket] = client
+        if self.backplane is not None:
+            self.backplane.start()
         logger.info(f"WebSocket connected for tenant {tenant_id}")
 
     def disconnect(self, websocket: WebSocket, tenant_id: str):
         """Remove WebSocket connection"""
-        if tenant_id in self.active_connections:
-            self.active_connections[tenant_id].discard(websocket)
-            if not self.active_connections[tenant_id]:
+        connections = self.active_connections.get(tenant_id)
+        if connections is not None:
+            client = connections.pop(websocket, None)
+            if client is not None:
+                self._clients.pop(websocket, None)
+                client.close()
+            if not connections:
                 del self.active_connections[tenant_id]
         logger.info(f"WebSocket disconnected for tenant {tenant_id}")
 
+    def _closed(self, client: ClientConnection):
+        """Writer ended (send error, timeout, slow client): forget the connection"""
+        connections = self.active_connections.get(client.tenant_id)
+        if connections is not None and connections.get(client.websocket) is client:
+            self.disconnect(client.websocket, client.tenant_id)
+
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send message to specific connection"""
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.enqueue(serialize(message))
+            return
         try:
             await websocket.send_json(message)
         except Exception as e:
             logger.error(f"Error sending WebSocket message: {e}")
 
-    async def broadcast_to_tenant(self, tenant_id: str, message: dict):
-        """Broadcast message to all connections of a tenant"""
-        if tenant_id not in self.active_connections:
-            return
-
-        disconnected = set()
-        for connection in self.active_connections[tenant_id]:
-            try:
-                await connection.send_json(message)
-            except WebSocketDisconnect:
-                disconnected.add(connection)
-            except Exception as e:
-                logger.error(f"Error broadcasting to tenant {tenant_id}: {e}")
-                disconnected.add(connection)
+    def deliver(self, tenant_id: str, payload: str, key: Optional[str] = None) -> int:
+        """Queue a serialized message to this worker's connections of a tenant"""
+        connections = self.active_connections.get(tenant_id)
+        if not connections:
+            return 0
+        return sum(client.enqueue(payload, key) for client in list(connections.values()))
 
-        # Clean up disconnected clients
-        for connection in disconnected:
-            self.disconnect(connection, tenant_id)
+    async def broadcast_to_tenant(self, tenant_id: str, message: dict):
+        """Broadcast message to all connections of a tenant, on every worker"""
+        payload = serialize(message)
+        key = coalesce_key(message)
+        if self.backplane is not None and await self.backplane.publish(tenant_id, payload, key):
+            if self.backplane.subscribed:
+                return  # delivered here too, by our own subscriber
+        self.deliver(tenant_id, payload, key)
 
     async def send_progress_update(
         self,
@@ -100,6 +349,16 @@ class ConnectionManager:
         )
         await self.broadcast_to_tenant(tenant_id, update.to_dict())
 
+    async def close(self):
+        """Stop writers and the backplane subscriber (app shutdown)"""
+        for connections in list(self.active_connections.values()):
+            for client in list(connections.values()):
+                client.close()
+        self.active_connections.clear()
+        self._clients.clear()
+        if self.backplane is not None:
+            await self.backplane.close()
+
 
 # Global connection manager
 manager = ConnectionManager()
@@ -0,0 +1,70 @@
+-- Migration 013: Billing Ledger
+-- =============================
+-- Soldes de crédits persistants + journal append-only des transactions
+
+BEGIN;
+
+-- ============================================================
+-- Table: billing_credit_accounts
+-- ============================================================
+-- Solde matérialisé, débité par UPDATE conditionnel atomique
+
+CREATE TABLE IF NOT EXISTS billing_credit_accounts (
+    user_id VARCHAR(100) PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 0 CHECK (balance >= 0),
+    bonus_balance INTEGER NOT NULL DEFAULT 0 CHECK (bonus_balance >= 0),
+    monthly_used INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- ============================================================
+-- Table: billing_transactions
+-- ============================================================
+-- Journal append-only; la clé d'idempotence rend les retries sans effet
+
+CREATE TABLE IF NOT EXISTS billing_transactions (
+    id VARCHAR(50) PRIMARY KEY,
+    user_id VARCHAR(100) NOT NULL,
+    type VARCHAR(30) NOT NULL,  -- 'purchase', 'consumption', 'refund', 'bonus', 'subscription', 'adjustment'
+    credits_amount INTEGER NOT NULL,
+    balance_before INTEGER NOT NULL,
+    balance_after INTEGER NOT NULL,
+    description TEXT NOT NULL,
+    service_type VARCHAR(50),
+    service_reference VARCHAR(200),
+    price_amount NUMERIC(12, 2),
+    payment_provider VARCHAR(30),
+    external_payment_id VARCHAR(200),
+    idempotency_key VARCHAR(200),
+    metadata JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (user_id, idempotency_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_billing_txn_user_created
+    ON billing_transactions (user_id, created_at DESC);
+
+-- ============================================================
+-- Table: billing_daily_usage
+-- ============================================================
+-- Compteurs quotidiens, alimentés par upserts groupés (write-behind)
+
+CREATE TABLE IF NOT EXISTS billing_daily_usage (
+    user_id VARCHAR(100) NOT NULL,
+    usage_date DATE NOT NULL,
+    rag_queries INTEGER NOT NULL DEFAULT 0,
+    pme_quick INTEGER NOT NULL DEFAULT 0,
+    pme_full INTEGER NOT NULL DEFAULT 0,
+    fiscal_simulations INTEGER NOT NULL DEFAULT 0,
+    creative_generations INTEGER NOT NULL DEFAULT 0,
+    voice_minutes INTEGER NOT NULL DEFAULT 0,
+    emails_sent INTEGER NOT NULL DEFAULT 0,
+    total_requests INTEGER NOT NULL DEFAULT 0,
+    total_credits_used INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, usage_date)
+);
+
+COMMENT ON TABLE billing_transactions IS 'Journal append-only des mouvements de crédits';
+
+COMMIT;
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK_CHUNKER - Débit et mémoire du découpage en chunks
+===========================================================
+Compare, sur un Journal Officiel de 500 pages (PDF réel via --pdf, sinon
+pages synthétiques FR/AR au format JO générées à la volée):
+
+- parser:     ancien DocumentParser (texte += page, taille fixe en caractères)
+- connectors: ancien TextChunker DZ-Connectors (4 caractères/token, overlap copié)
+- stream:     app.chunking (page par page, tokens BPE, fins de phrase AR/FR)
+
+Mesures: pages/s, Mo/s, pic mémoire Python (tracemalloc), nombre de chunks
+et taille réelle en tokens des chunks produits (budget: CHUNK_MAX_TOKENS).
+
+Usage:
+    python scripts/benchmark_chunker.py
+    python scripts/benchmark_chunker.py --pages 500 --repeat 3
+    python scripts/benchmark_chunker.py --pdf JO_2024_001.pdf
+"""
+
+import re
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+# Ajouter le path du projet
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.chunking import count_chunk_tokens, get_chunker
+
+ARTICLE_FR = (
+    "Art. {n}. — Les dispositions de l'article {m} de la loi n° 23-{n:02d} du {day} janvier 2023 "
+    "sont modifiées et complétées comme suit. M. le ministre des finances fixe, par arrêté, "
+    "les modalités d'application du présent article, cf. le décret exécutif n° 24-{m:02d}. "
+    "Le taux applicable aux opérations réalisées par les entreprises est de {rate} %, "
+    "sauf dispositions contraires prévues par la législation en vigueur.\n\n"
+)
+ARTICLE_AR = (
+    "المادة {n}: تعدل وتتمم أحكام المادة {m} من القانون رقم 23-{n:02d} المؤرخ في {day} يناير 2023. "
+    "يحدد وزير المالية كيفيات تطبيق هذه المادة بموجب قرار. "
+    "تطبق النسبة {rate} بالمائة على العمليات التي تنجزها المؤسسات، ما لم تنص أحكام مخالفة على ذلك؟ "
+    "ينشر هذا المرسوم في الجريدة الرسمية للجمهورية الجزائرية الديمقراطية الشعبية.\n\n"
+)
+
+
+def synthetic_pages(pages: int) -> Iterator[str]:
+    """Pages JO bilingues (~3 Ko), générées une à une"""
+    n = 1
+    for page in range(pages):
+        parts = [f"JOURNAL OFFICIEL DE LA REPUBLIQUE ALGERIENNE N° {page // 40 + 1}\n\n"]
+        for _ in range(3):
+            parts.append(ARTICLE_FR.format(n=n, m=n + 7, day=n % 28 + 1, rate=n % 19 + 1))
+            parts.append(ARTICLE_AR.format(n=n, m=n + 7, day=n % 28 + 1, rate=n % 19 + 1))
+            n += 1
+        yield "".join(parts)
+
+
+def pdf_pages(path: Path) -> Iterator[str]:
+    import PyPDF2
+    reader = PyPDF2.PdfReader(str(path))
+    for page in reader.pages:
+        yield page.extract_text() or ""
+
+
+# ----------------------------------------
+# Implémentations précédentes (référence)
+# ----------------------------------------
+
+def legacy_parser(pages: Iterator[str]) -> List[str]:
+    """DocumentParser.parse_pdf + chunk_text (1200 caractères, français)"""
+    text = ""
+    for page in pages:
+        text += page + "\n"
+
+    chunks, current_chunk = [], ""
+    for paragraph in text.strip().split("\n\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(current_chunk) + len(paragraph) < 1200:
+            current_chunk += paragraph + "\n\n"
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = paragraph + "\n\n"
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+    return [chunk for chunk in chunks if len(chunk) > 50]
+
+
+def legacy_connectors(pages: Iterator[str], chunk_size: int = 500, overlap: int = 50) -> List[str]:
+    """TextChunker DZ-Connectors (4 caractères/token, overlap par concaténation)"""
+    text = ""
+    for page in pages:
+        text += page + "\n"
+
+    max_chars, overlap_chars = chunk_size * 4, overlap * 4
+    chunks, current_chunk = [], ""
+    for para in text.split("\n\n"):
+        para = para.strip()
+        if not para:
+            continue
+        if len(para) > max_chars:
+            for sentence in (s.strip() for s in re.split(r"(?<=[.!?])\s+", para) if s.strip()):
+                if len(current_chunk) + len(sentence) <= max_chars:
+                    current_chunk += " " + sentence if current_chunk else sentence
+                else:
+                    if current_chunk:
+                        chunks.append(current_chunk.strip())
+                    current_chunk = sentence
+        elif len(current_chunk) + len(para) + 2 <= max_chars:
+            current_chunk += "\n\n" + para if current_chunk else para
+        else:
+            if current_chunk:
+                chunks.append(current_chunk.strip())
+            current_chunk = para
+    if current_chunk:
+        chunks.append(current_chunk.strip())
+
+    overlapped = chunks[:1]
+    for i in range(1, len(chunks)):
+        prev_end = chunks[i - 1][-overlap_chars:] if len(chunks[i - 1]) > overlap_chars else chunks[i - 1]
+        overlapped.append(f"...{prev_end}\n\n{chunks[i]}")
+    return overlapped
+
+
+def streaming(pages: Iterator[str]) -> List[str]:
+    """app.chunking: page par page (seuls les textes des chunks sont conservés)"""
+    return [chunk.text for chunk in get_chunker().stream(pages, namespace="benchmark")]
+
+
+IMPLEMENTATIONS = {"parser": legacy_parser, "connectors": legacy_connectors, "stream": streaming}
+
+
+def measure(chunker: Callable[[Iterator[str]], List[str]], source: Callable[[], Iterator[str]], repeat: int):
+    """(meilleur temps en s, pic mémoire en Mo, chunks)"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = chunker(source())
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    chunker(source())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 2**20, chunks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du découpage en chunks")
+    parser.add_argument("--pages", type=int, default=500, help="Pages synthétiques")
+    parser.add_argument("--pdf", type=Path, help="PDF réel (Journal Officiel)")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions (meilleur temps)")
+    args = parser.parse_args()
+
+    if args.pdf:
+        # Extraction PDF une fois: on mesure le découpage, pas PyPDF2
+        cached = list(pdf_pages(args.pdf))
+        source = lambda: iter(cached)
+        label = f"{args.pdf.name}"
+    else:
+        source = lambda: synthetic_pages(args.pages)
+        label = "JO synthétique FR/AR"
+
+    pages = sum(1 for _ in source())
+    size_mb = sum(len(page.encode("utf-8")) for page in source()) / 2**20
+    budget = get_chunker().max_tokens
+    print(f"{label}: {pages} pages, {size_mb:.1f} Mo, budget {budget} tokens\n")
+    print(f"{'':<11} {'pages/s':>9} {'Mo/s':>7} {'pic Mo':>8} {'chunks':>7} {'tokens moy':>11} {'max':>6} {'> budget':>9}")
+
+    for name, chunker in IMPLEMENTATIONS.items():
+        seconds, peak_mb, chunks = measure(chunker, source, args.repeat)
+        tokens = count_chunk_tokens(chunks)
+        over = sum(1 for t in tokens if t > budget)
+        print(
+            f"{name:<11} {pages / seconds:>9.0f} {size_mb / seconds:>7.1f} {peak_mb:>8.1f} {len(chunks):>7} "
+            f"{sum(tokens) / len(tokens):>11.0f} {max(tokens):>6} {over:>9}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK_MIDDLEWARE - Coût par requête de la pile de middlewares
+=================================================================
+Compare, sous charge httpx ASGI (sans réseau), la latence ajoutée par:
+
+- none:     application nue (référence)
+- legacy:   RequestID → EnhancedAuth → TenantContext → RateLimit (BaseHTTPMiddleware)
+- pipeline: RequestPipelineMiddleware (une seule passe ASGI)
+
+sur un endpoint JSON et un endpoint en streaming (temps jusqu'au 1er chunk).
+Les requêtes s'authentifient avec API_SECRET_KEY (tenant dev, sans base).
+
+Usage:
+    python scripts/benchmark_middleware.py
+    python scripts/benchmark_middleware.py --requests 5000 --concurrency 50
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+# Ajouter le path du projet
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+os.environ.setdefault("ENABLE_RATE_LIMITING", "false")
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from app.config import get_settings
+from app.middleware import RequestIDMiddleware, RequestPipelineMiddleware
+from app.security import EnhancedAuthMiddleware, RateLimitMiddleware
+from app.tenant_middleware import TenantContextMiddleware
+
+TENANT_ID = "550e8400-e29b-41d4-a716-446655440000"
+STACKS = ("none", "legacy", "pipeline")
+
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id, "name": "item"}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            for i in range(5):
+                yield f"chunk {i}\n"
+                await asyncio.sleep(0.001)
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    if stack == "legacy":
+        app.add_middleware(RateLimitMiddleware)
+        app.add_middleware(TenantContextMiddleware)
+        app.add_middleware(EnhancedAuthMiddleware)
+        app.add_middleware(RequestIDMiddleware)
+    elif stack == "pipeline":
+        app.add_middleware(RequestPipelineMiddleware)
+    return app
+
+
+async def measure(app: FastAPI, path: str, requests: int, concurrency: int, stream: bool) -> list:
+    """Latences (ms) jusqu'à la réponse complète, ou jusqu'au 1er chunk si stream"""
+    headers = {"X-API-Key": get_settings().api_secret_key, "X-Tenant-ID": TENANT_ID}
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+        async def one():
+            async with semaphore:
+                started = time.perf_counter()
+                first_chunk = None
+                async with client.stream("GET", path) as response:
+                    async for _ in response.aiter_raw():
+                        first_chunk = first_chunk or time.perf_counter()
+                    if response.status_code != 200:
+                        raise RuntimeError(f"{path}: HTTP {response.status_code}")
+                finished = time.perf_counter()
+                latencies.append(((first_chunk if stream else finished) - started) * 1000)
+
+        # Warm-up
+        await asyncio.gather(*(one() for _ in range(min(100, requests))))
+        latencies.clear()
+        await asyncio.gather(*(one() for _ in range(requests)))
+
+    return latencies
+
+
+def summarize(latencies: list) -> str:
+    ordered = sorted(latencies)
+    p50 = statistics.median(ordered)
+    p99 = ordered[int(len(ordered) * 0.99) - 1]
+    return f"p50 {p50:7.3f} ms   p99 {p99:7.3f} ms"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la pile de middlewares")
+    parser.add_argument("--requests", type=int, default=2000, help="Requêtes par scénario")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requêtes simultanées")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    settings.enable_api_key_auth = True
+    if not settings.api_secret_key:
+        settings.api_secret_key = "bench-secret-key"
+
+    print(f"{args.requests} requêtes, concurrence {args.concurrency}\n")
+    for label, path, stream in (("JSON", "/api/items/42", False), ("stream (1er chunk)", "/api/stream", True)):
+        print(label)
+        baseline = None
+        for stack in STACKS:
+            latencies = await measure(build_app(stack), path, args.requests, args.concurrency, stream)
+            mean = statistics.fmean(latencies)
+            baseline = mean if baseline is None else baseline
+            print(f"  {stack:<9} {summarize(latencies)}   surcoût moyen {(mean - baseline) * 1000:8.1f} µs")
+        print()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
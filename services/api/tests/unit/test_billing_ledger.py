@@ -0,0 +1,168 @@
+"""
+Unit tests for the persistent billing ledger
+"""
+import sys
+import types
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import date
+
+import pytest
+
+from app.services.billing_ledger import CreditLedger, UsageBatcher
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=()):
+        self.connection.queries.append(query)
+
+    def fetchone(self):
+        return (100, 0, 0)
+
+
+class FakeConnectionPool:
+    """psycopg_pool.ConnectionPool handing out a single recorded connection"""
+    instances = []
+
+    def __init__(self, conninfo, min_size, max_size, open):
+        self.max_size = max_size
+        self.checkouts = 0
+        self.queries = []
+        self.closed = False
+        FakeConnectionPool.instances.append(self)
+
+    @contextmanager
+    def connection(self):
+        self.checkouts += 1
+        yield types.SimpleNamespace(cursor=lambda: FakeCursor(self))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return CreditLedger(f"sqlite:///{tmp_path / 'ledger.db'}")
+
+
+class TestCreditLedger:
+    """Test suite for atomic consumption, idempotency and write-behind usage"""
+
+    def test_open_account_is_idempotent(self, ledger):
+        """Re-opening an account neither resets the balance nor duplicates the bonus"""
+        ledger.open_account("u1", 100, "Bienvenue")
+        ledger.consume("u1", 30, "Consommation rag_query")
+
+        account = ledger.open_account("u1", 100, "Bienvenue")
+
+        assert account["balance"] == 70
+        assert len(ledger.list_transactions("u1", type="bonus")) == 1
+
+    def test_bonus_consumed_first(self, ledger):
+        """Bonus credits are spent before the regular balance"""
+        ledger.open_account("u1", 100, "Bienvenue")
+        with ledger._transaction() as cur:
+            cur.execute("UPDATE billing_credit_accounts SET bonus_balance = 10 WHERE user_id = 'u1'")
+
+        result = ledger.consume("u1", 15, "Consommation pme_full")
+
+        assert (result.bonus_balance, result.balance) == (0, 95)
+        assert (result.balance_before, result.balance_after) == (110, 95)
+
+    def test_insufficient_balance_is_rejected(self, ledger):
+        """A consume larger than the balance leaves the account untouched"""
+        ledger.open_account("u1", 5, "Bienvenue")
+
+        result = ledger.consume("u1", 8, "Consommation council")
+
+        assert not result.success
+        assert ledger.get_account("u1")["balance"] == 5
+        assert ledger.list_transactions("u1", type="consumption") == []
+
+    def test_idempotency_key_replays_transaction(self, ledger):
+        """Retrying with the same key returns the original transaction without charging"""
+        ledger.open_account("u1", 100, "Bienvenue")
+
+        first = ledger.consume("u1", 10, "Consommation", idempotency_key="req-1")
+        retry = ledger.consume("u1", 10, "Consommation", idempotency_key="req-1")
+
+        assert retry.duplicate and retry.transaction_id == first.transaction_id
+        assert ledger.get_account("u1")["balance"] == 90
+
+    def test_concurrent_consumes_lose_nothing(self, ledger):
+        """1k concurrent consumes: no lost update, no overdraft, duplicates charged once"""
+        ledger.open_account("u1", 700, "Bienvenue")
+
+        # 1000 requêtes dont 200 retries d'une clé déjà envoyée
+        keys = [f"req-{i % 800}" for i in range(1000)]
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            results = list(pool.map(lambda key: ledger.consume("u1", 1, "Consommation", idempotency_key=key), keys))
+
+        charged = {r.transaction_id for r in results if r.success}
+        consumptions = ledger.list_transactions("u1", limit=2000, type="consumption")
+        account = ledger.get_account("u1")
+
+        assert len(charged) == len(consumptions) == 700
+        assert account["balance"] == 0
+        assert account["monthly_used"] == 700
+        assert sum(r.success and not r.duplicate for r in results) == 700
+
+    def test_usage_batcher_upserts_increments(self, ledger):
+        """Pending daily usage is merged into one upsert per user and day"""
+        batcher = UsageBatcher(ledger, flush_interval=3600)
+        for _ in range(3):
+            batcher.add("u1", "rag_queries", 1)
+        batcher.add("u1", "pme_full", 5)
+
+        assert batcher.flush() == 1
+        batcher.add("u1", "rag_queries", 1)
+        usage = batcher.get_daily_usage("u1", date.today())
+
+        assert usage["rag_queries"] == 4
+        assert usage["total_requests"] == 5
+        assert usage["total_credits_used"] == 9
+
+    def test_consume_with_key_is_one_transaction(self, ledger, monkeypatch):
+        """The idempotency lookup runs inside the debit transaction"""
+        ledger.open_account("u1", 100, "Bienvenue")
+        transaction = ledger._transaction
+        opened = []
+
+        def counting():
+            opened.append(1)
+            return transaction()
+
+        monkeypatch.setattr(ledger, "_transaction", counting)
+        ledger.consume("u1", 10, "Consommation", idempotency_key="req-1")
+        ledger.consume("u1", 10, "Consommation", idempotency_key="req-1")
+
+        assert len(opened) == 2
+        assert ledger.get_account("u1")["balance"] == 90
+
+
+class TestPostgresPool:
+    """Test suite for pooled PostgreSQL connections"""
+
+    def test_connections_come_from_one_pool(self, monkeypatch):
+        """Every operation checks out a pooled connection instead of connecting"""
+        monkeypatch.setitem(sys.modules, "psycopg_pool", types.SimpleNamespace(ConnectionPool=FakeConnectionPool))
+        FakeConnectionPool.instances.clear()
+        ledger = CreditLedger("postgresql://billing@db/iafactory", pool_size=4)
+
+        for _ in range(3):
+            ledger.get_account("u1")
+
+        assert len(FakeConnectionPool.instances) == 1
+        pool = FakeConnectionPool.instances[0]
+        assert pool.max_size == 4 and pool.checkouts == 3
+        ledger.close()
+        assert pool.closed
@@ -0,0 +1,117 @@
+"""
+Unit tests for the BMAD agent DAG scheduler and coalesced status writes
+"""
+import asyncio
+
+import pytest
+
+from app.models.bolt_workflow import WorkflowStatus
+from app.services.bmad_scheduler import AGENT_DEPENDENCIES, AgentDAGScheduler, resolve_dependencies
+from app.services.bolt_workflow_service import WorkflowStatusWriter
+
+DURATIONS = {"architect": 0.05, "pm": 0.02, "backend": 0.04, "frontend": 0.02, "devops": 0.01, "qa": 0.03}
+
+
+class FakeWorkflowService:
+    def __init__(self):
+        self.writes = []
+
+    async def update_agents_progress(self, workflow_id, status, current_agent, completed_agents):
+        self.writes.append((status, current_agent, list(completed_agents)))
+        return True
+
+
+def run_graph(dependencies, max_concurrency=3):
+    calls = {}
+    running = []
+    peak = []
+
+    async def run_agent(agent_id, inputs):
+        calls[agent_id] = sorted(inputs)
+        running.append(agent_id)
+        peak.append(len(running))
+        await asyncio.sleep(DURATIONS.get(agent_id, 0.01))
+        running.remove(agent_id)
+        return f"output of {agent_id}"
+
+    report = asyncio.run(AgentDAGScheduler(dependencies, max_concurrency).run(run_agent))
+    return report, calls, max(peak)
+
+
+class TestAgentDAGScheduler:
+    """Test suite for dependency resolution, concurrent execution and critical path"""
+
+    def test_missing_agents_are_bridged(self):
+        """Dependencies on agents not requested fall back to their own inputs"""
+        resolved = resolve_dependencies(["pm", "qa", "custom"])
+
+        assert resolved == {"pm": (), "qa": ("pm",), "custom": ("pm", "qa")}
+
+    def test_agents_receive_only_their_dependencies(self):
+        """Each agent starts after its dependencies and only sees their outputs"""
+        report, calls, _ = run_graph(resolve_dependencies(list(AGENT_DEPENDENCIES)))
+
+        assert calls["architect"] == [] and calls["pm"] == []
+        assert calls["qa"] == ["backend", "frontend", "pm"]
+        for agent_id, deps in AGENT_DEPENDENCIES.items():
+            timing = report.timings[agent_id]
+            assert all(report.timings[dep].finished_at <= timing.started_at for dep in deps)
+        assert list(report.results) == list(AGENT_DEPENDENCIES)
+
+    def test_concurrency_cap_and_critical_path(self):
+        """Independent agents overlap under the cap; the longest chain is reported"""
+        report, _, peak = run_graph(resolve_dependencies(list(AGENT_DEPENDENCIES)), max_concurrency=2)
+
+        assert peak == 2
+        assert report.critical_path == ["architect", "backend", "qa"]
+        assert report.critical_path_time == pytest.approx(0.12, abs=0.03)
+        assert report.wall_time < report.sequential_time
+
+    def test_cycle_is_rejected(self):
+        """A dependency cycle is reported before anything runs"""
+        with pytest.raises(ValueError, match="cycle"):
+            AgentDAGScheduler({"a": ("b",), "b": ("a",)})
+
+    def test_failure_cancels_running_agents(self):
+        """An agent exception cancels the agents still running and propagates"""
+        cancelled = []
+
+        async def run_agent(agent_id, inputs):
+            if agent_id == "pm":
+                raise RuntimeError("boom")
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(agent_id)
+                raise
+
+        scheduler = AgentDAGScheduler(resolve_dependencies(["architect", "pm", "backend"]))
+        with pytest.raises(RuntimeError):
+            asyncio.run(scheduler.run(run_agent))
+        assert cancelled == ["architect"]
+
+
+class TestWorkflowStatusWriter:
+    """Test suite for coalesced workflow progress writes"""
+
+    def test_progress_writes_are_coalesced(self):
+        """Starts and completions within the interval become one write; close writes the final state"""
+        service = FakeWorkflowService()
+
+        async def scenario():
+            writer = WorkflowStatusWriter(service, "wf-1", WorkflowStatus.ORCHESTRATING, min_interval=0.05)
+            writer.agent_started("architect")
+            writer.agent_started("pm")
+            writer.agent_completed("pm")
+            await asyncio.sleep(0.1)
+            writer.agent_started("backend")
+            writer.agent_completed("architect")
+            writer.agent_completed("backend")
+            await writer.close()
+
+        asyncio.run(scenario())
+
+        assert service.writes == [
+            (WorkflowStatus.ORCHESTRATING, "architect", ["pm"]),
+            (WorkflowStatus.ORCHESTRATING, None, ["architect", "backend"]),
+        ]
@@ -0,0 +1,103 @@
+"""
+Unit tests for the streaming Bolt project ZIP builder
+"""
+import asyncio
+import io
+import json
+import os
+import shutil
+import time
+import zipfile
+
+import pytest
+
+from app.services.bolt_zip_service import BoltZipService, boilerplate_cache
+
+
+GENERATED_CODE = {
+    "raw_output": json.dumps({
+        f"backend/module_{i}.py": f"def handler_{i}():\n    return {i}\n" * 200
+        for i in range(60)
+    })
+}
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = BoltZipService(db_pool=None)
+    service.zip_storage_dir = tmp_path
+    return service
+
+
+def legacy_build(service, tmp_path, files):
+    """Previous implementation: temp tree on disk, os.walk, re-read into ZipFile"""
+    project_dir = tmp_path / "legacy-project"
+    for path, content, _ in files:
+        full_path = project_dir / path
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        full_path.write_text(content, encoding="utf-8")
+    tree_bytes = sum(f.stat().st_size for f in project_dir.rglob("*") if f.is_file())
+
+    zip_path = tmp_path / "legacy.zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for root, _, names in os.walk(project_dir):
+            for name in names:
+                file_path = os.path.join(root, name)
+                zipf.write(file_path, os.path.relpath(file_path, project_dir))
+    shutil.rmtree(project_dir)
+    return tree_bytes + zip_path.stat().st_size
+
+
+class TestBoltZipService:
+    """Test suite for archive content, streaming and boilerplate caching"""
+
+    def test_archive_contains_project_tree(self, service):
+        """The archive is valid and lays out README, sources, tests and configs"""
+        zip_path = asyncio.run(service.create_project_zip("wf-1", generated_code=GENERATED_CODE))
+
+        with zipfile.ZipFile(zip_path) as zipf:
+            assert zipf.testzip() is None
+            names = set(zipf.namelist())
+            assert zipf.read("src/backend/module_3.py").decode().startswith("def handler_3")
+
+        assert {"README.md", "docker-compose.yml", ".github/workflows/ci.yml",
+                ".gitignore", ".env.example", "tests/unit/test_example.py"} <= names
+        assert not any(p.name.endswith(".partial") for p in service.zip_storage_dir.iterdir())
+
+    def test_stream_matches_file_content(self, service):
+        """Streamed chunks form an archive with the same entries as the file build"""
+        async def collect():
+            return b"".join([chunk async for chunk in service.stream_project_zip(generated_code=GENERATED_CODE)])
+
+        streamed = zipfile.ZipFile(io.BytesIO(asyncio.run(collect())))
+        zip_path = asyncio.run(service.create_project_zip("wf-2", generated_code=GENERATED_CODE))
+
+        with zipfile.ZipFile(zip_path) as built:
+            assert streamed.namelist() == built.namelist()
+            assert all(streamed.read(n) == built.read(n) for n in built.namelist())
+
+    def test_boilerplate_payloads_are_cached(self, service):
+        """Static parts are compressed once and reused across projects"""
+        list(service.iter_zip_chunks(service.build_project_files()))
+        hits = boilerplate_cache.hits
+
+        list(service.iter_zip_chunks(service.build_project_files()))
+
+        static_count = sum(1 for _, _, static in service.build_project_files() if static)
+        assert boilerplate_cache.hits - hits == static_count
+
+    @pytest.mark.slow
+    def test_benchmark_against_temp_tree(self, service, tmp_path):
+        """Streaming build is faster and uses no disk beyond the final archive"""
+        files = service.build_project_files(generated_code=GENERATED_CODE)
+
+        started = time.perf_counter()
+        legacy_peak_disk = legacy_build(service, tmp_path, files)
+        legacy_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        streamed_bytes = sum(len(chunk) for chunk in service.iter_zip_chunks(files))
+        streaming_time = time.perf_counter() - started
+
+        assert streaming_time < legacy_time
+        assert streamed_bytes < legacy_peak_disk
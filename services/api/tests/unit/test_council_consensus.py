@@ -0,0 +1,176 @@
+"""
+Unit tests for Council consensus helpers and the stage-2 early exit
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.modules.council import flexible_orchestrator, orchestrator
+from app.modules.council.config import CouncilConfig
+from app.modules.council.consensus import StageTimer, gather_with_deadline, opinion_agreement
+from app.modules.council.flexible_orchestrator import FlexibleCouncilOrchestrator
+from app.modules.council.orchestrator import CouncilOrchestrator
+from app.modules.council.universal_provider import UniversalProvider
+
+# Jaccard 4/6 = 0.67 (above the 0.6 default threshold) and 3/7 = 0.43 (below)
+CLOSE = ["alpha beta gamma delta epsilon", "alpha beta gamma delta zeta"]
+APART = ["alpha beta gamma delta epsilon", "alpha beta gamma theta iota"]
+
+
+class FakeProvider:
+    """Council provider returning a fixed opinion and recording reviews"""
+
+    def __init__(self, opinion: str, reviews: list):
+        self.opinion = opinion
+        self.reviews = reviews
+
+    def is_available(self) -> bool:
+        return True
+
+    async def generate(self, prompt: str, system: str = None) -> str:
+        if system:
+            return self.opinion
+        if prompt.startswith("Tu es le Chairman"):
+            return "Synthèse"
+        self.reviews.append(prompt)
+        return '{"Response_1": {"precision": 8}}'
+
+
+class TestOpinionAgreement:
+    """Test suite for the pairwise Jaccard agreement"""
+
+    def test_identical_and_disjoint(self):
+        """Identical opinions agree fully, opinions without common terms not at all"""
+        assert opinion_agreement(["Taux normal de TVA", "taux NORMAL de tva"]) == 1.0
+        assert opinion_agreement(["alpha beta", "gamma delta"]) == 0.0
+
+    def test_pairwise_average(self):
+        """The score is the mean Jaccard similarity over all pairs"""
+        assert opinion_agreement(CLOSE) == pytest.approx(4 / 6)
+        three = CLOSE + ["theta iota kappa lambda"]
+        assert opinion_agreement(three) == pytest.approx((4 / 6 + 0 + 0) / 3)
+
+    def test_short_words_and_missing_opinions_are_ignored(self):
+        """Terms under 4 characters are ignored and fewer than two opinions agree"""
+        assert opinion_agreement(["le prix est de 19", "le prix est de 9"]) == 1.0
+        assert opinion_agreement(["alpha beta", ""]) == 1.0
+        assert opinion_agreement([]) == 1.0
+
+
+class TestGatherWithDeadline:
+    """Test suite for parallel reviews under a deadline"""
+
+    def test_late_calls_are_cancelled(self):
+        """Partial results are returned and late reviews are cancelled"""
+        cancelled = []
+
+        async def answer(text: str, delay: float) -> str:
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(text)
+                raise
+            return text
+
+        async def failure() -> str:
+            raise RuntimeError("quota exceeded")
+
+        async def scenario():
+            started = time.perf_counter()
+            outcome = await gather_with_deadline(
+                {"fast": answer("ok", 0), "slow": answer("late", 5), "broken": failure()},
+                timeout=0.05,
+            )
+            await asyncio.sleep(0)
+            return outcome, time.perf_counter() - started
+
+        (results, errors, timed_out), elapsed = asyncio.run(scenario())
+
+        assert results == {"fast": "ok"}
+        assert errors == {"broken": "quota exceeded"}
+        assert timed_out == ["slow"]
+        assert cancelled == ["late"]
+        assert elapsed < 1
+
+    def test_no_calls(self):
+        """An empty call set returns immediately"""
+        assert asyncio.run(gather_with_deadline({}, timeout=1)) == ({}, {}, [])
+
+
+class TestStageTimer:
+    """Test suite for per-stage latency"""
+
+    def test_durations_per_stage(self):
+        """Each stop records the time since the last start"""
+        timer = StageTimer()
+        timer.start()
+        time.sleep(0.02)
+        timer.stop("stage1_opinions")
+        timer.start()
+        timer.stop("stage3_synthesis")
+
+        assert timer.durations["stage1_opinions"] >= 0.02
+        assert timer.durations["stage3_synthesis"] < timer.durations["stage1_opinions"]
+
+
+class TestEarlyExit:
+    """Test suite for skipping the cross-review when opinions agree"""
+
+    def _council(self, monkeypatch, opinions, threshold=0.6):
+        reviews = []
+        providers = dict(zip(["chatgpt", "claude"], opinions))
+        config = CouncilConfig(OPENAI_API_KEY="k", ANTHROPIC_API_KEY="k", EARLY_EXIT_AGREEMENT=threshold)
+        monkeypatch.setattr(orchestrator, "council_config", config)
+        monkeypatch.setattr(orchestrator, "get_provider", lambda name: FakeProvider(providers.get(name, ""), reviews))
+        council = CouncilOrchestrator(council_members=["chatgpt", "claude"], chairman="claude")
+        return asyncio.run(council.process_query("Taux de TVA ?")), reviews
+
+    def _flexible(self, monkeypatch, opinions, threshold=0.6):
+        reviews = []
+        experts = ["gpt-4o", "gpt-4-turbo", "mistral-large"]
+        providers = dict(zip(experts, opinions))
+        monkeypatch.setattr(flexible_orchestrator, "council_config", CouncilConfig(EARLY_EXIT_AGREEMENT=threshold))
+        monkeypatch.setattr(
+            UniversalProvider, "get_provider",
+            staticmethod(lambda model_id: FakeProvider(providers.get(model_id, ""), reviews)),
+        )
+        council = FlexibleCouncilOrchestrator(*experts, chairman="gpt-4o", enable_review=True)
+        return asyncio.run(council.process_query("Taux de TVA ?")), reviews
+
+    def test_agreeing_opinions_skip_review(self, monkeypatch):
+        """Agreement above the threshold goes straight to the synthesis"""
+        result, reviews = self._council(monkeypatch, CLOSE)
+
+        review = result["metadata"]["review"]
+        assert review["skipped"] and review["reason"] == "early_exit_agreement"
+        assert review["agreement"] == round(4 / 6, 3)
+        assert reviews == [] and result["rankings"] is None
+        assert "stage2_review" not in result["metadata"]["stage_latency"]
+        assert result["final_response"] == "Synthèse"
+
+    def test_diverging_opinions_are_reviewed(self, monkeypatch):
+        """Agreement below the threshold runs the cross-review"""
+        result, reviews = self._council(monkeypatch, APART)
+
+        assert not result["metadata"]["review"]["skipped"]
+        assert len(reviews) == 2
+        assert set(result["rankings"]) == {"chatgpt", "claude"}
+        assert "stage2_review" in result["metadata"]["stage_latency"]
+
+    def test_threshold_is_configurable(self, monkeypatch):
+        """Raising EARLY_EXIT_AGREEMENT above the agreement forces the review"""
+        result, reviews = self._council(monkeypatch, CLOSE, threshold=0.7)
+
+        assert not result["metadata"]["review"]["skipped"]
+        assert len(reviews) == 2
+
+    def test_flexible_council_early_exit(self, monkeypatch):
+        """The flexible council applies the same threshold"""
+        skipped, no_reviews = self._flexible(monkeypatch, CLOSE + [CLOSE[0]])
+        reviewed, reviews = self._flexible(monkeypatch, APART + ["kappa lambda sigma"])
+
+        assert skipped["metadata"]["review"]["reason"] == "early_exit_agreement"
+        assert no_reviews == []
+        assert not reviewed["metadata"]["review"]["skipped"]
+        assert len(reviews) == 3 and reviewed["metadata"]["review"]["reviewers_dropped"] == []
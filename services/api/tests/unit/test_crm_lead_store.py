@@ -0,0 +1,147 @@
+"""
+Unit tests for the indexed CRM lead store
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models.crm_pro_models import LeadPro, LeadPriority, LeadSource, LeadStatus, Sector
+from app.services.crm_lead_store import LeadStore
+from app.services.crm_pro_service import SORT_KEYS
+
+
+def make_lead(i: int, rng: random.Random, created_at: datetime) -> LeadPro:
+    first = rng.choice(["Mohamed", "Amine", "Yasmine", "Sara", "Nassim", "Imane"])
+    last = rng.choice(["Benali", "Haddad", "Bouzid", "Mansouri", "Cherif", "Kaci"])
+    return LeadPro(
+        id=f"lead_{i:06d}",
+        name=f"{first} {last}",
+        email=f"{first.lower()}.{last.lower()}{i}@example.dz",
+        phone=f"+2135{i:08d}",
+        company=f"{last} SARL {i % 500}",
+        sector=rng.choice(list(Sector)),
+        source=rng.choice(list(LeadSource)),
+        status=rng.choice(list(LeadStatus)),
+        priority=rng.choice(list(LeadPriority)),
+        score=rng.randint(0, 100),
+        assigned_to=f"user_{i % 20}",
+        estimated_value=Decimal(rng.randint(0, 100_000)) if i % 3 else None,
+        created_at=created_at,
+    )
+
+
+def build_store(count: int) -> LeadStore:
+    rng = random.Random(42)
+    start = datetime.utcnow() - timedelta(minutes=count)
+    store = LeadStore(sort_fields=SORT_KEYS)
+    for i in range(count):
+        lead = make_lead(i, rng, start + timedelta(minutes=i))
+        store[lead.id] = lead
+    return store
+
+
+def scan(store, status=None, min_score=None, search=None):
+    """Reference implementation: full scan + full sort (previous list_leads)"""
+    leads = list(store.values())
+    if status:
+        leads = [l for l in leads if l.status in status]
+    if min_score is not None:
+        leads = [l for l in leads if l.score >= min_score]
+    if search:
+        needle = search.lower()
+        leads = [l for l in leads if (
+            needle in l.name.lower()
+            or (l.email and needle in l.email.lower())
+            or (l.company and needle in l.company.lower())
+            or (l.phone and needle in l.phone)
+        )]
+    leads.sort(key=lambda l: l.created_at, reverse=True)
+    return leads
+
+
+class TestLeadStore:
+    """Test suite for index maintenance, queries and incremental aggregates"""
+
+    @pytest.fixture
+    def store(self):
+        return build_store(2000)
+
+    @pytest.mark.parametrize("kwargs", [
+        {},
+        {"status": [LeadStatus.WON]},
+        {"status": [LeadStatus.WARM, LeadStatus.PROPOSAL], "min_score": 70},
+        {"search": "bouzid sarl 1"},
+        {"search": "00001234"},
+        {"search": "ka"},
+    ])
+    def test_query_matches_full_scan(self, store, kwargs):
+        """Indexed queries return the same page and total as a full scan"""
+        expected = scan(store, **kwargs)
+
+        page, total = store.query(
+            filters={"status": kwargs.get("status")},
+            min_score=kwargs.get("min_score"),
+            search=kwargs.get("search"),
+            offset=20,
+            limit=20,
+        )
+
+        assert total == len(expected)
+        assert [l.id for l in page] == [l.id for l in expected[20:40]]
+
+    def test_sort_by_score_breaks_ties_by_creation(self, store):
+        """Score sort orders ties by creation date, in the sort direction"""
+        expected = sorted(store.values(), key=lambda l: (l.score, l.created_at), reverse=True)
+
+        page, _ = store.query(sort_by="score", limit=50)
+
+        assert [l.id for l in page] == [l.id for l in expected[:50]]
+
+    def test_reindex_and_delete_keep_aggregates_consistent(self, store):
+        """Mutations update indexes, trigram postings and per-status totals"""
+        lead = store.get("lead_000010")
+        lead.status = LeadStatus.WON
+        lead.estimated_value = Decimal("5000")
+        lead.name = "Zoubir Unique"
+        store.reindex(lead)
+        del store["lead_000011"]
+
+        leads = list(store.values())
+        won = [l for l in leads if l.status == LeadStatus.WON]
+        assert store.count_by("status")[LeadStatus.WON] == len(won)
+        assert store.value_by_status()[LeadStatus.WON] == sum(l.estimated_value or 0 for l in won)
+        assert store.score_total == sum(l.score for l in leads)
+        assert [l.id for l in store.query(search="zoubir")[0]] == ["lead_000010"]
+        assert "lead_000011" not in store
+
+    @pytest.mark.slow
+    def test_benchmark_100k_leads(self):
+        """Page queries and Kanban counters stay fast at 100k leads"""
+        store = build_store(100_000)
+
+        timings = {}
+        for name, kwargs in {
+            "unfiltered": {},
+            "status": {"filters": {"status": [LeadStatus.WON]}},
+            "selective": {"filters": {"status": [LeadStatus.WARM], "assigned_to": ["user_3"]}, "min_score": 80},
+            "search": {"search": "0001234"},
+        }.items():
+            started = time.perf_counter()
+            store.query(**kwargs)
+            timings[name] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        store.count_by("status"), store.value_by_status()
+        timings["kanban"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        scan(store, status=[LeadStatus.WARM], min_score=80)
+        baseline = time.perf_counter() - started
+
+        assert timings["unfiltered"] < 0.005
+        assert timings["kanban"] < 0.001
+        assert timings["selective"] < baseline
+        assert timings["search"] < baseline
@@ -0,0 +1,137 @@
+"""
+Unit tests for page streaming in DocumentParser and the pipelined ingest
+"""
+import asyncio
+import io
+import threading
+
+import docx
+import pytest
+
+from app.clients.document_parser import (
+    LANGUAGE_SAMPLE_MAX_CHARS,
+    DocumentParser,
+    DocumentStream,
+    LanguageSample,
+)
+from app.ingest_pipeline import EmbeddingError, embed_document
+
+FR = "Art. 12. — Les dispositions de la loi n° 23-05 sont modifiées comme suit pour les contribuables. "
+AR = "تعدل وتتمم أحكام المادة 12 من القانون. يحدد وزير المالية كيفيات تطبيق هذه المادة. "
+
+
+def _docx(paragraphs) -> bytes:
+    document = docx.Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _fake_embed(texts):
+    return [[float(len(text))] for text in texts]
+
+
+def _use_reader(monkeypatch, reader):
+    """Replace the DocumentParser readers with a page generator"""
+    monkeypatch.setattr(DocumentParser, "readers", classmethod(lambda cls: {"txt": (reader, "TXT")}))
+
+
+class TestPageStreaming:
+    """Test suite for lazy (page_no, text) iteration and sampled language detection"""
+
+    def test_iter_pages_numbers_pages_lazily(self):
+        """Pages come numbered from 1, one at a time"""
+        pages = DocumentParser.iter_pages("guide.docx", _docx([FR, AR, FR]))
+
+        assert next(pages) == (1, FR)
+        assert [number for number, _ in pages] == [2, 3]
+
+    def test_language_sample_is_bounded(self):
+        """The sample stays under its cap and still finds the dominant language"""
+        sample = LanguageSample()
+        for _ in range(200):
+            sample.add(AR * 30)
+
+        assert sample.size <= LANGUAGE_SAMPLE_MAX_CHARS
+        assert sample.language() == "ar"
+
+    def test_sample_spans_the_page(self):
+        """Windows are taken across a long page, not only from its start"""
+        sample = LanguageSample()
+        sample.add(FR * 10 + AR * 200)
+
+        assert sample.language() == "ar"
+
+    def test_parse_file_reports_pages(self):
+        """parse_file keeps its result shape and counts pages"""
+        parsed = DocumentParser.parse_file("guide.docx", _docx([FR * 5, AR * 5]))
+
+        assert parsed["pages"] == 2
+        assert parsed["text"] == (FR * 5 + "\n" + AR * 5).strip()
+        assert len(parsed["chunks"]) == len(parsed["chunk_ids"]) > 0
+
+
+class TestEmbedDocument:
+    """Test suite for overlapping parsing/chunking with embedding"""
+
+    def test_matches_parse_file(self):
+        """Pipelined chunks and ids equal those of a full parse"""
+        content = _docx([FR * 20, AR * 20, FR * 20])
+        chunks, embeddings, stats = asyncio.run(
+            embed_document(DocumentStream("guide.docx", content), _fake_embed, batch_size=2)
+        )
+        parsed = DocumentParser.parse_file("guide.docx", content)
+
+        assert [c.id for c in chunks] == parsed["chunk_ids"]
+        assert embeddings == [[float(len(c.text))] for c in chunks]
+        assert stats.pages == 3 and stats.chunks == len(chunks)
+        assert stats.batches == (len(chunks) + 1) // 2
+        assert 0 <= stats.time_to_first_chunk_ms <= stats.time_to_first_embedding_ms <= stats.total_ms
+        assert stats.as_dict()["chunks_per_second"] > 0
+
+    def test_first_batch_embedded_while_parsing(self, monkeypatch):
+        """The first batch is embedded before later pages are read"""
+        embedded = threading.Event()
+        waited = []
+
+        def pages(_content):
+            for number in range(12):
+                if number == 8:
+                    # Page 9 is only read once the first batch has been embedded
+                    waited.append(embedded.wait(timeout=5))
+                yield FR * 12
+
+        def embed(texts):
+            embedded.set()
+            return _fake_embed(texts)
+
+        _use_reader(monkeypatch, pages)
+        document = DocumentStream("loi.txt", b"")
+        chunks, _, stats = asyncio.run(embed_document(document, embed, batch_size=1))
+
+        assert waited == [True]
+        assert stats.pages == 12 and len(chunks) == stats.chunks
+
+    def test_embedding_failure_stops_parsing(self, monkeypatch):
+        """An embedder error surfaces as EmbeddingError and parsing stops"""
+        read = []
+
+        def pages(_content):
+            for number in range(1000):
+                read.append(number)
+                yield FR * 12
+
+        def embed(texts):
+            raise RuntimeError("model unavailable")
+
+        _use_reader(monkeypatch, pages)
+        with pytest.raises(EmbeddingError):
+            asyncio.run(embed_document(DocumentStream("loi.txt", b""), embed, batch_size=1))
+        assert len(read) < 1000
+
+    def test_parse_error_is_value_error(self):
+        """Unreadable content keeps the ValueError contract of parse_file"""
+        with pytest.raises(ValueError):
+            asyncio.run(embed_document(DocumentStream("scan.pdf", b"not a pdf"), _fake_embed))
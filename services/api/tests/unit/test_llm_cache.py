@@ -0,0 +1,250 @@
+"""
+Unit tests for the LLM completion cache
+"""
+import asyncio
+import importlib
+import threading
+from types import SimpleNamespace
+
+from app.config import get_settings
+from app.llm_cache import CompletionCache, estimate_cost_usd, make_cache_key
+from app.multi_llm.multi_llm_models import ChatMessage, ChatRequest
+from app.multi_llm.providers_client import LLMResponse
+
+
+MESSAGES = [
+    {"role": "system", "content": "Tu es un expert fiscal."},
+    {"role": "user", "content": "Quel est le taux de TVA en Algérie ?"},
+]
+
+
+class TestCompletionCache:
+    """Test suite for exact and semantic completion caching"""
+
+    def test_key_normalizes_whitespace(self):
+        """Extra whitespace does not change the cache key"""
+        spaced = [{"role": m["role"], "content": f"  {m['content']}  "} for m in MESSAGES]
+        assert make_cache_key("gpt-4o", MESSAGES, 0.3, 100) == make_cache_key("gpt-4o", spaced, 0.3, 100)
+        assert make_cache_key("gpt-4o", MESSAGES, 0.3, 100) != make_cache_key("gpt-4o", MESSAGES, 0.7, 100)
+
+    def test_exact_hit_and_savings(self):
+        """An identical request is served from cache and counted as saved"""
+        cache = CompletionCache()
+        cache.set("gpt-4o", MESSAGES, "19%", 0.3, 100, tenant_id="t1", cost_usd=0.002)
+
+        entry = cache.get("gpt-4o", MESSAGES, 0.3, 100, tenant_id="t1")
+
+        assert entry.content == "19%"
+        stats = cache.get_stats()
+        assert stats["exact_hits"] == 1
+        assert stats["dollars_saved"] == 0.002
+
+    def test_tenant_isolation(self):
+        """Entries of one tenant are never served to another"""
+        cache = CompletionCache()
+        cache.set("gpt-4o", MESSAGES, "19%", tenant_id="t1")
+
+        assert cache.get("gpt-4o", MESSAGES, tenant_id="t2") is None
+
+    def test_nothing_cached_without_tenant(self):
+        """Requests without a tenant are neither stored nor served"""
+        cache = CompletionCache()
+        cache.set("gpt-4o", MESSAGES, "19%")
+
+        assert cache.get("gpt-4o", MESSAGES) is None
+        assert cache.get_stats()["entries"] == 0
+        assert not cache.cacheable(0.0, None)
+
+    def test_only_deterministic_requests_are_cacheable(self):
+        """Sampling temperatures above max_temperature bypass the cache"""
+        cache = CompletionCache()
+
+        assert cache.cacheable(0.0, "t1")
+        assert cache.cacheable(None, "t1")
+        assert not cache.cacheable(0.7, "t1")
+        assert CompletionCache(max_temperature=0.3).cacheable(0.3, "t1")
+
+    def test_estimated_cost(self):
+        """Costs come from the router price table, 0 for unknown models"""
+        assert estimate_cost_usd("gpt-4o-mini", 1_000_000) == 0.15
+        assert estimate_cost_usd("unknown-model", 1_000_000) == 0.0
+
+    def test_ttl_and_lru_eviction(self):
+        """Expired entries miss and the least recently used entry is evicted"""
+        cache = CompletionCache(max_entries_per_tenant=2, ttl_seconds=60)
+        for i in range(3):
+            cache.set("m", [{"role": "user", "content": f"q{i}"}], f"a{i}", tenant_id="t1")
+
+        assert cache.get("m", [{"role": "user", "content": "q0"}], tenant_id="t1") is None
+        assert cache.get("m", [{"role": "user", "content": "q2"}], tenant_id="t1").content == "a2"
+
+        cache.ttl_seconds = -1
+        assert cache.get("m", [{"role": "user", "content": "q2"}], tenant_id="t1") is None
+
+    def test_semantic_hit(self):
+        """A near-identical question reuses the cached answer above the threshold"""
+        vectors = {"Taux de TVA ?": [1.0, 0.0], "Taux TVA ?": [0.99, 0.05], "Capital social ?": [0.0, 1.0]}
+        cache = CompletionCache(semantic_threshold=0.95, embed_fn=lambda text: vectors[text])
+        cache.set("m", [{"role": "user", "content": "Taux de TVA ?"}], "19%", tenant_id="t1")
+
+        assert cache.get("m", [{"role": "user", "content": "Taux TVA ?"}], tenant_id="t1").content == "19%"
+        assert cache.get("m", [{"role": "user", "content": "Capital social ?"}], tenant_id="t1") is None
+        assert cache.get_stats()["semantic_hits"] == 1
+
+    def test_async_semantic_tier_runs_off_the_event_loop(self):
+        """aget/aset embed in a worker thread when the semantic tier is on"""
+        loop_thread = threading.get_ident()
+        threads = []
+
+        def embed(text):
+            threads.append(threading.get_ident())
+            return [1.0, 0.0]
+
+        cache = CompletionCache(semantic_threshold=0.95, embed_fn=embed)
+
+        async def scenario():
+            await cache.aset("m", [{"role": "user", "content": "Taux de TVA ?"}], "19%", tenant_id="t1")
+            return await cache.aget("m", [{"role": "user", "content": "Taux TVA ?"}], tenant_id="t1")
+
+        assert asyncio.run(scenario()).content == "19%"
+        assert len(threads) == 2 and loop_thread not in threads
+
+
+class FakeBilling:
+    """Billing service recording the credits consumed"""
+
+    def __init__(self):
+        self.consumed = []
+
+    def can_consume(self, user_id, service_type):
+        return True, 1, 1000
+
+    def get_or_create_user_credits(self, user_id):
+        return SimpleNamespace(total_available=1000)
+
+    def consume_credits(self, user_id, service_type, credits_override, metadata):
+        self.consumed.append(credits_override)
+        return SimpleNamespace(balance_after=1000 - sum(self.consumed))
+
+
+class TestMultiLLMChatCache:
+    """Test suite for completion caching in MultiLLMService.chat"""
+
+    def _service(self, monkeypatch):
+        module = importlib.import_module("app.multi_llm.multi_llm_service")
+        calls, billing = [], FakeBilling()
+
+        async def call_llm(model_code, messages, temperature, max_tokens):
+            calls.append(model_code)
+            return LLMResponse(content="19%", tokens_input=1200, tokens_output=800, model=model_code)
+
+        monkeypatch.setattr(module, "call_llm", call_llm)
+        monkeypatch.setattr(module, "billing_service", billing)
+        monkeypatch.setattr(module, "completion_cache", CompletionCache())
+        return module.MultiLLMService(), calls, billing
+
+    def _request(self, temperature):
+        return ChatRequest(
+            model="openai.gpt-4o",
+            messages=[ChatMessage(**m) for m in MESSAGES],
+            temperature=temperature,
+        )
+
+    def test_cache_hit_is_not_charged(self, monkeypatch):
+        """A deterministic repeat is served from cache without consuming credits"""
+        service, calls, billing = self._service(monkeypatch)
+        first = asyncio.run(service.chat("user-1", self._request(0.0)))
+        second = asyncio.run(service.chat("user-1", self._request(0.0)))
+
+        assert calls == ["openai.gpt-4o"]
+        assert not first.cached and second.cached
+        assert billing.consumed == [first.credits_used]
+        assert second.credits_used == 0 and second.cost_usd_estimated == 0
+
+    def test_sampled_requests_bypass_cache(self, monkeypatch):
+        """Requests with a sampling temperature always reach the provider"""
+        service, calls, billing = self._service(monkeypatch)
+        for _ in range(2):
+            asyncio.run(service.chat("user-1", self._request(0.7)))
+
+        assert len(calls) == 2
+        assert len(billing.consumed) == 2
+
+
+def _default_cache() -> CompletionCache:
+    """Cache built from the default settings, like the global instance"""
+    settings = get_settings()
+    return CompletionCache(
+        max_entries_per_tenant=settings.llm_cache_max_entries,
+        ttl_seconds=settings.llm_cache_ttl_seconds,
+        max_temperature=settings.llm_cache_max_temperature,
+    )
+
+
+class TestRAGAnswerCache:
+    """Test suite for caching RAG answers at default settings"""
+
+    def test_repeated_bigrag_call_hits_cache(self, monkeypatch):
+        """A repeated BIG RAG generation is served from cache, at temperature 0"""
+        module = importlib.import_module("app.bigrag.bigrag_service")
+        cache = _default_cache()
+        monkeypatch.setattr(module, "completion_cache", cache)
+        calls = []
+
+        async def call_openai(system_prompt, user_prompt, model, temperature):
+            calls.append(temperature)
+            return "La TVA est de 19%.", 900
+
+        service = module.BigRAGService()
+        monkeypatch.setattr(service, "_call_openai", call_openai)
+
+        async def scenario():
+            first = await service._call_llm("Système", "Taux de TVA ?", "gpt-4o-mini", tenant_id="t1")
+            second = await service._call_llm("Système", "Taux de TVA ?", "gpt-4o-mini", tenant_id="t1")
+            return first, second
+
+        first, second = asyncio.run(scenario())
+
+        assert calls == [0.0]
+        assert first == ("La TVA est de 19%.", 900) and second == ("La TVA est de 19%.", 0)
+        stats = cache.get_stats()
+        assert stats["exact_hits"] == 1 and stats["dollars_saved"] > 0
+
+    def test_bigrag_without_tenant_keeps_sampling_temperature(self, monkeypatch):
+        """Without a tenant nothing is cached and the answer keeps temperature 0.3"""
+        module = importlib.import_module("app.bigrag.bigrag_service")
+        monkeypatch.setattr(module, "completion_cache", _default_cache())
+        calls = []
+
+        async def call_openai(system_prompt, user_prompt, model, temperature):
+            calls.append(temperature)
+            return "19%", 10
+
+        service = module.BigRAGService()
+        monkeypatch.setattr(service, "_call_openai", call_openai)
+        for _ in range(2):
+            asyncio.run(service._call_llm("Système", "Taux de TVA ?", "gpt-4o-mini"))
+
+        assert calls == [module.RAG_TEMPERATURE] * 2
+
+    def test_repeated_rag_answer_hits_cache(self, monkeypatch):
+        """generate_rag_answer reuses the cached answer for the same question and context"""
+        module = importlib.import_module("app.clients.cloud_llm")
+        cache = _default_cache()
+        monkeypatch.setattr(module, "completion_cache", cache)
+        calls = []
+
+        client = module.CloudLLMClient()
+        client.provider, client.model, client.client = "openai", "gpt-4o-mini", object()
+
+        def generate_openai(prompt, system, temperature, max_tokens):
+            calls.append(temperature)
+            return "La TVA est de 19%.", 700, 40
+
+        monkeypatch.setattr(client, "_generate_openai", generate_openai)
+        chunks = [{"title": "Code TVA", "text": "Le taux normal de TVA est fixé à 19%."}]
+        answers = [client.generate_rag_answer("Taux de TVA ?", chunks, tenant_id="t1") for _ in range(2)]
+
+        assert answers == ["La TVA est de 19%."] * 2
+        assert calls == [0.0]
+        assert cache.get_stats()["exact_hits"] == 1
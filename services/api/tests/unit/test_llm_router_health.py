@@ -0,0 +1,162 @@
+"""
+Unit tests for LLMRouter adaptive mode and provider health tracking
+"""
+import asyncio
+
+import pytest
+from app.llm_router import LLMRouter, Provider, UseCaseType, ProviderHealthTracker, CircuitState
+from app.llm_router.router import HedgeFailure, LLMResponse
+
+
+class TestProviderHealthTracker:
+    """Test suite for rolling latency / circuit breaker tracking"""
+
+    def test_percentile_requires_min_samples(self):
+        """Latency percentiles are unknown until enough samples are collected"""
+        tracker = ProviderHealthTracker({"min_samples": 5})
+        for latency in (100, 200, 300):
+            tracker.record_success(Provider.GROQ, "mixtral", latency)
+
+        assert tracker.latency_percentile(Provider.GROQ, "mixtral", 0.95) is None
+
+    def test_percentile_nearest_rank(self):
+        """p95 over 1..100 ms is 95 ms"""
+        tracker = ProviderHealthTracker()
+        for latency in range(1, 101):
+            tracker.record_success(Provider.GROQ, "mixtral", latency)
+
+        assert tracker.latency_percentile(Provider.GROQ, "mixtral", 0.95) == 95
+
+    def test_circuit_opens_after_consecutive_failures(self):
+        """Circuit opens after the failure threshold and half-opens after the cool-down"""
+        tracker = ProviderHealthTracker({"failure_threshold": 3, "open_seconds": 0})
+        for _ in range(3):
+            tracker.record_failure(Provider.QWEN, "turbo")
+
+        assert tracker.snapshot()["qwen:turbo"]["state"] == CircuitState.OPEN.value
+        # open_seconds=0: the next check moves to half-open and allows a probe
+        assert tracker.is_available(Provider.QWEN, "turbo") is True
+
+        tracker.record_success(Provider.QWEN, "turbo", 120)
+        assert tracker.snapshot()["qwen:turbo"]["state"] == CircuitState.CLOSED.value
+
+
+class TestAdaptiveRouting:
+    """Test suite for SLO-aware model selection"""
+
+    @pytest.fixture
+    def router(self):
+        router = LLMRouter(adaptive=True)
+        router.api_keys = {provider: "test-key" for provider in Provider}
+        return router
+
+    def test_cheapest_within_slo(self, router):
+        """Without history, the cheapest candidate within budget is selected"""
+        assert router.select_model(UseCaseType.CLASSIFICATION) == (Provider.GLM, "4-air")
+
+    def test_skips_model_violating_slo(self, router):
+        """A cheap model whose p95 exceeds the SLO is ranked after compliant ones"""
+        for _ in range(10):
+            router.health.record_success(Provider.GLM, "4-air", 10_000)
+
+        ranked = router.rank_candidates(UseCaseType.CLASSIFICATION)
+        assert ranked[0] == (Provider.QWEN, "turbo")
+        assert (Provider.GLM, "4-air") in ranked
+
+    def test_skips_open_circuit(self, router):
+        """Models with an open circuit are ranked last"""
+        for _ in range(5):
+            router.health.record_failure(Provider.QWEN, "turbo")
+
+        assert router.rank_candidates(UseCaseType.CLASSIFICATION)[-1] == (Provider.QWEN, "turbo")
+
+
+class FailingProvider:
+    """Provider whose calls fail after a delay"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def generate(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        raise RuntimeError("upstream 503")
+
+
+class AnsweringProvider:
+    """Provider answering after a delay"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def generate(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        return LLMResponse(content="ok", model="m", provider="p", tokens_used=10, cost=0.0, latency_ms=0)
+
+
+class TestHedgedCall:
+    """Test suite for hedged requests and per-attempt health tracking"""
+
+    def test_both_attempts_record_failures(self):
+        """When primary and hedge both fail, each model's circuit sees its own failure"""
+        router = LLMRouter(adaptive=True, hedge=True)
+        router.api_keys = {provider: "test-key" for provider in Provider}
+        primary, secondary = (Provider.GLM, "4-air"), (Provider.QWEN, "turbo")
+        providers = {primary: FailingProvider(0.02), secondary: FailingProvider(0.01)}
+        router.get_provider = lambda provider, model_key: providers[(provider, model_key)]
+        # Primary still running when the hedge budget expires
+        router._hedge_delay_seconds = lambda *args: 0.005
+
+        with pytest.raises(HedgeFailure) as failure:
+            asyncio.run(router._hedged_call(primary, secondary, UseCaseType.CLASSIFICATION, [], 0.0, 10))
+
+        assert set(failure.value.errors) == {"glm:4-air", "qwen:turbo"}
+        snapshot = router.health.snapshot()
+        assert snapshot["glm:4-air"]["total_failures"] == 1
+        assert snapshot["qwen:turbo"]["total_failures"] == 1
+
+    def _router(self, providers, hedge_delay):
+        router = LLMRouter(adaptive=True, hedge=True)
+        router.api_keys = {provider: "test-key" for provider in Provider}
+        router.get_provider = lambda provider, model_key: providers[(provider, model_key)]
+        router._hedge_delay_seconds = lambda *args: hedge_delay
+        return router
+
+    def test_fast_primary_failure_is_a_failover(self):
+        """A primary failing before the hedge budget is a failover, not a hedge"""
+        primary, secondary = (Provider.GLM, "4-air"), (Provider.QWEN, "turbo")
+        router = self._router({primary: FailingProvider(0), secondary: AnsweringProvider(0)}, hedge_delay=1)
+
+        response, chosen, hedged = asyncio.run(
+            router._hedged_call(primary, secondary, UseCaseType.CLASSIFICATION, [], 0.0, 10)
+        )
+
+        assert (response.content, chosen, hedged) == ("ok", secondary, False)
+
+    def test_slow_primary_is_hedged(self):
+        """The backup launched by the hedge timer is reported as hedged"""
+        primary, secondary = (Provider.GLM, "4-air"), (Provider.QWEN, "turbo")
+        router = self._router({primary: AnsweringProvider(1), secondary: AnsweringProvider(0)}, hedge_delay=0.005)
+
+        _, chosen, hedged = asyncio.run(
+            router._hedged_call(primary, secondary, UseCaseType.CLASSIFICATION, [], 0.0, 10)
+        )
+
+        assert (chosen, hedged) == (secondary, True)
+
+    def test_decisions_count_hedges_and_failovers_apart(self, monkeypatch):
+        """Routing stats report failovers separately from hedged requests"""
+        primary, secondary = (Provider.GLM, "4-air"), (Provider.QWEN, "turbo")
+        providers = {primary: FailingProvider(0), secondary: AnsweringProvider(0)}
+        router = self._router(providers, hedge_delay=1)
+        monkeypatch.setattr(router, "rank_candidates", lambda *args: [primary, secondary])
+        messages = [{"role": "user", "content": "Classe ce ticket"}]
+
+        failed_over = asyncio.run(router._generate_adaptive(messages, UseCaseType.CLASSIFICATION, "economy", 0.0, 10))
+        providers[primary] = AnsweringProvider(1)
+        router._hedge_delay_seconds = lambda *args: 0.005
+        hedged = asyncio.run(router._generate_adaptive(messages, UseCaseType.CLASSIFICATION, "economy", 0.0, 10))
+
+        assert (failed_over["hedged"], failed_over["failover"]) == (False, True)
+        assert (hedged["hedged"], hedged["failover"]) == (True, False)
+        stats = router.get_cost_summary()["routing_by_model"]["qwen:turbo"]
+        assert (stats["requests"], stats["hedged"], stats["failover"]) == (2, 1, 1)
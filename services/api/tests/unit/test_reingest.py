@@ -0,0 +1,167 @@
+"""
+Unit tests for re-ingestion replacing the chunks of a previous version
+"""
+import asyncio
+import hashlib
+import io
+from types import SimpleNamespace
+
+import pytest
+from fastapi import UploadFile
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qm
+
+import app.clients.qdrant_client as qdrant_module
+from app.bigrag_ingest.ingest_models import RAGDocument, RAGIngestBatch
+from app.bigrag_ingest.ingest_service import IngestService
+from app.routers import ingest as ingest_router
+from app.routers import upload as upload_router
+
+DOC_ID = "5f0c6a8e-2d1b-4a57-9c3e-8b2f1d4e6a70"
+VECTOR_SIZE = 8
+
+
+def _embed(texts):
+    """Deterministic embeddings (content hash)"""
+    return [[b / 255 for b in hashlib.sha256(text.encode()).digest()[:VECTOR_SIZE]] for text in texts]
+
+
+def _article(version: str, articles: int) -> str:
+    return " ".join(
+        f"Art. {n}. — Les dispositions de l'article {n} de la loi de finances {version} "
+        f"sont modifiées et complétées par le présent texte relatif à la TVA."
+        for n in range(articles)
+    )
+
+
+def _points(client: QdrantClient, collection: str):
+    records, _ = client.scroll(collection_name=collection, limit=1000, with_payload=True)
+    return records
+
+
+@pytest.fixture
+def memory_qdrant(monkeypatch):
+    client = QdrantClient(":memory:")
+    monkeypatch.setattr(qdrant_module, "client", client)
+    return client
+
+
+class TestIngestServiceReingest:
+    """Test suite for BIG RAG re-ingestion of a changed document"""
+
+    def _service(self, client: QdrantClient) -> IngestService:
+        service = IngestService.__new__(IngestService)
+        service.qdrant = client
+        service.embedder = SimpleNamespace(vector_size=VECTOR_SIZE, embed_batch=_embed)
+        return service
+
+    def _ingest(self, service, text: str, doc_id: str = DOC_ID):
+        doc = RAGDocument(id=doc_id, title="Loi de finances", text=text, country="DZ")
+        return asyncio.run(service.ingest_batch(RAGIngestBatch(collection="rag_dz", docs=[doc])))
+
+    def test_changed_document_replaces_its_chunks(self):
+        """Chunks of the previous version disappear, other documents are kept"""
+        client = QdrantClient(":memory:")
+        service = self._service(client)
+        other = "0b7d3c1e-6f2a-4e8b-a1d9-3c5e7f9b2d41"
+        self._ingest(service, _article("2024", 60), doc_id=other)
+        self._ingest(service, _article("2024", 60))
+        result = self._ingest(service, _article("2025", 30))
+
+        assert result.success and not result.errors
+        points = [p for p in _points(client, "rag_dz") if p.payload["parent_id"] == DOC_ID]
+        assert points and all("2025" in p.payload["text"] for p in points)
+        assert sorted(p.payload["chunk_index"] for p in points) == list(range(len(points)))
+        assert any(p.payload["parent_id"] == other for p in _points(client, "rag_dz"))
+
+    def test_former_single_point_is_removed(self):
+        """A document that grows past one chunk drops its former single point"""
+        client = QdrantClient(":memory:")
+        service = self._service(client)
+        self._ingest(service, "Le taux normal de TVA est fixé à 19%.")
+        self._ingest(service, _article("2025", 40))
+
+        points = _points(client, "rag_dz")
+        assert DOC_ID not in {str(p.id) for p in points}
+        assert all(p.payload["parent_id"] == DOC_ID for p in points)
+
+    def test_same_content_is_idempotent(self):
+        """Re-ingesting identical content keeps the same points"""
+        client = QdrantClient(":memory:")
+        service = self._service(client)
+        self._ingest(service, _article("2024", 40))
+        first = sorted(str(p.id) for p in _points(client, "rag_dz"))
+        self._ingest(service, _article("2024", 40))
+
+        assert sorted(str(p.id) for p in _points(client, "rag_dz")) == first
+
+
+class FakeSearchEngine:
+    def __init__(self):
+        self.deleted = []
+
+    def add_to_meilisearch(self, collection_name, documents):
+        pass
+
+    def delete_from_meilisearch(self, collection_name, ids):
+        self.deleted.extend(ids)
+
+
+def _request():
+    return SimpleNamespace(state=SimpleNamespace(tenant={"id": "t1"}))
+
+
+def _create_collection(client):
+    def create(name, vector_size=VECTOR_SIZE):
+        if not client.collection_exists(name):
+            client.create_collection(name, vectors_config=qm.VectorParams(size=VECTOR_SIZE, distance=qm.Distance.COSINE))
+    return create
+
+
+class TestUploadRouters:
+    """Test suite for re-uploads through /upload and /ingest/upload"""
+
+    def _upload_file(self, monkeypatch, client, text: str, filename: str = "loi.txt"):
+        monkeypatch.setattr(upload_router, "qdrant_client", client)
+        monkeypatch.setattr(upload_router, "create_collection", _create_collection(client))
+        monkeypatch.setattr(upload_router, "embed_documents", _embed)
+        upload = UploadFile(file=io.BytesIO(text.encode()), filename=filename)
+        return asyncio.run(upload_router.upload_file(upload, _request()))
+
+    def test_short_file_is_indexed(self, monkeypatch, memory_qdrant):
+        """A file over 20 characters still gives one chunk"""
+        response = self._upload_file(monkeypatch, memory_qdrant, "TVA normale: 19% en 2025.")
+
+        assert response["success"] and response["chunks_created"] == 1
+
+    def test_reupload_replaces_chunks(self, monkeypatch, memory_qdrant):
+        """A changed file leaves no chunk of its previous version"""
+        self._upload_file(monkeypatch, memory_qdrant, _article("2024", 40))
+        self._upload_file(monkeypatch, memory_qdrant, _article("2024", 40), filename="autre.txt")
+        response = self._upload_file(monkeypatch, memory_qdrant, _article("2025", 20))
+
+        points = [p for p in _points(memory_qdrant, "docs_t1") if p.payload["filename"] == "loi.txt"]
+        assert len(points) == response["chunks_created"]
+        assert all("2025" in p.payload["text"] for p in points)
+        assert any(p.payload["filename"] == "autre.txt" for p in _points(memory_qdrant, "docs_t1"))
+
+    def test_ingest_reupload_replaces_chunks(self, monkeypatch, memory_qdrant):
+        """/ingest/upload removes stale chunks from Qdrant and Meilisearch"""
+        search_engine = FakeSearchEngine()
+        monkeypatch.setattr(ingest_router, "qdrant_client", memory_qdrant)
+        monkeypatch.setattr(ingest_router, "create_collection", _create_collection(memory_qdrant))
+        monkeypatch.setattr(ingest_router, "embed_documents", _embed)
+        monkeypatch.setattr(ingest_router, "search_engine", search_engine)
+
+        def upload(text):
+            file = UploadFile(file=io.BytesIO(text.encode()), filename="loi.txt")
+            return asyncio.run(ingest_router.upload_document(file, _request()))
+
+        upload(_article("2024", 40))
+        before = {str(p.id) for p in _points(memory_qdrant, "docs_t1")}
+        response = upload(_article("2025", 20))
+
+        points = _points(memory_qdrant, "docs_t1")
+        assert len(points) == response["total_chunks"]
+        assert all("2025" in p.payload["text"] for p in points)
+        assert set(search_engine.deleted) == before - {str(p.id) for p in points}
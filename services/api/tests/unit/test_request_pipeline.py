@@ -0,0 +1,152 @@
+"""
+Unit tests for the single-pass ASGI request pipeline
+"""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+import app.middleware as middleware
+from app.config import get_settings
+from app.middleware import RequestIDMiddleware, RequestPipelineMiddleware
+from app.security import EnhancedAuthMiddleware, RateLimitMiddleware
+from app.tenant_middleware import TenantContextMiddleware
+from app.tracing import current_request_id, slow_traces
+
+SECRET = "test-secret-key-0123456789"
+TENANT_ID = "550e8400-e29b-41d4-a716-446655440000"
+
+# Headers dont la valeur change d'une requête à l'autre
+VOLATILE = {"x-ratelimit-reset", "x-ratelimit-remaining"}
+
+
+def build_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def get_item(item_id: int, request: Request):
+        return {
+            "id": item_id,
+            "tenant_id": request.state.tenant_id,
+            "request_id": request.state.request_id,
+            "trace_request_id": current_request_id(),
+        }
+
+    @app.get("/api/bmad/agents")
+    async def agents():
+        return {"agents": []}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"chunk {i}\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    if stack == "legacy":
+        app.add_middleware(RateLimitMiddleware)
+        app.add_middleware(TenantContextMiddleware)
+        app.add_middleware(EnhancedAuthMiddleware)
+        app.add_middleware(RequestIDMiddleware)
+    else:
+        app.add_middleware(RequestPipelineMiddleware)
+    return app
+
+
+@pytest.fixture
+def api_key_auth(monkeypatch):
+    settings = get_settings()
+    monkeypatch.setattr(settings, "enable_api_key_auth", True)
+    monkeypatch.setattr(settings, "enable_rate_limiting", False)
+    monkeypatch.setattr(settings, "api_secret_key", SECRET)
+    return settings
+
+
+def _snapshot(response):
+    headers = {k: v for k, v in response.headers.items() if k not in VOLATILE}
+    return response.status_code, headers, response.content
+
+
+class TestRequestPipeline:
+    """Test suite for RequestPipelineMiddleware parity with the legacy stack"""
+
+    @pytest.mark.parametrize("method,path,headers", [
+        ("GET", "/api/items/1", {}),
+        ("GET", "/api/items/1", {"X-API-Key": "wrong-key"}),
+        ("GET", "/api/items/1", {"X-API-Key": SECRET, "X-Tenant-ID": TENANT_ID}),
+        ("GET", "/api/items/1", {"X-API-Key": SECRET, "X-Tenant-ID": "not-a-uuid"}),
+        ("GET", "/api/items/1", {"X-API-Key": SECRET}),
+        ("GET", "/api/bmad/agents", {}),
+        ("GET", "/api/bmad/agents", {"X-Tenant-ID": TENANT_ID}),
+        ("GET", "/health", {}),
+        ("OPTIONS", "/api/items/1", {}),
+    ])
+    def test_same_responses_as_legacy_stack(self, api_key_auth, method, path, headers):
+        """Status, headers and body match the four BaseHTTPMiddleware layers"""
+        headers = {"X-Request-Id": "parity-req-0001", **headers}
+        legacy = TestClient(build_app("legacy")).request(method, path, headers=headers)
+        pipeline = TestClient(build_app("pipeline")).request(method, path, headers=headers)
+
+        assert _snapshot(pipeline) == _snapshot(legacy)
+        assert pipeline.headers["x-request-id"] == "parity-req-0001"
+
+    def test_state_and_trace_are_shared_with_handlers(self, api_key_auth):
+        """Handlers see tenant_id, request_id and the trace through scope state"""
+        client = TestClient(build_app("pipeline"))
+
+        response = client.get(
+            "/api/items/7",
+            headers={"X-API-Key": SECRET, "X-Tenant-ID": TENANT_ID, "X-Request-Id": "upstream-req-0001"},
+        )
+
+        assert response.json() == {
+            "id": 7,
+            "tenant_id": TENANT_ID,
+            "request_id": "upstream-req-0001",
+            "trace_request_id": "upstream-req-0001",
+        }
+        assert response.headers["x-tenant-context"] == TENANT_ID
+        assert response.headers["x-content-type-options"] == "nosniff"
+        assert "x-ratelimit-limit" in response.headers
+
+    def test_trace_records_the_tenant(self, api_key_auth, monkeypatch):
+        """Slow traces carry the request tenant, so the debug endpoint can filter them"""
+        monkeypatch.setattr(slow_traces, "threshold_ms", 0)
+        slow_traces.clear()
+        client = TestClient(build_app("pipeline"))
+
+        client.get("/api/items/1", headers={"X-API-Key": SECRET, "X-Tenant-ID": TENANT_ID})
+
+        assert [t["tenant_id"] for t in slow_traces.snapshot(tenant_id=TENANT_ID)] == [TENANT_ID]
+        slow_traces.clear()
+
+    def test_jwt_is_decoded_once(self, api_key_auth, monkeypatch):
+        """The bearer token is decoded once, only when no X-Tenant-ID is sent"""
+        decoded = []
+
+        def fake_decode(token):
+            decoded.append(token)
+            return TENANT_ID
+
+        monkeypatch.setattr(middleware, "tenant_id_from_jwt", fake_decode)
+        client = TestClient(build_app("pipeline"))
+
+        response = client.get("/api/items/1", headers={"X-API-Key": SECRET, "Authorization": "Bearer jwt-token"})
+        client.get("/api/items/1", headers={"X-API-Key": SECRET, "X-Tenant-ID": TENANT_ID})
+
+        assert response.json()["tenant_id"] == TENANT_ID
+        assert decoded == ["jwt-token"]
+
+    def test_streaming_response_passes_through(self, api_key_auth):
+        """Streamed chunks are forwarded with the pipeline headers"""
+        client = TestClient(build_app("pipeline"))
+
+        with client.stream("GET", "/api/stream", headers={"X-API-Key": SECRET, "X-Tenant-ID": TENANT_ID}) as response:
+            chunks = list(response.iter_text())
+
+        assert "".join(chunks) == "chunk 0\nchunk 1\nchunk 2\n"
+        assert response.headers["x-tenant-context"] == TENANT_ID
@@ -0,0 +1,50 @@
+"""
+Unit tests for feature-flagged router groups and the startup profiler
+"""
+import pytest
+
+from app.router_groups import CORE_GROUP, ROUTER_GROUPS, ROUTER_MOUNTS, mounts_for, parse_router_groups
+from app.startup_profile import parse_importtime
+
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _heapq
+import time:       300 |        420 |   heapq
+import time:      2000 |       2000 |   torch
+import time:       500 |       2920 | sentence_transformers
+import time:        80 |         80 | app.clients.embeddings
+""".splitlines()
+
+
+class TestRouterGroups:
+    """Test suite for ROUTER_GROUPS parsing and the import-time tree"""
+
+    def test_all_enables_every_group(self):
+        """"all" (default) mounts every router in the historical order"""
+        assert parse_router_groups("all") == list(ROUTER_GROUPS)
+        assert parse_router_groups("") == list(ROUTER_GROUPS)
+        assert mounts_for(parse_router_groups("all")) == list(ROUTER_MOUNTS)
+
+    def test_core_is_always_mounted(self):
+        """A slim deployment still gets auth, tenants and health-related routers"""
+        groups = parse_router_groups(" RAG , ocr")
+
+        assert groups == [g for g in ROUTER_GROUPS if g in {CORE_GROUP, "rag", "ocr"}]
+        modules = [m.module for m in mounts_for(groups)]
+        assert "routers.auth" in modules and "bigrag" in modules
+        assert "voice.tts_router" not in modules
+
+    def test_unknown_group_is_rejected(self):
+        """Typos fail at startup instead of silently dropping routes"""
+        with pytest.raises(ValueError, match="vocie"):
+            parse_router_groups("rag,vocie")
+
+    def test_importtime_tree(self):
+        """-X importtime lines are folded into a parent/children tree"""
+        roots = parse_importtime(IMPORTTIME)
+
+        assert [r.module for r in roots] == ["sentence_transformers", "app.clients.embeddings"]
+        assert [c.module for c in roots[0].children] == ["heapq", "torch"]
+        assert roots[0].children[0].children[0].module == "_heapq"
+        assert roots[0].cumulative_ms == 2.92
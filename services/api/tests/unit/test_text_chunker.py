@@ -0,0 +1,61 @@
+"""
+Unit tests for the shared streaming text chunker
+"""
+from app.chunking import TextChunker, chunk_id, count_chunk_tokens
+
+FR = (
+    "Art. 12. — Les dispositions de la loi n° 23-05 sont modifiées comme suit. "
+    "M. le ministre des finances fixe les modalités d'application, cf. le décret exécutif. "
+)
+AR = "تعدل وتتمم أحكام المادة 12 من القانون. يحدد وزير المالية كيفيات تطبيق هذه المادة؟ "
+PAGES = [FR * 4 + "\n\n" + AR * 4 + f"Page {n} terminée sans point final" for n in range(6)]
+
+
+def _chunker(**kwargs) -> TextChunker:
+    options = {"max_tokens": 80, "overlap_tokens": 20, "min_chars": 20, "count_tokens": count_chunk_tokens}
+    return TextChunker(**{**options, **kwargs})
+
+
+class TestTextChunker:
+    """Test suite for token-aware, sentence-aligned chunking"""
+
+    def test_streamed_pages_match_whole_document(self):
+        """Page-by-page streaming yields the same chunks as the joined text"""
+        streamed = list(_chunker().stream(iter(PAGES), namespace="jo-001"))
+        whole = list(_chunker().stream(["\n".join(PAGES)], namespace="jo-001"))
+
+        assert [c.id for c in streamed] == [c.id for c in whole]
+        assert [c.index for c in streamed] == list(range(len(streamed)))
+        assert streamed[-1].page == len(PAGES)
+
+    def test_chunks_are_slices_within_budget(self):
+        """Each chunk is one slice of the source, within the token budget, with overlap"""
+        source = "\n".join(PAGES)
+        # Overlap is made of whole sentences: the budget must fit the longest one
+        chunks = list(_chunker(overlap_tokens=35).stream(PAGES))
+
+        assert all(source[c.start:c.end] == c.text for c in chunks)
+        assert all(c.tokens <= 80 for c in chunks)
+        assert all(b.start < a.end for a, b in zip(chunks, chunks[1:]))
+
+    def test_sentence_boundaries_fr_ar(self):
+        """Cuts fall after Latin/Arabic terminators, not after abbreviations"""
+        chunker = _chunker(max_tokens=30, overlap_tokens=0)
+        texts = chunker.chunk(FR + AR)
+
+        assert not any(t.endswith(("Art.", "M.", "cf.")) for t in texts)
+        assert any(t.endswith("؟") for t in texts)
+        assert texts[0].startswith("Art. 12. — Les dispositions")
+
+    def test_oversized_sentence_is_split_on_whitespace(self):
+        """A sentence longer than the budget is cut between words"""
+        text = " ".join(["mot"] * 600)
+        chunks = list(_chunker(overlap_tokens=0).stream([text]))
+
+        assert len(chunks) > 1
+        assert all(c.tokens <= 80 and not c.text.startswith("ot") for c in chunks)
+
+    def test_chunk_ids_are_stable(self):
+        """Ids ignore whitespace differences but depend on the namespace"""
+        assert chunk_id("Le  texte\n de la loi", "doc-1") == chunk_id("Le texte de la loi", "doc-1")
+        assert chunk_id("Le texte de la loi", "doc-1") != chunk_id("Le texte de la loi", "doc-2")
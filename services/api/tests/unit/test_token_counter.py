@@ -0,0 +1,92 @@
+"""
+Unit tests for the token counting service
+"""
+import os
+
+import pytest
+
+from app.tokens import counter as counter_module
+from app.tokens.counter import (
+    BPE_DIR,
+    BPE_SPECS,
+    TOKENS_PER_MESSAGE,
+    TOKENS_REPLY_PRIMING,
+    TokenCounter,
+    load_bpe_ranks,
+)
+
+
+class TestTokenCounter:
+    """Test suite for per-model token counting"""
+
+    def test_arabic_costs_more_than_latin(self):
+        """Calibrated fallback charges Arabic script more tokens per character"""
+        counter = TokenCounter()
+        latin = counter.estimate_by_script("a" * 100)
+        arabic = counter.estimate_by_script("ب" * 100)
+
+        assert arabic > latin
+
+    def test_empty_text(self):
+        """Empty text has no tokens"""
+        assert TokenCounter().count("") == 0
+
+    def test_message_overhead(self):
+        """Each chat message adds a fixed overhead plus reply priming"""
+        counter = TokenCounter()
+        messages = [{"role": "user", "content": "Bonjour"}, {"role": "assistant", "content": ""}]
+
+        expected = counter.count("Bonjour", "claude") + 2 * TOKENS_PER_MESSAGE + TOKENS_REPLY_PRIMING
+        assert counter.count_messages(messages, "claude") == expected
+
+    def test_batch_matches_single(self):
+        """Batched conversation counts equal individual counts"""
+        counter = TokenCounter()
+        conversations = [
+            [{"role": "user", "content": "واش راك؟"}],
+            [{"role": "system", "content": "Expert fiscal"}, {"role": "user", "content": "Taux IRG ?"}],
+        ]
+
+        assert counter.count_messages_batch(conversations, "llama") == [
+            counter.count_messages(conv, "llama") for conv in conversations
+        ]
+
+    def test_vendored_bpe_files(self):
+        """The bundled BPE files are complete and match the tiktoken hashes"""
+        sizes = {"cl100k_base": 100256, "o200k_base": 199998}
+        for encoding, spec in BPE_SPECS.items():
+            ranks = load_bpe_ranks(os.path.join(BPE_DIR, f"{encoding}.tiktoken"), spec["sha256"])
+            assert len(ranks) == sizes[encoding]
+
+    def test_missing_bpe_file_uses_estimate(self, tmp_path, monkeypatch):
+        """Without its BPE file an encoding falls back to the estimate, never to a download"""
+        if counter_module.tiktoken is not None:
+            def no_download(name):
+                raise AssertionError("tiktoken download attempted")
+            monkeypatch.setattr(counter_module.tiktoken, "get_encoding", no_download)
+        counter = TokenCounter(bpe_dir=str(tmp_path))
+        text = "Quel est le taux de TVA en Algérie ?"
+
+        assert counter.count(text, "gpt-4o") == counter.estimate_by_script(text)
+
+    def test_bpe_counts_from_bundled_files(self):
+        """OpenAI models are counted with the bundled BPE"""
+        pytest.importorskip("tiktoken")
+        counter = TokenCounter()
+
+        assert counter.count("Hello world", "gpt-4o") == 2
+        assert counter.count("Hello world", "openai.gpt-4") == 2
+        assert counter.count("Hello world", "gpt-4.1") == 2
+        assert counter.count("Hello world", "gpt-3.5-turbo") == 2
+
+    def test_dotted_model_names_keep_their_encoding(self):
+        """Versions with a dot resolve like their family, with or without provider prefix"""
+        counter = TokenCounter()
+
+        assert counter._encoding_for("gpt-4.1") == "o200k_base"
+        assert counter._encoding_for("gpt-4.1-mini") == "o200k_base"
+        assert counter._encoding_for("openai.gpt-4.1") == "o200k_base"
+        assert counter._encoding_for("gpt-3.5-turbo") == "cl100k_base"
+        assert counter._encoding_for("azure.gpt-3.5-turbo") == "cl100k_base"
+        assert counter._encoding_for("openai.gpt-4o-mini") == "o200k_base"
+        assert counter._encoding_for("claude-3.5-sonnet") is None
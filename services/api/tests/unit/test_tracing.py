@@ -0,0 +1,109 @@
+"""
+Unit tests for request tracing and pipeline stage spans
+"""
+import pytest
+
+from app.monitoring import STAGE_ERRORS, STAGE_LATENCY
+from app.tracing import (
+    SlowTraceBuffer,
+    Trace,
+    current_request_id,
+    finish_trace,
+    new_request_id,
+    slow_traces,
+    stage,
+    start_trace,
+)
+
+
+def _count(stage_name: str) -> float:
+    for metric in STAGE_LATENCY.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_count") and sample.labels.get("stage") == stage_name:
+                return sample.value
+    return 0.0
+
+
+class TestTracing:
+    """Test suite for stage spans, slow trace buffer and request IDs"""
+
+    def test_stages_nest_under_the_request_trace(self):
+        """Nested stages become child spans of the enclosing stage"""
+        trace = start_trace("req-nesting-01", method="POST", route="/api/bigrag/query")
+
+        with stage("search", country="DZ") as outer:
+            with stage("rerank") as inner:
+                pass
+        with stage("llm"):
+            pass
+
+        names = [(s.name, s.parent_id) for s in trace.spans]
+        assert names == [("search", None), ("rerank", outer.span_id), ("llm", None)]
+        assert outer.attributes == {"country": "DZ"}
+        assert outer.duration_ms >= inner.duration_ms >= 0
+        assert current_request_id() == "req-nesting-01"
+
+    def test_stage_records_errors(self):
+        """A failing stage keeps its error and re-raises"""
+        trace = start_trace("req-errors-001")
+        before = STAGE_ERRORS.labels(stage="ocr_page")._value.get()
+
+        with pytest.raises(ValueError):
+            with stage("ocr_page", page=3):
+                raise ValueError("page illisible")
+
+        assert trace.spans[0].error == "ValueError: page illisible"
+        assert STAGE_ERRORS.labels(stage="ocr_page")._value.get() == before + 1
+
+    def test_stage_observes_histogram(self):
+        """Each stage adds one observation to its histogram"""
+        before = _count("embed")
+
+        with stage("embed"):
+            pass
+
+        assert _count("embed") == before + 1
+
+    def test_slow_buffer_keeps_recent_slow_traces(self):
+        """Only traces above the threshold are kept, oldest evicted first"""
+        buffer = SlowTraceBuffer(threshold_ms=100, max_traces=2)
+        for i, duration in enumerate([50, 150, 300, 120]):
+            trace = Trace(request_id=f"req-{i}")
+            trace.duration_ms = duration
+            buffer.offer(trace)
+
+        snapshot = buffer.snapshot()
+
+        assert [t["request_id"] for t in snapshot] == ["req-3", "req-2"]
+        assert buffer.recorded == 3
+        assert [t["request_id"] for t in buffer.snapshot(min_duration_ms=200)] == ["req-2"]
+
+    def test_slow_buffer_filters_by_tenant(self):
+        """A tenant only sees its own slow traces"""
+        buffer = SlowTraceBuffer(threshold_ms=100)
+        for i, tenant_id in enumerate(["tenant-a", "tenant-b", None, "tenant-a"]):
+            trace = Trace(request_id=f"req-{i}", tenant_id=tenant_id)
+            trace.duration_ms = 200
+            buffer.offer(trace)
+
+        assert [t["request_id"] for t in buffer.snapshot(tenant_id="tenant-a")] == ["req-3", "req-0"]
+        assert [t["request_id"] for t in buffer.snapshot(tenant_id="tenant-b")] == ["req-1"]
+        assert buffer.snapshot(tenant_id="tenant-c") == []
+
+    def test_finish_trace_offers_to_slow_buffer(self):
+        """A finished trace over the threshold shows up in the debug buffer"""
+        slow_traces.clear()
+        trace = start_trace("req-slow-0001", method="GET")
+        trace.started_at -= (slow_traces.threshold_ms + 10) / 1000
+
+        finish_trace(trace, 200, route="/api/ocr/process")
+
+        snapshot = slow_traces.snapshot()
+        assert snapshot[0]["request_id"] == "req-slow-0001"
+        assert snapshot[0]["route"] == "/api/ocr/process"
+
+    def test_request_id_reuses_valid_upstream_id(self):
+        """Valid upstream IDs are propagated, malformed ones replaced"""
+        assert new_request_id("b7e1c2d4-9f00-4e1a") == "b7e1c2d4-9f00-4e1a"
+        assert new_request_id("bad id\nX-Injected: 1") != "bad id\nX-Injected: 1"
+        assert len(new_request_id()) == 16
@@ -0,0 +1,121 @@
+"""
+Unit tests for spooled uploads and zero-copy parser access
+"""
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+import threading
+
+import docx
+import pytest
+from fastapi import UploadFile
+
+from app.clients.document_parser import DocumentParser
+from app.tracing import start_trace
+from app.uploads import READ_CHUNK_SIZE, SpooledUpload, UploadTooLarge, upload_scope
+
+TEXT = ("Art. 12. — Les dispositions de la loi n° 23-05 sont modifiées comme suit. " * 40).encode()
+
+
+def _upload(data: bytes, filename: str = "loi.txt") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+
+def _spool(data: bytes, max_memory: int, filename: str = "loi.txt", **kwargs) -> SpooledUpload:
+    return asyncio.run(SpooledUpload.from_upload(_upload(data, filename), max_memory=max_memory, **kwargs))
+
+
+class TestSpooledUpload:
+    """Test suite for memory/disk spooling, streaming hash and size limits"""
+
+    def test_small_upload_stays_in_memory(self):
+        """Under the threshold, content is served from the in-memory buffer"""
+        with _spool(TEXT, max_memory=len(TEXT)) as upload:
+            assert upload.in_memory
+            assert upload.size == len(TEXT)
+            assert upload.sha256 == hashlib.sha256(TEXT).hexdigest()
+            with upload.view() as data:
+                assert isinstance(data, memoryview) and data == TEXT
+            assert upload.stream().read() == TEXT
+
+    def test_large_upload_spills_to_disk_and_maps(self):
+        """Above the threshold, content moves to a temp file read through mmap"""
+        data = os.urandom(3 * READ_CHUNK_SIZE + 17)
+        with _spool(data, max_memory=READ_CHUNK_SIZE, filename="scan.pdf") as upload:
+            assert not upload.in_memory
+            assert upload.sha256 == hashlib.sha256(data).hexdigest()
+            with upload.view() as mapped:
+                assert isinstance(mapped, mmap.mmap) and mapped[:] == data
+            path = upload.path()
+            assert path.endswith(".pdf")
+            with open(path, "rb") as f:
+                assert f.read() == data
+        assert not os.path.exists(path)
+
+    def test_size_limit_stops_reading(self):
+        """UploadTooLarge is raised as soon as the limit is crossed"""
+        source = io.BytesIO(b"x" * (4 * READ_CHUNK_SIZE))
+        with pytest.raises(UploadTooLarge):
+            asyncio.run(SpooledUpload.from_upload(UploadFile(file=source), max_bytes=READ_CHUNK_SIZE))
+        assert source.tell() <= 2 * READ_CHUNK_SIZE
+
+    def test_disk_writes_run_off_the_event_loop(self, monkeypatch):
+        """Buffered chunks are written on the loop, the rollover and disk chunks in a thread"""
+        loop_thread = threading.get_ident()
+        writes = []
+        write = SpooledUpload.write
+
+        def recording_write(self, chunk):
+            writes.append((self.writes_to_disk(len(chunk)), threading.get_ident() == loop_thread))
+            write(self, chunk)
+
+        monkeypatch.setattr(SpooledUpload, "write", recording_write)
+        data = os.urandom(4 * READ_CHUNK_SIZE)
+
+        with _spool(data, max_memory=2 * READ_CHUNK_SIZE) as upload:
+            assert upload.sha256 == hashlib.sha256(data).hexdigest()
+            with upload.view() as mapped:
+                assert mapped[:] == data
+
+        assert writes == [(False, True), (False, True), (True, False), (True, False)]
+
+    def test_scope_tracks_peak_memory(self):
+        """The upload span reports the in-memory peak, bounded by the threshold"""
+        trace = start_trace("req-upload-01", method="POST", route="/api/ingest/upload")
+        data = b"y" * (5 * READ_CHUNK_SIZE)
+
+        with upload_scope(filename="scan.pdf") as memory:
+            with _spool(data, max_memory=2 * READ_CHUNK_SIZE):
+                pass
+
+        assert memory.peak_bytes == 2 * READ_CHUNK_SIZE
+        assert memory.in_memory_bytes == 0
+        assert memory.spilled_bytes == 2 * READ_CHUNK_SIZE
+        span = next(s for s in trace.spans if s.name == "upload")
+        assert span.attributes["peak_upload_bytes"] == 2 * READ_CHUNK_SIZE
+        assert span.attributes["filename"] == "scan.pdf"
+
+
+class TestParserOnSpooledUpload:
+    """Test suite for DocumentParser reading spooled uploads in place"""
+
+    @pytest.mark.parametrize("max_memory", [10 * len(TEXT), 0])
+    def test_txt_matches_bytes(self, max_memory):
+        """Spooled TXT (memory or disk) parses like the raw bytes"""
+        with _spool(TEXT, max_memory=max_memory) as upload:
+            spooled = DocumentParser.parse_file("loi.txt", upload)
+        assert spooled == DocumentParser.parse_file("loi.txt", TEXT)
+
+    def test_docx_read_from_disk(self):
+        """A DOCX spilled to disk is opened from the temp file"""
+        document = docx.Document()
+        document.add_paragraph(TEXT.decode())
+        buffer = io.BytesIO()
+        document.save(buffer)
+
+        with _spool(buffer.getvalue(), max_memory=0, filename="guide.docx") as upload:
+            parsed = DocumentParser.parse_file("guide.docx", upload)
+        assert parsed["text"] == TEXT.decode().strip()
+        assert parsed["chunks"]
@@ -0,0 +1,193 @@
+"""
+Unit tests for the WebSocket fan-out broadcaster
+"""
+import asyncio
+import json
+
+from app.websocket import SLOW_CLIENT_CLOSE_CODE, ConnectionManager, RedisBackplane
+
+
+class FakeWebSocket:
+    """WebSocket whose sends can be held back to simulate a slow client"""
+
+    def __init__(self, blocked: bool = False):
+        self.sent = []
+        self.closed_with = None
+        self.released = asyncio.Event()
+        if not blocked:
+            self.released.set()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.released.wait()
+        self.sent.append(text)
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+class FakeRedis:
+    """In-memory pub/sub shared by the "workers" of a test"""
+
+    def __init__(self, bus: list):
+        self.bus = bus
+
+    async def publish(self, channel, data):
+        for queue in self.bus:
+            queue.put_nowait({"type": "message", "channel": channel, "data": data})
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        return FakePubSub(self.bus)
+
+    async def aclose(self):
+        pass
+
+
+class FakePubSub:
+    def __init__(self, bus: list):
+        self.bus = bus
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.bus.append(self.queue)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        self.bus.remove(self.queue)
+
+
+async def _settle():
+    """Let writer tasks drain (each send goes through wait_for)"""
+    for _ in range(50):
+        await asyncio.sleep(0)
+
+
+def _progress(operation_id: str, progress: int, status: str = "progress") -> dict:
+    return {"operation_id": operation_id, "status": status, "progress": progress}
+
+
+class TestConnectionManager:
+    """Test suite for per-client queues, coalescing and slow-client isolation"""
+
+    def test_broadcast_serializes_once(self):
+        """Every client receives the same serialized payload"""
+        async def scenario():
+            manager = ConnectionManager(backplane=False)
+            sockets = [FakeWebSocket() for _ in range(3)]
+            for socket in sockets:
+                await manager.connect(socket, "t1")
+            await manager.send_progress_update("t1", "op-1", "started", 0, "Début")
+            await _settle()
+            await manager.close()
+            return sockets
+
+        sockets = asyncio.run(scenario())
+        payloads = [socket.sent[0] for socket in sockets]
+        assert all(payload is payloads[0] for payload in payloads)
+        assert json.loads(payloads[0])["operation_id"] == "op-1"
+
+    def test_slow_client_does_not_delay_others(self):
+        """A blocked client neither delays nor loses the updates of the others"""
+        async def scenario():
+            manager = ConnectionManager(backplane=False)
+            slow, fast = FakeWebSocket(blocked=True), FakeWebSocket()
+            await manager.connect(slow, "t1")
+            await manager.connect(fast, "t1")
+            for progress in range(0, 100, 10):
+                await manager.broadcast_to_tenant("t1", _progress("op-1", progress))
+                await _settle()
+            fast_count = len(fast.sent)
+            slow.released.set()
+            await _settle()
+            await manager.close()
+            return fast_count, slow
+
+        fast_count, slow = asyncio.run(scenario())
+        assert fast_count == 10
+        # The slow client only gets the send in flight and the latest progress
+        assert [json.loads(text)["progress"] for text in slow.sent] == [0, 90]
+
+    def test_full_queue_drops_oldest_progress(self):
+        """A full queue drops the oldest progress event, never a final status"""
+        async def scenario():
+            manager = ConnectionManager(max_queue=3, backplane=False)
+            slow = FakeWebSocket(blocked=True)
+            await manager.connect(slow, "t1")
+            await manager.broadcast_to_tenant("t1", {"type": "in-flight"})
+            await _settle()
+            await manager.broadcast_to_tenant("t1", _progress("op-1", 10))
+            await manager.broadcast_to_tenant("t1", _progress("op-1", 100, status="completed"))
+            await manager.broadcast_to_tenant("t1", _progress("op-2", 20))
+            await manager.broadcast_to_tenant("t1", _progress("op-3", 30))
+            slow.released.set()
+            await _settle()
+            await manager.close()
+            return slow
+
+        slow = asyncio.run(scenario())
+        received = [json.loads(text) for text in slow.sent[1:]]
+        assert [(m["operation_id"], m["status"]) for m in received] == [
+            ("op-1", "completed"), ("op-2", "progress"), ("op-3", "progress")
+        ]
+
+    def test_client_stuck_on_final_messages_is_disconnected(self):
+        """Without droppable messages, an overflowing client is closed and forgotten"""
+        async def scenario():
+            manager = ConnectionManager(max_queue=2, send_timeout=0.05, backplane=False)
+            slow = FakeWebSocket(blocked=True)
+            await manager.connect(slow, "t1")
+            for i in range(4):
+                await manager.broadcast_to_tenant("t1", _progress(f"op-{i}", 100, status="completed"))
+            await asyncio.sleep(0.2)
+            return manager, slow
+
+        manager, slow = asyncio.run(scenario())
+        assert slow.closed_with == SLOW_CLIENT_CLOSE_CODE
+        assert "t1" not in manager.active_connections
+
+
+class TestRedisBackplane:
+    """Test suite for cross-worker delivery through pub/sub"""
+
+    def test_progress_reaches_clients_of_other_workers(self, monkeypatch):
+        """An update sent by a worker without clients reaches another worker's clients once"""
+        bus = []
+        monkeypatch.setattr(RedisBackplane, "_redis", staticmethod(lambda **options: FakeRedis(bus)))
+
+        async def scenario():
+            sender, receiver = ConnectionManager(), ConnectionManager()
+            socket = FakeWebSocket()
+            await receiver.connect(socket, "t1")
+            await _settle()
+            await sender.send_progress_update("t1", "op-1", "progress", 40, "Indexation")
+            await _settle()
+            await sender.close()
+            await receiver.close()
+            return socket
+
+        socket = asyncio.run(scenario())
+        assert [json.loads(text)["progress"] for text in socket.sent] == [40]
+
+    def test_local_delivery_when_redis_is_down(self, monkeypatch):
+        """Broadcasts fall back to local delivery when publishing fails"""
+        def unavailable(**options):
+            raise ConnectionError("redis down")
+
+        monkeypatch.setattr(RedisBackplane, "_redis", staticmethod(unavailable))
+
+        async def scenario():
+            manager = ConnectionManager()
+            socket = FakeWebSocket()
+            await manager.connect(socket, "t1")
+            await manager.send_progress_update("t1", "op-1", "completed", 100, "Terminé")
+            await _settle()
+            await manager.close()
+            return socket
+
+        socket = asyncio.run(scenario())
+        assert json.loads(socket.sent[0])["status"] == "completed"
@@ -8,14 +8,16 @@ Endpoints:
 - POST /api/ingest/batch - Ingérer plusieurs documents
 - GET /api/sources - Liste des sources disponibles
 - GET /api/stats - Statistiques d'ingestion
-- POST /api/scrape/{source} - Lancer un scraping manuel
+- POST /api/scrape/{source} - Lancer un scraping manuel (incrémental, ?full=true pour tout ré-émettre)
+- GET /api/scrape/report - Bilan du dernier scraping
 """
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import datetime, date
+import os
 import hashlib
 import asyncio
 import logging
@@ -24,9 +26,9 @@ from contextlib import asynccontextmanager
 # Local imports
 from scrapers import JORADPScraper, DGIScraper, ONSScraper, BankAlgeriaScraper
 from scrapers import DouanesScraper, ANEMScraper, ANDIScraper, NewsScraper
-from embeddings import EmbeddingService
-from database import Database, IngestionLog
-from chunker import TextChunker
+from scrape_scheduler import ScrapeScheduler, CHANGED
+from services import EmbeddingService, Database, IngestionLog
+from text_chunker import TextChunker, tiktoken_counter
 
 # Configuration logging
 logging.basicConfig(level=logging.INFO)
@@ -43,17 +45,29 @@ SOURCES = {
     "DZ_ANDI": {"name": "ANDI Investissement", "url": "https://andi.dz", "frequency": "monthly"},
     "DZ_NEWS": {"name": "Actualités DZ", "url": "multiple", "frequency": "daily"},
 }
+SCRAPERS = {
+    "DZ_JO": JORADPScraper,
+    "DZ_DGI": DGIScraper,
+    "DZ_ONS": ONSScraper,
+    "DZ_BANK": BankAlgeriaScraper,
+    "DZ_DOUANE": DouanesScraper,
+    "DZ_ANEM": ANEMScraper,
+    "DZ_ANDI": ANDIScraper,
+    "DZ_NEWS": NewsScraper,
+}
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 4))  # Documents ingérés en parallèle par lot
 
 # Services
 db: Optional[Database] = None
 embedding_service: Optional[EmbeddingService] = None
 chunker: Optional[TextChunker] = None
+scrape_scheduler: Optional[ScrapeScheduler] = None
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle management"""
-    global db, embedding_service, chunker
+    global db, embedding_service, chunker, scrape_scheduler
     
     logger.info("🚀 Initialisation DZ-Connectors...")
     
@@ -62,13 +76,16 @@ async def lifespan(app: FastAPI):
     await db.connect()
     
     embedding_service = EmbeddingService()
-    chunker = TextChunker(chunk_size=500, overlap=50)
+    await embedding_service.load()
+    chunker = TextChunker(max_tokens=500, overlap_tokens=50, count_tokens=tiktoken_counter())
+    scrape_scheduler = ScrapeScheduler(ingest_concurrency=INGEST_CONCURRENCY)
     
     logger.info("✅ DZ-Connectors prêt!")
     
     yield
     
     # Cleanup
+    scrape_scheduler.close()
     await db.disconnect()
     logger.info("👋 DZ-Connectors arrêté")
 
@@ -205,6 +222,8 @@ async def health():
         "status": "healthy",
         "database": await db.ping() if db else False,
         "embedding_service": embedding_service is not None,
+        "embedding_throughput": embedding_service.throughput() if embedding_service else None,
+        "last_scrape": scrape_scheduler.last_report.as_dict() if scrape_scheduler and scrape_scheduler.last_report else None,
         "sources_count": len(SOURCES)
     }
 
@@ -220,12 +239,22 @@ async def ingest_document(doc: DocumentInput, background_tasks: BackgroundTasks)
     3. Génération des embeddings
     4. Stockage dans la base vectorielle
     """
+    return await ingest(doc)
+
+
+async def ingest(doc: DocumentInput, replace: bool = False) -> IngestionResult:
+    """
+    Ingestion d'un document (API et scraping)
+    
+    replace=True ré-ingère un document déjà connu dont le contenu a changé:
+    ses chunks sont écrasés et ceux en trop de l'ancienne version supprimés.
+    """
     try:
         # Générer ID unique
         doc_id = generate_doc_id(doc)
         
         # Vérifier si déjà ingéré
-        if await db.document_exists(doc_id):
+        if not replace and await db.document_exists(doc_id):
             return IngestionResult(
                 success=True,
                 document_id=doc_id,
@@ -242,8 +271,8 @@ async def ingest_document(doc: DocumentInput, background_tasks: BackgroundTasks)
                 message="Texte trop court après nettoyage"
             )
         
-        # Chunking
-        chunks = chunker.chunk(cleaned_text)
+        # Chunking (tokens, fins de phrase, ID de chunk stable par contenu)
+        chunks = list(chunker.iter_chunks(cleaned_text, namespace=doc_id))
         
         # Métadonnées communes
         metadata = {
@@ -256,16 +285,23 @@ async def ingest_document(doc: DocumentInput, background_tasks: BackgroundTasks)
             "ingested_at": datetime.now().isoformat()
         }
         
-        # Générer embeddings et stocker
-        for i, chunk in enumerate(chunks):
-            chunk_metadata = {**metadata, "chunk_index": i, "total_chunks": len(chunks)}
-            embedding = await embedding_service.embed(chunk)
+        # Générer les embeddings (un seul lot pour tous les chunks) et stocker
+        embeddings = await embedding_service.embed_batch([chunk.text for chunk in chunks])
+        for chunk, embedding in zip(chunks, embeddings):
+            chunk_metadata = {
+                **metadata,
+                "chunk_index": chunk.index,
+                "total_chunks": len(chunks),
+                "chunk_id": chunk.id,
+            }
             await db.store_embedding(
-                doc_id=f"{doc_id}_{i}",
-                text=chunk,
+                doc_id=f"{doc_id}_{chunk.index}",
+                text=chunk.text,
                 embedding=embedding,
                 metadata=chunk_metadata
             )
+        if replace:
+            await db.delete_stale_chunks(doc_id, len(chunks))
         
         # Logger l'ingestion
         await db.log_ingestion(IngestionLog(
@@ -276,7 +312,12 @@ async def ingest_document(doc: DocumentInput, background_tasks: BackgroundTasks)
             status="success"
         ))
         
-        logger.info(f"✅ Document ingéré: {doc.title} ({len(chunks)} chunks)")
+        throughput = embedding_service.throughput()
+        logger.info(
+            f"✅ Document ingéré: {doc.title} ({len(chunks)} chunks) | embeddings "
+            f"{throughput['backend']}: {throughput['chunks_per_second']} chunks/s, "
+            f"lot moyen {throughput['avg_batch_size']}"
+        )
         
         return IngestionResult(
             success=True,
@@ -303,20 +344,26 @@ async def ingest_document(doc: DocumentInput, background_tasks: BackgroundTasks)
 
 @app.post("/api/ingest/batch", response_model=List[IngestionResult])
 async def ingest_batch(batch: BatchInput, background_tasks: BackgroundTasks):
-    """Ingérer plusieurs documents en lot"""
-    results = []
-    
-    for doc in batch.documents:
-        try:
-            result = await ingest_document(doc, background_tasks)
-            results.append(result)
-        except Exception as e:
-            results.append(IngestionResult(
-                success=False,
-                message=f"Erreur: {str(e)}"
-            ))
-    
-    return results
+    """
+    Ingérer plusieurs documents en lot
+
+    Les documents sont ingérés en parallèle (au plus INGEST_CONCURRENCY à la fois):
+    leurs chunks partagent les micro-lots de l'EmbeddingService.
+    """
+    semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+
+    async def ingest_one(doc: DocumentInput) -> IngestionResult:
+        async with semaphore:
+            try:
+                return await ingest_document(doc, background_tasks)
+            except Exception as e:
+                return IngestionResult(
+                    success=False,
+                    message=f"Erreur: {str(e)}"
+                )
+
+    # gather conserve l'ordre des documents
+    return list(await asyncio.gather(*(ingest_one(doc) for doc in batch.documents)))
 
 
 @app.get("/api/sources", response_model=List[SourceInfo])
@@ -355,49 +402,46 @@ async def get_stats():
 
 
 @app.post("/api/scrape/{source}")
-async def trigger_scrape(source: str, background_tasks: BackgroundTasks):
-    """Lancer un scraping manuel pour une source"""
+async def trigger_scrape(source: str, background_tasks: BackgroundTasks, full: bool = False):
+    """
+    Lancer un scraping manuel pour une source
+    
+    Incrémental par défaut: pages et PDF inchangés (ETag, Last-Modified,
+    empreinte) ne sont pas re-téléchargés/re-parsés et seuls les documents
+    nouveaux ou modifiés sont ingérés. full=true ignore les validateurs.
+    """
     
     if source not in SOURCES and source != "all":
         raise HTTPException(status_code=404, detail=f"Source inconnue: {source}")
     
     # Lancer en arrière-plan
-    background_tasks.add_task(run_scraper, source)
+    background_tasks.add_task(run_scraper, source, full)
     
     return {
         "status": "started",
         "source": source,
+        "incremental": not full,
         "message": f"Scraping de {source} lancé en arrière-plan"
     }
 
 
-async def run_scraper(source: str):
-    """Exécute le scraper pour une source"""
-    scrapers = {
-        "DZ_JO": JORADPScraper(),
-        "DZ_DGI": DGIScraper(),
-        "DZ_ONS": ONSScraper(),
-        "DZ_BANK": BankAlgeriaScraper(),
-        "DZ_DOUANE": DouanesScraper(),
-        "DZ_ANEM": ANEMScraper(),
-        "DZ_ANDI": ANDIScraper(),
-        "DZ_NEWS": NewsScraper(),
-    }
+@app.get("/api/scrape/report")
+async def scrape_report():
+    """Bilan du dernier scraping (documents émis, 304, octets téléchargés)"""
+    if not scrape_scheduler or not scrape_scheduler.last_report:
+        return {"status": "never_run"}
+    return scrape_scheduler.last_report.as_dict()
+
+
+async def run_scraper(source: str, full: bool = False):
+    """Exécute les scrapers (toutes les sources en parallèle pour "all")"""
+    scrapers = SCRAPERS if source == "all" else {source: SCRAPERS[source]}
     
-    if source == "all":
-        for src_id, scraper in scrapers.items():
-            try:
-                documents = await scraper.scrape()
-                for doc in documents:
-                    await ingest_document(doc, BackgroundTasks())
-            except Exception as e:
-                logger.error(f"Erreur scraping {src_id}: {e}")
-    else:
-        scraper = scrapers.get(source)
-        if scraper:
-            documents = await scraper.scrape()
-            for doc in documents:
-                await ingest_document(doc, BackgroundTasks())
+    async def ingest_scraped(doc: Dict, status: str) -> bool:
+        result = await ingest(DocumentInput(**doc), replace=status == CHANGED)
+        return result.success
+    
+    await scrape_scheduler.run(scrapers, ingest_scraped, incremental=not full)
 
 
 @app.get("/api/search")
@@ -0,0 +1,471 @@
+"""
+Ordonnanceur de scraping DZ
+===========================
+Exécute les scrapers en parallèle et ne ré-émet que ce qui a changé
+
+- Budget par hôte: au plus SCRAPE_HOST_CONCURRENCY requêtes simultanées et
+  un délai de politesse minimal entre deux requêtes vers le même hôte
+  (crawl_delay du scraper, 429/503 + Retry-After respectés)
+- Cache HTTP persistant (JSON): ETag / Last-Modified envoyés en GET
+  conditionnel, empreinte SHA-256 du contenu pour les serveurs qui n'en
+  fournissent pas. Un PDF inchangé n'est ni re-téléchargé (304) ni re-parsé.
+- Extraction du texte PDF dans un pool de processus (pypdf est CPU-bound et
+  bloquerait la boucle asyncio)
+- Exécution incrémentale: seuls les documents nouveaux ou modifiés (empreinte
+  du texte) sont transmis à l'ingestion. Un document dont l'ingestion échoue
+  est oublié du cache et sera retenté au prochain passage.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type
+from urllib.parse import urlsplit
+
+import aiohttp
+
+# Pour PDF
+try:
+    import pypdf
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+logger = logging.getLogger("dz-scrapers")
+
+# User-Agent pour éviter les blocages
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "fr-FR,fr;q=0.9,ar;q=0.8",
+}
+
+# Configuration
+SCRAPE_CACHE_PATH = os.getenv("SCRAPE_CACHE_PATH", "data/scrape_cache.json")
+SCRAPE_SOURCE_CONCURRENCY = int(os.getenv("SCRAPE_SOURCE_CONCURRENCY", 8))  # Scrapers exécutés en parallèle
+SCRAPE_HOST_CONCURRENCY = int(os.getenv("SCRAPE_HOST_CONCURRENCY", 2))  # Requêtes simultanées par hôte
+SCRAPE_HOST_DELAY = float(os.getenv("SCRAPE_HOST_DELAY", 0))  # Délai minimal par hôte (s), en plus du crawl_delay
+SCRAPE_PDF_WORKERS = int(os.getenv("SCRAPE_PDF_WORKERS", min(4, os.cpu_count() or 1)))
+SCRAPE_CACHE_TTL_DAYS = int(os.getenv("SCRAPE_CACHE_TTL_DAYS", 30))  # URLs non revues depuis: retirées du cache
+
+# Statut d'un document émis vers l'ingestion
+NEW, CHANGED, UNCHANGED = "new", "changed", "unchanged"
+
+IngestCallback = Callable[[Dict, str], Awaitable[bool]]
+
+
+def extract_pdf_text(pdf_bytes: bytes) -> str:
+    """Extrait le texte d'un PDF (exécuté dans le pool de processus)"""
+    try:
+        reader = pypdf.PdfReader(BytesIO(pdf_bytes))
+        return "".join((page.extract_text() or "") + "\n" for page in reader.pages)
+    except Exception as e:
+        logger.error(f"Erreur extraction PDF: {e}")
+        return ""
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def document_key(doc: Dict) -> str:
+    """Même identité que generate_doc_id (source, URL, titre)"""
+    return f"{doc['source_name']}:{doc['source_url']}:{doc['title']}"
+
+
+# ==================== BUDGET PAR HÔTE ====================
+
+@dataclass
+class _HostState:
+    semaphore: asyncio.Semaphore
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    next_start: float = 0.0
+
+
+class HostBudget:
+    """Concurrence et politesse par hôte, partagées par tous les scrapers"""
+
+    def __init__(self, concurrency: int = SCRAPE_HOST_CONCURRENCY, min_delay: float = SCRAPE_HOST_DELAY):
+        self.concurrency = max(1, concurrency)
+        self.min_delay = min_delay
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _state(self, url: str) -> _HostState:
+        host = urlsplit(url).hostname or ""
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(semaphore=asyncio.Semaphore(self.concurrency))
+        return self._hosts[host]
+
+    @asynccontextmanager
+    async def slot(self, url: str, delay: float):
+        """Réserve une requête vers l'hôte de `url`, espacée d'au moins `delay` s de la précédente"""
+        state = self._state(url)
+        loop = asyncio.get_running_loop()
+        async with state.semaphore:
+            async with state.lock:
+                wait = state.next_start - loop.time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                state.next_start = loop.time() + max(delay, self.min_delay)
+            yield
+
+    def back_off(self, url: str, seconds: float):
+        """Repousse les prochaines requêtes vers l'hôte (429/503)"""
+        state = self._state(url)
+        state.next_start = max(state.next_start, asyncio.get_running_loop().time() + seconds)
+
+
+# ==================== CACHE ====================
+
+class FetchCache:
+    """
+    Cache persistant des validateurs HTTP et des empreintes de documents
+
+    {"urls": {url: {etag, last_modified, sha256, body, checked_at}}, "documents": {clé: sha256}}
+    `body` n'est conservé que pour les pages HTML: une page inchangée (304)
+    est re-parsée depuis le cache pour retrouver ses liens.
+    """
+
+    def __init__(self, path: Optional[str] = SCRAPE_CACHE_PATH, ttl_days: int = SCRAPE_CACHE_TTL_DAYS):
+        self.path = Path(path) if path else None
+        self.ttl_days = ttl_days
+        self.urls: Dict[str, Dict[str, Any]] = {}
+        self.documents: Dict[str, str] = {}
+        self._loaded = False
+
+    def load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.urls = data.get("urls", {})
+            self.documents = data.get("documents", {})
+            logger.info(f"Cache scraping: {len(self.urls)} URLs, {len(self.documents)} documents")
+        except Exception as e:
+            logger.warning(f"Cache scraping illisible ({self.path}), ignoré: {e}")
+
+    def save(self):
+        """Écriture atomique (fichier temporaire + rename), sans les URLs expirées"""
+        if not self.path:
+            return
+        expired = (datetime.now() - timedelta(days=self.ttl_days)).isoformat()
+        self.urls = {url: entry for url, entry in self.urls.items() if entry.get("checked_at", "") >= expired}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(
+            json.dumps({"urls": self.urls, "documents": self.documents}, ensure_ascii=False),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
+
+
+# ==================== FETCHER ====================
+
+@dataclass
+class FetchStats:
+    requests: int = 0
+    not_modified: int = 0  # 304: rien téléchargé
+    unchanged: int = 0  # 200 mais contenu identique (SHA-256)
+    errors: int = 0
+    bytes_downloaded: int = 0
+    pdf_extracted: int = 0
+    pdf_skipped: int = 0
+
+
+class Fetcher:
+    """
+    Téléchargements HTTP d'un passage de scraping
+
+    Une session aiohttp partagée, le budget par hôte et, en mode incrémental,
+    les GET conditionnels. Sans cache ni pool (scraper utilisé seul), se
+    comporte comme avant: tout est téléchargé, PDF extraits dans un thread.
+    """
+
+    def __init__(
+        self,
+        budget: Optional[HostBudget] = None,
+        cache: Optional[FetchCache] = None,
+        pool: Optional[ProcessPoolExecutor] = None,
+        incremental: bool = True,
+    ):
+        self.budget = budget or HostBudget()
+        self.cache = cache
+        self.pool = pool
+        self.incremental = incremental and cache is not None
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.stats = FetchStats()
+        # SHA-256 du texte extrait -> URL du PDF (pour oublier un PDF dont l'ingestion a échoué)
+        self.origins: Dict[str, str] = {}
+
+    async def __aenter__(self):
+        self.session = aiohttp.ClientSession(headers=HEADERS)
+        return self
+
+    async def __aexit__(self, *args):
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def get(self, url: str, timeout: float, delay: float, keep_body: bool) -> Optional[bytes]:
+        """
+        GET (conditionnel si possible)
+
+        Retourne le contenu, b"" si la ressource n'a pas changé depuis le
+        dernier passage, None en cas d'erreur.
+        """
+        entry = self.cache.urls.get(url, {}) if self.cache else {}
+        headers = {}
+        if self.incremental:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        async with self.budget.slot(url, delay):
+            self.stats.requests += 1
+            try:
+                async with self.session.get(
+                    url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    if response.status == 304:
+                        self.stats.not_modified += 1
+                        entry["checked_at"] = datetime.now().isoformat()
+                        return b""
+                    if response.status in (429, 503):
+                        retry_after = response.headers.get("Retry-After", "")
+                        self.budget.back_off(url, float(retry_after) if retry_after.isdigit() else delay * 4)
+                    if response.status != 200:
+                        self.stats.errors += 1
+                        logger.error(f"Erreur HTTP {response.status} pour {url}")
+                        return None
+                    body = await response.read()
+                    validators = {
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                    }
+            except Exception as e:
+                self.stats.errors += 1
+                logger.error(f"Erreur requête {url}: {e}")
+                return None
+
+        self.stats.bytes_downloaded += len(body)
+        if not self.cache:
+            return body
+
+        digest = content_hash(body)
+        unchanged = self.incremental and entry.get("sha256") == digest
+        self.cache.urls[url] = {
+            **validators,
+            "sha256": digest,
+            "body": body.decode("utf-8", errors="replace") if keep_body else None,
+            "checked_at": datetime.now().isoformat(),
+        }
+        if unchanged:
+            self.stats.unchanged += 1
+            return b""
+        return body
+
+    async def fetch_html(self, url: str, delay: float = 1.0) -> str:
+        """HTML de la page (depuis le cache si inchangée: les liens doivent être re-parsés)"""
+        body = await self.get(url, timeout=30, delay=delay, keep_body=True)
+        if body is None:
+            return ""
+        if body == b"":
+            return self.cache.urls[url].get("body") or ""
+        return body.decode("utf-8", errors="replace")
+
+    async def fetch_pdf(self, url: str, delay: float = 1.0) -> str:
+        """Texte d'un PDF nouveau ou modifié, "" si inchangé ou en erreur"""
+        if not PDF_AVAILABLE:
+            logger.warning("pypdf non disponible, skip PDF")
+            return ""
+        body = await self.get(url, timeout=60, delay=delay, keep_body=False)
+        if not body:
+            if body == b"":
+                self.stats.pdf_skipped += 1
+            return ""
+
+        loop = asyncio.get_running_loop()
+        if self.pool:
+            text = await loop.run_in_executor(self.pool, extract_pdf_text, body)
+        else:
+            text = await asyncio.to_thread(extract_pdf_text, body)
+        self.stats.pdf_extracted += 1
+        if text:
+            self.origins[content_hash(text.encode("utf-8"))] = url
+        return text
+
+    def forget(self, doc: Dict):
+        """Oublie les validateurs des ressources d'un document (re-téléchargées au prochain passage)"""
+        if not self.cache:
+            return
+        self.cache.urls.pop(doc.get("source_url"), None)
+        origin = self.origins.get(content_hash(doc.get("text", "").encode("utf-8")))
+        if origin:
+            self.cache.urls.pop(origin, None)
+
+
+# ==================== ORDONNANCEUR ====================
+
+@dataclass
+class ScrapeReport:
+    """Bilan d'un passage de scraping"""
+    sources: List[str]
+    incremental: bool
+    started_at: str
+    duration_seconds: float = 0.0
+    documents_new: int = 0
+    documents_changed: int = 0
+    documents_unchanged: int = 0
+    documents_failed: int = 0
+    fetch: FetchStats = field(default_factory=FetchStats)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ScrapeScheduler:
+    """
+    Exécute les scrapers et transmet à `ingest` les documents nouveaux/modifiés
+
+    Un seul passage à la fois (les passages partagent le cache). Les documents
+    d'une source sont ingérés dès que son scraper a terminé, pendant que les
+    autres sources continuent.
+    """
+
+    def __init__(
+        self,
+        cache_path: Optional[str] = SCRAPE_CACHE_PATH,
+        source_concurrency: int = SCRAPE_SOURCE_CONCURRENCY,
+        ingest_concurrency: int = 4,
+        pdf_workers: int = SCRAPE_PDF_WORKERS,
+    ):
+        self.cache = FetchCache(cache_path)
+        self.budget = HostBudget()
+        self.source_concurrency = max(1, source_concurrency)
+        self.ingest_concurrency = max(1, ingest_concurrency)
+        self.pdf_workers = pdf_workers
+        self.last_report: Optional[ScrapeReport] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = asyncio.Lock()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._pool is None and self.pdf_workers > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.pdf_workers)
+        return self._pool
+
+    def close(self):
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def run(
+        self,
+        scrapers: Dict[str, Type],
+        ingest: IngestCallback,
+        incremental: bool = True,
+    ) -> ScrapeReport:
+        """
+        Scrape les sources de `scrapers` ({source_id: classe BaseScraper})
+
+        `ingest(doc, status)` reçoit chaque document à (ré)ingérer avec son
+        statut NEW ou CHANGED (UNCHANGED aussi si incremental=False) et
+        retourne False en cas d'échec.
+        """
+        async with self._lock:
+            await asyncio.to_thread(self.cache.load)
+            report = ScrapeReport(
+                sources=list(scrapers),
+                incremental=incremental,
+                started_at=datetime.now().isoformat(),
+            )
+            started = time.perf_counter()
+            sources = asyncio.Semaphore(self.source_concurrency)
+            ingestions = asyncio.Semaphore(self.ingest_concurrency)
+
+            async with Fetcher(self.budget, self.cache, self._get_pool(), incremental) as fetcher:
+
+                async def emit(doc: Dict, status: str, digest: str):
+                    async with ingestions:
+                        try:
+                            ok = await ingest(doc, status)
+                        except Exception as e:
+                            logger.error(f"Erreur ingestion {doc.get('title')}: {e}")
+                            ok = False
+                    if ok:
+                        self.cache.documents[document_key(doc)] = digest
+                    else:
+                        # L'ancienne empreinte reste: au prochain passage le document sera NEW ou CHANGED
+                        report.documents_failed += 1
+                        fetcher.forget(doc)
+
+                async def run_source(source_id: str, scraper_class: Type):
+                    async with sources:
+                        try:
+                            documents = await scraper_class(fetcher).scrape()
+                        except Exception as e:
+                            logger.error(f"Erreur scraping {source_id}: {e}")
+                            report.errors[source_id] = str(e)
+                            return
+
+                    pending = []
+                    for doc in documents:
+                        digest = content_hash(doc["text"].encode("utf-8"))
+                        previous = self.cache.documents.get(document_key(doc))
+                        if previous is None:
+                            status = NEW
+                            report.documents_new += 1
+                        elif previous != digest:
+                            status = CHANGED
+                            report.documents_changed += 1
+                        else:
+                            status = UNCHANGED
+                            report.documents_unchanged += 1
+                            if incremental:
+                                continue
+                        pending.append(emit(doc, status, digest))
+                    await asyncio.gather(*pending)
+
+                await asyncio.gather(*(run_source(s, c) for s, c in scrapers.items()))
+                report.fetch = fetcher.stats
+
+            report.duration_seconds = round(time.perf_counter() - started, 2)
+            await asyncio.to_thread(self.cache.save)
+
+        self.last_report = report
+        fetch = report.fetch
+        logger.info(
+            f"🔄 Scraping {', '.join(report.sources)} en {report.duration_seconds}s: "
+            f"{report.documents_new} nouveaux, {report.documents_changed} modifiés, "
+            f"{report.documents_unchanged} inchangés | {fetch.requests} requêtes, "
+            f"{fetch.not_modified} x 304, {fetch.pdf_skipped} PDF non re-parsés, "
+            f"{fetch.bytes_downloaded / 2**20:.1f} Mo téléchargés"
+        )
+        return report
+
+
+__all__ = [
+    "HEADERS",
+    "NEW",
+    "CHANGED",
+    "UNCHANGED",
+    "HostBudget",
+    "FetchCache",
+    "Fetcher",
+    "ScrapeReport",
+    "ScrapeScheduler",
+    "extract_pdf_text",
+]
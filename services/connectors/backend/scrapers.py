@@ -8,18 +8,11 @@ from abc import ABC, abstractmethod
 from typing import List, Dict, Optional
 from datetime import datetime, timedelta
 import asyncio
-import aiohttp
 from bs4 import BeautifulSoup
 import logging
 import re
-from io import BytesIO
 
-# Pour PDF
-try:
-    import pypdf
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
+from scrape_scheduler import Fetcher, extract_pdf_text
 
 try:
     from playwright.async_api import async_playwright
@@ -29,31 +22,41 @@ except ImportError:
 
 logger = logging.getLogger("dz-scrapers")
 
-# User-Agent pour éviter les blocages
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-    "Accept-Language": "fr-FR,fr;q=0.9,ar;q=0.8",
-}
-
 
 class BaseScraper(ABC):
-    """Classe de base pour tous les scrapers DZ"""
+    """
+    Classe de base pour tous les scrapers DZ
+
+    Les requêtes passent par un Fetcher: fourni par le ScrapeScheduler
+    (session partagée, budget par hôte, cache ETag/Last-Modified, pool PDF),
+    ou créé à l'entrée du `async with` quand le scraper est utilisé seul.
+    """
     
     source_name: str = ""
     source_url: str = ""
     doc_type: str = ""
+    crawl_delay: float = 2.0  # Délai minimal entre deux requêtes vers un même hôte (s)
     
-    def __init__(self):
-        self.session: Optional[aiohttp.ClientSession] = None
+    def __init__(self, fetcher: Optional[Fetcher] = None):
+        self.fetcher = fetcher
+        self.session = None
+        self._owns_fetcher = False
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(headers=HEADERS)
+        if self.fetcher is None:
+            self.fetcher = Fetcher()
+            self._owns_fetcher = True
+        if self._owns_fetcher:
+            await self.fetcher.__aenter__()
+        self.session = self.fetcher.session
         return self
     
     async def __aexit__(self, *args):
-        if self.session:
-            await self.session.close()
+        if self._owns_fetcher:
+            await self.fetcher.__aexit__(*args)
+            self.fetcher = None
+            self._owns_fetcher = False
+        self.session = None
     
     @abstractmethod
     async def scrape(self) -> List[Dict]:
@@ -62,38 +65,19 @@ class BaseScraper(ABC):
     
     async def fetch_html(self, url: str) -> str:
         """Récupère le HTML d'une page"""
-        async with self.session.get(url, timeout=30) as response:
-            if response.status == 200:
-                return await response.text()
-            logger.error(f"Erreur HTTP {response.status} pour {url}")
-            return ""
+        return await self.fetcher.fetch_html(url, delay=self.crawl_delay)
     
     async def fetch_pdf(self, url: str) -> str:
-        """Récupère et extrait le texte d'un PDF"""
-        if not PDF_AVAILABLE:
-            logger.warning("pypdf non disponible, skip PDF")
-            return ""
-        
-        try:
-            async with self.session.get(url, timeout=60) as response:
-                if response.status == 200:
-                    pdf_bytes = await response.read()
-                    return self.extract_pdf_text(pdf_bytes)
-        except Exception as e:
-            logger.error(f"Erreur PDF {url}: {e}")
-        return ""
+        """Récupère et extrait le texte d'un PDF ("" s'il n'a pas changé depuis le dernier passage)"""
+        return await self.fetcher.fetch_pdf(url, delay=self.crawl_delay)
+    
+    async def fetch_pdfs(self, urls: List[str]) -> List[str]:
+        """Textes de plusieurs PDF, téléchargés en parallèle dans le budget de l'hôte"""
+        return list(await asyncio.gather(*(self.fetch_pdf(url) for url in urls)))
     
     def extract_pdf_text(self, pdf_bytes: bytes) -> str:
         """Extrait le texte d'un PDF"""
-        try:
-            reader = pypdf.PdfReader(BytesIO(pdf_bytes))
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-        except Exception as e:
-            logger.error(f"Erreur extraction PDF: {e}")
-            return ""
+        return extract_pdf_text(pdf_bytes)
     
     def clean_html(self, html: str) -> str:
         """Extrait le texte propre du HTML"""
@@ -135,7 +119,7 @@ class JORADPScraper(BaseScraper):
     async def scrape(self) -> List[Dict]:
         documents = []
         
-        async with aiohttp.ClientSession(headers=HEADERS) as self.session:
+        async with self:
             # Page d'accueil pour récupérer les derniers JO
             base_url = "https://www.joradp.dz/HAR/Index.htm"
             
@@ -150,14 +134,18 @@ class JORADPScraper(BaseScraper):
                 # Trouver les liens vers les JO
                 links = soup.find_all('a', href=re.compile(r'\.pdf$', re.I))
                 
-                for link in links[:10]:  # Limiter à 10 derniers
+                links = links[:10]  # Limiter à 10 derniers
+                pdf_urls = []
+                for link in links:
                     pdf_url = link.get('href')
                     if not pdf_url.startswith('http'):
                         pdf_url = f"{self.source_url}/{pdf_url}"
-                    
-                    await self.delay(2)  # Respecter le serveur
-                    
-                    text = await self.fetch_pdf(pdf_url)
+                    pdf_urls.append(pdf_url)
+                
+                # Le budget de l'hôte espace les requêtes (respecter le serveur)
+                texts = await self.fetch_pdfs(pdf_urls)
+                
+                for link, pdf_url, text in zip(links, pdf_urls, texts):
                     if text and len(text) > 100:
                         # Extraire le titre du PDF
                         title = self.extract_jo_title(text, link.text)
@@ -185,24 +173,20 @@ class JORADPScraper(BaseScraper):
         year = datetime.now().year
         
         # Format: F{year}{numero}.pdf
-        for num in range(1, 10):
-            pdf_url = f"https://www.joradp.dz/FTP/JO-FRANCAIS/{year}/F{year}0{num:02d}.pdf"
-            
-            try:
-                text = await self.fetch_pdf(pdf_url)
-                if text:
-                    documents.append({
-                        "title": f"Journal Officiel N°{num} - {year}",
-                        "text": text,
-                        "source_url": pdf_url,
-                        "source_name": self.source_name,
-                        "type": "law",
-                        "date": f"{year}-01-{num:02d}"
-                    })
-            except:
-                continue
-            
-            await self.delay(2)
+        numbers = range(1, 10)
+        pdf_urls = [f"https://www.joradp.dz/FTP/JO-FRANCAIS/{year}/F{year}0{num:02d}.pdf" for num in numbers]
+        texts = await self.fetch_pdfs(pdf_urls)
+        
+        for num, pdf_url, text in zip(numbers, pdf_urls, texts):
+            if text:
+                documents.append({
+                    "title": f"Journal Officiel N°{num} - {year}",
+                    "text": text,
+                    "source_url": pdf_url,
+                    "source_name": self.source_name,
+                    "type": "law",
+                    "date": f"{year}-01-{num:02d}"
+                })
         
         return documents
     
@@ -258,7 +242,7 @@ class DGIScraper(BaseScraper):
     async def scrape(self) -> List[Dict]:
         documents = []
         
-        async with aiohttp.ClientSession(headers=HEADERS) as self.session:
+        async with self:
             # Pages principales à scraper
             pages = [
                 "/index.php/fr/documentation/textes-reglementaires",
@@ -277,6 +261,8 @@ class DGIScraper(BaseScraper):
                         # Chercher les articles/documents
                         articles = soup.find_all(['article', 'div'], class_=re.compile(r'item|article|document'))
                         
+                        items = []
+                        pdf_urls = []
                         for article in articles[:10]:
                             title_tag = article.find(['h2', 'h3', 'a'])
                             title = title_tag.text.strip() if title_tag else "Document DGI"
@@ -288,12 +274,16 @@ class DGIScraper(BaseScraper):
                                 pdf_url = pdf_link['href']
                                 if not pdf_url.startswith('http'):
                                     pdf_url = f"{self.source_url}{pdf_url}"
-                                
-                                await self.delay(2)
-                                text = await self.fetch_pdf(pdf_url)
+                                items.append((title, pdf_url, None))
+                                pdf_urls.append(pdf_url)
                             else:
                                 # Contenu HTML
-                                text = article.get_text(separator='\n')
+                                items.append((title, None, article.get_text(separator='\n')))
+                        
+                        pdf_texts = dict(zip(pdf_urls, await self.fetch_pdfs(pdf_urls)))
+                        
+                        for title, pdf_url, html_text in items:
+                            text = pdf_texts[pdf_url] if pdf_url else html_text
                             
                             if text and len(text) > 100:
                                 documents.append({
@@ -307,8 +297,6 @@ class DGIScraper(BaseScraper):
                                 
                                 logger.info(f"💰 DGI document: {title}")
                     
-                    await self.delay(2)
-                    
                 except Exception as e:
                     logger.error(f"Erreur scraping DGI {page}: {e}")
         
@@ -331,11 +319,12 @@ class ONSScraper(BaseScraper):
     source_name = "DZ_ONS"
     source_url = "https://www.ons.dz"
     doc_type = "statistic"
+    crawl_delay = 3.0
     
     async def scrape(self) -> List[Dict]:
         documents = []
         
-        async with aiohttp.ClientSession(headers=HEADERS) as self.session:
+        async with self:
             # Publications récentes
             pages = [
                 "/index.php?option=com_content&view=article&id=1",
@@ -352,14 +341,17 @@ class ONSScraper(BaseScraper):
                     # Chercher les PDFs
                     pdf_links = soup.find_all('a', href=re.compile(r'\.pdf$', re.I))
                     
-                    for link in pdf_links[:10]:
+                    pdf_links = pdf_links[:10]
+                    pdf_urls = []
+                    for link in pdf_links:
                         pdf_url = link['href']
                         if not pdf_url.startswith('http'):
                             pdf_url = f"{self.source_url}/{pdf_url}"
-                        
-                        await self.delay(3)
-                        text = await self.fetch_pdf(pdf_url)
-                        
+                        pdf_urls.append(pdf_url)
+                    
+                    texts = await self.fetch_pdfs(pdf_urls)
+                    
+                    for link, pdf_url, text in zip(pdf_links, pdf_urls, texts):
                         if text and len(text) > 200:
                             title = link.text.strip() or self.extract_title_from_pdf(text)
                             
@@ -409,7 +401,7 @@ class BankAlgeriaScraper(BaseScraper):
     async def scrape(self) -> List[Dict]:
         documents = []
         
-        async with aiohttp.ClientSession(headers=HEADERS) as self.session:
+        async with self:
             sections = [
                 "/html/circulaires.htm",
                 "/html/rapports.htm",
@@ -427,14 +419,17 @@ class BankAlgeriaScraper(BaseScraper):
                         # Chercher les liens PDF
                         links = soup.find_all('a', href=re.compile(r'\.pdf$', re.I))
                         
-                        for link in links[:5]:
+                        links = links[:5]
+                        pdf_urls = []
+                        for link in links:
                             pdf_url = link['href']
                             if not pdf_url.startswith('http'):
                                 pdf_url = f"{self.source_url}/html/{pdf_url}"
-                            
-                            await self.delay(2)
-                            text = await self.fetch_pdf(pdf_url)
-                            
+                            pdf_urls.append(pdf_url)
+                        
+                        texts = await self.fetch_pdfs(pdf_urls)
+                        
+                        for link, pdf_url, text in zip(links, pdf_urls, texts):
                             if text:
                                 title = link.text.strip() or "Document Banque d'Algérie"
                                 
@@ -449,8 +444,6 @@ class BankAlgeriaScraper(BaseScraper):
                                 
                                 logger.info(f"🏦 Banque d'Algérie: {title}")
                     
-                    await self.delay(2)
-                    
                 except Exception as e:
                     logger.error(f"Erreur scraping Banque d'Algérie {section}: {e}")
         
@@ -477,7 +470,7 @@ class DouanesScraper(BaseScraper):
     async def scrape(self) -> List[Dict]:
         documents = []
         
-        async with aiohttp.ClientSession(headers=HEADERS) as self.session:
+        async with self:
             try:
                 html = await self.fetch_html(self.source_url)
                 
@@ -531,7 +524,7 @@ class ANEMScraper(BaseScraper):
     async def scrape(self) -> List[Dict]:
         documents = []
         
-        async with aiohttp.ClientSession(headers=HEADERS) as self.session:
+        async with self:
             try:
                 html = await self.fetch_html(self.source_url)
                 
@@ -585,7 +578,7 @@ class ANDIScraper(BaseScraper):
     async def scrape(self) -> List[Dict]:
         documents = []
         
-        async with aiohttp.ClientSession(headers=HEADERS) as self.session:
+        async with self:
             pages = [
                 "/index.php/fr/",
                 "/index.php/fr/creer-son-entreprise",
@@ -621,8 +614,6 @@ class ANDIScraper(BaseScraper):
                                 
                                 logger.info(f"🏢 ANDI: {title}")
                     
-                    await self.delay(2)
-                    
                 except Exception as e:
                     logger.error(f"Erreur scraping ANDI {page}: {e}")
         
@@ -644,6 +635,7 @@ class NewsScraper(BaseScraper):
     source_name = "DZ_NEWS"
     source_url = "multiple"
     doc_type = "news"
+    crawl_delay = 1.0
     
     NEWS_SOURCES = [
         {"name": "APS", "url": "https://www.aps.dz/economie", "selector": "article"},
@@ -654,56 +646,63 @@ class NewsScraper(BaseScraper):
     async def scrape(self) -> List[Dict]:
         documents = []
         
-        async with aiohttp.ClientSession(headers=HEADERS) as self.session:
-            for source in self.NEWS_SOURCES:
-                try:
-                    html = await self.fetch_html(source["url"])
+        async with self:
+            # Un hôte par source: les trois sites sont scrapés en parallèle
+            results = await asyncio.gather(*(self.scrape_source(source) for source in self.NEWS_SOURCES))
+            for source_documents in results:
+                documents.extend(source_documents)
+        
+        return documents
+    
+    async def scrape_source(self, source: Dict) -> List[Dict]:
+        """Derniers articles d'un site d'actualités"""
+        documents = []
+        
+        try:
+            html = await self.fetch_html(source["url"])
+            
+            if html:
+                soup = BeautifulSoup(html, 'html.parser')
+                articles = soup.select(source["selector"])[:5]
+                
+                for article in articles:
+                    # Titre
+                    title_tag = article.find(['h1', 'h2', 'h3', 'a'])
+                    title = title_tag.text.strip() if title_tag else "Actualité"
                     
-                    if html:
-                        soup = BeautifulSoup(html, 'html.parser')
-                        articles = soup.select(source["selector"])[:5]
-                        
-                        for article in articles:
-                            # Titre
-                            title_tag = article.find(['h1', 'h2', 'h3', 'a'])
-                            title = title_tag.text.strip() if title_tag else "Actualité"
-                            
-                            # Lien article complet
-                            link = article.find('a', href=True)
-                            article_url = link['href'] if link else source["url"]
-                            
-                            if not article_url.startswith('http'):
-                                article_url = f"{source['url'].rsplit('/', 1)[0]}/{article_url}"
-                            
-                            # Contenu
-                            text = article.get_text(separator='\n').strip()
-                            
-                            # Si le contenu est court, récupérer l'article complet
-                            if len(text) < 300 and link:
-                                await self.delay(1)
-                                full_html = await self.fetch_html(article_url)
-                                if full_html:
-                                    full_soup = BeautifulSoup(full_html, 'html.parser')
-                                    content = full_soup.find(['article', 'div'], class_=re.compile(r'content|post|article'))
-                                    if content:
-                                        text = content.get_text(separator='\n').strip()
-                            
-                            if len(text) > 100:
-                                documents.append({
-                                    "title": f"[{source['name']}] {title}",
-                                    "text": text,
-                                    "source_url": article_url,
-                                    "source_name": self.source_name,
-                                    "type": "news",
-                                    "date": datetime.now().strftime("%Y-%m-%d")
-                                })
-                                
-                                logger.info(f"📰 News {source['name']}: {title[:50]}...")
+                    # Lien article complet
+                    link = article.find('a', href=True)
+                    article_url = link['href'] if link else source["url"]
                     
-                    await self.delay(2)
+                    if not article_url.startswith('http'):
+                        article_url = f"{source['url'].rsplit('/', 1)[0]}/{article_url}"
                     
-                except Exception as e:
-                    logger.error(f"Erreur scraping news {source['name']}: {e}")
+                    # Contenu
+                    text = article.get_text(separator='\n').strip()
+                    
+                    # Si le contenu est court, récupérer l'article complet
+                    if len(text) < 300 and link:
+                        full_html = await self.fetch_html(article_url)
+                        if full_html:
+                            full_soup = BeautifulSoup(full_html, 'html.parser')
+                            content = full_soup.find(['article', 'div'], class_=re.compile(r'content|post|article'))
+                            if content:
+                                text = content.get_text(separator='\n').strip()
+                    
+                    if len(text) > 100:
+                        documents.append({
+                            "title": f"[{source['name']}] {title}",
+                            "text": text,
+                            "source_url": article_url,
+                            "source_name": self.source_name,
+                            "type": "news",
+                            "date": datetime.now().strftime("%Y-%m-%d")
+                        })
+                        
+                        logger.info(f"📰 News {source['name']}: {title[:50]}...")
+            
+        except Exception as e:
+            logger.error(f"Erreur scraping news {source['name']}: {e}")
         
         return documents
 
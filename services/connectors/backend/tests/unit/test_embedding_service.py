@@ -0,0 +1,173 @@
+"""
+Unit tests for the micro-batching EmbeddingService and its hash fallback
+"""
+import asyncio
+import hashlib
+import math
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from services import EmbeddingService
+
+TEXTS = [
+    "Loi de finances 2024 : taux normal de TVA",
+    "le le le taux taux",
+    "",
+    "   ",
+    "تعدل وتتمم أحكام المادة 12 من القانون",
+    " ".join(f"mot{i}" for i in range(2000)),
+]
+
+
+def _reference_embedding(text: str, dimension: int):
+    """Word-by-word hash embedding, as computed before vectorisation"""
+    vector = [0.0] * dimension
+    for i, word in enumerate(text.lower().strip().split()):
+        idx = int(hashlib.md5(word.encode()).hexdigest(), 16) % dimension
+        vector[idx] += 1.0 / (1 + math.log(i + 1))
+    norm = math.sqrt(sum(v ** 2 for v in vector)) or 1
+    return [v / norm for v in vector]
+
+
+def _hash_service(**options) -> EmbeddingService:
+    return EmbeddingService(backend="hash", **options)
+
+
+class TestHashFallback:
+    """Test suite for the vectorised hash embedding"""
+
+    def test_batch_matches_reference(self):
+        """The NumPy batch gives the same vectors as the word-by-word loop"""
+        service = _hash_service()
+        vectors = service._embed_hash_batch(TEXTS)
+
+        assert len(vectors) == len(TEXTS)
+        for text, vector in zip(TEXTS, vectors):
+            assert len(vector) == service.dimension
+            np.testing.assert_allclose(vector, _reference_embedding(text, service.dimension), rtol=1e-12, atol=1e-15)
+
+    def test_single_text_fallback(self):
+        """_embed_fallback is the batch computation for one text"""
+        service = _hash_service()
+
+        for text in TEXTS:
+            np.testing.assert_allclose(service._embed_fallback(text), _reference_embedding(text, service.dimension))
+
+    def test_empty_text_is_zero_vector(self):
+        """A text without words yields a zero vector, not NaN"""
+        assert _hash_service()._embed_hash_batch(["  "])[0] == [0.0] * 768
+
+
+class TestMicroBatching:
+    """Test suite for grouping concurrent requests into batches"""
+
+    def test_concurrent_calls_share_batches(self):
+        """Chunks of concurrent ingestions are encoded together"""
+        service = _hash_service(max_batch_size=4, max_wait_ms=20)
+        requests = [[f"document {n} chunk {i}" for i in range(3)] for n in range(3)]
+
+        async def scenario():
+            return await asyncio.gather(*(service.embed_batch(texts) for texts in requests))
+
+        results = asyncio.run(scenario())
+
+        assert service.batches == 3 and service.chunks_embedded == 9
+        for texts, vectors in zip(requests, results):
+            assert vectors == service._embed_hash_batch(texts)
+        assert service.throughput()["avg_batch_size"] == 3.0
+
+    def test_single_embeds_wait_for_a_batch(self):
+        """Concurrent embed() calls within max_wait_ms form a single batch"""
+        service = _hash_service(max_batch_size=8, max_wait_ms=20)
+
+        async def scenario():
+            return await asyncio.gather(*(service.embed(f"question {i}") for i in range(5)))
+
+        vectors = asyncio.run(scenario())
+
+        assert service.batches == 1
+        assert vectors == service._embed_hash_batch([f"question {i}" for i in range(5)])
+
+    def test_full_batch_does_not_wait(self):
+        """A request of max_batch_size chunks is encoded without waiting"""
+        service = _hash_service(max_batch_size=2, max_wait_ms=10_000)
+
+        vectors = asyncio.run(asyncio.wait_for(service.embed_batch(["a b", "c d"]), timeout=1))
+
+        assert len(vectors) == 2 and service.batches == 1
+
+    def test_failed_batch_fails_its_callers_only(self, monkeypatch):
+        """An encoding error is raised to the callers of that batch, the next batch works"""
+        service = _hash_service(max_batch_size=2, max_wait_ms=1)
+        encode = service._encode
+        calls = []
+
+        async def flaky(texts):
+            calls.append(texts)
+            if len(calls) == 1:
+                raise RuntimeError("encoder crashed")
+            return await encode(texts)
+
+        monkeypatch.setattr(service, "_encode", flaky)
+
+        async def scenario():
+            with pytest.raises(RuntimeError, match="encoder crashed"):
+                await service.embed_batch(["a", "b"])
+            return await service.embed_batch(["c", "d"])
+
+        assert len(asyncio.run(scenario())) == 2
+
+    def test_empty_request(self):
+        """No texts, no batch"""
+        service = _hash_service()
+
+        assert asyncio.run(service.embed_batch([])) == []
+        assert service.batches == 0
+
+
+class TestModelDimension:
+    """Test suite for the model / Qdrant collection dimension check"""
+
+    @pytest.fixture
+    def sentence_transformers(self, monkeypatch):
+        module = types.ModuleType("sentence_transformers")
+        module.dimension = 768
+
+        class SentenceTransformer:
+            def __init__(self, name, device=None, backend=None):
+                self.name = name
+
+            def get_sentence_embedding_dimension(self):
+                return module.dimension
+
+            def encode(self, texts, **options):
+                return np.ones((len(texts), module.dimension))
+
+        module.SentenceTransformer = SentenceTransformer
+        monkeypatch.setitem(sys.modules, "sentence_transformers", module)
+        return module
+
+    def test_matching_dimension_loads(self, sentence_transformers):
+        """A model of EMBEDDING_DIMENSION dimensions is used for every batch"""
+        service = EmbeddingService(backend="torch")
+
+        async def scenario():
+            await service.load()
+            return await service.embed("Taux de TVA")
+
+        assert len(asyncio.run(scenario())) == 768
+        assert service.backend == "torch"
+
+    def test_dimension_mismatch_fails_fast(self, sentence_transformers):
+        """A model of another dimension is refused at load time and on every embed"""
+        sentence_transformers.dimension = 384
+        service = EmbeddingService(backend="torch")
+
+        with pytest.raises(ValueError, match="384 dimensions"):
+            asyncio.run(service.load())
+        with pytest.raises(ValueError):
+            asyncio.run(service.embed("Taux de TVA"))
+        assert service.dimension == 768
@@ -0,0 +1,401 @@
+"""
+Unit tests for the scrape scheduler: host budget, conditional GETs and incremental runs
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+import main
+import scrape_scheduler
+from scrape_scheduler import (
+    CHANGED,
+    NEW,
+    UNCHANGED,
+    FetchCache,
+    Fetcher,
+    HostBudget,
+    ScrapeScheduler,
+    content_hash,
+)
+
+PAGE_URL = "https://www.example.dz/textes"
+PDF_URL = "https://www.example.dz/textes/loi.pdf"
+
+
+class FakeResponse:
+    def __init__(self, status=200, body=b"", headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def read(self):
+        return self.body
+
+
+class FakeSession:
+    """aiohttp.ClientSession answering from a {url: FakeResponse} table and recording request headers"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses[url]
+
+    async def close(self):
+        pass
+
+
+class FakeScraper:
+    """Scraper fetching one page and one PDF, then returning the documents of `DOCUMENTS`"""
+
+    DOCUMENTS = []
+
+    def __init__(self, fetcher):
+        self.fetcher = fetcher
+
+    async def scrape(self):
+        await self.fetcher.fetch_html(PAGE_URL, delay=0)
+        await self.fetcher.fetch_pdf(PDF_URL, delay=0)
+        return [dict(doc) for doc in self.DOCUMENTS]
+
+
+def _doc(title, text, url=PDF_URL):
+    return {"source_name": "DZ_JO", "source_url": url, "title": title, "text": text, "type": "law"}
+
+
+@pytest.fixture
+def pdf_as_text(monkeypatch):
+    """PDF bodies are plain UTF-8 text: no pypdf parsing in these tests"""
+    monkeypatch.setattr(scrape_scheduler, "PDF_AVAILABLE", True)
+    monkeypatch.setattr(scrape_scheduler, "extract_pdf_text", lambda body: body.decode("utf-8"))
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """FakeSession used by every Fetcher opened by the scheduler"""
+    fake = FakeSession({
+        PAGE_URL: FakeResponse(200, b"<html>liste</html>", {"ETag": '"page-1"'}),
+        PDF_URL: FakeResponse(200, b"texte de la loi", {"Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+    })
+    monkeypatch.setattr(scrape_scheduler.aiohttp, "ClientSession", lambda **kwargs: fake)
+    return fake
+
+
+def _fetcher(cache=None, incremental=True, responses=None, budget=None):
+    fetcher = Fetcher(budget or HostBudget(min_delay=0), cache, incremental=incremental)
+    fetcher.session = FakeSession(responses or {})
+    return fetcher
+
+
+def _run(scheduler, ingest, incremental=True):
+    return asyncio.run(scheduler.run({"TEST": FakeScraper}, ingest, incremental=incremental))
+
+
+class TestHostBudget:
+    """Test suite for per-host concurrency and politeness"""
+
+    def test_requests_to_a_host_are_spaced(self):
+        """Two requests to the same host start at least `delay` apart, other hosts are not held back"""
+        budget = HostBudget(concurrency=2, min_delay=0)
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            starts = {}
+
+            async def request(name, url):
+                async with budget.slot(url, delay=0.1):
+                    starts[name] = loop.time()
+
+            begin = loop.time()
+            await asyncio.gather(
+                request("first", "https://a.dz/1"),
+                request("second", "https://a.dz/2"),
+                request("other", "https://b.dz/1"),
+            )
+            return begin, starts
+
+        begin, starts = asyncio.run(scenario())
+
+        assert starts["second"] - starts["first"] >= 0.09
+        assert starts["other"] - begin < 0.05
+
+    def test_min_delay_applies_when_larger(self):
+        """The host minimum delay wins over a shorter crawl_delay"""
+        budget = HostBudget(min_delay=0.1)
+
+        async def scenario():
+            loop = asyncio.get_running_loop()
+            async with budget.slot("https://a.dz/1", delay=0):
+                pass
+            return budget._hosts["a.dz"].next_start - loop.time()
+
+        assert asyncio.run(scenario()) > 0.05
+
+    def test_429_with_retry_after_backs_off(self):
+        """A 429 pushes the next request to the host back by Retry-After seconds"""
+        budget = HostBudget(min_delay=0)
+        fetcher = _fetcher(budget=budget, responses={PAGE_URL: FakeResponse(429, headers={"Retry-After": "5"})})
+
+        async def scenario():
+            body = await fetcher.get(PAGE_URL, timeout=30, delay=0, keep_body=True)
+            return body, budget._hosts["www.example.dz"].next_start - asyncio.get_running_loop().time()
+
+        body, wait = asyncio.run(scenario())
+
+        assert body is None and fetcher.stats.errors == 1
+        assert 4 < wait <= 5
+
+    def test_503_without_retry_after_backs_off_four_delays(self):
+        """Without Retry-After, a 503 backs off by four crawl delays"""
+        budget = HostBudget(min_delay=0)
+        fetcher = _fetcher(budget=budget, responses={PAGE_URL: FakeResponse(503)})
+
+        async def scenario():
+            await fetcher.get(PAGE_URL, timeout=30, delay=0.5, keep_body=True)
+            return budget._hosts["www.example.dz"].next_start - asyncio.get_running_loop().time()
+
+        assert 1.5 < asyncio.run(scenario()) <= 2
+
+
+class TestFetchCache:
+    """Test suite for the persistent validator cache"""
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        """Saved URLs and document fingerprints are reloaded from the JSON file"""
+        path = tmp_path / "cache" / "scrape_cache.json"
+        cache = FetchCache(str(path))
+        cache.urls[PAGE_URL] = {"etag": '"1"', "checked_at": datetime.now().isoformat()}
+        cache.documents["DZ_JO:u:t"] = "abc"
+        cache.save()
+
+        reloaded = FetchCache(str(path))
+        reloaded.load()
+
+        assert reloaded.urls == cache.urls and reloaded.documents == {"DZ_JO:u:t": "abc"}
+        assert not path.with_suffix(".tmp").exists()
+
+    def test_expired_urls_are_dropped_on_save(self, tmp_path):
+        """URLs not checked for ttl_days are not written back"""
+        cache = FetchCache(str(tmp_path / "scrape_cache.json"), ttl_days=30)
+        cache.urls["old"] = {"checked_at": (datetime.now() - timedelta(days=31)).isoformat()}
+        cache.urls["recent"] = {"checked_at": datetime.now().isoformat()}
+        cache.save()
+
+        assert set(json.loads((tmp_path / "scrape_cache.json").read_text())["urls"]) == {"recent"}
+
+    def test_unreadable_file_is_ignored(self, tmp_path):
+        """A corrupt cache file starts an empty cache"""
+        path = tmp_path / "scrape_cache.json"
+        path.write_text("{not json")
+        cache = FetchCache(str(path))
+        cache.load()
+
+        assert cache.urls == {} and cache.documents == {}
+
+
+class TestFetcher:
+    """Test suite for conditional GETs and content fingerprints"""
+
+    def _cache(self, tmp_path, **entry):
+        cache = FetchCache(str(tmp_path / "scrape_cache.json"))
+        cache.urls[PAGE_URL] = dict(entry)
+        cache.urls[PDF_URL] = dict(entry)
+        return cache
+
+    def test_validators_are_sent(self, tmp_path):
+        """The cached ETag and Last-Modified go out as If-None-Match / If-Modified-Since"""
+        cache = self._cache(tmp_path, etag='"v1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+        fetcher = _fetcher(cache, responses={PAGE_URL: FakeResponse(304)})
+
+        asyncio.run(fetcher.get(PAGE_URL, timeout=30, delay=0, keep_body=True))
+
+        assert fetcher.session.requests == [(PAGE_URL, {
+            "If-None-Match": '"v1"',
+            "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+        })]
+
+    def test_not_modified_pdf_is_not_parsed(self, tmp_path, pdf_as_text):
+        """A 304 on a PDF returns "" without extraction"""
+        cache = self._cache(tmp_path, etag='"v1"')
+        fetcher = _fetcher(cache, responses={PDF_URL: FakeResponse(304)})
+
+        assert asyncio.run(fetcher.fetch_pdf(PDF_URL, delay=0)) == ""
+        assert fetcher.stats.not_modified == 1 and fetcher.stats.pdf_skipped == 1
+        assert fetcher.stats.pdf_extracted == 0
+
+    def test_not_modified_html_returns_cached_body(self, tmp_path):
+        """A 304 on a page returns the cached HTML so its links can be parsed again"""
+        cache = self._cache(tmp_path, etag='"v1"', body="<html>cache</html>")
+        fetcher = _fetcher(cache, responses={PAGE_URL: FakeResponse(304)})
+
+        assert asyncio.run(fetcher.fetch_html(PAGE_URL, delay=0)) == "<html>cache</html>"
+        assert fetcher.stats.bytes_downloaded == 0
+
+    def test_same_sha256_is_unchanged(self, tmp_path, pdf_as_text):
+        """Without validators, a body with the cached SHA-256 is reported as unchanged"""
+        cache = self._cache(tmp_path, sha256=content_hash(b"texte de la loi"))
+        fetcher = _fetcher(cache, responses={PDF_URL: FakeResponse(200, b"texte de la loi")})
+
+        assert asyncio.run(fetcher.fetch_pdf(PDF_URL, delay=0)) == ""
+        assert fetcher.session.requests == [(PDF_URL, {})]
+        assert fetcher.stats.unchanged == 1 and fetcher.stats.pdf_skipped == 1
+
+    def test_new_body_updates_the_cache(self, tmp_path):
+        """A changed page is returned and its validators, SHA-256 and HTML body cached"""
+        cache = self._cache(tmp_path, etag='"v1"', sha256="old")
+        fetcher = _fetcher(cache, responses={PAGE_URL: FakeResponse(200, b"<html>neuf</html>", {"ETag": '"v2"'})})
+
+        assert asyncio.run(fetcher.fetch_html(PAGE_URL, delay=0)) == "<html>neuf</html>"
+        entry = cache.urls[PAGE_URL]
+        assert entry["etag"] == '"v2"' and entry["sha256"] == content_hash(b"<html>neuf</html>")
+        assert entry["body"] == "<html>neuf</html>"
+
+    def test_full_run_ignores_validators(self, tmp_path, pdf_as_text):
+        """incremental=False sends no validators and returns an unchanged body"""
+        cache = self._cache(tmp_path, etag='"v1"', sha256=content_hash(b"texte de la loi"))
+        fetcher = _fetcher(cache, incremental=False, responses={PDF_URL: FakeResponse(200, b"texte de la loi")})
+
+        assert asyncio.run(fetcher.fetch_pdf(PDF_URL, delay=0)) == "texte de la loi"
+        assert fetcher.session.requests == [(PDF_URL, {})]
+        assert fetcher.stats.unchanged == 0
+
+
+class TestScrapeScheduler:
+    """Test suite for incremental scraping runs"""
+
+    @pytest.fixture(autouse=True)
+    def documents(self, monkeypatch):
+        monkeypatch.setattr(FakeScraper, "DOCUMENTS", [_doc("Loi 1", "texte de la loi"), _doc("Loi 2", "autre texte")])
+
+    def _scheduler(self, tmp_path):
+        return ScrapeScheduler(cache_path=str(tmp_path / "scrape_cache.json"), pdf_workers=0)
+
+    def _recorder(self, fail=()):
+        emitted = []
+
+        async def ingest(doc, status):
+            emitted.append((doc["title"], status))
+            return doc["title"] not in fail
+
+        return emitted, ingest
+
+    def test_new_changed_unchanged(self, tmp_path, session, pdf_as_text, monkeypatch):
+        """A second run emits only the changed document, as CHANGED"""
+        emitted, ingest = self._recorder()
+        first = _run(self._scheduler(tmp_path), ingest)
+
+        assert sorted(emitted) == [("Loi 1", NEW), ("Loi 2", NEW)]
+        assert first.documents_new == 2
+
+        monkeypatch.setattr(FakeScraper, "DOCUMENTS", [_doc("Loi 1", "texte modifié"), _doc("Loi 2", "autre texte")])
+        emitted.clear()
+        second = _run(self._scheduler(tmp_path), ingest)
+
+        assert emitted == [("Loi 1", CHANGED)]
+        assert (second.documents_new, second.documents_changed, second.documents_unchanged) == (0, 1, 1)
+
+    def test_second_run_uses_cached_validators(self, tmp_path, session, pdf_as_text):
+        """Validators from the first run, reloaded from the cache file, make the second run conditional"""
+        _, ingest = self._recorder()
+        _run(self._scheduler(tmp_path), ingest)
+        session.requests.clear()
+        session.responses[PDF_URL] = FakeResponse(304)
+        session.responses[PAGE_URL] = FakeResponse(304)
+
+        report = _run(self._scheduler(tmp_path), ingest)
+
+        headers = dict(session.requests)
+        assert headers[PAGE_URL] == {"If-None-Match": '"page-1"'}
+        assert headers[PDF_URL] == {"If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        assert report.fetch.not_modified == 2 and report.fetch.pdf_skipped == 1
+
+    def test_failed_ingestion_is_retried(self, tmp_path, session, pdf_as_text):
+        """A document whose ingestion failed is forgotten and emitted again on the next run"""
+        emitted, failing = self._recorder(fail={"Loi 1"})
+        report = _run(self._scheduler(tmp_path), failing)
+
+        assert report.documents_failed == 1
+        assert PDF_URL not in json.loads((tmp_path / "scrape_cache.json").read_text())["urls"]
+
+        session.requests.clear()
+        emitted.clear()
+        _, ingest = self._recorder()
+        retried = []
+
+        async def recording(doc, status):
+            retried.append((doc["title"], status))
+            return await ingest(doc, status)
+
+        _run(self._scheduler(tmp_path), recording)
+
+        assert retried == [("Loi 1", NEW)]
+        assert dict(session.requests)[PDF_URL] == {}
+
+    def test_ingestion_exception_counts_as_failure(self, tmp_path, session, pdf_as_text):
+        """An exception raised by ingest is a failed ingestion, not a failed run"""
+        async def ingest(doc, status):
+            raise RuntimeError("qdrant indisponible")
+
+        report = _run(self._scheduler(tmp_path), ingest)
+
+        assert report.documents_failed == 2 and report.errors == {}
+
+    def test_full_run_emits_unchanged(self, tmp_path, session, pdf_as_text):
+        """incremental=False re-emits unchanged documents and sends no validators"""
+        emitted, ingest = self._recorder()
+        _run(self._scheduler(tmp_path), ingest)
+        emitted.clear()
+        session.requests.clear()
+
+        report = _run(self._scheduler(tmp_path), ingest, incremental=False)
+
+        assert sorted(emitted) == [("Loi 1", UNCHANGED), ("Loi 2", UNCHANGED)]
+        assert all(headers == {} for _, headers in session.requests)
+        assert report.incremental is False and report.fetch.not_modified == 0
+
+    def test_scraper_error_is_reported(self, tmp_path, session):
+        """A failing scraper is recorded in the report without stopping the run"""
+        class BrokenScraper:
+            def __init__(self, fetcher):
+                pass
+
+            async def scrape(self):
+                raise ValueError("structure de page inattendue")
+
+        _, ingest = self._recorder()
+        report = asyncio.run(self._scheduler(tmp_path).run({"BROKEN": BrokenScraper}, ingest))
+
+        assert report.errors == {"BROKEN": "structure de page inattendue"}
+
+
+class TestRunScraper:
+    """Test suite for the scrape endpoint's ingestion callback"""
+
+    def test_changed_documents_are_replaced(self, tmp_path, session, pdf_as_text, monkeypatch):
+        """run_scraper ingests CHANGED documents with replace=True and NEW ones with replace=False"""
+        monkeypatch.setattr(FakeScraper, "DOCUMENTS", [_doc("Loi 1", "texte de la loi")])
+        monkeypatch.setattr(main, "SCRAPERS", {"TEST": FakeScraper})
+        monkeypatch.setattr(main, "scrape_scheduler", ScrapeScheduler(str(tmp_path / "scrape_cache.json"), pdf_workers=0))
+        calls = []
+
+        async def ingest(doc, replace=False):
+            calls.append((doc.title, replace))
+            return main.IngestionResult(success=True, document_id="id", chunks_count=1, message="ok")
+
+        monkeypatch.setattr(main, "ingest", ingest)
+
+        asyncio.run(main.run_scraper("TEST"))
+        monkeypatch.setattr(FakeScraper, "DOCUMENTS", [_doc("Loi 1", "texte modifié")])
+        asyncio.run(main.run_scraper("TEST"))
+
+        assert calls == [("Loi 1", False), ("Loi 1", True)]
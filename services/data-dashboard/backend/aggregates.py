@@ -0,0 +1,111 @@
+"""
+DZ Data Dashboard - Agrégats maintenus à l'écriture
+Compteurs par source et par type, derniers runs, mis à jour à chaque
+document ou run enregistré: les lectures (summary, health, stats publiques)
+ne parcourent plus les stores, seulement les sources et les types.
+
+- Document: O(1) (compteurs, dates max par source)
+- Run: O(log n) (tas borné des derniers runs, dernier run par source)
+
+Les agrégats ne sont pas persistés: au démarrage, ils sont reconstruits en
+rejouant le journal des enregistrements (journal.py).
+"""
+
+import heapq
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from models import DocumentIndexed, DocumentType, IngestionLog
+
+RECENT_RUNS = 10
+
+
+class SourceAggregate:
+    """Compteurs d'une source"""
+
+    __slots__ = ("documents", "chunks", "last_document_date", "last_ingested_at")
+
+    def __init__(self):
+        self.documents = 0
+        self.chunks = 0
+        self.last_document_date: Optional[datetime] = None
+        self.last_ingested_at: Optional[datetime] = None
+
+
+class DashboardAggregates:
+    """
+    Agrégats du dashboard
+
+    Mêmes résultats qu'un parcours complet des stores: en cas d'égalité de
+    date, le premier document/run enregistré l'emporte (comme un tri stable),
+    et les sources/types gardent leur ordre de première apparition.
+    """
+
+    def __init__(self, recent_runs: int = RECENT_RUNS):
+        self.recent_runs = recent_runs
+        self.reset()
+
+    def reset(self):
+        self.by_source: Dict[str, SourceAggregate] = {}
+        self.by_type: Dict[str, int] = {}
+        self.total_documents = 0
+        self.total_chunks = 0
+        self.last_update: Optional[datetime] = None
+        self.last_run_by_source: Dict[str, IngestionLog] = {}
+        # Tas min (start_time, -seq, log): la racine est le run le plus ancien des N gardés
+        self._runs: List[Tuple[datetime, int, IngestionLog]] = []
+        self._seq = 0
+
+    # ---------- Mises à jour ----------
+
+    def add_document(self, doc: DocumentIndexed):
+        src = self.by_source.get(doc.source_name)
+        if src is None:
+            src = self.by_source[doc.source_name] = SourceAggregate()
+        src.documents += 1
+        src.chunks += doc.nb_chunks
+        if doc.date_document and (not src.last_document_date or doc.date_document > src.last_document_date):
+            src.last_document_date = doc.date_document
+        if not src.last_ingested_at or doc.date_ingested > src.last_ingested_at:
+            src.last_ingested_at = doc.date_ingested
+
+        self.by_type[doc.type.value] = self.by_type.get(doc.type.value, 0) + 1
+        self.total_documents += 1
+        self.total_chunks += doc.nb_chunks
+        if not self.last_update or doc.date_ingested > self.last_update:
+            self.last_update = doc.date_ingested
+
+    def add_run(self, log: IngestionLog):
+        last = self.last_run_by_source.get(log.source_name)
+        if not last or log.start_time > last.start_time:
+            self.last_run_by_source[log.source_name] = log
+
+        self._seq += 1
+        entry = (log.start_time, -self._seq, log)
+        if len(self._runs) < self.recent_runs:
+            heapq.heappush(self._runs, entry)
+        elif entry[:2] > self._runs[0][:2]:
+            heapq.heapreplace(self._runs, entry)
+
+    # ---------- Lectures ----------
+
+    def sources(self) -> List[Tuple[str, SourceAggregate]]:
+        """Sources par nombre de documents décroissant"""
+        return sorted(self.by_source.items(), key=lambda item: item[1].documents, reverse=True)
+
+    def types(self) -> List[Tuple[str, int]]:
+        """Types par nombre de documents décroissant"""
+        return sorted(self.by_type.items(), key=lambda item: item[1], reverse=True)
+
+    def type_count(self, *types: DocumentType) -> int:
+        return sum(self.by_type.get(t.value, 0) for t in types)
+
+    def last_runs(self) -> List[IngestionLog]:
+        """Derniers runs, du plus récent au plus ancien"""
+        return [log for _, _, log in sorted(self._runs, key=lambda entry: entry[:2], reverse=True)]
+
+    def source(self, source_name: str) -> SourceAggregate:
+        return self.by_source.get(source_name) or SourceAggregate()
+
+    def last_run(self, source_name: str) -> Optional[IngestionLog]:
+        return self.last_run_by_source.get(source_name)
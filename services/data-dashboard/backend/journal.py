@@ -0,0 +1,71 @@
+"""
+DZ Data Dashboard - Journal des enregistrements
+Documents et runs enregistrés par les connecteurs, une ligne JSON par
+enregistrement, dans l'ordre d'arrivée (DASHBOARD_JOURNAL_PATH).
+
+- Rejoué au démarrage, il reconstruit les stores et les agrégats à
+  l'identique (mêmes égalités de dates résolues dans le même ordre)
+- Écritures en ajout, dans un thread: la boucle d'événements n'attend pas
+  le disque, et les lignes arrivées pendant une écriture partent ensemble
+  à la suivante (un seul open/write par lot)
+- Une ligne illisible (écriture interrompue) est ignorée au rejeu
+"""
+
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import Iterator, List, Union
+
+from models import DocumentIndexed, IngestionLog
+
+logger = logging.getLogger("dz-data-dashboard")
+
+Record = Union[DocumentIndexed, IngestionLog]
+
+RECORD_KINDS = {"document": DocumentIndexed, "run": IngestionLog}
+
+
+class IngestJournal:
+    """Journal JSONL en ajout seul des documents et runs"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._pending: List[str] = []
+        self._lock = asyncio.Lock()
+        self.writes = 0
+
+    def replay(self) -> Iterator[Record]:
+        """Enregistrements du journal, dans l'ordre d'écriture"""
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as journal:
+            for number, line in enumerate(journal, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    record = RECORD_KINDS[entry["kind"]](**entry["data"])
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"Ligne {number} du journal ignorée ({self.path}): {e}")
+                    continue
+                yield record
+
+    async def append(self, record: Record):
+        """Ajoute un enregistrement; rend la main une fois sa ligne écrite"""
+        kind = "document" if isinstance(record, DocumentIndexed) else "run"
+        self._pending.append(json.dumps({"kind": kind, "data": record.model_dump(mode="json")}, ensure_ascii=False))
+        async with self._lock:
+            if not self._pending:
+                return  # Écrite avec le lot précédent
+            lines, self._pending = self._pending, []
+            await asyncio.to_thread(self._write, lines)
+
+    def _write(self, lines: List[str]):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as journal:
+                journal.write("\n".join(lines) + "\n")
+            self.writes += 1
+        except OSError as e:
+            logger.warning(f"Écriture du journal impossible ({self.path}), {len(lines)} enregistrement(s) perdus: {e}")
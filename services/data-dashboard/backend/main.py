@@ -1,14 +1,20 @@
 """
 DZ Data Dashboard - Backend API
 Monitoring & pilotage du RAG Algérie
+
+Les endpoints summary, health et stats publiques lisent des agrégats
+maintenus à l'écriture (aggregates.py) au lieu de parcourir les stores.
+DASHBOARD_JOURNAL_PATH active le journal des documents et runs ingérés
+(journal.py): il est rejoué au démarrage pour reconstruire stores et
+agrégats, et les données de démo ne sont alors ni générées ni régénérables.
 """
 
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
 from datetime import datetime, timedelta
 from typing import Optional
+import os
 import random
-from collections import defaultdict
 
 from models import (
     DocumentIndexed, IngestionLog, DocumentType, DocumentStatus, RunStatus,
@@ -16,6 +22,10 @@ from models import (
     SourceDetailResponse, DocumentDetail, RunsListResponse,
     HealthResponse, SourceHealthStatus, PublicStatsResponse, SourceHealth
 )
+from aggregates import DashboardAggregates
+from journal import IngestJournal
+
+JOURNAL_PATH = os.getenv("DASHBOARD_JOURNAL_PATH", "")
 
 app = FastAPI(
     title="DZ Data Dashboard API",
@@ -81,6 +91,8 @@ SOURCES_CONFIG = {
 # Générer des données de démonstration
 documents_store: list[DocumentIndexed] = []
 ingestion_logs_store: list[IngestionLog] = []
+aggregates = DashboardAggregates()
+journal = IngestJournal(JOURNAL_PATH) if JOURNAL_PATH else None
 
 
 def generate_demo_data():
@@ -89,6 +101,7 @@ def generate_demo_data():
     
     documents_store = []
     ingestion_logs_store = []
+    aggregates.reset()
     
     now = datetime.utcnow()
     
@@ -175,6 +188,7 @@ def generate_demo_data():
                 status=DocumentStatus.OK if random.random() > 0.05 else DocumentStatus.PARTIAL
             )
             documents_store.append(doc)
+            aggregates.add_document(doc)
     
     # Créer les logs d'ingestion
     for source_name in SOURCES_CONFIG.keys():
@@ -217,10 +231,40 @@ def generate_demo_data():
                 error_message=error_msg
             )
             ingestion_logs_store.append(log)
+            aggregates.add_run(log)
+
+
+def replay_journal():
+    """Reconstruit stores et agrégats à partir du journal"""
+    for record in journal.replay():
+        if isinstance(record, DocumentIndexed):
+            documents_store.append(record)
+            aggregates.add_document(record)
+        else:
+            ingestion_logs_store.append(record)
+            aggregates.add_run(record)
 
 
-# Initialiser les données de démo au démarrage
-generate_demo_data()
+# Initialiser les données au démarrage: journal s'il existe, sinon démo
+if journal is None:
+    generate_demo_data()
+else:
+    replay_journal()
+
+
+def run_summary(log: IngestionLog) -> RunSummary:
+    """RunSummary d'un log d'ingestion"""
+    return RunSummary(
+        source_name=log.source_name,
+        run_id=log.run_id,
+        start_time=log.start_time.isoformat(),
+        end_time=log.end_time.isoformat() if log.end_time else None,
+        status=log.status.value,
+        nb_documents=log.nb_documents,
+        nb_chunks=log.nb_chunks,
+        error_message=log.error_message,
+        duration_seconds=int((log.end_time - log.start_time).total_seconds()) if log.end_time else None
+    )
 
 
 # ==================== API ENDPOINTS ====================
@@ -243,65 +287,31 @@ async def root():
 
 @app.get("/api/dz-data/summary", response_model=DataSummaryResponse)
 async def get_summary():
-    """Résumé global des données indexées dans le RAG-DZ"""
-    
-    # Calculs par source
-    by_source_dict = defaultdict(lambda: {"docs": 0, "chunks": 0, "last_doc": None, "last_ingest": None})
-    for doc in documents_store:
-        src = by_source_dict[doc.source_name]
-        src["docs"] += 1
-        src["chunks"] += doc.nb_chunks
-        if doc.date_document:
-            if not src["last_doc"] or doc.date_document > src["last_doc"]:
-                src["last_doc"] = doc.date_document
-        if not src["last_ingest"] or doc.date_ingested > src["last_ingest"]:
-            src["last_ingest"] = doc.date_ingested
+    """Résumé global des données indexées dans le RAG-DZ (agrégats, sans parcours des stores)"""
     
     by_source = [
         SourceSummary(
             source_name=name,
-            document_count=data["docs"],
-            chunk_count=data["chunks"],
-            last_document_date=data["last_doc"].strftime("%Y-%m-%d") if data["last_doc"] else None,
-            last_ingested_at=data["last_ingest"].isoformat() if data["last_ingest"] else None
+            document_count=src.documents,
+            chunk_count=src.chunks,
+            last_document_date=src.last_document_date.strftime("%Y-%m-%d") if src.last_document_date else None,
+            last_ingested_at=src.last_ingested_at.isoformat() if src.last_ingested_at else None
         )
-        for name, data in sorted(by_source_dict.items(), key=lambda x: x[1]["docs"], reverse=True)
+        for name, src in aggregates.sources()
     ]
     
-    # Calculs par type
-    by_type_dict = defaultdict(int)
-    for doc in documents_store:
-        by_type_dict[doc.type.value] += 1
-    
     by_type = [
         TypeSummary(type=t, document_count=c)
-        for t, c in sorted(by_type_dict.items(), key=lambda x: x[1], reverse=True)
-    ]
-    
-    # Derniers runs
-    sorted_logs = sorted(ingestion_logs_store, key=lambda x: x.start_time, reverse=True)[:10]
-    last_runs = [
-        RunSummary(
-            source_name=log.source_name,
-            run_id=log.run_id,
-            start_time=log.start_time.isoformat(),
-            end_time=log.end_time.isoformat() if log.end_time else None,
-            status=log.status.value,
-            nb_documents=log.nb_documents,
-            nb_chunks=log.nb_chunks,
-            error_message=log.error_message,
-            duration_seconds=int((log.end_time - log.start_time).total_seconds()) if log.end_time else None
-        )
-        for log in sorted_logs
+        for t, c in aggregates.types()
     ]
     
     return DataSummaryResponse(
-        total_documents=len(documents_store),
-        total_chunks=sum(doc.nb_chunks for doc in documents_store),
-        sources_count=len(by_source_dict),
+        total_documents=aggregates.total_documents,
+        total_chunks=aggregates.total_chunks,
+        sources_count=len(aggregates.by_source),
         by_source=by_source,
         by_type=by_type,
-        last_runs=last_runs
+        last_runs=[run_summary(log) for log in aggregates.last_runs()]
     )
 
 
@@ -389,20 +399,7 @@ async def get_runs(
     # Tri par date décroissante
     filtered = sorted(filtered, key=lambda x: x.start_time, reverse=True)[:limit]
     
-    runs = [
-        RunSummary(
-            source_name=log.source_name,
-            run_id=log.run_id,
-            start_time=log.start_time.isoformat(),
-            end_time=log.end_time.isoformat() if log.end_time else None,
-            status=log.status.value,
-            nb_documents=log.nb_documents,
-            nb_chunks=log.nb_chunks,
-            error_message=log.error_message,
-            duration_seconds=int((log.end_time - log.start_time).total_seconds()) if log.end_time else None
-        )
-        for log in filtered
-    ]
+    runs = [run_summary(log) for log in filtered]
     
     return RunsListResponse(runs=runs, total=len(runs))
 
@@ -416,20 +413,12 @@ async def get_health():
     overall_issues = 0
     
     for source_name in SOURCES_CONFIG.keys():
-        # Derniers documents de cette source
-        source_docs = [doc for doc in documents_store if doc.source_name == source_name]
-        
-        # Dernier run de cette source
-        source_runs = [log for log in ingestion_logs_store if log.source_name == source_name]
-        source_runs = sorted(source_runs, key=lambda x: x.start_time, reverse=True)
-        last_run = source_runs[0] if source_runs else None
+        # Agrégats de la source et dernier run
+        src = aggregates.source(source_name)
+        last_run = aggregates.last_run(source_name)
         
         # Dernière date de document
-        last_doc_date = None
-        if source_docs:
-            dates = [doc.date_document for doc in source_docs if doc.date_document]
-            if dates:
-                last_doc_date = max(dates)
+        last_doc_date = src.last_document_date
         
         # Calcul de la fraîcheur
         freshness_days = None
@@ -455,7 +444,7 @@ async def get_health():
             last_run_status=last_run.status.value if last_run else None,
             last_document_date=last_doc_date.strftime("%Y-%m-%d") if last_doc_date else None,
             freshness_days=freshness_days,
-            document_count=len(source_docs)
+            document_count=src.documents
         ))
     
     # Statut global
@@ -480,18 +469,15 @@ async def get_public_stats():
     now = datetime.utcnow()
     
     # Compter par type
-    laws = sum(1 for doc in documents_store if doc.type in [DocumentType.LAW, DocumentType.DECREE])
-    tax_docs = sum(1 for doc in documents_store if doc.type in [DocumentType.TAX, DocumentType.INSTRUCTION])
-    procedures = sum(1 for doc in documents_store if doc.type == DocumentType.PROCEDURE)
+    laws = aggregates.type_count(DocumentType.LAW, DocumentType.DECREE)
+    tax_docs = aggregates.type_count(DocumentType.TAX, DocumentType.INSTRUCTION)
+    procedures = aggregates.type_count(DocumentType.PROCEDURE)
     
     # Sources actives
-    sources = set(doc.source_name for doc in documents_store)
+    sources = set(aggregates.by_source)
     
     # Dernière mise à jour
-    if documents_store:
-        last_update = max(doc.date_ingested for doc in documents_store)
-    else:
-        last_update = now
+    last_update = aggregates.last_update or now
     
     # Couverture
     coverage = {
@@ -534,6 +520,11 @@ async def list_sources():
 @app.post("/api/dz-data/refresh-demo")
 async def refresh_demo_data():
     """Régénère les données de démo (pour tests)"""
+    if journal is not None:
+        raise HTTPException(
+            status_code=409,
+            detail="Journal d'ingestion actif (DASHBOARD_JOURNAL_PATH): les données réelles ne sont pas remplacées"
+        )
     generate_demo_data()
     return {"message": "Données de démonstration régénérées", "documents": len(documents_store), "runs": len(ingestion_logs_store)}
 
@@ -571,6 +562,9 @@ async def ingest_document(
     )
     
     documents_store.append(doc)
+    aggregates.add_document(doc)
+    if journal is not None:
+        await journal.append(doc)
     
     return {"message": "Document enregistré", "id": doc.id}
 
@@ -600,6 +594,9 @@ async def log_ingestion_run(
     )
     
     ingestion_logs_store.append(log)
+    aggregates.add_run(log)
+    if journal is not None:
+        await journal.append(log)
     
     return {"message": "Run enregistré", "id": log.id}
 
@@ -0,0 +1 @@
+"""Tests package for DZ Data Dashboard backend"""
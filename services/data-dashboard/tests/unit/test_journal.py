@@ -0,0 +1,126 @@
+"""
+Unit tests for the dashboard ingest journal and its replay
+"""
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import main
+from aggregates import DashboardAggregates
+from journal import IngestJournal
+
+
+def _snapshot(aggregates: DashboardAggregates):
+    return (
+        [(name, [getattr(src, slot) for slot in src.__slots__]) for name, src in aggregates.sources()],
+        list(aggregates.types()),
+        aggregates.total_documents,
+        aggregates.total_chunks,
+        aggregates.last_update,
+        [log.id for log in aggregates.last_runs()],
+        {name: log.id for name, log in aggregates.last_run_by_source.items()},
+    )
+
+
+def _journal_demo_data(journal: IngestJournal):
+    """Journalise les données de démo dans l'ordre où elles ont été créées"""
+    main.generate_demo_data()
+
+    async def scenario():
+        await asyncio.gather(*(journal.append(doc) for doc in main.documents_store))
+        await asyncio.gather(*(journal.append(log) for log in main.ingestion_logs_store))
+
+    asyncio.run(scenario())
+
+
+class TestIngestJournal:
+    """Test suite for journal writes and replay"""
+
+    def test_replay_rebuilds_identical_aggregates(self, tmp_path):
+        """Replaying the journal gives the same stores and aggregates"""
+        journal = IngestJournal(str(tmp_path / "journal.jsonl"))
+        _journal_demo_data(journal)
+        rebuilt = DashboardAggregates()
+        documents, runs = [], []
+        for record in journal.replay():
+            if isinstance(record, main.DocumentIndexed):
+                documents.append(record)
+                rebuilt.add_document(record)
+            else:
+                runs.append(record)
+                rebuilt.add_run(record)
+
+        assert documents == main.documents_store
+        assert runs == main.ingestion_logs_store
+        assert _snapshot(rebuilt) == _snapshot(main.aggregates)
+
+    def test_concurrent_appends_are_grouped(self, tmp_path):
+        """Lines queued during a write go out together in the next one"""
+        journal = IngestJournal(str(tmp_path / "journal.jsonl"))
+        _journal_demo_data(journal)
+
+        records = len(main.documents_store) + len(main.ingestion_logs_store)
+        assert len(list(journal.replay())) == records
+        assert journal.writes < records
+
+    def test_unreadable_lines_are_skipped(self, tmp_path):
+        """A truncated last line or an unknown kind does not stop the replay"""
+        path = tmp_path / "journal.jsonl"
+        journal = IngestJournal(str(path))
+        main.generate_demo_data()
+        first, second = main.documents_store[:2]
+        asyncio.run(journal.append(first))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"kind": "unknown", "data": {}}\n')
+        asyncio.run(journal.append(second))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"kind": "document", "data": {"doc_id"')
+
+        assert list(journal.replay()) == [first, second]
+
+    def test_missing_journal_replays_nothing(self, tmp_path):
+        """A first start without a journal file starts empty"""
+        assert list(IngestJournal(str(tmp_path / "absent.jsonl")).replay()) == []
+
+
+class TestJournalEndpoints:
+    """Test suite for the ingest endpoints with the journal enabled"""
+
+    def test_ingested_records_survive_a_restart(self, monkeypatch, tmp_path):
+        """Documents and runs ingested through the API come back on replay"""
+        journal = IngestJournal(str(tmp_path / "journal.jsonl"))
+        monkeypatch.setattr(main, "journal", journal)
+        client = TestClient(main.app)
+
+        client.post("/api/dz-data/ingest/document", params={
+            "doc_id": "jo-1", "title": "Loi de finances", "source_name": "DZ_JO",
+            "doc_type": "law", "nb_chunks": 12, "date_document": "2026-01-02",
+        })
+        client.post("/api/dz-data/ingest/run", params={
+            "source_name": "DZ_JO", "run_id": "run-1", "status": "success",
+            "nb_documents": 1, "nb_chunks": 12, "start_time": "2026-01-02T08:00:00",
+        })
+        # Redémarrage: stores et agrégats vides, puis rejeu
+        monkeypatch.setattr(main, "documents_store", [])
+        monkeypatch.setattr(main, "ingestion_logs_store", [])
+        monkeypatch.setattr(main, "aggregates", DashboardAggregates())
+        main.replay_journal()
+
+        assert [doc.doc_id for doc in main.documents_store] == ["jo-1"]
+        assert [log.run_id for log in main.ingestion_logs_store] == ["run-1"]
+        summary = client.get("/api/dz-data/summary").json()
+        assert (summary["total_documents"], summary["total_chunks"]) == (1, 12)
+
+    def test_refresh_demo_is_refused(self, monkeypatch, tmp_path):
+        """refresh-demo does not overwrite journaled data"""
+        monkeypatch.setattr(main, "journal", IngestJournal(str(tmp_path / "journal.jsonl")))
+        client = TestClient(main.app)
+
+        assert client.post("/api/dz-data/refresh-demo").status_code == 409
+
+    def test_refresh_demo_without_journal(self, monkeypatch):
+        """Without a journal the demo data can still be regenerated"""
+        monkeypatch.setattr(main, "journal", None)
+        client = TestClient(main.app)
+
+        assert client.post("/api/dz-data/refresh-demo").status_code == 200
@@ -8,22 +8,38 @@ Les calculs sont basés sur des règles configurables, pas sur les hallucination
 
 Endpoints:
 - POST /api/dz-fiscal/simulate - Simulation fiscale complète
+- POST /api/dz-fiscal/simulate/batch - Calcul seul (sans LLM) pour une liste de profils
+- POST /api/dz-fiscal/sweep - Balayage CA x salaires x régimes, matrice comparative
 - GET /api/dz-fiscal/profiles - Types de profils disponibles
 - GET /api/dz-fiscal/rules - Règles fiscales chargées
+
+Performance: clients HTTP (RAG, Groq) partagés sur la durée de vie de l'app,
+cache TTL des recherches RAG (requête, doc_type, limite) préchargé pour chaque
+couple profil x régime, calcul déterministe mémorisé par profil, et temps par
+étape (rules, rag, llm) publiés dans l'en-tête Server-Timing et sur /health.
 """
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import List, Literal, Optional, Dict, Any
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import asyncio
 import json
 import yaml
 import os
 import logging
 import httpx
+import itertools
+import math
+import numpy as np
 from datetime import datetime
 from pathlib import Path
 
+from assistant_http import ClientPool, LatencyTracker, ServerTimingMiddleware, TTLCache
+from tax_sweep import BREAKDOWN_LABELS, TOTAL_FIELDS, VectorizedTaxEngine
+
 # Configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("dz-fiscal-assistant")
@@ -32,11 +48,36 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 RAG_API_URL = os.getenv("RAG_API_URL", "http://iaf-dz-connectors-prod:8195")
 RULES_FILE = os.getenv("RULES_FILE", "/app/dz_tax_rules.yaml")
+SWEEP_MAX_SCENARIOS = int(os.getenv("SWEEP_MAX_SCENARIOS", 100000))
+RAG_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", 600))
+RAG_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", 1024))
+RAG_WARMUP = os.getenv("RAG_WARMUP", "true").lower() == "true"
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", 4096))
+
+# Clients HTTP partagés, cache RAG et temps par étape
+http_clients = ClientPool(
+    rag={"base_url": RAG_API_URL, "timeout": 30},
+    llm={"base_url": "https://api.groq.com/openai/v1", "timeout": 120},
+)
+rag_cache = TTLCache(ttl=RAG_CACHE_TTL, max_entries=RAG_CACHE_SIZE)
+latency = LatencyTracker()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ouvre les clients HTTP et précharge le cache RAG, ferme tout à l'arrêt"""
+    async with http_clients:
+        warmup = asyncio.create_task(warm_rag_cache()) if RAG_WARMUP else None
+        yield
+        if warmup:
+            warmup.cancel()
+
 
 app = FastAPI(
     title="DZ-FiscalAssistant API",
     description="Assistant fiscal Algérie - Simulations IRG, IFU, TAP, TVA, CNAS, CASNOS",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -45,7 +86,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(ServerTimingMiddleware, tracker=latency)
 
 
 # ============== MODÈLES PYDANTIC ==============
@@ -125,6 +168,78 @@ class DZFiscalResponse(BaseModel):
     followup_questions: List[str] = []
 
 
+class DZFiscalBatchRequest(BaseModel):
+    """Lot de profils à calculer (moteur déterministe seul, sans LLM)"""
+    scenarios: List[DZFiscalRequest] = Field(..., min_length=1)
+
+
+class ScenarioResult(BaseModel):
+    """Montants d'un scénario (postes du breakdown non nuls)"""
+    amounts: Dict[str, float]
+    totals: Totals
+
+
+class DZFiscalBatchResponse(BaseModel):
+    """Résultats du lot, dans l'ordre des scénarios"""
+    currency: str = "DZD"
+    results: List[ScenarioResult]
+
+
+class DZFiscalSweepRequest(BaseModel):
+    """Balayage: produit cartésien des situations (CA, charges, salaires) et des options (profil, régime)"""
+    profile_types: List[ProfileType] = Field(default=["freelance"], min_length=1)
+    regimes: List[RegimeType] = Field(default=["IFU", "réel"], min_length=1)
+    activity_sector: str = Field(default="", description="Secteur d'activité")
+    revenue_period: RevenuePeriod = Field(default="annuel")
+    revenue_amounts: List[float] = Field(..., min_length=1, description="Montants de revenu à explorer")
+    charges_amounts: List[float] = Field(default=[0], min_length=1)
+    salaries_amounts: List[float] = Field(default=[0], min_length=1)
+    social_covered: bool = Field(default=True)
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "profile_types": ["freelance", "entreprise"],
+                "regimes": ["IFU", "réel"],
+                "activity_sector": "Développement logiciel",
+                "revenue_period": "annuel",
+                "revenue_amounts": [2000000, 5000000, 10000000, 20000000],
+                "charges_amounts": [0, 500000],
+                "salaries_amounts": [0, 1200000],
+                "social_covered": True
+            }
+        }
+
+
+class SweepOption(BaseModel):
+    """Colonne de la matrice: combinaison profil x régime"""
+    profile_type: ProfileType
+    regime: RegimeType
+
+
+class SweepSituation(BaseModel):
+    """Ligne de la matrice: combinaison CA x charges x salaires"""
+    revenue_amount: float
+    charges_amount: float
+    salaries_amount: float
+
+
+class DZFiscalSweepResponse(BaseModel):
+    """
+    Matrice comparative: matrix[champ][ligne][colonne]
+    
+    Champs: estimated_tax_total, estimated_social_total, estimated_net_income
+    et chaque poste (IRG, IFU, TAP, TVA, IBS, CNAS, CASNOS). best[ligne]
+    est l'indice de l'option au revenu net estimé le plus élevé.
+    """
+    currency: str = "DZD"
+    scenario_count: int
+    situations: List[SweepSituation]
+    options: List[SweepOption]
+    matrix: Dict[str, List[List[float]]]
+    best: List[int]
+
+
 # ============== MOTEUR DE CALCUL FISCAL ==============
 
 class TaxRulesEngine:
@@ -132,6 +247,8 @@ class TaxRulesEngine:
     
     def __init__(self):
         self.rules = {}
+        self.vectorized: Optional[VectorizedTaxEngine] = None
+        self._summaries: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
         self.load_rules()
     
     def load_rules(self):
@@ -148,6 +265,13 @@ class TaxRulesEngine:
         except Exception as e:
             logger.error(f"Erreur chargement règles: {e}")
             self.rules = self._get_default_rules()
+        
+        self._summaries.clear()
+        try:
+            self.vectorized = VectorizedTaxEngine(self.rules)
+        except Exception as e:
+            logger.warning(f"Moteur vectorisé indisponible ({e}), lots calculés profil par profil")
+            self.vectorized = None
     
     def _get_default_rules(self) -> dict:
         """Règles fiscales par défaut (Algérie 2024-2025)"""
@@ -542,6 +666,63 @@ class TaxRulesEngine:
         }
 
 
+    def summary_for(self, request: DZFiscalRequest) -> Dict[str, Any]:
+        """
+        compute_fiscal_summary mémorisé par profil
+        
+        Le calcul est déterministe: un même profil (tous les champs sauf
+        detail_level) avec les mêmes règles donne le même résumé. Chaque
+        appel reçoit sa copie (dict, BreakdownItem, Totals): la modifier
+        n'altère pas le résumé mémorisé.
+        """
+        key = (
+            request.profile_type, request.activity_sector, request.regime, request.revenue_period,
+            request.revenue_amount, request.charges_amount, request.salaries_amount, request.social_covered
+        )
+        summary = self._summaries.get(key)
+        if summary is None:
+            summary = self._summaries[key] = self.compute_fiscal_summary(request)
+            if len(self._summaries) > SUMMARY_CACHE_SIZE:
+                self._summaries.popitem(last=False)
+        else:
+            self._summaries.move_to_end(key)
+        return {
+            **summary,
+            "breakdown": [item.model_copy(deep=True) for item in summary["breakdown"]],
+            "totals": summary["totals"].model_copy(),
+        }
+
+    def compute_batch(self, requests: List[DZFiscalRequest]) -> Dict[str, np.ndarray]:
+        """
+        Calcule N profils d'un coup (montants et totaux, sans textes)
+        
+        Résultats identiques à compute_fiscal_summary pour chaque profil:
+        un tableau par poste de BREAKDOWN_LABELS (0 si absent du breakdown)
+        et par champ de Totals.
+        """
+        if self.vectorized:
+            return self.vectorized.compute(
+                profile_types=[r.profile_type for r in requests],
+                regimes=[r.regime for r in requests],
+                sectors=[r.activity_sector for r in requests],
+                revenue_periods=[r.revenue_period for r in requests],
+                revenue_amounts=[r.revenue_amount for r in requests],
+                charges_amounts=[r.charges_amount for r in requests],
+                salaries_amounts=[r.salaries_amount for r in requests],
+                social_covered=[r.social_covered for r in requests],
+            )
+        
+        # Règles non vectorisables: calcul scalaire profil par profil
+        columns = {key: np.zeros(len(requests)) for key in BREAKDOWN_LABELS + TOTAL_FIELDS}
+        for i, request in enumerate(requests):
+            summary = self.compute_fiscal_summary(request)
+            for item in summary["breakdown"]:
+                columns[item.label][i] = item.amount
+            for key in TOTAL_FIELDS:
+                columns[key][i] = getattr(summary["totals"], key)
+        return columns
+
+
 # Instance globale du moteur
 tax_engine = TaxRulesEngine()
 
@@ -634,49 +815,71 @@ Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""
 
 # ============== SERVICES ==============
 
+def rag_query_for(profile_type: str, regime: str) -> str:
+    """Requête RAG d'une simulation (ne dépend que du profil et du régime)"""
+    return f"fiscalité algérie {profile_type} {regime} impôts cotisations"
+
+
+async def fetch_rag(query: str, doc_type: str, limit: int) -> List[dict]:
+    """Résultats RAG via le cache (une erreur lève une exception et n'est pas mise en cache)"""
+    async def fetch():
+        response = await http_clients["rag"].get(
+            "/api/search",
+            params={"query": query, "doc_type": doc_type, "limit": limit}
+        )
+        response.raise_for_status()
+        return response.json().get("results", [])
+    
+    return await rag_cache.get_or_fetch((query, doc_type, limit), fetch)
+
+
 async def search_rag(query: str, limit: int = 3) -> List[dict]:
     """Recherche dans le RAG DZ pour contexte fiscal"""
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            response = await client.get(
-                f"{RAG_API_URL}/api/search",
-                params={"query": query, "doc_type": "tax", "limit": limit}
-            )
-            if response.status_code == 200:
-                return response.json().get("results", [])
+        return await fetch_rag(query, "tax", limit)
     except Exception as e:
         logger.warning(f"RAG search failed: {e}")
     return []
 
 
+async def warm_rag_cache():
+    """Précharge le cache RAG pour chaque couple profil x régime"""
+    for profile_type, regime in itertools.product(ProfileType.__args__, RegimeType.__args__):
+        try:
+            await fetch_rag(rag_query_for(profile_type, regime), "tax", 3)
+        except Exception as e:
+            logger.info(f"Préchargement RAG interrompu: {e}")
+            return
+    logger.info(f"Cache RAG préchargé: {rag_cache.stats()['entries']} requêtes")
+
+
 async def call_llm(system_prompt: str, user_prompt: str) -> str:
     """Appelle le LLM pour générer les explications"""
     try:
-        async with httpx.AsyncClient(timeout=120) as client:
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": GROQ_MODEL,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 2000,
-                    "response_format": {"type": "json_object"}
-                }
-            )
+        response = await http_clients["llm"].post(
+            "/chat/completions",
+            headers={
+                "Authorization": f"Bearer {GROQ_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": GROQ_MODEL,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                "temperature": 0.3,
+                "max_tokens": 2000,
+                "response_format": {"type": "json_object"}
+            }
+        )
+        
+        if response.status_code == 200:
+            return response.json()["choices"][0]["message"]["content"]
+        else:
+            logger.error(f"LLM error: {response.status_code}")
+            raise HTTPException(status_code=500, detail="LLM_CALL_FAILED")
             
-            if response.status_code == 200:
-                return response.json()["choices"][0]["message"]["content"]
-            else:
-                logger.error(f"LLM error: {response.status_code}")
-                raise HTTPException(status_code=500, detail="LLM_CALL_FAILED")
-                
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="LLM_TIMEOUT")
     except Exception as e:
@@ -720,6 +923,8 @@ async def health():
         "llm_configured": bool(GROQ_API_KEY),
         "rules_version": tax_engine.rules.get("version", "unknown"),
         "rules_updated": tax_engine.rules.get("last_updated", "unknown"),
+        "rag_cache": rag_cache.stats(),
+        "latency_ms": latency.snapshot(),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -764,6 +969,92 @@ async def get_rules():
     }
 
 
+@app.post("/api/dz-fiscal/simulate/batch", response_model=DZFiscalBatchResponse)
+async def simulate_batch(batch: DZFiscalBatchRequest):
+    """
+    Calcul déterministe pour une liste de profils (sans RAG ni LLM)
+    
+    Mêmes montants que /simulate, évalués en un seul passage vectorisé.
+    """
+    if len(batch.scenarios) > SWEEP_MAX_SCENARIOS:
+        raise HTTPException(status_code=413, detail=f"Au plus {SWEEP_MAX_SCENARIOS} scénarios par lot")
+    
+    columns = tax_engine.compute_batch(batch.scenarios)
+    amounts = {label: columns[label].tolist() for label in BREAKDOWN_LABELS}
+    totals = {key: columns[key].tolist() for key in TOTAL_FIELDS}
+    
+    return DZFiscalBatchResponse(results=[
+        ScenarioResult(
+            amounts={label: values[i] for label, values in amounts.items() if values[i] > 0},
+            totals=Totals(**{key: values[i] for key, values in totals.items()})
+        )
+        for i in range(len(batch.scenarios))
+    ])
+
+
+@app.post("/api/dz-fiscal/sweep", response_model=DZFiscalSweepResponse)
+async def sweep(request: DZFiscalSweepRequest):
+    """
+    Balayage de scénarios pour comparer régimes et profils
+    
+    Chaque situation (CA x charges x salaires) est évaluée pour chaque option
+    (profil x régime); la matrice permet de repérer le régime optimal.
+    """
+    # Compte vérifié avant de construire le produit cartésien
+    count = math.prod(len(values) for values in (
+        request.revenue_amounts, request.charges_amounts, request.salaries_amounts,
+        request.profile_types, request.regimes,
+    ))
+    if count > SWEEP_MAX_SCENARIOS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"{count} scénarios demandés, maximum {SWEEP_MAX_SCENARIOS}"
+        )
+    situations = list(itertools.product(request.revenue_amounts, request.charges_amounts, request.salaries_amounts))
+    options = list(itertools.product(request.profile_types, request.regimes))
+    
+    # Scénarios en ordre ligne-major: (situation, option)
+    rows, cols = len(situations), len(options)
+    situation_values = np.repeat(np.array(situations, dtype=float), cols, axis=0)
+    profiles, regimes = zip(*options)
+    
+    if tax_engine.vectorized:
+        columns = tax_engine.vectorized.compute(
+            profile_types=list(profiles) * rows,
+            regimes=list(regimes) * rows,
+            sectors=[request.activity_sector] * count,
+            revenue_periods=[request.revenue_period] * count,
+            revenue_amounts=situation_values[:, 0],
+            charges_amounts=situation_values[:, 1],
+            salaries_amounts=situation_values[:, 2],
+            social_covered=[request.social_covered] * count,
+        )
+    else:
+        columns = tax_engine.compute_batch([
+            DZFiscalRequest(
+                profile_type=profile, regime=regime, activity_sector=request.activity_sector,
+                revenue_period=request.revenue_period, revenue_amount=revenue,
+                charges_amount=charges, salaries_amount=salaries, social_covered=request.social_covered
+            )
+            for revenue, charges, salaries in situations
+            for profile, regime in options
+        ])
+    
+    fields = TOTAL_FIELDS + BREAKDOWN_LABELS
+    matrix = {key: columns[key].reshape(rows, cols) for key in fields}
+    
+    return DZFiscalSweepResponse(
+        scenario_count=count,
+        situations=[
+            SweepSituation(revenue_amount=revenue, charges_amount=charges, salaries_amount=salaries)
+            for revenue, charges, salaries in situations
+        ],
+        options=[SweepOption(profile_type=profile, regime=regime) for profile, regime in options],
+        matrix={key: values.tolist() for key, values in matrix.items()},
+        best=matrix["estimated_net_income"].argmax(axis=1).tolist()
+    )
+
+
 @app.post("/api/dz-fiscal/simulate", response_model=DZFiscalResponse)
 async def simulate(request: DZFiscalRequest):
     """
@@ -775,17 +1066,19 @@ async def simulate(request: DZFiscalRequest):
     """
     logger.info(f"Simulation: {request.profile_type}, CA={request.revenue_amount}")
     
-    # 1. Calcul déterministe
-    calc_result = tax_engine.compute_fiscal_summary(request)
+    # 1. Calcul déterministe (mémorisé par profil)
+    with latency.stage("rules"):
+        calc_result = tax_engine.summary_for(request)
     logger.info(f"Calcul terminé: {len(calc_result['breakdown'])} éléments")
     
-    # 2. Recherche RAG (contexte fiscal)
-    rag_query = f"fiscalité algérie {request.profile_type} {request.regime} impôts cotisations"
-    rag_docs = await search_rag(rag_query)
+    # 2. Recherche RAG (contexte fiscal, en cache par profil x régime)
+    with latency.stage("rag"):
+        rag_docs = await search_rag(rag_query_for(request.profile_type, request.regime))
     
     # 3. Appel LLM pour explications
     user_prompt = build_fiscal_prompt(request, calc_result, rag_docs)
-    llm_raw = await call_llm(SYSTEM_PROMPT, user_prompt)
+    with latency.stage("llm"):
+        llm_raw = await call_llm(SYSTEM_PROMPT, user_prompt)
     llm_data = parse_llm_response(llm_raw)
     
     # 4. Construire les références
@@ -0,0 +1,200 @@
+"""
+Moteur fiscal vectorisé (NumPy) - simulations en lot et balayages de scénarios
+==============================================================================
+Mêmes règles que TaxRulesEngine (dz_tax_rules.yaml), évaluées sur des
+tableaux de scénarios au lieu d'un profil à la fois:
+
+- Barèmes progressifs (IRG): np.searchsorted sur les bornes basses donne la
+  tranche atteinte, les tranches pleines sont précalculées en cumul
+  (np.cumsum) et seule la tranche partielle est calculée par scénario
+- Tranches forfaitaires (IFU): np.searchsorted sur les bornes hautes
+- Taux conditionnels (TAP, TVA, IBS, CNAS, CASNOS): masques booléens
+
+Les résultats sont identiques (égalité exacte des flottants) à
+TaxRulesEngine.compute_fiscal_summary: mêmes opérations dans le même ordre,
+et arrondi à 2 décimales identique à round() de Python (voir round2).
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Postes du breakdown, dans l'ordre de compute_fiscal_summary
+BREAKDOWN_LABELS = ("IBS", "IRG", "IFU", "TAP", "TVA", "CNAS", "CASNOS")
+TOTAL_FIELDS = ("estimated_tax_total", "estimated_social_total", "estimated_net_income")
+
+FLAT_REGIMES = ["IFU", "forfaitaire"]  # TVA et TAP incluses dans l'IFU
+IFU_REGIMES = ["IFU", "forfaitaire", "inconnu"]
+
+
+def round2(values: np.ndarray) -> np.ndarray:
+    """
+    Arrondi à 2 décimales identique à round(x, 2) de Python
+
+    np.round calcule rint(x * 100) / 100: le produit x * 100 est arrondi et
+    peut franchir un demi-centime quand x en est très proche. Ces cas (rares)
+    sont détectés et recalculés avec round() de Python, qui arrondit la
+    valeur décimale exacte.
+    """
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    distance = np.abs(scaled - np.floor(scaled) - 0.5)
+    near_tie = np.flatnonzero(distance <= np.abs(scaled) * 1e-15 + 1e-12)
+    if near_tie.size:
+        rounded[near_tie] = [round(value, 2) for value in values[near_tie].tolist()]
+    return rounded
+
+
+def _sector_flags(sectors: Sequence[str], *keywords: str) -> np.ndarray:
+    """Masque "un des mots-clés dans le secteur" (calculé une fois par secteur distinct)"""
+    unique, inverse = np.unique(np.asarray(sectors, dtype=str), return_inverse=True)
+    flags = np.array([any(k in sector.lower() for k in keywords) for sector in unique], dtype=bool)
+    return flags[inverse.reshape(-1)]
+
+
+class VectorizedTaxEngine:
+    """Règles fiscales compilées en tableaux NumPy"""
+
+    def __init__(self, rules: dict):
+        self.rules = rules
+        irg = rules.get("irg", {})
+        self.irg_min, self.irg_max, self.irg_rate = self._tranches(irg.get("tranches", []), "irg")
+        # Impôt cumulé des tranches pleines: irg_prefix[k] = tranches 0..k-1 entièrement imposées
+        full = (self.irg_max - self.irg_min) * self.irg_rate
+        self.irg_prefix = np.concatenate(([0.0], np.cumsum(full[:-1])))
+        ifu = rules.get("ifu", {})
+        self.ifu_min, self.ifu_max, self.ifu_rate = self._tranches(ifu.get("tranches", []), "ifu")
+
+    @staticmethod
+    def _tranches(tranches: List[dict], name: str):
+        """
+        (min, max, rate) en tableaux
+
+        Le cumul suppose des tranches ordonnées et disjointes (comme le
+        barème officiel): sinon ValueError et l'appelant reste sur le calcul
+        scalaire.
+        """
+        mins = np.array([float(t["min"]) for t in tranches])
+        maxs = np.array([float(t["max"]) for t in tranches])
+        rates = np.array([float(t["rate"]) for t in tranches])
+        if not tranches:
+            raise ValueError(f"Aucune tranche {name}")
+        if np.any(mins > maxs) or np.any(mins[1:] < maxs[:-1]):
+            raise ValueError(f"Tranches {name} non ordonnées ou chevauchantes")
+        return mins, maxs, rates
+
+    def compute(
+        self,
+        profile_types: Sequence[str],
+        regimes: Sequence[str],
+        sectors: Sequence[str],
+        revenue_periods: Sequence[str],
+        revenue_amounts: Sequence[float],
+        charges_amounts: Sequence[float],
+        salaries_amounts: Sequence[float],
+        social_covered: Sequence[bool],
+    ) -> Dict[str, np.ndarray]:
+        """
+        Évalue N scénarios (une valeur par scénario dans chaque séquence)
+
+        Retourne un tableau par poste de BREAKDOWN_LABELS (0 si le poste
+        n'apparaît pas dans le breakdown), par champ de Totals, plus
+        revenu_annuel et benefice.
+        """
+        rules = self.rules
+        profile = np.asarray(profile_types, dtype=str)
+        regime = np.asarray(regimes, dtype=str)
+        covered = np.asarray(social_covered, dtype=bool)
+        flat = np.isin(regime, FLAT_REGIMES)
+
+        # Normaliser en annuel
+        monthly = np.asarray(revenue_periods, dtype=str) == "mensuel"
+        factor = np.where(monthly, 12.0, 1.0)
+        revenu = np.asarray(revenue_amounts, dtype=float) * factor
+        charges = np.asarray(charges_amounts, dtype=float) * factor
+        salaires = np.asarray(salaries_amounts, dtype=float) * factor
+        benefice = revenu - charges - salaires
+
+        def applies(key: str) -> np.ndarray:
+            tax = rules.get(key, {})
+            return np.isin(profile, tax.get("applies_to", [])) & bool(tax.get("enabled"))
+
+        entreprise = profile == "entreprise"
+        production = _sector_flags(sectors, "production")
+        amounts: Dict[str, np.ndarray] = {}
+
+        # IBS (entreprises)
+        ibs = rules.get("ibs", {})
+        export = _sector_flags(sectors, "export")
+        ibs_rate = np.where(
+            production, ibs.get("rate_production", 0.19),
+            np.where(export, ibs.get("rate_export", 0.19), ibs.get("rate_general", 0.26)),
+        )
+        ibs_on = entreprise & (benefice > 0) & bool(ibs.get("enabled"))
+        amounts["IBS"] = np.where(ibs_on, round2(benefice * ibs_rate), 0.0)
+
+        # IRG (autres profils, hors IFU/forfaitaire): barème progressif
+        irg = rules.get("irg", {})
+        base = np.where(profile == "salarié", revenu * (1 - irg.get("abattement_salarie", 0.10)), revenu)
+        reached = np.searchsorted(self.irg_min, base, side="left")  # tranches avec min < base
+        last = np.maximum(reached - 1, 0)
+        partial = (np.minimum(base, self.irg_max[last]) - self.irg_min[last]) * self.irg_rate[last]
+        irg_amount = np.where(reached > 0, round2(self.irg_prefix[last] + partial), 0.0)
+        irg_on = ~entreprise & applies("irg") & ~flat
+        amounts["IRG"] = np.where(irg_on & (irg_amount > 0), irg_amount, 0.0)
+
+        # IFU: taux de la première tranche contenant le CA
+        ifu = rules.get("ifu", {})
+        tranche = np.minimum(np.searchsorted(self.ifu_max, revenu, side="left"), len(self.ifu_max) - 1)
+        in_tranche = (revenu >= self.ifu_min[tranche]) & (revenu <= self.ifu_max[tranche])
+        ifu_on = (
+            applies("ifu")
+            & np.isin(regime, IFU_REGIMES)
+            & (revenu <= ifu.get("seuil_ca_max", 30000000))
+            & in_tranche
+        )
+        amounts["IFU"] = np.where(ifu_on, round2(revenu * self.ifu_rate[tranche]), 0.0)
+
+        # TAP (incluse dans l'IFU)
+        tap = rules.get("tap", {})
+        tap_rate = np.where(
+            production | _sector_flags(sectors, "industrie"),
+            tap.get("rate_production", 0.01), tap.get("rate_general", 0.02),
+        )
+        amounts["TAP"] = np.where(applies("tap") & ~flat, round2(revenu * tap_rate), 0.0)
+
+        # TVA (collectée, hors totaux)
+        tva = rules.get("tva", {})
+        tva_on = applies("tva") & ~flat & (revenu >= tva.get("seuil_assujettissement", 30000000))
+        amounts["TVA"] = np.where(tva_on, round2(revenu * 0.30 * tva.get("rate_normal", 0.19)), 0.0)
+
+        # CNAS (masse salariale plafonnée)
+        cnas = rules.get("cnas", {})
+        cnas_base = np.minimum(salaires / 12, cnas.get("plafond_mensuel", 180000)) * 12
+        cnas_total = cnas_base * cnas.get("taux_employeur", 0.26) + cnas_base * cnas.get("taux_salarie", 0.09)
+        amounts["CNAS"] = np.where(applies("cnas") & (salaires > 0), round2(cnas_total), 0.0)
+
+        # CASNOS (non-salariés couverts)
+        casnos = rules.get("casnos", {})
+        assiette = np.maximum(
+            casnos.get("assiette_min", 216000), np.minimum(revenu, casnos.get("assiette_max", 6000000))
+        )
+        amounts["CASNOS"] = np.where(applies("casnos") & covered, round2(assiette * casnos.get("taux", 0.15)), 0.0)
+
+        # Postes nuls: absents du breakdown
+        for label in BREAKDOWN_LABELS:
+            amounts[label] = np.where(amounts[label] > 0, amounts[label], 0.0)
+
+        # Même ordre d'addition que compute_fiscal_summary
+        total_impots = amounts["IBS"] + amounts["IRG"] + amounts["IFU"] + amounts["TAP"]
+        total_social = amounts["CNAS"] + amounts["CASNOS"]
+        net = revenu - total_impots - total_social - charges - salaires
+
+        return {
+            "revenu_annuel": revenu,
+            "benefice": benefice,
+            **amounts,
+            "estimated_tax_total": round2(total_impots),
+            "estimated_social_total": round2(total_social),
+            "estimated_net_income": round2(np.maximum(net, 0.0)),
+        }
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+BENCHMARK_SWEEP - Moteur fiscal vectorisé vs compute_fiscal_summary
+===================================================================
+Génère des scénarios aléatoires (tous profils, régimes, secteurs, périodes,
+montants autour des seuils des barèmes), vérifie que chaque montant du
+breakdown et chaque total sont strictement égaux entre les deux moteurs,
+puis compare les temps de calcul.
+
+Usage:
+    RULES_FILE=backend/dz_tax_rules.yaml python scripts/benchmark_sweep.py
+    python scripts/benchmark_sweep.py --scenarios 100000 --seed 7
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+# Ajouter le backend au path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from main import DZFiscalRequest, tax_engine
+from tax_sweep import BREAKDOWN_LABELS, TOTAL_FIELDS
+
+PROFILES = ["freelance", "entreprise", "salarié", "commerçant", "autre"]
+REGIMES = ["inconnu", "forfaitaire", "réel", "IFU", "autre"]
+SECTORS = ["", "Développement logiciel", "Production agroalimentaire", "Industrie textile", "Export de dattes"]
+# Seuils des barèmes (IRG, IFU, TVA, CASNOS, plafond CNAS): les cas limites comptent
+THRESHOLDS = [240000, 480000, 960000, 1920000, 3840000, 10000000, 30000000, 216000, 6000000, 2160000]
+
+
+def random_amount(rng: random.Random) -> float:
+    kind = rng.random()
+    if kind < 0.3:
+        return rng.choice(THRESHOLDS) + rng.choice([-1, -0.5, 0, 0.5, 1, 0.005, 0.015])
+    if kind < 0.5:
+        return round(rng.uniform(0, 40000000), 2)
+    return float(rng.randrange(0, 40000000, 1000))
+
+
+def random_scenarios(count: int, seed: int):
+    rng = random.Random(seed)
+    return [
+        DZFiscalRequest(
+            profile_type=rng.choice(PROFILES),
+            regime=rng.choice(REGIMES),
+            activity_sector=rng.choice(SECTORS),
+            revenue_period=rng.choice(["annuel", "mensuel"]),
+            revenue_amount=random_amount(rng) / rng.choice([1, 12]),
+            charges_amount=rng.choice([0.0, random_amount(rng) / 4]),
+            salaries_amount=rng.choice([0.0, random_amount(rng) / 3]),
+            social_covered=rng.random() < 0.8,
+        )
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du moteur fiscal vectorisé")
+    parser.add_argument("--scenarios", type=int, default=20000, help="Nombre de scénarios")
+    parser.add_argument("--seed", type=int, default=2025)
+    args = parser.parse_args()
+
+    if tax_engine.vectorized is None:
+        sys.exit("Moteur vectorisé indisponible pour ces règles")
+
+    scenarios = random_scenarios(args.scenarios, args.seed)
+    print(f"Règles {tax_engine.rules.get('version')}, {len(scenarios)} scénarios\n")
+
+    started = time.perf_counter()
+    scalar = [tax_engine.compute_fiscal_summary(request) for request in scenarios]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columns = tax_engine.compute_batch(scenarios)
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = 0
+    for i, summary in enumerate(scalar):
+        expected = {label: 0.0 for label in BREAKDOWN_LABELS}
+        expected.update({item.label: item.amount for item in summary["breakdown"]})
+        expected.update({key: getattr(summary["totals"], key) for key in TOTAL_FIELDS})
+        got = {key: columns[key][i].item() for key in expected}
+        if got != expected:
+            mismatches += 1
+            if mismatches <= 5:
+                diff = {k: (expected[k], got[k]) for k in expected if expected[k] != got[k]}
+                print(f"  ≠ scénario {i}: {scenarios[i].model_dump()} {diff}")
+
+    print(f"{'compute_fiscal_summary':<24} {scalar_seconds * 1000:>9.1f} ms  {len(scenarios) / scalar_seconds:>12,.0f} scénarios/s")
+    print(f"{'compute_batch (NumPy)':<24} {batch_seconds * 1000:>9.1f} ms  {len(scenarios) / batch_seconds:>12,.0f} scénarios/s")
+    print(f"\nAccélération x{scalar_seconds / batch_seconds:.0f}, écarts: {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
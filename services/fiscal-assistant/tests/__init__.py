@@ -0,0 +1 @@
+"""Tests package for DZ-FiscalAssistant backend"""
@@ -0,0 +1,7 @@
+"""
+Configuration pytest: les modules du backend s'importent à plat (comme dans l'image)
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
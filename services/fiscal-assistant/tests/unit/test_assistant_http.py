@@ -0,0 +1,223 @@
+"""
+Unit tests for the shared assistant HTTP runtime (clients, RAG cache, Server-Timing)
+"""
+import asyncio
+
+import httpx
+import pytest
+
+import assistant_http
+from assistant_http import ClientPool, LatencyTracker, ServerTimingMiddleware, TTLCache
+
+
+class Clock:
+    """time.monotonic under test control"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTTLCache:
+    """Test suite for the get-or-fetch cache"""
+
+    def test_concurrent_lookups_share_one_fetch(self):
+        """Identical lookups in flight wait for the same upstream request"""
+        cache = TTLCache(ttl=60)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["doc"]
+
+        async def scenario():
+            return await asyncio.gather(*(cache.get_or_fetch("tva", fetch) for _ in range(5)))
+
+        results = asyncio.run(scenario())
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert (cache.hits, cache.misses) == (4, 1)
+        assert asyncio.run(cache.get_or_fetch("tva", fetch)) == ["doc"] and len(calls) == 1
+
+    def test_failures_are_shared_but_not_cached(self):
+        """Waiters get the error of the shared fetch and the next lookup fetches again"""
+        cache = TTLCache(ttl=60)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise httpx.ConnectError("RAG unavailable")
+            return ["doc"]
+
+        async def scenario():
+            failed = await asyncio.gather(*(cache.get_or_fetch("tva", fetch) for _ in range(3)), return_exceptions=True)
+            return failed, await cache.get_or_fetch("tva", fetch)
+
+        failed, result = asyncio.run(scenario())
+
+        assert all(isinstance(error, httpx.ConnectError) for error in failed)
+        assert result == ["doc"] and len(calls) == 2
+        assert cache.stats()["entries"] == 1
+
+    def test_entries_expire_after_ttl(self, monkeypatch):
+        """An entry older than ttl is dropped and fetched again"""
+        clock = Clock()
+        monkeypatch.setattr(assistant_http.time, "monotonic", clock)
+        cache = TTLCache(ttl=60)
+        cache.set("tva", "v1")
+
+        clock.now += 59
+        assert cache.get("tva") == "v1"
+        clock.now += 2
+        assert cache.get("tva") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_least_recently_used_is_evicted(self):
+        """Past max_entries the least recently read entry goes first"""
+        cache = TTLCache(ttl=60, max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+    def test_clear_and_stats(self):
+        """clear() empties the cache, stats() reports the hit rate"""
+        cache = TTLCache(ttl=60)
+
+        async def fetch():
+            return "value"
+
+        async def scenario():
+            await cache.get_or_fetch("k", fetch)
+            await cache.get_or_fetch("k", fetch)
+
+        asyncio.run(scenario())
+        assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1, "hit_rate": 0.5, "ttl_seconds": 60}
+        cache.clear()
+        assert cache.get("k") is None
+
+
+class TestClientPool:
+    """Test suite for long-lived upstream clients"""
+
+    @staticmethod
+    def _pool(requests: list) -> ClientPool:
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(str(request.url))
+            return httpx.Response(200, json={"ok": True})
+
+        return ClientPool(rag={"base_url": "http://rag.local", "transport": httpx.MockTransport(handler)})
+
+    def test_one_client_per_upstream(self):
+        """Every request of the app lifetime goes through the same client"""
+        requests = []
+        pool = self._pool(requests)
+
+        async def scenario():
+            async with pool:
+                client = pool["rag"]
+                await pool["rag"].get("/api/search", params={"q": "tva"})
+                await pool["rag"].get("/api/search", params={"q": "irg"})
+                return client, pool["rag"]
+
+        first, second = asyncio.run(scenario())
+
+        assert first is second and first.is_closed
+        assert requests == ["http://rag.local/api/search?q=tva", "http://rag.local/api/search?q=irg"]
+
+    def test_client_outside_lifespan_is_created_on_access(self):
+        """Without start(), a client is created on first use and recreated once closed"""
+        pool = self._pool([])
+
+        async def scenario():
+            client = pool["rag"]
+            await pool.aclose()
+            return client, pool["rag"]
+
+        closed, reopened = asyncio.run(scenario())
+
+        assert closed.is_closed and reopened is not closed and not reopened.is_closed
+        asyncio.run(pool.aclose())
+
+    def test_unknown_upstream(self):
+        """Only configured upstreams exist"""
+        with pytest.raises(KeyError):
+            self._pool([])["llm"]
+
+
+class TestServerTimingMiddleware:
+    """Test suite for per-request stage timings"""
+
+    @staticmethod
+    def _app(tracker: LatencyTracker):
+        async def app(scope, receive, send):
+            for stage in scope.get("stages", []):
+                with tracker.stage(stage):
+                    await asyncio.sleep(0.001)
+            await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": b"{}"})
+
+        return app
+
+    @staticmethod
+    async def _call(middleware, stages=(), scope_type="http"):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        await middleware({"type": scope_type, "stages": list(stages)}, None, send)
+        return dict(sent[0].get("headers", []))
+
+    def test_header_lists_request_stages(self):
+        """Stages recorded by the handler appear with the total and feed the tracker"""
+        tracker = LatencyTracker()
+        middleware = ServerTimingMiddleware(self._app(tracker), tracker=tracker)
+
+        headers = asyncio.run(self._call(middleware, ["rules", "rag"]))
+
+        entries = [entry.split(";")[0] for entry in headers[b"server-timing"].decode().split(", ")]
+        assert entries == ["rules", "rag", "total"]
+        assert headers[b"content-type"] == b"application/json"
+        assert set(tracker.snapshot()) == {"rules", "rag", "total"}
+
+    def test_no_stage_no_header(self):
+        """Requests without stages (health checks) get no header"""
+        tracker = LatencyTracker()
+        middleware = ServerTimingMiddleware(self._app(tracker), tracker=tracker)
+
+        assert b"server-timing" not in asyncio.run(self._call(middleware))
+        assert tracker.snapshot() == {}
+
+    def test_concurrent_requests_keep_their_own_timings(self):
+        """Each request only reports its own stages"""
+        tracker = LatencyTracker()
+        middleware = ServerTimingMiddleware(self._app(tracker), tracker=tracker)
+
+        async def scenario():
+            return await asyncio.gather(self._call(middleware, ["rag"]), self._call(middleware, ["llm"]))
+
+        rag, llm = asyncio.run(scenario())
+
+        assert rag[b"server-timing"].startswith(b"rag;dur=") and b"llm" not in rag[b"server-timing"]
+        assert llm[b"server-timing"].startswith(b"llm;dur=") and b"rag" not in llm[b"server-timing"]
+        assert tracker.snapshot()["total"]["count"] == 2
+
+    def test_stage_outside_a_request(self):
+        """Stages recorded outside a request only feed the percentiles"""
+        tracker = LatencyTracker(window=3)
+        for seconds in (0.1, 0.2, 0.3, 0.4):
+            tracker.record("rag", seconds)
+
+        assert tracker.snapshot()["rag"] == {
+            "count": 3, "mean_ms": 300.0, "p50_ms": 300.0, "p95_ms": 400.0, "max_ms": 400.0
+        }
@@ -0,0 +1,50 @@
+"""
+Unit tests for the memoized fiscal summaries of TaxRulesEngine
+"""
+import main
+from main import DZFiscalRequest, TaxRulesEngine
+
+
+def _engine(monkeypatch, tmp_path) -> TaxRulesEngine:
+    monkeypatch.setattr(main, "RULES_FILE", str(tmp_path / "absent.yaml"))
+    return TaxRulesEngine()
+
+
+REQUEST = DZFiscalRequest(profile_type="freelance", regime="réel", revenue_amount=3000000, salaries_amount=600000)
+
+
+class TestSummaryFor:
+    """Test suite for summary_for copies"""
+
+    def test_same_result_as_compute_fiscal_summary(self, monkeypatch, tmp_path):
+        """The memoized summary equals a fresh computation"""
+        engine = _engine(monkeypatch, tmp_path)
+
+        assert engine.summary_for(REQUEST) == engine.compute_fiscal_summary(REQUEST)
+        assert engine.summary_for(REQUEST) == engine.compute_fiscal_summary(REQUEST)
+
+    def test_callers_get_their_own_copy(self, monkeypatch, tmp_path):
+        """Changing a returned summary leaves the memoized one untouched"""
+        engine = _engine(monkeypatch, tmp_path)
+        first = engine.summary_for(REQUEST)
+
+        first["breakdown"][0].amount = -1
+        first["breakdown"][0].notes.append("modifié")
+        first["breakdown"].pop()
+        first["totals"].estimated_net_income = 0
+        first["benefice"] = 0
+
+        second = engine.summary_for(REQUEST)
+        assert second == engine.compute_fiscal_summary(REQUEST)
+        assert second["breakdown"][0] is not first["breakdown"][0]
+        assert second["totals"] is not first["totals"]
+
+    def test_detail_level_shares_the_entry(self, monkeypatch, tmp_path):
+        """detail_level is not part of the key; reloading the rules empties the memo"""
+        engine = _engine(monkeypatch, tmp_path)
+        engine.summary_for(REQUEST)
+        engine.summary_for(REQUEST.model_copy(update={"detail_level": "détaillé"}))
+
+        assert len(engine._summaries) == 1
+        engine.load_rules()
+        assert len(engine._summaries) == 0
@@ -0,0 +1,218 @@
+"""
+Unit tests for the vectorised tax engine against compute_fiscal_summary
+"""
+import asyncio
+import copy
+import random
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+
+import main
+from main import DZFiscalRequest, DZFiscalSweepRequest, TaxRulesEngine
+from tax_sweep import BREAKDOWN_LABELS, TOTAL_FIELDS, VectorizedTaxEngine, round2
+
+RULES_YAML = Path(main.__file__).parent / "dz_tax_rules.yaml"
+
+PROFILES = ["freelance", "entreprise", "salarié", "commerçant", "autre"]
+REGIMES = ["inconnu", "forfaitaire", "réel", "IFU", "autre"]
+SECTORS = ["", "Développement logiciel", "Production agroalimentaire", "Industrie textile", "Export de dattes"]
+# Écarts autour des seuils: bornes exactes, demi-centimes et dinars voisins
+OFFSETS = [-1, -0.5, -0.005, 0, 0.005, 0.015, 0.5, 1]
+
+
+def _engine(monkeypatch, rules_file) -> TaxRulesEngine:
+    monkeypatch.setattr(main, "RULES_FILE", str(rules_file))
+    return TaxRulesEngine()
+
+
+def _thresholds(rules: dict) -> list:
+    """Bornes finies des barèmes et seuils des règles (annuels)"""
+    values = []
+    for tax in ("irg", "ifu"):
+        for tranche in rules[tax]["tranches"]:
+            values += [float(tranche["min"]), float(tranche["max"])]
+    values += [
+        rules["ifu"]["seuil_ca_max"],
+        rules["tva"]["seuil_assujettissement"],
+        rules["cnas"]["plafond_mensuel"] * 12,
+        rules["casnos"]["assiette_min"],
+        rules["casnos"]["assiette_max"],
+    ]
+    # Dernière tranche IRG ouverte (max: inf) dans les règles par défaut
+    return sorted(value for value in set(values) if np.isfinite(value))
+
+
+def _random_scenarios(rules: dict, count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    thresholds = _thresholds(rules)
+
+    def amount() -> float:
+        kind = rng.random()
+        if kind < 0.4:
+            return max(0.0, rng.choice(thresholds) + rng.choice(OFFSETS))
+        if kind < 0.6:
+            return round(rng.uniform(0, 40000000), 2)
+        return float(rng.randrange(0, 40000000, 1000))
+
+    return [
+        DZFiscalRequest(
+            profile_type=rng.choice(PROFILES),
+            regime=rng.choice(REGIMES),
+            activity_sector=rng.choice(SECTORS),
+            revenue_period=rng.choice(["annuel", "mensuel"]),
+            revenue_amount=amount() / rng.choice([1, 12]),
+            charges_amount=rng.choice([0.0, amount() / 4]),
+            salaries_amount=rng.choice([0.0, amount() / 3]),
+            social_covered=rng.random() < 0.8,
+        )
+        for _ in range(count)
+    ]
+
+
+def _assert_batch_matches(engine: TaxRulesEngine, scenarios: list):
+    """Chaque poste et chaque total du lot est strictement égal au calcul scalaire"""
+    columns = engine.compute_batch(scenarios)
+    mismatches = []
+    for i, request in enumerate(scenarios):
+        summary = engine.compute_fiscal_summary(request)
+        expected = {label: 0.0 for label in BREAKDOWN_LABELS}
+        expected.update({item.label: item.amount for item in summary["breakdown"]})
+        expected.update({key: getattr(summary["totals"], key) for key in TOTAL_FIELDS})
+        got = {key: columns[key][i].item() for key in expected}
+        if got != expected:
+            mismatches.append((request.model_dump(), {k: (expected[k], got[k]) for k in expected if expected[k] != got[k]}))
+    assert mismatches[:5] == []
+
+
+@pytest.fixture(params=["yaml", "default"])
+def engine(request, monkeypatch, tmp_path):
+    """Moteur sur dz_tax_rules.yaml, puis sur les règles par défaut (fichier absent)"""
+    rules_file = RULES_YAML if request.param == "yaml" else tmp_path / "absent.yaml"
+    engine = _engine(monkeypatch, rules_file)
+    assert engine.vectorized is not None
+    return engine
+
+
+class TestVectorizedEquality:
+    """Test suite for exact equality between compute_batch and compute_fiscal_summary"""
+
+    def test_random_scenarios(self, engine):
+        """Scénarios aléatoires (profils, régimes, secteurs, périodes, montants près des seuils)"""
+        _assert_batch_matches(engine, _random_scenarios(engine.rules, 3000, seed=2025))
+
+    def test_every_threshold(self, engine):
+        """Chaque seuil des règles, à l'unité et au demi-centime près, pour chaque profil et régime"""
+        scenarios = [
+            DZFiscalRequest(
+                profile_type=profile, regime=regime, activity_sector=sector, revenue_period=period,
+                revenue_amount=max(0.0, threshold + offset) / (12 if period == "mensuel" else 1),
+                salaries_amount=max(0.0, threshold + offset) / 2, social_covered=True,
+            )
+            for threshold in _thresholds(engine.rules)
+            for offset in OFFSETS
+            for profile in PROFILES
+            for regime in REGIMES
+            for sector, period in [("", "annuel"), ("Production agroalimentaire", "mensuel")]
+        ]
+        _assert_batch_matches(engine, scenarios)
+
+    def test_round2_matches_python_round(self):
+        """round2 arrondit comme round(x, 2), y compris près des demi-centimes"""
+        rng = random.Random(5)
+        values = [rng.randrange(0, 10 ** 9) / 1000 for _ in range(20000)]
+        values += [k + 0.005 for k in range(0, 100000, 7)] + [1.005, 2.675, 1e-3, 0.0]
+
+        assert round2(np.array(values)).tolist() == [round(value, 2) for value in values]
+
+
+class TestScalarFallback:
+    """Test suite for rules the vectorised engine cannot compile"""
+
+    @pytest.fixture
+    def overlapping_rules(self, tmp_path):
+        rules = yaml.safe_load(RULES_YAML.read_text(encoding="utf-8"))
+        # Deux tranches IRG qui se chevauchent: le cumul des tranches pleines ne s'applique plus
+        rules["irg"]["tranches"][2]["min"] = rules["irg"]["tranches"][1]["min"]
+        path = tmp_path / "rules.yaml"
+        path.write_text(yaml.safe_dump(rules, allow_unicode=True), encoding="utf-8")
+        return path
+
+    def test_non_monotonic_tranches_are_rejected(self):
+        """Tranches non ordonnées ou chevauchantes: ValueError"""
+        rules = yaml.safe_load(RULES_YAML.read_text(encoding="utf-8"))
+        unordered = copy.deepcopy(rules)
+        unordered["ifu"]["tranches"].reverse()
+        inverted = copy.deepcopy(rules)
+        inverted["irg"]["tranches"][1]["max"] = inverted["irg"]["tranches"][1]["min"] - 1
+
+        for broken in (unordered, inverted):
+            with pytest.raises(ValueError):
+                VectorizedTaxEngine(broken)
+
+    def test_batch_falls_back_to_scalar(self, monkeypatch, overlapping_rules):
+        """Sans moteur vectorisé, compute_batch reste égal au calcul scalaire"""
+        engine = _engine(monkeypatch, overlapping_rules)
+
+        assert engine.vectorized is None
+        _assert_batch_matches(engine, _random_scenarios(engine.rules, 300, seed=11))
+
+    def test_sweep_uses_the_fallback(self, monkeypatch, overlapping_rules):
+        """/sweep passe par compute_batch et garde les montants du calcul scalaire"""
+        engine = _engine(monkeypatch, overlapping_rules)
+        monkeypatch.setattr(main, "tax_engine", engine)
+
+        _assert_sweep_matches(engine, asyncio.run(main.sweep(SWEEP)))
+
+
+SWEEP = DZFiscalSweepRequest(
+    profile_types=PROFILES,
+    regimes=REGIMES,
+    activity_sector="Industrie textile",
+    revenue_amounts=[0, 240000.5, 960000, 10000000, 29999999.995, 30000000],
+    charges_amounts=[0, 100000],
+    salaries_amounts=[0, 2160000],
+)
+
+
+def _assert_sweep_matches(engine: TaxRulesEngine, response):
+    """Chaque case de la matrice est le total du calcul scalaire de la situation et de l'option"""
+    assert response.scenario_count == len(response.situations) * len(response.options)
+    for row, situation in enumerate(response.situations):
+        nets = []
+        for column, option in enumerate(response.options):
+            summary = engine.compute_fiscal_summary(DZFiscalRequest(
+                **option.model_dump(), **situation.model_dump(),
+                activity_sector=SWEEP.activity_sector, social_covered=SWEEP.social_covered,
+            ))
+            for key in TOTAL_FIELDS:
+                assert response.matrix[key][row][column] == getattr(summary["totals"], key)
+            nets.append(summary["totals"].estimated_net_income)
+        assert nets[response.best[row]] == max(nets)
+
+
+def test_sweep_vectorized(engine, monkeypatch):
+    """/sweep sur le moteur vectorisé"""
+    monkeypatch.setattr(main, "tax_engine", engine)
+
+    _assert_sweep_matches(engine, asyncio.run(main.sweep(SWEEP)))
+
+
+def test_sweep_too_large_is_refused_before_expansion(monkeypatch):
+    """Le 413 est levé sur le compte, sans construire le produit des situations"""
+    def no_expansion(*iterables):
+        raise AssertionError("produit cartésien construit avant la vérification")
+
+    monkeypatch.setattr(main.itertools, "product", no_expansion)
+    amounts = list(range(5000))
+    request = DZFiscalSweepRequest(
+        profile_types=PROFILES, regimes=REGIMES,
+        revenue_amounts=amounts, charges_amounts=amounts, salaries_amounts=amounts,
+    )
+
+    with pytest.raises(main.HTTPException) as error:
+        asyncio.run(main.sweep(request))
+    assert error.value.status_code == 413
+    assert str(5000 ** 3 * 25) in error.value.detail
@@ -7,18 +7,25 @@ Endpoints:
 - POST /api/dz-legal/answer - Répondre à une question juridique/administrative
 - GET /api/dz-legal/categories - Liste des catégories disponibles
 - GET /api/dz-legal/examples - Exemples de questions
+
+Performance: clients HTTP (RAG, Groq) partagés sur la durée de vie de l'app,
+cache TTL des recherches RAG (requête, doc_type, limite), et temps par étape
+(rag, llm) publiés dans l'en-tête Server-Timing et sur /health.
 """
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from typing import List, Literal, Optional
+from contextlib import asynccontextmanager
 import json
 import os
 import logging
 import httpx
 from datetime import datetime
 
+from assistant_http import ClientPool, LatencyTracker, ServerTimingMiddleware, TTLCache
+
 # Configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("dz-legal-assistant")
@@ -26,11 +33,30 @@ logger = logging.getLogger("dz-legal-assistant")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
 RAG_API_URL = os.getenv("RAG_API_URL", "http://iaf-dz-connectors-prod:8195")
+RAG_CACHE_TTL = float(os.getenv("RAG_CACHE_TTL", 600))
+RAG_CACHE_SIZE = int(os.getenv("RAG_CACHE_SIZE", 1024))
+
+# Clients HTTP partagés, cache RAG et temps par étape
+http_clients = ClientPool(
+    rag={"base_url": RAG_API_URL, "timeout": 30},
+    llm={"base_url": "https://api.groq.com/openai/v1", "timeout": 120},
+)
+rag_cache = TTLCache(ttl=RAG_CACHE_TTL, max_entries=RAG_CACHE_SIZE)
+latency = LatencyTracker()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Ouvre les clients HTTP au démarrage, les ferme à l'arrêt"""
+    async with http_clients:
+        yield
+
 
 app = FastAPI(
     title="DZ-LegalAssistant API",
     description="Assistant juridique & administratif spécialisé Algérie",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -39,7 +65,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(ServerTimingMiddleware, tracker=latency)
 
 
 # ============== MODÈLES PYDANTIC ==============
@@ -198,38 +226,35 @@ Réponds UNIQUEMENT avec le JSON, sans texte avant ou après."""
 
 async def search_rag(question: str, category: str, limit: int = 5) -> List[dict]:
     """Interroge le RAG DZ pour obtenir des documents pertinents"""
+    # Mapper les catégories vers les types de documents
+    type_mapping = {
+        "procédure_administrative": "procedure",
+        "droit_des_affaires": "law",
+        "social_cnas_casnos": "procedure",
+        "impôts_dgi": "tax",
+        "douane_import_export": "procedure",
+        "autre": None
+    }
+    doc_type = type_mapping.get(category)
+    # Espaces normalisés: même clé de cache pour une même question
+    query = " ".join(question.split())
+    
+    params = {
+        "query": query,
+        "limit": limit
+    }
+    if doc_type:
+        params["doc_type"] = doc_type
+    
+    async def fetch():
+        response = await http_clients["rag"].get("/api/search", params=params)
+        if response.status_code != 200:
+            # Erreur: levée pour ne pas être mise en cache
+            raise RuntimeError(f"RAG search failed: {response.status_code}")
+        return response.json().get("results", [])
+    
     try:
-        async with httpx.AsyncClient(timeout=30) as client:
-            # Mapper les catégories vers les types de documents
-            type_mapping = {
-                "procédure_administrative": "procedure",
-                "droit_des_affaires": "law",
-                "social_cnas_casnos": "procedure",
-                "impôts_dgi": "tax",
-                "douane_import_export": "procedure",
-                "autre": None
-            }
-            doc_type = type_mapping.get(category)
-            
-            params = {
-                "query": question,
-                "limit": limit
-            }
-            if doc_type:
-                params["doc_type"] = doc_type
-            
-            response = await client.get(
-                f"{RAG_API_URL}/api/search",
-                params=params
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("results", [])
-            else:
-                logger.warning(f"RAG search failed: {response.status_code}")
-                return []
-                
+        return await rag_cache.get_or_fetch((query, doc_type, limit), fetch)
     except Exception as e:
         logger.error(f"Error searching RAG: {e}")
         return []
@@ -238,32 +263,31 @@ async def search_rag(question: str, category: str, limit: int = 5) -> List[dict]
 async def call_llm(system_prompt: str, user_prompt: str) -> str:
     """Appelle le LLM (GROQ) pour générer la réponse"""
     try:
-        async with httpx.AsyncClient(timeout=120) as client:
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": GROQ_MODEL,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 4000,
-                    "response_format": {"type": "json_object"}
-                }
-            )
+        response = await http_clients["llm"].post(
+            "/chat/completions",
+            headers={
+                "Authorization": f"Bearer {GROQ_API_KEY}",
+                "Content-Type": "application/json"
+            },
+            json={
+                "model": GROQ_MODEL,
+                "messages": [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt}
+                ],
+                "temperature": 0.3,
+                "max_tokens": 4000,
+                "response_format": {"type": "json_object"}
+            }
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            return data["choices"][0]["message"]["content"]
+        else:
+            logger.error(f"LLM call failed: {response.status_code} - {response.text}")
+            raise HTTPException(status_code=500, detail="LLM_CALL_FAILED")
             
-            if response.status_code == 200:
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
-            else:
-                logger.error(f"LLM call failed: {response.status_code} - {response.text}")
-                raise HTTPException(status_code=500, detail="LLM_CALL_FAILED")
-                
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="LLM_TIMEOUT")
     except Exception as e:
@@ -330,6 +354,8 @@ async def health():
         "status": "healthy",
         "llm_configured": bool(GROQ_API_KEY),
         "rag_url": RAG_API_URL,
+        "rag_cache": rag_cache.stats(),
+        "latency_ms": latency.snapshot(),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -446,7 +472,8 @@ async def dz_legal_answer(payload: DZLegalRequest):
     logger.info(f"Question reçue: {payload.question[:100]}... | Catégorie: {payload.category}")
     
     # 1. Rechercher dans le RAG DZ
-    rag_docs = await search_rag(payload.question, payload.category)
+    with latency.stage("rag"):
+        rag_docs = await search_rag(payload.question, payload.category)
     logger.info(f"Documents RAG trouvés: {len(rag_docs)}")
     
     # 2. Construire les prompts
@@ -458,7 +485,8 @@ async def dz_legal_answer(payload: DZLegalRequest):
     )
     
     # 3. Appeler le LLM
-    llm_raw = await call_llm(SYSTEM_PROMPT, user_prompt)
+    with latency.stage("llm"):
+        llm_raw = await call_llm(SYSTEM_PROMPT, user_prompt)
     
     # 4. Parser la réponse
     data = parse_llm_response(llm_raw)